@@ -1,11 +1,14 @@
 # new.py
 from __future__ import annotations
 
+import hashlib
 import math
 import re
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Tuple, Dict, Optional
+from typing import Any, List, Tuple, Dict, Optional
+
+from common.lru_cache import BoundedLRU
 
 
 class CodeKind(str, Enum):
@@ -879,6 +882,75 @@ def classify_text_compact(text: str) -> Tuple[str, float]:
     return r.kind.value, r.confidence
 
 
+# ------------------------------
+# Memoized classification
+# ------------------------------
+
+# RagNode property holding CodeKind.value precomputed at import time.
+CODE_KIND_PROPERTY = "code_kind"
+
+_DEFAULT_CLASSIFICATION_CACHE_MAX_ENTRIES = 20_000
+
+
+class ClassificationCache:
+    """
+    Bounded LRU of ClassificationResult keyed by a BLAKE2b digest of the text.
+
+    Cached results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, *, max_entries: int = _DEFAULT_CLASSIFICATION_CACHE_MAX_ENTRIES) -> None:
+        self._lru: "BoundedLRU[bytes, ClassificationResult]" = BoundedLRU(max_entries=max_entries)
+
+    def classify(self, text: str) -> ClassificationResult:
+        s = str(text or "")
+        key = hashlib.blake2b(s.encode("utf-8", errors="ignore"), digest_size=16).digest()
+        cached = self._lru.get(key)
+        if cached is not None:
+            return cached
+        # Classify outside the lock; concurrent misses on the same text are harmless.
+        result = classify_text(s)
+        self._lru.put(key, result)
+        return result
+
+    def set_max_entries(self, max_entries: int) -> None:
+        self._lru.set_max_entries(max_entries)
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        out = self._lru.stats()
+        out["max_entries"] = int(self._lru.max_entries or 0)
+        return out
+
+
+_CLASSIFICATION_CACHE = ClassificationCache()
+
+
+def get_classification_cache() -> ClassificationCache:
+    return _CLASSIFICATION_CACHE
+
+
+def classify_text_cached(text: str) -> ClassificationResult:
+    """classify_text() memoized in the process-wide ClassificationCache."""
+    return _CLASSIFICATION_CACHE.classify(text)
+
+
+def precomputed_code_kind(value: Any) -> Optional[CodeKind]:
+    """
+    Parses a CodeKind stored on a node (RagNode.code_kind). Returns None when
+    missing or unknown, so callers fall back to classifying the text.
+    """
+    raw = str(value or "").strip().lower()
+    if not raw:
+        return None
+    try:
+        return CodeKind(raw)
+    except ValueError:
+        return None
+
+
 if __name__ == "__main__":
     import sys
 
@@ -4,7 +4,7 @@ import json
 import time
 import uuid
 from dataclasses import asdict
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from history.history_backend import HistoryBackend
 
@@ -26,6 +26,8 @@ class KvSessionConversationStore(ISessionConversationStore):
     Notes:
     - TTL is best-effort: if the underlying backend supports set(..., ttl=...), we use it.
     - Hard cap is enforced on every write: keep only the last max_turns per session.
+    - Writes go through `backend.update()`: on Redis (WATCH/MULTI) and the in-memory mock two
+      concurrent requests of one session cannot overwrite each other's turns.
     """
 
     def __init__(self, *, backend: HistoryBackend, ttl_s: Optional[int] = None, max_turns: int = 200) -> None:
@@ -42,7 +44,9 @@ class KvSessionConversationStore(ISessionConversationStore):
         return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
     def _load(self, session_id: str) -> dict[str, Any]:
-        raw = self._backend.get(self._key(session_id))
+        return self._parse(self._backend.get(self._key(session_id)))
+
+    def _parse(self, raw: Optional[str]) -> dict[str, Any]:
         if not raw:
             return {"by_request": {}, "turns": []}
         try:
@@ -57,12 +61,16 @@ class KvSessionConversationStore(ISessionConversationStore):
             data["turns"] = []
         return data
 
-    def _save(self, session_id: str, payload: dict[str, Any]) -> None:
-        txt = json.dumps(payload, ensure_ascii=False)
-        try:
-            self._backend.set(self._key(session_id), txt, ttl=self._ttl_s)  # type: ignore[call-arg]
-        except TypeError:
-            self._backend.set(self._key(session_id), txt)
+    def _mutate(self, session_id: str, apply: Callable[[dict[str, Any]], bool]) -> None:
+        """Transactional read-modify-write; `apply` edits the payload and returns False to skip the write."""
+
+        def _fn(raw: Optional[str]) -> Optional[str]:
+            data = self._parse(raw)
+            if not apply(data):
+                return None
+            return json.dumps(data, ensure_ascii=False)
+
+        self._backend.update(self._key(session_id), _fn, ttl=self._ttl_s)
 
     def start_turn(
         self,
@@ -82,34 +90,40 @@ class KvSessionConversationStore(ISessionConversationStore):
         if not request_id:
             raise ValueError("KvSessionConversationStore.start_turn: request_id is required")
 
-        data = self._load(session_id)
-        by_request: dict[str, str] = data["by_request"]
-
-        existing = by_request.get(request_id)
-        if isinstance(existing, str) and existing.strip():
-            return existing
-
-        turn_id = str(uuid.uuid4())
-        turn = ConversationTurn(
-            turn_id=turn_id,
-            session_id=session_id,
-            request_id=request_id,
-            created_at_utc=self._now_utc(),
-            identity_id=identity_id,
-            finalized_at_utc=None,
-            question_neutral=str(question_neutral or ""),
-            answer_neutral=None,
-            question_translated=(str(question_translated) if question_translated is not None else None),
-            answer_translated=None,
-            answer_translated_is_fallback=None,
-            metadata=dict(meta or {}),
-        )
-
-        by_request[request_id] = turn_id
-        data["turns"].append(asdict(turn))
-        data["turns"] = data["turns"][-self._max_turns :]
-        self._save(session_id, data)
-        return turn_id
+        new_turn_id = str(uuid.uuid4())
+        result: dict[str, str] = {}
+
+        def _apply(data: dict[str, Any]) -> bool:
+            # May run more than once when a concurrent write wins the race: keep it side-effect free.
+            by_request: dict[str, str] = data["by_request"]
+            existing = by_request.get(request_id)
+            if isinstance(existing, str) and existing.strip():
+                result["turn_id"] = existing
+                return False
+
+            turn = ConversationTurn(
+                turn_id=new_turn_id,
+                session_id=session_id,
+                request_id=request_id,
+                created_at_utc=self._now_utc(),
+                identity_id=identity_id,
+                finalized_at_utc=None,
+                question_neutral=str(question_neutral or ""),
+                answer_neutral=None,
+                question_translated=(str(question_translated) if question_translated is not None else None),
+                answer_translated=None,
+                answer_translated_is_fallback=None,
+                metadata=dict(meta or {}),
+            )
+
+            by_request[request_id] = new_turn_id
+            data["turns"].append(asdict(turn))
+            data["turns"] = data["turns"][-self._max_turns :]
+            result["turn_id"] = new_turn_id
+            return True
+
+        self._mutate(session_id, _apply)
+        return result["turn_id"]
 
     def finalize_turn(
         self,
@@ -128,30 +142,32 @@ class KvSessionConversationStore(ISessionConversationStore):
         if not session_id or not request_id or not turn_id:
             raise ValueError("KvSessionConversationStore.finalize_turn: session_id/request_id/turn_id are required")
 
-        data = self._load(session_id)
-        turns: list[dict[str, Any]] = [t for t in data.get("turns", []) if isinstance(t, dict)]
-        updated = False
-        for t in reversed(turns):
-            if str(t.get("turn_id") or "") == turn_id:
-                t["finalized_at_utc"] = self._now_utc()
-                t["answer_neutral"] = str(answer_neutral or "")
-                t["answer_translated"] = str(answer_translated) if answer_translated is not None else None
-                t["answer_translated_is_fallback"] = answer_translated_is_fallback
-                if meta:
-                    old = t.get("metadata")
-                    if not isinstance(old, dict):
-                        old = {}
-                    old.update(dict(meta))
-                    t["metadata"] = old
-                updated = True
-                break
-
-        if not updated:
+        result = {"found": False}
+
+        def _apply(data: dict[str, Any]) -> bool:
+            turns: list[dict[str, Any]] = [t for t in data.get("turns", []) if isinstance(t, dict)]
+            result["found"] = False
+            for t in reversed(turns):
+                if str(t.get("turn_id") or "") == turn_id:
+                    t["finalized_at_utc"] = self._now_utc()
+                    t["answer_neutral"] = str(answer_neutral or "")
+                    t["answer_translated"] = str(answer_translated) if answer_translated is not None else None
+                    t["answer_translated_is_fallback"] = answer_translated_is_fallback
+                    if meta:
+                        old = t.get("metadata")
+                        if not isinstance(old, dict):
+                            old = {}
+                        old.update(dict(meta))
+                        t["metadata"] = old
+                    data["turns"] = turns[-self._max_turns :]
+                    result["found"] = True
+                    return True
+            return False
+
+        self._mutate(session_id, _apply)
+        if not result["found"]:
             raise ValueError("KvSessionConversationStore.finalize_turn: turn_id not found")
 
-        data["turns"] = turns[-self._max_turns :]
-        self._save(session_id, data)
-
     def list_recent_finalized_turns(self, *, session_id: str, limit: int) -> list[ConversationTurn]:
         session_id = str(session_id or "").strip()
         if not session_id:
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, Mapping, Optional
+
+from .ports import IUserConversationStore
+from .types import ConversationTurn
+
+logger = logging.getLogger(__name__)
+
+# sync:         durable writes run inline on the request path (errors reach the caller).
+# write_behind: writes are queued; a full queue makes the request wait for room (backpressure, no loss).
+# best_effort:  writes are queued; a full queue drops the write (counted in stats()).
+DURABILITY_LEVELS = ("sync", "write_behind", "best_effort")
+
+
+@dataclass(frozen=True)
+class WriteBehindConfig:
+    durability: str = "sync"
+    queue_size: int = 1000
+    batch_size: int = 50
+    max_attempts: int = 5
+    backoff_base_s: float = 0.2
+    backoff_max_s: float = 5.0
+    flush_timeout_s: float = 10.0
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> "WriteBehindConfig":
+        env = os.environ if env is None else env
+        default = cls()
+
+        def _get(name: str, default_value: Any, cast: Callable[[str], Any]) -> Any:
+            raw = (env.get(name) or "").strip()
+            return cast(raw) if raw else default_value
+
+        durability = _get("APP_CONV_HIST_DURABILITY", default.durability, str).lower()
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"APP_CONV_HIST_DURABILITY must be one of {DURABILITY_LEVELS}, got {durability!r}")
+        return cls(
+            durability=durability,
+            queue_size=max(1, _get("APP_CONV_HIST_QUEUE_SIZE", default.queue_size, int)),
+            batch_size=max(1, _get("APP_CONV_HIST_BATCH_SIZE", default.batch_size, int)),
+            max_attempts=max(1, _get("APP_CONV_HIST_MAX_ATTEMPTS", default.max_attempts, int)),
+            backoff_base_s=_get("APP_CONV_HIST_BACKOFF_S", default.backoff_base_s, float),
+            backoff_max_s=_get("APP_CONV_HIST_BACKOFF_MAX_S", default.backoff_max_s, float),
+            flush_timeout_s=_get("APP_CONV_HIST_FLUSH_TIMEOUT_S", default.flush_timeout_s, float),
+        )
+
+
+class _PendingWrite:
+    __slots__ = ("method", "target", "kwargs", "enqueued_at", "session_id")
+
+    def __init__(self, method: str, target: Any, kwargs: dict[str, Any], enqueued_at: float) -> None:
+        self.method = method
+        self.target = target
+        self.kwargs = kwargs
+        self.enqueued_at = enqueued_at
+        turn = kwargs.get("turn")
+        self.session_id = str(turn.session_id if turn is not None else kwargs.get("session_id") or "")
+
+    def batch_key(self) -> Optional[Hashable]:
+        """Store-defined (tenant, user, session) key when the target can append several turns at once."""
+        key_fn = getattr(self.target, "batch_key", None)
+        if not callable(key_fn) or not callable(getattr(self.target, "insert_turns", None)):
+            return None
+        turn = self.kwargs.get("turn")
+        if turn is not None:
+            return key_fn(identity_id=turn.identity_id, session_id=turn.session_id)
+        return key_fn(identity_id=self.kwargs.get("identity_id"), session_id=self.session_id)
+
+
+class _WriteUnit:
+    """
+    What the worker applies and retries as one: a single write, or consecutive turn inserts of one
+    session (with finalizations folded into their still-queued insert) sent as one insert_turns call.
+    """
+
+    __slots__ = ("items", "turns", "attempts")
+
+    def __init__(self, item: _PendingWrite) -> None:
+        self.items = [item]
+        self.turns: Optional[list[ConversationTurn]] = [item.kwargs["turn"]] if item.method == "insert_turn" else None
+        self.attempts = 0
+
+    @property
+    def session_id(self) -> str:
+        return self.items[0].session_id
+
+    @property
+    def method(self) -> str:
+        return "insert_turns" if self.turns is not None and len(self.items) > 1 else self.items[0].method
+
+    def add_insert(self, item: _PendingWrite) -> None:
+        self.items.append(item)
+        self.turns.append(item.kwargs["turn"])
+
+    def fold_final(self, item: _PendingWrite) -> bool:
+        """Applies a finalization to its queued insert (same fields upsert_turn_final writes)."""
+        kw = item.kwargs
+        for i, turn in enumerate(self.turns or []):
+            if turn.turn_id == kw["turn_id"]:
+                self.turns[i] = dataclasses.replace(
+                    turn,
+                    answer_neutral=kw["answer_neutral"],
+                    answer_translated=kw["answer_translated"],
+                    answer_translated_is_fallback=kw["answer_translated_is_fallback"],
+                    finalized_at_utc=kw["finalized_at_utc"],
+                    metadata=dict(kw["meta"]) if kw["meta"] is not None else turn.metadata,
+                )
+                self.items.append(item)
+                return True
+        return False
+
+    def apply(self) -> None:
+        if self.turns is not None and len(self.items) > 1:
+            self.items[0].target.insert_turns(turns=list(self.turns))
+            return
+        item = self.items[0]
+        getattr(item.target, item.method)(**item.kwargs)
+
+
+class WriteBehindUserConversationStore(IUserConversationStore):
+    """
+    Durable-store decorator that moves writes off the request path.
+
+    Writes are queued in a bounded FIFO and taken by one worker thread up to `batch_size` at a
+    time. Writes of one session are applied in enqueue order (a turn's insert always lands before
+    its finalization). Stores with `insert_turns()` and `batch_key()` (the SQL store) get the
+    session's turn inserts of a batch as one call, with each finalization folded into its
+    still-queued insert; session link upserts in between do not split a group.
+
+    A failed write is retried with exponential backoff; meanwhile only the later writes of its
+    session wait behind it, other sessions keep being written. After `max_attempts` (or at once
+    for ValueError, which stores raise for bad input) it is dropped and counted; a group rejected
+    with ValueError is retried write by write. Reads go straight to the wrapped store and may lag queued writes.
+
+    Stores whose methods resolve request-scoped values (tenant, user) expose
+    `bind_request_context()`; it is called at enqueue time so the worker needs no request.
+
+    The worker starts lazily; call `reset_after_fork()` in forked children and `close()`
+    on shutdown to flush what is still queued.
+    """
+
+    def __init__(
+        self,
+        inner: IUserConversationStore,
+        *,
+        config: WriteBehindConfig,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._inner = inner
+        self._cfg = config
+        self._clock = clock
+        self.reset_after_fork()
+
+    def reset_after_fork(self) -> None:
+        """Forget the parent's queue, lock and worker (threads do not survive fork)."""
+        self._cond = threading.Condition()
+        self._queue: Deque[_PendingWrite] = collections.deque()
+        # session_id -> (retry due at, units waiting in order: the failed one first).
+        self._parked: Dict[str, tuple[float, Deque[_WriteUnit]]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._busy = 0
+        self._busy_since: Optional[float] = None
+        self._stop = threading.Event()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "grouped_inserts": 0,
+            "folded_finals": 0,
+            "retries": 0,
+            "failed": 0,
+            "dropped_queue_full": 0,
+            "blocked_on_full": 0,
+            "inline_writes": 0,
+            "max_depth": 0,
+            "last_lag_ms": None,
+            "max_lag_ms": 0,
+        }
+
+    # ------------------------------------------------------------------ #
+    # IUserConversationStore
+
+    def upsert_session_link(self, *, identity_id: str, session_id: str) -> None:
+        self._submit("upsert_session_link", identity_id=identity_id, session_id=session_id)
+
+    def insert_turn(self, *, turn: ConversationTurn) -> None:
+        self._submit("insert_turn", turn=turn)
+
+    def upsert_turn_final(
+        self,
+        *,
+        identity_id: str,
+        session_id: str,
+        turn_id: str,
+        answer_neutral: str,
+        answer_translated: Optional[str],
+        answer_translated_is_fallback: Optional[bool],
+        finalized_at_utc: Optional[str],
+        meta: Optional[dict[str, Any]],
+    ) -> None:
+        self._submit(
+            "upsert_turn_final",
+            identity_id=identity_id,
+            session_id=session_id,
+            turn_id=turn_id,
+            answer_neutral=answer_neutral,
+            answer_translated=answer_translated,
+            answer_translated_is_fallback=answer_translated_is_fallback,
+            finalized_at_utc=finalized_at_utc,
+            meta=dict(meta) if meta is not None else None,
+        )
+
+    def list_recent_finalized_turns_by_session(self, *, session_id: str, limit: int) -> list[ConversationTurn]:
+        return self._inner.list_recent_finalized_turns_by_session(session_id=session_id, limit=limit)
+
+    # ------------------------------------------------------------------ #
+
+    def _submit(self, method: str, **kwargs: Any) -> None:
+        if self._cfg.durability == "sync":
+            getattr(self._inner, method)(**kwargs)
+            return
+
+        bind = getattr(self._inner, "bind_request_context", None)
+        target = bind() if callable(bind) else self._inner
+        with self._cond:
+            if self._closed:
+                inline = True
+            elif len(self._queue) >= self._cfg.queue_size and not self._wait_for_room():
+                if self._cfg.durability == "best_effort":
+                    self._stats["dropped_queue_full"] += 1
+                    logger.warning("conversation history: write-behind queue full, dropped %s", method)
+                    return
+                # The worker is stuck (e.g. retrying a dead database): do not hang the request forever.
+                inline = True
+            else:
+                inline = False
+                self._queue.append(_PendingWrite(method, target, kwargs, self._clock()))
+                self._stats["enqueued"] += 1
+                self._stats["max_depth"] = max(self._stats["max_depth"], len(self._queue))
+                self._ensure_worker()
+                self._cond.notify_all()
+            if inline:
+                self._stats["inline_writes"] += 1
+        if inline:
+            getattr(target, method)(**kwargs)
+
+    def _wait_for_room(self) -> bool:
+        # Caller holds self._cond.
+        if self._cfg.durability != "write_behind":
+            return False
+        self._stats["blocked_on_full"] += 1
+        deadline = time.monotonic() + self._cfg.flush_timeout_s
+        while len(self._queue) >= self._cfg.queue_size and not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return not self._closed
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="conv-history-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    due = self._take_due_locked()
+                    if due or self._queue:
+                        break
+                    if self._stop.is_set() and not self._parked:
+                        return
+                    self._cond.wait(self._next_due_in_locked())
+                batch = [self._queue.popleft() for _ in range(min(self._cfg.batch_size, len(self._queue)))]
+                self._busy = sum(len(u.items) for u in due) + len(batch)
+                self._busy_since = min([u.items[0].enqueued_at for u in due] + [i.enqueued_at for i in batch[:1]])
+                self._cond.notify_all()  # room for requests blocked on a full queue
+            try:
+                self._write_units(due + self._plan(batch))
+            finally:
+                with self._cond:
+                    self._busy = 0
+                    self._busy_since = None
+                    self._stats["batches"] += 1
+                    self._cond.notify_all()
+
+    def _take_due_locked(self) -> list[_WriteUnit]:
+        # Parked sessions whose retry is due (all of them once close() gave up waiting), oldest first.
+        now = time.monotonic()
+        due_ids = [sid for sid, (due_at, _) in self._parked.items() if due_at <= now or self._stop.is_set()]
+        units: list[_WriteUnit] = []
+        for sid in due_ids:
+            units.extend(self._parked.pop(sid)[1])
+        return units
+
+    def _next_due_in_locked(self) -> Optional[float]:
+        if not self._parked:
+            return None
+        return max(0.0, min(due_at for due_at, _ in self._parked.values()) - time.monotonic())
+
+    def _plan(self, batch: list[_PendingWrite]) -> list[_WriteUnit]:
+        units: list[_WriteUnit] = []
+        open_groups: Dict[Hashable, _WriteUnit] = {}
+        for item in batch:
+            try:
+                key = item.batch_key()
+            except Exception:
+                key = None  # applied alone; its own write reports the problem
+            group = open_groups.get(key) if key is not None else None
+            if item.method == "insert_turn" and key is not None:
+                if group is None:
+                    group = _WriteUnit(item)
+                    open_groups[key] = group
+                    units.append(group)
+                else:
+                    group.add_insert(item)
+                continue
+            if item.method == "upsert_turn_final" and group is not None and group.fold_final(item):
+                continue
+            if item.method != "upsert_session_link" and key is not None:
+                # A later insert must not move ahead of this write.
+                open_groups.pop(key, None)
+            units.append(_WriteUnit(item))
+        return units
+
+    def _write_units(self, units: list[_WriteUnit]) -> None:
+        pending = collections.deque(units)
+        while pending:
+            unit = pending.popleft()
+            with self._cond:
+                parked = self._parked.get(unit.session_id)
+                if parked is not None:
+                    parked[1].append(unit)  # keeps the session's order behind its failed write
+                    self._busy -= len(unit.items)
+                    continue
+            unit.attempts += 1
+            try:
+                unit.apply()
+            except ValueError:
+                if len(unit.items) > 1:
+                    # One bad turn must not take the group's other writes with it.
+                    pending.extendleft(reversed([_WriteUnit(item) for item in unit.items]))
+                    continue
+                logger.exception("conversation history: %s rejected, dropped", unit.method)
+                self._record_done(unit, failed=True)
+                continue
+            except Exception:
+                if unit.attempts >= self._cfg.max_attempts:
+                    logger.exception("conversation history: %s failed %d times, dropped", unit.method, unit.attempts)
+                    self._record_done(unit, failed=True)
+                    continue
+                delay = min(self._cfg.backoff_max_s, self._cfg.backoff_base_s * (2 ** (unit.attempts - 1)))
+                if self._stop.is_set():
+                    # Once close() gave up waiting, the remaining attempts run without delay.
+                    delay = 0.0
+                logger.warning("conversation history: %s failed, retry in %.2fs", unit.method, delay)
+                with self._cond:
+                    self._stats["retries"] += 1
+                    self._parked[unit.session_id] = (time.monotonic() + delay, collections.deque([unit]))
+                    self._busy -= len(unit.items)
+                continue
+            self._record_done(unit, failed=False)
+
+    def _record_done(self, unit: _WriteUnit, *, failed: bool) -> None:
+        lag_ms = int((self._clock() - unit.items[0].enqueued_at) * 1000)
+        with self._cond:
+            self._stats["failed" if failed else "written"] += len(unit.items)
+            if not failed and len(unit.items) > 1:
+                self._stats["grouped_inserts"] += len(unit.turns or [])
+                self._stats["folded_finals"] += len(unit.items) - len(unit.turns or [])
+            self._stats["last_lag_ms"] = lag_ms
+            self._stats["max_lag_ms"] = max(self._stats["max_lag_ms"], lag_ms)
+
+    def flush(self, timeout_s: Optional[float] = None) -> bool:
+        """Wait until every queued write was applied (or dropped); False on timeout."""
+        timeout = self._cfg.flush_timeout_s if timeout_s is None else float(timeout_s)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy or self._parked:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Stop accepting queued writes (later ones run inline), flush, then let the worker finish without backoff."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+        self.flush()
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(self._cfg.flush_timeout_s)
+        with self._cond:
+            pending = len(self._queue) + self._busy + self._parked_count_locked()
+        if pending:
+            logger.error("conversation history: %d durable writes still queued at shutdown", pending)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            waiting = [u.items[0].enqueued_at for _, units in self._parked.values() for u in units]
+            waiting += [t for t in (self._busy_since,) if t is not None]
+            waiting += [self._queue[0].enqueued_at] if self._queue else []
+            oldest = min(waiting) if waiting else None
+            return {
+                "durability": self._cfg.durability,
+                "queue_size": self._cfg.queue_size,
+                "depth": len(self._queue) + self._busy + self._parked_count_locked(),
+                "parked_sessions": len(self._parked),
+                "lag_ms": int((self._clock() - oldest) * 1000) if oldest is not None else 0,
+                **self._stats,
+            }
+
+    def _parked_count_locked(self) -> int:
+        return sum(len(u.items) for _, units in self._parked.values() for u in units)
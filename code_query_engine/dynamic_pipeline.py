@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import logging
 import os
-from pathlib import Path
 from typing import Any, Optional
 
 from code_query_engine.pipeline.providers.ports import IRetrievalBackend
@@ -12,8 +11,8 @@ from integrations.plant_uml.plantuml_check import add_plant_link
 
 from .pipeline.action_registry import build_default_action_registry
 from .pipeline.engine import PipelineEngine, PipelineRuntime
+from .pipeline.compiled_cache import CompiledPipelineCache
 from .pipeline.loader import PipelineLoader
-from .pipeline.lockfile import apply_lockfile, load_lockfile, lockfile_path_for_yaml
 from .pipeline.providers.retrieval import RetrievalDispatcher
 from .pipeline.state import PipelineState
 from .pipeline.validator import PipelineValidator
@@ -60,7 +59,9 @@ _RETRIEVAL_FILTER_KEYS_ALLOWED = {
 
 
 def _create_history_manager(*, mock_redis: Any, session_id: str, consultant: str, user_id: Optional[str]):
-    return HistoryManager(backend=mock_redis, session_id=session_id, user_id=user_id)
+    # Same session TTL knob as the conversation-history session store.
+    ttl_raw = (os.getenv("APP_CONV_HIST_TTL_S") or "").strip()
+    return HistoryManager(backend=mock_redis, session_id=session_id, user_id=user_id, ttl=int(ttl_raw) if ttl_raw else None)
 
 
 def _validate_override_keys(overrides: dict[str, Any]) -> None:
@@ -172,6 +173,37 @@ class DynamicPipelineRunner:
         # Engine needs an action registry (tests may override runner._engine anyway).
         self._engine = PipelineEngine(registry=build_default_action_registry())
         self._budget_contract_cache: dict[str, tuple[dict[str, float], dict[str, Any], PipelineDef]] = {}
+        self._compiled_cache = CompiledPipelineCache()
+
+    def compiled_pipeline_cache_stats(self) -> dict[str, Any]:
+        return self._compiled_cache.stats()
+
+    def warm_compiled_pipelines(self, pipeline_names: Optional[list[str]] = None) -> dict[str, Optional[str]]:
+        """
+        Loads, validates and compiles pipelines ahead of the first query (all when pipeline_names is None).
+        Returns {pipeline_name: None | error}.
+        """
+        results: dict[str, Optional[str]] = {}
+        names = pipeline_names if pipeline_names is not None else self._loader.list_pipeline_names()
+        for name in names:
+            try:
+                self._compiled_cache.get_or_compile(name, loader=self._loader, validator=self._validator)
+                results[name] = None
+            except Exception as ex:
+                results[name] = f"{type(ex).__name__}: {ex}"
+        return results
+
+    def invalidate_compiled_pipelines(self, pipeline_name: Optional[str] = None) -> int:
+        """
+        Drops compiled pipelines (all when pipeline_name is None).
+        Budget-contract results derived from them are dropped as well.
+        """
+        removed = self._compiled_cache.invalidate(pipeline_name)
+        if pipeline_name is None:
+            self._budget_contract_cache.clear()
+        else:
+            self._budget_contract_cache.pop(pipeline_name, None)
+        return removed
 
     def run(
         self,
@@ -190,12 +222,20 @@ class DynamicPipelineRunner:
         snapshot_set_id: Optional[str] = None,
         overrides: Optional[dict[str, Any]] = None,
         mock_redis: Any = None,
+        conversation_history_service: Any = None,
     ):
+        """
+        `mock_redis` / `conversation_history_service` replace the runner's history backends for
+        this run only (warmup runs synthetic turns against throwaway in-memory stores).
+        """
         pipe_name = pipeline_name or consultant
 
-        # ✅ Correct loader API
-        pipeline = self._loader.load_by_name(pipe_name)
-        self._validator.validate(pipeline)
+        compiled = self._compiled_cache.get_or_compile(
+            pipe_name,
+            loader=self._loader,
+            validator=self._validator,
+        )
+        pipeline = compiled.pipeline
 
         # ✅ Block test pipelines unless explicitly allowed (required by E2E test)
         if bool((pipeline.settings or {}).get("test")) and not self.allow_test_pipelines:
@@ -208,35 +248,6 @@ class DynamicPipelineRunner:
             if settings_overrides:
                 effective_settings.update(settings_overrides)
 
-        compat_mode = str(effective_settings.get("compat_mode") or "").strip().lower()
-        behavior_version = str(effective_settings.get("behavior_version") or "").strip()
-
-        if compat_mode in ("locked", "strict"):
-            lockfile_path = None
-            resolve_fn = getattr(self._loader, "resolve_files_by_name", None)
-            if callable(resolve_fn):
-                try:
-                    files = resolve_fn(pipe_name)
-                except Exception:
-                    files = []
-                if files:
-                    lockfile_path = lockfile_path_for_yaml(Path(files[0]))
-
-            if lockfile_path is None:
-                raise ValueError("compat_mode locked requires lockfile path resolution")
-            if not lockfile_path.exists():
-                raise ValueError(f"compat_mode locked requires lockfile: {lockfile_path}")
-
-            lock = load_lockfile(lockfile_path)
-            if lock.behavior_version != behavior_version:
-                raise ValueError(
-                    "lockfile.behavior_version does not match pipeline.settings.behavior_version"
-                )
-            if lock.pipeline_name != pipeline.name:
-                raise ValueError("lockfile.pipeline_name does not match pipeline.name")
-
-            pipeline = apply_lockfile(pipeline, lock)
-
         # Budget contract requires some numeric settings to be present even for pipelines
         # with no call_model steps (e.g., unit-test pipelines). Provide safe defaults.
         if effective_settings.get("max_context_tokens") is None:
@@ -265,10 +276,8 @@ class DynamicPipelineRunner:
                 if pk:
                     prompt_keys.add(pk)
 
-            files: list[str] = []
-            resolve_fn = getattr(self._loader, "resolve_files_by_name", None)
-            if callable(resolve_fn):
-                files = [os.fspath(p) for p in resolve_fn(pipe_name)]
+            # The compiled pipeline already knows its extends chain; avoid re-parsing YAML.
+            files: list[str] = list(compiled.files)
             for pk in sorted(prompt_keys):
                 files.append(os.path.join(prompts_dir, f"{pk}.txt"))
 
@@ -395,7 +404,7 @@ class DynamicPipelineRunner:
             markdown_translator=self.markdown_translator,
             translator_pl_en=self.translator_pl_en,
             history_manager=history_manager,
-            conversation_history_service=self.conversation_history_service,
+            conversation_history_service=conversation_history_service or self.conversation_history_service,
             logger=self.logger,
             constants=constants,
             retrieval_backend=retrieval_backend,
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import http.client
+import io
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Errors on a reused keep-alive connection that mean "the server already closed it":
+# the request is retried once on a fresh connection.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """
+    Connection pool settings of one LLM server (ServersLLM.json `pool` object).
+
+    - max_connections: kept keep-alive connections (and concurrent pooled requests).
+    - block: when all connections are busy, wait for one (True) or open a temporary
+      overflow connection that is closed after use (False, default).
+    - read_timeout_seconds: None -> the server's `timeout_seconds`.
+    """
+
+    max_connections: int = 8
+    connect_timeout_seconds: float = 10.0
+    read_timeout_seconds: Optional[float] = None
+    idle_timeout_seconds: float = 60.0
+    block: bool = False
+
+
+class PoolTimeout(TimeoutError):
+    """Raised when `block=True` and no connection became free within the connect timeout."""
+
+
+class HttpConnectionPool:
+    """
+    Thread-safe keep-alive pool of http.client connections to one origin (scheme, host, port).
+
+    Idle connections are reused LIFO and dropped after `idle_timeout_seconds`. Non-2xx responses
+    raise urllib.error.HTTPError (body fully read, so the connection stays reusable), which keeps
+    OpenAIThrottle's retry/Retry-After handling unchanged.
+    """
+
+    def __init__(self, base_url: str, cfg: Optional[PoolConfig] = None, *, read_timeout_seconds: float = 120.0) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"HttpConnectionPool: unsupported base_url: {base_url!r}")
+        self._cfg = cfg or PoolConfig()
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port or (443 if parts.scheme == "https" else 80)
+        self._max = max(1, int(self._cfg.max_connections))
+        self._connect_timeout = float(self._cfg.connect_timeout_seconds)
+        self._read_timeout = float(
+            self._cfg.read_timeout_seconds if self._cfg.read_timeout_seconds is not None else read_timeout_seconds
+        )
+        self._ssl_context = ssl.create_default_context() if self._scheme == "https" else None
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._max)
+        self._idle: List[Tuple[http.client.HTTPConnection, float]] = []
+        self._in_use = 0
+        self._created = 0
+        self._reused = 0
+        self._overflow = 0
+        self._discarded = 0
+        self._stale_retries = 0
+        self._waits = 0
+
+    @property
+    def max_connections(self) -> int:
+        return self._max
+
+    @property
+    def in_use(self) -> int:
+        with self._lock:
+            return self._in_use
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> "PooledResponse":
+        """Sends one request; use the result as a context manager so the connection is returned."""
+        target = _request_target(url)
+        pooled = self._acquire_slot()
+        conn: Optional[http.client.HTTPConnection] = None
+        try:
+            conn, reused = self._checkout(pooled)
+            try:
+                resp = self._send(conn, method, target, body, headers)
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                with self._lock:
+                    self._stale_retries += 1
+                conn = self._new_connection()
+                resp = self._send(conn, method, target, body, headers)
+        except BaseException:
+            # The connection may hold a half-sent request or an unread response: never pool it.
+            if conn is None:
+                self._release_slot(pooled)
+            else:
+                self._return(conn, pooled=pooled, reusable=False)
+            raise
+
+        out = PooledResponse(self, conn, resp, pooled=pooled)
+        if resp.status >= 400:
+            with out:
+                payload = out.read()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(payload))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "origin": f"{self._scheme}://{self._host}:{self._port}",
+                "max_connections": self._max,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "reused": self._reused,
+                "overflow": self._overflow,
+                "discarded": self._discarded,
+                "stale_retries": self._stale_retries,
+                "waits": self._waits,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+    # ------------------------------------------------------------------ #
+
+    def _acquire_slot(self) -> bool:
+        if self._slots.acquire(blocking=False):
+            pooled = True
+        elif self._cfg.block:
+            with self._lock:
+                self._waits += 1
+            if not self._slots.acquire(timeout=self._connect_timeout):
+                raise PoolTimeout(f"No free connection to {self._host}:{self._port} within {self._connect_timeout}s")
+            pooled = True
+        else:
+            pooled = False
+        with self._lock:
+            self._in_use += 1
+            if not pooled:
+                self._overflow += 1
+        return pooled
+
+    def _release_slot(self, pooled: bool) -> None:
+        with self._lock:
+            self._in_use -= 1
+        if pooled:
+            self._slots.release()
+
+    def _checkout(self, pooled: bool) -> Tuple[http.client.HTTPConnection, bool]:
+        if pooled:
+            now = time.monotonic()
+            with self._lock:
+                while self._idle:
+                    conn, last_used = self._idle.pop()
+                    if now - last_used <= self._cfg.idle_timeout_seconds and conn.sock is not None:
+                        self._reused += 1
+                        return conn, True
+                    self._discarded += 1
+                    conn.close()
+        return self._new_connection(), False
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self._ssl_context is not None:
+            conn: http.client.HTTPConnection = http.client.HTTPSConnection(
+                self._host, self._port, timeout=self._connect_timeout, context=self._ssl_context
+            )
+        else:
+            conn = http.client.HTTPConnection(self._host, self._port, timeout=self._connect_timeout)
+        conn.connect()
+        if conn.sock is not None:
+            conn.sock.settimeout(self._read_timeout)
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self._created += 1
+        return conn
+
+    @staticmethod
+    def _send(
+        conn: http.client.HTTPConnection,
+        method: str,
+        target: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+    ) -> http.client.HTTPResponse:
+        conn.request(method, target, body=body, headers=dict(headers or {}))
+        return conn.getresponse()
+
+    def _return(self, conn: http.client.HTTPConnection, *, pooled: bool, reusable: bool) -> None:
+        if pooled and reusable:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+            if pooled:
+                with self._lock:
+                    self._discarded += 1
+        self._release_slot(pooled)
+
+
+class PooledResponse:
+    """A response bound to a pooled connection; closing it returns the connection."""
+
+    def __init__(
+        self,
+        pool: HttpConnectionPool,
+        conn: http.client.HTTPConnection,
+        resp: http.client.HTTPResponse,
+        *,
+        pooled: bool,
+    ) -> None:
+        self._pool = pool
+        self._conn = conn
+        self._resp = resp
+        self._pooled = pooled
+        self._closed = False
+        self._failed = False
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def read(self) -> bytes:
+        try:
+            return self._resp.read()
+        except Exception:
+            self._failed = True
+            raise
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Yields raw lines as they arrive (chunked transfer decoding is done by http.client)."""
+        try:
+            while True:
+                line = self._resp.readline()
+                if not line:
+                    return
+                yield line
+        except Exception:
+            self._failed = True
+            raise
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        reusable = not self._failed and not self._resp.will_close
+        if reusable and not self._resp.isclosed():
+            # Stopped early (e.g. after `data: [DONE]`): drain the rest so the connection can be reused.
+            try:
+                self._resp.read()
+            except Exception:
+                reusable = False
+        self._pool._return(self._conn, pooled=self._pooled, reusable=reusable)
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if exc and exc[0] is not None:
+            self._failed = True
+        self.close()
+
+
+def _request_target(url: str) -> str:
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    return target
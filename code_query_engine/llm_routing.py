@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+ROUTING_POLICIES = ("least_outstanding", "ewma_latency", "ordered")
+
+_CLOSED = "closed"
+_OPEN = "open"
+_HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class CircuitBreakerConfig:
+    """
+    Per-server circuit breaker (ServersLLM.json `routing.circuit_breaker`).
+
+    After `failure_threshold` consecutive failures (connection errors, timeouts, 5xx/429 after
+    throttle retries) the server is skipped for `cooldown_seconds`; then a single probe request
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    failure_threshold: int = 5
+    cooldown_seconds: float = 30.0
+
+
+@dataclass(frozen=True)
+class RoutingConfig:
+    """
+    Server selection among security-eligible servers (ServersLLM.json `routing` object).
+
+    - policy: "least_outstanding" (fewest in-flight requests, EWMA latency as tie-break),
+      "ewma_latency" (lowest EWMA latency weighted by in-flight requests) or "ordered"
+      (first available server; only the circuit breaker applies).
+    - ewma_alpha: weight of the newest latency sample.
+    """
+
+    policy: str = "least_outstanding"
+    ewma_alpha: float = 0.3
+    circuit_breaker: CircuitBreakerConfig = field(default_factory=CircuitBreakerConfig)
+
+
+class _ServerHealth:
+    __slots__ = (
+        "state",
+        "opened_at",
+        "probe_in_flight",
+        "probe_started_at",
+        "in_flight",
+        "ewma_ms",
+        "consecutive_failures",
+        "requests",
+        "failures",
+        "selected",
+        "circuit_opens",
+        "backoffs",
+        "backoff_until",
+    )
+
+    def __init__(self) -> None:
+        self.state = _CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_started_at = 0.0
+        self.in_flight = 0
+        self.ewma_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.selected = 0
+        self.circuit_opens = 0
+        self.backoffs = 0
+        self.backoff_until = 0.0
+
+
+class ServerRouter:
+    """
+    Thread-safe load tracker and circuit breaker for LLM servers.
+
+    `route()` picks one server name from tiers of interchangeable candidates (the caller has
+    already filtered them by security policy); `start()`/`finish()` bracket every request so
+    in-flight counts, latency and failures stay current. Servers that OpenAIThrottle is
+    currently backing off (429/5xx) are ranked after the others.
+
+    Picking a server whose cooldown has elapsed reserves its single half-open probe inside
+    `route()`, so concurrent callers cannot all pass as probes. A reservation that is never
+    finished (the caller gave up before sending) lapses after another cooldown period.
+    """
+
+    def __init__(self, cfg: Optional[RoutingConfig] = None, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._cfg = cfg or RoutingConfig()
+        if self._cfg.policy not in ROUTING_POLICIES:
+            raise ValueError(f"ServerRouter: unknown policy {self._cfg.policy!r} (expected one of {ROUTING_POLICIES})")
+        self._alpha = min(1.0, max(0.0, float(self._cfg.ewma_alpha)))
+        self._threshold = max(1, int(self._cfg.circuit_breaker.failure_threshold))
+        self._cooldown = max(0.0, float(self._cfg.circuit_breaker.cooldown_seconds))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._health: Dict[str, _ServerHealth] = {}
+        self._decisions: Dict[str, int] = {"primary": 0, "balanced": 0, "failover": 0, "unavailable": 0}
+
+    @property
+    def policy(self) -> str:
+        return self._cfg.policy
+
+    def route(self, tiers: Sequence[Sequence[str]]) -> Optional[str]:
+        """
+        Returns the best available server of the first tier that has one, or None when every
+        circuit is open. tiers[0][0] is the primary (preferred) server.
+        """
+        now = self._clock()
+        with self._lock:
+            primary = tiers[0][0] if tiers and tiers[0] else None
+            for tier_index, names in enumerate(tiers):
+                ranked: List[tuple] = []
+                for position, name in enumerate(names):
+                    health = self._get(name)
+                    if not self._available(health, now):
+                        continue
+                    ranked.append((self._rank_key(health, position, now), name))
+                if not ranked:
+                    continue
+                ranked.sort()
+                picked = ranked[0][1]
+                health = self._health[picked]
+                health.selected += 1
+                if health.state != _CLOSED:
+                    self._reserve_probe(health, now)
+                if tier_index > 0:
+                    self._decisions["failover"] += 1
+                elif picked == primary:
+                    self._decisions["primary"] += 1
+                else:
+                    self._decisions["balanced"] += 1
+                return picked
+            self._decisions["unavailable"] += 1
+            return None
+
+    def start(self, name: str) -> None:
+        now = self._clock()
+        with self._lock:
+            health = self._get(name)
+            # Requests that did not go through route() (e.g. fail-open) still take the probe.
+            if health.state != _CLOSED and not health.probe_in_flight and self._probe_due(health, now):
+                self._reserve_probe(health, now)
+            health.in_flight += 1
+            health.requests += 1
+
+    def finish(self, name: str, *, failed: Optional[bool], latency_s: Optional[float] = None) -> None:
+        """
+        Reports a request outcome. `failed=None` is neutral (e.g. cancelled by the caller):
+        it only releases the in-flight slot and the probe, the breaker state is unchanged.
+        """
+        now = self._clock()
+        with self._lock:
+            health = self._get(name)
+            health.in_flight = max(0, health.in_flight - 1)
+            if latency_s is not None:
+                sample = max(0.0, float(latency_s)) * 1000.0
+                if health.ewma_ms is None:
+                    health.ewma_ms = sample
+                else:
+                    health.ewma_ms = self._alpha * sample + (1.0 - self._alpha) * health.ewma_ms
+            if failed is None:
+                pass
+            elif failed:
+                health.failures += 1
+                health.consecutive_failures += 1
+                if health.state == _HALF_OPEN or (
+                    health.state == _CLOSED and health.consecutive_failures >= self._threshold
+                ):
+                    health.state = _OPEN
+                    health.opened_at = now
+                    health.circuit_opens += 1
+            else:
+                health.consecutive_failures = 0
+                health.state = _CLOSED
+            health.probe_in_flight = False
+
+    def record_backoff(self, name: str, seconds: float) -> None:
+        now = self._clock()
+        with self._lock:
+            health = self._get(name)
+            health.backoffs += 1
+            health.backoff_until = max(health.backoff_until, now + max(0.0, float(seconds)))
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            servers = {
+                name: {
+                    "state": self._effective_state(h, now),
+                    "in_flight": h.in_flight,
+                    "ewma_latency_ms": round(h.ewma_ms, 1) if h.ewma_ms is not None else None,
+                    "requests": h.requests,
+                    "failures": h.failures,
+                    "consecutive_failures": h.consecutive_failures,
+                    "selected": h.selected,
+                    "circuit_opens": h.circuit_opens,
+                    "backoffs": h.backoffs,
+                    "backing_off": h.backoff_until > now,
+                }
+                for name, h in self._health.items()
+            }
+            return {"policy": self._cfg.policy, "decisions": dict(self._decisions), "servers": servers}
+
+    # ------------------------------------------------------------------ #
+
+    def _get(self, name: str) -> _ServerHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = _ServerHealth()
+            self._health[name] = health
+        return health
+
+    def _available(self, health: _ServerHealth, now: float) -> bool:
+        if health.state == _CLOSED:
+            return True
+        if health.probe_in_flight and now - health.probe_started_at < self._cooldown:
+            return False
+        return self._probe_due(health, now)
+
+    def _probe_due(self, health: _ServerHealth, now: float) -> bool:
+        return health.state == _HALF_OPEN or now - health.opened_at >= self._cooldown
+
+    @staticmethod
+    def _reserve_probe(health: _ServerHealth, now: float) -> None:
+        # Caller holds self._lock.
+        health.state = _HALF_OPEN
+        health.probe_in_flight = True
+        health.probe_started_at = now
+
+    def _effective_state(self, health: _ServerHealth, now: float) -> str:
+        if health.state == _OPEN and now - health.opened_at >= self._cooldown:
+            return _HALF_OPEN
+        return health.state
+
+    def _rank_key(self, health: _ServerHealth, position: int, now: float) -> tuple:
+        backing_off = health.backoff_until > now
+        # Servers without samples rank as fastest so they get measured.
+        ewma = health.ewma_ms or 0.0
+        if self._cfg.policy == "least_outstanding":
+            return (backing_off, health.in_flight, ewma, position)
+        if self._cfg.policy == "ewma_latency":
+            return (backing_off, ewma * (health.in_flight + 1), position)
+        return (position,)
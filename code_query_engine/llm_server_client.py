@@ -1,15 +1,17 @@
 from __future__ import annotations
 
+import http.client
 import json
 import logging
 import random
 import threading
 import time
 import urllib.error
-import urllib.request
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Any, Callable, Dict, Optional, TypeVar, Iterable, Tuple
 
+from code_query_engine.llm_http_pool import HttpConnectionPool, PoolConfig
+from code_query_engine.llm_routing import RoutingConfig, ServerRouter
 from code_query_engine.llm_query_logger import log_llm_query, LLMCallTimer
 
 
@@ -34,6 +36,8 @@ class ServerLLMConfig:
     allowed_classification_labels: Tuple[str, ...] = ()
     is_trusted_server: bool = False
     is_trusted_for_all_acl: bool = False
+    pool: Optional[PoolConfig] = None
+    routing_group: str = ""
 
 
 @dataclass(frozen=True)
@@ -52,11 +56,13 @@ class OpenAIThrottle:
     - Limits concurrency via semaphore
     - Retries with exponential backoff (+ jitter)
     - Honors Retry-After header when present
+    - Reports every backoff sleep to `on_backoff` (used for load-aware routing)
     """
 
-    def __init__(self, cfg: ThrottleConfig):
+    def __init__(self, cfg: ThrottleConfig, *, on_backoff: Optional[Callable[[float], None]] = None):
         self._cfg = cfg
         self._sem = threading.Semaphore(cfg.max_concurrency)
+        self._on_backoff = on_backoff
 
     def call(self, fn: Callable[[], T]) -> T:
         with self._sem:
@@ -74,6 +80,8 @@ class OpenAIThrottle:
 
                     retry_after = self._parse_retry_after(e)
                     sleep_s = self._compute_sleep(attempt, retry_after)
+                    if self._on_backoff is not None:
+                        self._on_backoff(sleep_s)
                     time.sleep(sleep_s)
 
     def _parse_retry_after(self, e: urllib.error.HTTPError) -> Optional[float]:
@@ -104,10 +112,19 @@ class OpenAIThrottle:
 class ServerLLMClient:
     """
     Minimal OpenAI-compatible HTTP client for llama.cpp (or similar servers).
+
+    Each server gets one HttpConnectionPool (keep-alive connections, connect/read timeouts).
+    With throttling enabled, the pool holds at least `max_concurrency` connections, so a request
+    admitted by OpenAIThrottle never waits for a connection; backoff sleeps hold no connection.
+
+    Among the servers a call may use (see `_select_server`), a ServerRouter picks the least
+    loaded one of the preferred server's `routing_group` and skips servers whose circuit
+    breaker is open, so one slow or failing server does not stall every request.
     """
     supports_server_name = True
     supports_cancel_check = False
     supports_security_context = True
+    supports_stream_callback = True
 
     def __init__(
         self,
@@ -115,11 +132,15 @@ class ServerLLMClient:
         servers: Dict[str, ServerLLMConfig],
         default_name: str,
         ordered_names: Optional[list[str]] = None,
+        routing: Optional[RoutingConfig] = None,
     ) -> None:
         self._servers = dict(servers or {})
         self._default_name = (default_name or "").strip()
         self._ordered_names = list(ordered_names or [])
         self._throttles: dict[str, OpenAIThrottle] = {}
+        self._pools: dict[str, HttpConnectionPool] = {}
+        self._transport_lock = threading.Lock()
+        self._router = ServerRouter(routing)
         if not self._default_name:
             raise ValueError("ServerLLMClient: default_name is required")
         if self._default_name not in self._servers:
@@ -141,22 +162,16 @@ class ServerLLMClient:
     ) -> Dict[str, Any]:
         timer = LLMCallTimer()
 
+        pool = self._get_pool(server)
+
         def _do_request() -> Dict[str, Any]:
             data = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(url, data=data, method="POST")
-            req.add_header("Content-Type", "application/json")
-            if server.api_key:
-                req.add_header("Authorization", f"Bearer {server.api_key}")
-            with urllib.request.urlopen(req, timeout=server.timeout_seconds) as resp:
+            with pool.request("POST", url, body=data, headers=self._headers(server)) as resp:
                 body = resp.read().decode("utf-8")
             return json.loads(body)
 
         try:
-            if server.throttling_enabled:
-                throttle = self._get_throttle(server)
-                res = throttle.call(_do_request)
-            else:
-                res = _do_request()
+            res = self._tracked(server, _do_request)
             log_llm_query(
                 op=op,
                 request={
@@ -205,14 +220,152 @@ class ServerLLMClient:
             logger.error("ServerLLMClient request failed: %s", e)
             raise
 
+    def _post_stream(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        *,
+        server: ServerLLMConfig,
+        op: str,
+        chat: bool,
+        on_delta: Callable[[str], None],
+    ) -> str:
+        """
+        POST with `"stream": true` and read OpenAI-style SSE chunks (`data: {...}` ... `data: [DONE]`).
+
+        Every text piece is passed to `on_delta`; the joined, stripped text is returned.
+        Throttling retries only apply before the first byte is read (HTTP status errors).
+        """
+        timer = LLMCallTimer()
+        stream_payload = dict(payload)
+        stream_payload["stream"] = True
+
+        pool = self._get_pool(server)
+
+        def _do_request() -> str:
+            data = json.dumps(stream_payload).encode("utf-8")
+            headers = self._headers(server)
+            headers["Accept"] = "text/event-stream"
+            parts: list[str] = []
+            with pool.request("POST", url, body=data, headers=headers) as resp:
+                for raw_line in resp.iter_lines():
+                    line = raw_line.decode("utf-8", errors="replace").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    chunk = line[len("data:"):].strip()
+                    if chunk == "[DONE]":
+                        break
+                    try:
+                        event = json.loads(chunk)
+                    except ValueError:
+                        continue
+                    text = self._extract_stream_delta(event, chat=chat)
+                    if text:
+                        parts.append(text)
+                        on_delta(text)
+            return "".join(parts).strip()
+
+        request_log = {
+            "url": url,
+            "server": server.name,
+            "mode": server.mode,
+            "payload": stream_payload,
+        }
+        try:
+            text = self._tracked(server, _do_request)
+            log_llm_query(op=op, request=request_log, response=text, duration_ms=timer.ms())
+            return text
+        except Exception as e:
+            log_llm_query(op=op, request=request_log, response=None, error=str(e), duration_ms=timer.ms())
+            logger.error("ServerLLMClient stream request failed: %s", e)
+            raise
+
+    def _tracked(self, server: ServerLLMConfig, do_request: Callable[[], T]) -> T:
+        """Runs one request (through the throttle, if enabled) and reports its outcome to the router."""
+        self._router.start(server.name)
+        started = time.perf_counter()
+        try:
+            if server.throttling_enabled:
+                result = self._get_throttle(server).call(do_request)
+            else:
+                result = do_request()
+        except urllib.error.HTTPError as e:
+            # 4xx (other than 429) is the caller's fault, not a sign of an unhealthy server.
+            failed = e.code == 429 or e.code >= 500
+            self._router.finish(server.name, failed=failed, latency_s=None)
+            raise
+        except (OSError, http.client.HTTPException, ValueError):
+            # ValueError: unparseable response body (JSONDecodeError, e.g. an HTML page from a proxy).
+            self._router.finish(server.name, failed=True, latency_s=None)
+            raise
+        except BaseException:
+            # Cancellation, timeout wrappers, ...: says nothing about the server, keep the breaker as is.
+            self._router.finish(server.name, failed=None, latency_s=None)
+            raise
+        self._router.finish(server.name, failed=False, latency_s=time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def _extract_stream_delta(event: Dict[str, Any], *, chat: bool) -> str:
+        try:
+            choice = (event.get("choices") or [{}])[0]
+            if chat:
+                delta = choice.get("delta") or {}
+                return str(delta.get("content") or "")
+            return str(choice.get("text") or "")
+        except Exception:
+            return ""
+
     def _get_throttle(self, server: ServerLLMConfig) -> OpenAIThrottle:
-        existing = self._throttles.get(server.name)
-        if existing is not None:
-            return existing
-        cfg = server.throttling or ThrottleConfig()
-        throttle = OpenAIThrottle(cfg)
-        self._throttles[server.name] = throttle
-        return throttle
+        with self._transport_lock:
+            existing = self._throttles.get(server.name)
+            if existing is not None:
+                return existing
+            cfg = server.throttling or ThrottleConfig()
+            name = server.name
+            throttle = OpenAIThrottle(cfg, on_backoff=lambda seconds: self._router.record_backoff(name, seconds))
+            self._throttles[server.name] = throttle
+            return throttle
+
+    def _get_pool(self, server: ServerLLMConfig) -> HttpConnectionPool:
+        with self._transport_lock:
+            existing = self._pools.get(server.name)
+            if existing is not None:
+                return existing
+            cfg = server.pool or PoolConfig()
+            if server.throttling_enabled:
+                max_concurrency = int((server.throttling or ThrottleConfig()).max_concurrency)
+                if cfg.max_connections < max_concurrency:
+                    cfg = replace(cfg, max_connections=max_concurrency)
+            pool = HttpConnectionPool(server.base_url, cfg, read_timeout_seconds=float(server.timeout_seconds))
+            self._pools[server.name] = pool
+            return pool
+
+    @staticmethod
+    def _headers(server: ServerLLMConfig) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if server.api_key:
+            headers["Authorization"] = f"Bearer {server.api_key}"
+        return headers
+
+    def transport_stats(self) -> Dict[str, Any]:
+        with self._transport_lock:
+            pools = dict(self._pools)
+        return {name: pool.stats() for name, pool in pools.items()}
+
+    def routing_stats(self) -> Dict[str, Any]:
+        return self._router.stats()
+
+    def reset_after_fork(self) -> None:
+        # Drop (do not close) the pools inherited from the parent: their sockets belong to it.
+        self._transport_lock = threading.Lock()
+        self._pools = {}
+
+    def close(self) -> None:
+        with self._transport_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
 
     @staticmethod
     def _extract_completion_text(res: Dict[str, Any]) -> str:
@@ -243,6 +396,7 @@ class ServerLLMClient:
         top_p: Optional[float] = None,
         server_name: Optional[str] = None,
         security_context: Optional[dict[str, Any]] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> str:
         server, notice_kind = self._select_server(server_name, security_context=security_context)
         if server is None:
@@ -250,6 +404,31 @@ class ServerLLMClient:
             return ""
         if notice_kind:
             self._apply_security_notice(security_context, notice_kind)
+        return self._complete(
+            server,
+            prompt=prompt,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            repeat_penalty=repeat_penalty,
+            top_k=top_k,
+            top_p=top_p,
+            on_delta=on_delta,
+        )
+
+    def _complete(
+        self,
+        server: ServerLLMConfig,
+        *,
+        prompt: str,
+        system_prompt: Optional[str],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        repeat_penalty: float,
+        top_k: int,
+        top_p: Optional[float],
+        on_delta: Optional[Callable[[str], None]],
+    ) -> str:
         if system_prompt:
             prompt = f"{system_prompt}\n\n{prompt}"
 
@@ -271,6 +450,8 @@ class ServerLLMClient:
                 payload["repeat_penalty"] = float(repeat_penalty)
 
         url = self._join(server.base_url, server.completions_path)
+        if on_delta is not None:
+            return self._post_stream(url, payload, server=server, op="server_completion", chat=False, on_delta=on_delta)
         res = self._post_json(url, payload, server=server, op="server_completion")
         return self._extract_completion_text(res)
 
@@ -287,6 +468,7 @@ class ServerLLMClient:
         top_p: Optional[float] = None,
         server_name: Optional[str] = None,
         security_context: Optional[dict[str, Any]] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> str:
         server, notice_kind = self._select_server(server_name, security_context=security_context)
         if server is None:
@@ -294,6 +476,33 @@ class ServerLLMClient:
             return ""
         if notice_kind:
             self._apply_security_notice(security_context, notice_kind)
+        return self._chat(
+            server,
+            prompt=prompt,
+            history=history,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            repeat_penalty=repeat_penalty,
+            top_k=top_k,
+            top_p=top_p,
+            on_delta=on_delta,
+        )
+
+    def _chat(
+        self,
+        server: ServerLLMConfig,
+        *,
+        prompt: str,
+        history: Optional[list[tuple[str, str]]],
+        system_prompt: Optional[str],
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+        repeat_penalty: float,
+        top_k: int,
+        top_p: Optional[float],
+        on_delta: Optional[Callable[[str], None]],
+    ) -> str:
         messages: list[Dict[str, str]] = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
@@ -321,6 +530,8 @@ class ServerLLMClient:
                 payload["repeat_penalty"] = float(repeat_penalty)
 
         url = self._join(server.base_url, server.chat_completions_path)
+        if on_delta is not None:
+            return self._post_stream(url, payload, server=server, op="server_chat", chat=True, on_delta=on_delta)
         res = self._post_json(url, payload, server=server, op="server_chat")
         return self._extract_chat_text(res)
 
@@ -329,7 +540,17 @@ class ServerLLMClient:
         name: Optional[str],
         *,
         security_context: Optional[dict[str, Any]] = None,
+        fail_open: bool = True,
     ) -> tuple[Optional[ServerLLMConfig], Optional[str]]:
+        """
+        Returns (server, notice_kind).
+
+        The first security-eligible candidate (preferred server, then `ordered_names`) is the
+        primary; notice_kind is "override" when it is not the preferred server. The router then
+        balances load across the primary's `routing_group` and fails over to the other eligible
+        servers while the group's circuits are open. If every circuit is open, the primary is
+        returned anyway (`fail_open=True`) or (None, "unavailable").
+        """
         preferred = (name or "").strip() or self._default_name
         ordered = [x for x in self._ordered_names if x in self._servers]
         if preferred and preferred not in ordered:
@@ -342,25 +563,28 @@ class ServerLLMClient:
             if n not in candidates:
                 candidates.append(n)
 
+        existing = [self._servers[n] for n in candidates if n in self._servers]
         if not security_context:
             key = preferred or self._default_name
-            server = self._servers.get(key)
-            if server is None:
+            if key not in self._servers:
                 raise ValueError(f"ServerLLMClient: server '{key}' not found")
-            return server, None
-
-        first = True
-        for key in candidates:
-            server = self._servers.get(key)
-            if server is None:
-                continue
-            if self._server_allows_security(server, security_context):
-                if first:
-                    return server, None
-                return server, "override"
-            first = False
-
-        return None, "no_server"
+            eligible = existing
+        else:
+            eligible = [s for s in existing if self._server_allows_security(s, security_context)]
+            if not eligible:
+                return None, "no_server"
+
+        primary = eligible[0]
+        notice_kind = "override" if security_context and primary is not existing[0] else None
+        group = primary.routing_group
+        peers = [s for s in eligible if s is primary or (group and s.routing_group == group)]
+        others = [s for s in eligible if s not in peers]
+        picked = self._router.route([[s.name for s in peers], [s.name for s in others]])
+        if picked is None:
+            if not fail_open:
+                return None, "unavailable"
+            return primary, notice_kind
+        return self._servers[picked], notice_kind
 
     @staticmethod
     def _normalize_labels(values: Iterable[Any]) -> set[str]:
@@ -464,6 +688,7 @@ class ServerLLMClient:
 class HybridLLMClient:
     """
     Routes calls to server LLMs when allowed; otherwise falls back to local model.
+    The local model also takes over while every eligible server's circuit breaker is open.
     """
     supports_server_name = True
     supports_security_context = True
@@ -477,6 +702,11 @@ class HybridLLMClient:
         self._local = local_model
         self._server = server_client
         self.supports_cancel_check = bool(getattr(local_model, "supports_cancel_check", False))
+        self.supports_priority = bool(getattr(local_model, "supports_priority", False))
+        self.supports_prefix_cache = bool(getattr(local_model, "supports_prefix_cache", False))
+        # Server calls always stream; the local fallback only if the local model supports it.
+        self.supports_stream_callback = True
+        self._local_streams = bool(getattr(local_model, "supports_stream_callback", False))
         self.default_max_tokens = getattr(local_model, "default_max_tokens", None)
         self.n_ctx = getattr(local_model, "n_ctx", None)
         self.llm = getattr(local_model, "llm", None)
@@ -494,12 +724,20 @@ class HybridLLMClient:
         server_name: Optional[str] = None,
         cancel_check: Optional[Callable[[], None]] = None,
         security_context: Optional[dict[str, Any]] = None,
+        priority: Optional[str] = None,
+        cache_prefix: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> str:
-        server, notice_kind = self._server._select_server(server_name, security_context=security_context)
+        server, notice_kind = self._server._select_server(
+            server_name,
+            security_context=security_context,
+            fail_open=self._local is None,
+        )
         if server is not None:
             if notice_kind:
                 self._server._apply_security_notice(security_context, notice_kind)
-            return self._server.ask(
+            return self._server._complete(
+                server,
                 prompt=prompt,
                 system_prompt=system_prompt,
                 max_tokens=max_tokens,
@@ -507,8 +745,7 @@ class HybridLLMClient:
                 repeat_penalty=repeat_penalty,
                 top_k=top_k,
                 top_p=top_p,
-                server_name=server.name,
-                security_context=security_context,
+                on_delta=on_delta,
             )
 
         # No server allowed; try local model if present.
@@ -516,8 +753,17 @@ class HybridLLMClient:
             self._server._apply_security_notice(security_context, "no_server")
             return ""
 
-        # If we got here, we are explicitly falling back to local due to security policy.
-        self._server._apply_security_notice(security_context, "override")
+        # If we got here, we are explicitly falling back to local due to security policy
+        # (or because every eligible server's circuit breaker is open).
+        if notice_kind != "unavailable":
+            self._server._apply_security_notice(security_context, "override")
+        local_kwargs: dict[str, Any] = {"cancel_check": cancel_check}
+        if priority is not None and self.supports_priority:
+            local_kwargs["priority"] = priority
+        if on_delta is not None and self._local_streams:
+            local_kwargs["on_delta"] = on_delta
+        if cache_prefix is not None and self.supports_prefix_cache:
+            local_kwargs["cache_prefix"] = cache_prefix
         return self._local.ask(
             prompt=prompt,
             system_prompt=system_prompt,
@@ -526,7 +772,7 @@ class HybridLLMClient:
             repeat_penalty=repeat_penalty,
             top_k=top_k,
             top_p=top_p,
-            cancel_check=cancel_check,
+            **local_kwargs,
         )
 
     def ask_chat(
@@ -543,12 +789,19 @@ class HybridLLMClient:
         server_name: Optional[str] = None,
         cancel_check: Optional[Callable[[], None]] = None,
         security_context: Optional[dict[str, Any]] = None,
+        priority: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> str:
-        server, notice_kind = self._server._select_server(server_name, security_context=security_context)
+        server, notice_kind = self._server._select_server(
+            server_name,
+            security_context=security_context,
+            fail_open=self._local is None,
+        )
         if server is not None:
             if notice_kind:
                 self._server._apply_security_notice(security_context, notice_kind)
-            return self._server.ask_chat(
+            return self._server._chat(
+                server,
                 prompt=prompt,
                 history=history,
                 system_prompt=system_prompt,
@@ -557,15 +810,20 @@ class HybridLLMClient:
                 repeat_penalty=repeat_penalty,
                 top_k=top_k,
                 top_p=top_p,
-                server_name=server.name,
-                security_context=security_context,
+                on_delta=on_delta,
             )
 
         if self._local is None:
             self._server._apply_security_notice(security_context, "no_server")
             return ""
 
-        self._server._apply_security_notice(security_context, "override")
+        if notice_kind != "unavailable":
+            self._server._apply_security_notice(security_context, "override")
+        local_kwargs: dict[str, Any] = {"cancel_check": cancel_check}
+        if priority is not None and self.supports_priority:
+            local_kwargs["priority"] = priority
+        if on_delta is not None and self._local_streams:
+            local_kwargs["on_delta"] = on_delta
         return self._local.ask_chat(
             prompt=prompt,
             history=history,
@@ -575,7 +833,7 @@ class HybridLLMClient:
             repeat_penalty=repeat_penalty,
             top_k=top_k,
             top_p=top_p,
-            cancel_check=cancel_check,
+            **local_kwargs,
         )
 
     @staticmethod
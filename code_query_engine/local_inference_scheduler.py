@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+_PRIORITY_NAMES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+_LATENCY_SAMPLES = 1024
+
+
+def resolve_priority(value: Any) -> int:
+    """Maps "high" | "normal" | "low" (or 0..2) to a priority; None -> normal."""
+    if value is None or value == "":
+        return PRIORITY_NORMAL
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid inference priority: {value!r}")
+    if isinstance(value, int):
+        if value not in (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW):
+            raise ValueError(f"Invalid inference priority: {value!r}")
+        return value
+    name = str(value).strip().lower()
+    if name not in _PRIORITY_NAMES:
+        raise ValueError(f"Invalid inference priority: {value!r}. Allowed: {sorted(_PRIORITY_NAMES)}")
+    return _PRIORITY_NAMES[name]
+
+
+def _priority_name(priority: int) -> str:
+    for name, p in _PRIORITY_NAMES.items():
+        if p == priority:
+            return name
+    return str(priority)
+
+
+class LocalModelBusy(RuntimeError):
+    """Raised when the local model cannot accept more work (queue full or queue wait exceeded)."""
+
+    def __init__(self, message: str, *, queue_depth: int, retry_after_seconds: float) -> None:
+        super().__init__(message)
+        self.queue_depth = int(queue_depth)
+        self.retry_after_seconds = float(retry_after_seconds)
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    max_queue_size: int = 16
+    max_queue_wait_seconds: float = 120.0
+    poll_interval_seconds: float = 0.05
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "enqueued_at", "done")
+
+    def __init__(self, priority: int, seq: int, enqueued_at: float) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = enqueued_at
+        self.done = False
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class InferenceScheduler:
+    """
+    Serializes access to one llama-cpp context (one job at a time), ordered by priority then arrival.
+
+    Jobs run on the caller's thread once they reach the head of the queue, so streaming and
+    `cancel_check` keep working unchanged. While queued, `cancel_check` is polled; a cancelled
+    job leaves the queue without ever touching the model.
+
+    Admission control: a job is rejected with LocalModelBusy when `max_queue_size` jobs are already
+    waiting, or when it waited longer than `max_queue_wait_seconds`.
+    """
+
+    def __init__(self, cfg: Optional[SchedulerConfig] = None, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._cfg = cfg or SchedulerConfig()
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._running: Optional[_Ticket] = None
+
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._cancelled_in_queue = 0
+        self._completed = 0
+        self._errors = 0
+        self._by_priority: Dict[str, int] = {name: 0 for name in _PRIORITY_NAMES}
+        self._queue_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._generation_ms: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+
+    def run(
+        self,
+        fn: Callable[[], T],
+        *,
+        priority: Any = None,
+        cancel_check: Optional[Callable[[], None]] = None,
+    ) -> T:
+        prio = resolve_priority(priority)
+        ticket = self._enqueue(prio)
+        try:
+            self._wait_for_turn(ticket, cancel_check)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+        t0 = self._clock()
+        ok = False
+        try:
+            out = fn()
+            ok = True
+            return out
+        finally:
+            with self._cond:
+                self._generation_ms.append((self._clock() - t0) * 1000.0)
+                if ok:
+                    self._completed += 1
+                else:
+                    self._errors += 1
+                self._running = None
+                self._cond.notify_all()
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "running": self._running is not None,
+                "max_queue_size": self._cfg.max_queue_size,
+                "max_queue_wait_seconds": self._cfg.max_queue_wait_seconds,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "cancelled_in_queue": self._cancelled_in_queue,
+                "completed": self._completed,
+                "errors": self._errors,
+                "by_priority": dict(self._by_priority),
+                "queue_ms": _summarize(self._queue_ms),
+                "generation_ms": _summarize(self._generation_ms),
+            }
+
+    # ------------------------------------------------------------------ #
+
+    def _enqueue(self, prio: int) -> _Ticket:
+        with self._cond:
+            # An idle model with an empty queue always accepts work, even with max_queue_size=0.
+            if len(self._heap) >= self._cfg.max_queue_size and (self._heap or self._running is not None):
+                self._rejected += 1
+                raise LocalModelBusy(
+                    f"Local model is busy ({len(self._heap)} requests queued).",
+                    queue_depth=len(self._heap),
+                    retry_after_seconds=self._retry_after_locked(),
+                )
+            ticket = _Ticket(prio, next(self._seq), self._clock())
+            heapq.heappush(self._heap, ticket)
+            self._admitted += 1
+            self._by_priority[_priority_name(prio)] = self._by_priority.get(_priority_name(prio), 0) + 1
+            return ticket
+
+    def _wait_for_turn(self, ticket: _Ticket, cancel_check: Optional[Callable[[], None]]) -> None:
+        deadline = ticket.enqueued_at + max(0.0, float(self._cfg.max_queue_wait_seconds))
+        while True:
+            with self._cond:
+                if self._running is None and self._heap and self._heap[0] is ticket:
+                    heapq.heappop(self._heap)
+                    ticket.done = True
+                    self._running = ticket
+                    self._queue_ms.append((self._clock() - ticket.enqueued_at) * 1000.0)
+                    return
+                now = self._clock()
+                if now >= deadline:
+                    self._timed_out += 1
+                    raise LocalModelBusy(
+                        f"Local model is busy (waited {now - ticket.enqueued_at:.1f}s in queue).",
+                        queue_depth=len(self._heap),
+                        retry_after_seconds=self._retry_after_locked(),
+                    )
+                self._cond.wait(timeout=min(self._cfg.poll_interval_seconds, deadline - now))
+            if cancel_check is not None:
+                try:
+                    cancel_check()
+                except BaseException:
+                    with self._cond:
+                        self._cancelled_in_queue += 1
+                    raise
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        with self._cond:
+            if ticket.done:
+                return
+            ticket.done = True
+            try:
+                self._heap.remove(ticket)
+                heapq.heapify(self._heap)
+            except ValueError:
+                pass
+            self._cond.notify_all()
+
+    def _retry_after_locked(self) -> float:
+        if not self._generation_ms:
+            return 1.0
+        avg_s = sum(self._generation_ms) / len(self._generation_ms) / 1000.0
+        return round(max(1.0, avg_s * (len(self._heap) + 1)), 1)
+
+
+def _summarize(samples: Deque[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        "count": n,
+        "avg": round(sum(ordered) / n, 2),
+        "p50": round(ordered[(n - 1) // 2], 2),
+        "p95": round(ordered[min(n - 1, int(n * 0.95))], 2),
+        "max": round(ordered[-1], 2),
+    }
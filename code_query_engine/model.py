@@ -4,6 +4,8 @@ import logging
 from typing import Any, Optional, Callable
 
 from llama_cpp import Llama
+from code_query_engine.local_inference_scheduler import InferenceScheduler, LocalModelBusy, SchedulerConfig
+from code_query_engine.prompt_prefix_cache import PromptPrefixCache, prefix_cache_model_id
 from code_query_engine.pipeline.cancellation import PipelineCancelled
 from code_query_engine.llm_query_logger import log_llm_query, LLMCallTimer
 
@@ -22,8 +24,20 @@ class Model:
 
     NOTE:
     Prompt construction is NOT done here. It must be done by the pipeline step (call_model).
+    `on_delta` receives generated text pieces as they arrive (streaming path); the return value
+    is still the complete, stripped answer.
+
+    One llama-cpp context is not safe for concurrent calls, so every completion goes through
+    `self.scheduler` (one job at a time, `priority` high/normal/low, bounded queue).
+    A full queue raises LocalModelBusy instead of returning "[MODEL_ERROR]".
+
+    KV states of shared system-prompt prefixes are kept in `self.prefix_cache` (see
+    PromptPrefixCache); `cache_prefix` / `system_prompt` select the entry.
     """
     supports_cancel_check = True
+    supports_priority = True
+    supports_prefix_cache = True
+    supports_stream_callback = True
 
     def __init__(
         self,
@@ -33,6 +47,10 @@ class Model:
         n_ctx: int = 4096,
         use_gpu: bool = True,
         n_gpu_layers: Optional[int] = None,
+        max_queue_size: int = 16,
+        max_queue_wait_seconds: float = 120.0,
+        prefix_cache_max_mb: float = 1024.0,
+        prefix_cache_min_tokens: int = 64,
     ):
         self.modelPath = model_path  # keep original attribute name for compatibility
         self.default_max_tokens = int(default_max_tokens)
@@ -44,6 +62,23 @@ class Model:
         if self.n_ctx <= 0:
             raise ValueError("Model: n_ctx must be > 0")
         self.llm = self._create_llama(self.modelPath, n_ctx=self.n_ctx)
+        self.scheduler = InferenceScheduler(
+            SchedulerConfig(
+                max_queue_size=max(0, int(max_queue_size)),
+                max_queue_wait_seconds=float(max_queue_wait_seconds),
+            )
+        )
+        self.prefix_cache = PromptPrefixCache(
+            max_bytes=int(max(0.0, float(prefix_cache_max_mb)) * 1024 * 1024),
+            min_prefix_tokens=int(prefix_cache_min_tokens),
+        )
+        self._prefix_model_id = prefix_cache_model_id(self.modelPath, self.n_ctx)
+
+    def scheduler_stats(self) -> dict[str, Any]:
+        return self.scheduler.stats()
+
+    def prefix_cache_stats(self) -> dict[str, Any]:
+        return self.prefix_cache.stats()
 
     # --------------------------------------------------------------------- #
     # Public API
@@ -60,13 +95,21 @@ class Model:
         top_k: int = 40,
         top_p: Optional[float] = None,
         cancel_check: Optional[Callable[[], None]] = None,
+        priority: Optional[str] = None,
+        cache_prefix: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> str:
+        """
+        `cache_prefix` is the fixed leading part of an already rendered `prompt` (call_model passes
+        the system prompt); it keys the prompt prefix KV cache. Defaults to `system_prompt`.
+        """
         if max_tokens is None:
             max_tokens = self.default_max_tokens
         if temperature is None:
             temperature = 0.1
 
         timer = LLMCallTimer()
+        prefix_key = self._prefix_key("completion", cache_prefix or system_prompt)
 
         # Optional: prepend system prompt if your renderer doesn't already include it.
         if system_prompt:
@@ -83,27 +126,33 @@ class Model:
             if top_p is not None:
                 call_kwargs["top_p"] = top_p  # llama-cpp-python supports top_p
 
-            output = ""
-            if cancel_check is not None:
-                cancel_check()
-                call_kwargs["stream"] = True
-                try:
-                    parts: list[str] = []
-                    for chunk in self.llm(**call_kwargs):
+            def _generate() -> str:
+                if cancel_check is not None or on_delta is not None:
+                    if cancel_check is not None:
                         cancel_check()
-                        text = ""
-                        if isinstance(chunk, dict):
-                            choice = (chunk.get("choices") or [{}])[0] if chunk else {}
-                            text = choice.get("text") or ""
-                        parts.append(str(text))
-                    output = "".join(parts).strip()
-                except TypeError:
-                    call_kwargs.pop("stream", None)
-                    res = self.llm(**call_kwargs)
-                    output = (res.get("choices") or [{}])[0].get("text", "").strip()
-            else:
+                    call_kwargs["stream"] = True
+                    try:
+                        parts: list[str] = []
+                        for chunk in self.llm(**call_kwargs):
+                            if cancel_check is not None:
+                                cancel_check()
+                            text = ""
+                            if isinstance(chunk, dict):
+                                choice = (chunk.get("choices") or [{}])[0] if chunk else {}
+                                text = choice.get("text") or ""
+                            parts.append(str(text))
+                            if on_delta is not None and text:
+                                on_delta(str(text))
+                        return "".join(parts).strip()
+                    except TypeError:
+                        call_kwargs.pop("stream", None)
                 res = self.llm(**call_kwargs)
-                output = (res.get("choices") or [{}])[0].get("text", "").strip()
+                return (res.get("choices") or [{}])[0].get("text", "").strip()
+
+            def _complete() -> str:
+                return self._with_prefix_cache(prefix_key, _generate)
+
+            output = self.scheduler.run(_complete, priority=priority, cancel_check=cancel_check)
 
             if self._looks_like_hallucination(output):
                 raise RuntimeError("Detected hallucination or recursive loop in LLM response.")
@@ -123,7 +172,7 @@ class Model:
             )
             return output
 
-        except PipelineCancelled:
+        except (PipelineCancelled, LocalModelBusy):
             raise
         except Exception as e:
             log_llm_query(
@@ -155,6 +204,8 @@ class Model:
         top_k: int = 40,
         top_p: Optional[float] = None,
         cancel_check: Optional[Callable[[], None]] = None,
+        priority: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> str:
         """
         Chat mode:
@@ -171,6 +222,7 @@ class Model:
             temperature = 0.1
 
         timer = LLMCallTimer()
+        prefix_key = self._prefix_key("chat", system_prompt)
 
         try:
             messages: list[dict[str, str]] = []
@@ -209,39 +261,40 @@ class Model:
             if top_p is not None:
                 call_kwargs["top_p"] = top_p
 
-            output = ""
-            if cancel_check is not None:
-                cancel_check()
-                call_kwargs["stream"] = True
-                try:
-                    parts: list[str] = []
-                    for chunk in self.llm.create_chat_completion(**call_kwargs):
+            def _generate_chat() -> str:
+                if cancel_check is not None or on_delta is not None:
+                    if cancel_check is not None:
                         cancel_check()
-                        text = ""
-                        if isinstance(chunk, dict):
-                            choice = (chunk.get("choices") or [{}])[0] if chunk else {}
-                            delta = choice.get("delta") or {}
-                            text = delta.get("content") or ""
-                        parts.append(str(text))
-                    output = "".join(parts).strip()
-                except TypeError:
-                    call_kwargs.pop("stream", None)
-                    res = self.llm.create_chat_completion(**call_kwargs)
-                    output = (
-                        (res.get("choices") or [{}])[0]
-                        .get("message", {})
-                        .get("content", "")
-                        .strip()
-                    )
-            else:
+                    call_kwargs["stream"] = True
+                    try:
+                        parts: list[str] = []
+                        for chunk in self.llm.create_chat_completion(**call_kwargs):
+                            if cancel_check is not None:
+                                cancel_check()
+                            text = ""
+                            if isinstance(chunk, dict):
+                                choice = (chunk.get("choices") or [{}])[0] if chunk else {}
+                                delta = choice.get("delta") or {}
+                                text = delta.get("content") or ""
+                            parts.append(str(text))
+                            if on_delta is not None and text:
+                                on_delta(str(text))
+                        return "".join(parts).strip()
+                    except TypeError:
+                        call_kwargs.pop("stream", None)
                 res = self.llm.create_chat_completion(**call_kwargs)
-                output = (
+                return (
                     (res.get("choices") or [{}])[0]
                     .get("message", {})
                     .get("content", "")
                     .strip()
                 )
 
+            def _complete_chat() -> str:
+                return self._with_prefix_cache(prefix_key, _generate_chat)
+
+            output = self.scheduler.run(_complete_chat, priority=priority, cancel_check=cancel_check)
+
             if self._looks_like_hallucination(output):
                 raise RuntimeError("Detected hallucination or recursive loop in LLM response.")
 
@@ -260,7 +313,7 @@ class Model:
             )
             return output
 
-        except PipelineCancelled:
+        except (PipelineCancelled, LocalModelBusy):
             raise
         except Exception as e:
             log_llm_query(
@@ -310,6 +363,21 @@ class Model:
     # Internal helpers
     # --------------------------------------------------------------------- #
 
+    def _prefix_key(self, mode: str, prefix_text: Optional[str]) -> Optional[bytes]:
+        if not prefix_text or not self.prefix_cache.enabled:
+            return None
+        return PromptPrefixCache.make_key(self._prefix_model_id, mode, prefix_text)
+
+    def _with_prefix_cache(self, prefix_key: Optional[bytes], generate: Callable[[], str]) -> str:
+        """Runs `generate` with the cached prefix state restored (runs inside the scheduler job)."""
+        if prefix_key is None:
+            return generate()
+        restored = self.prefix_cache.restore(self.llm, prefix_key)
+        output = generate()
+        if not restored:
+            self.prefix_cache.learn(self.llm, prefix_key)
+        return output
+
     def _create_llama(self, model_path: str, *, n_ctx: int) -> Llama:
         """
         Try GPU first, then fall back to CPU if GPU init fails.
@@ -6,6 +6,7 @@ import json
 from typing import Any, Dict, Optional
 
 from code_query_engine.chat_types import Dialog
+from code_query_engine.work_callback.answer_stream import AnswerStreamEmitter, mark_answer_streamed
 
 from ..definitions import StepDef
 from ..engine import PipelineRuntime
@@ -21,6 +22,7 @@ _TRACE_PROMPT_NAME_ATTR = "_pipeline_trace_prompt_name"
 _TRACE_RENDERED_PROMPT_ATTR = "_pipeline_trace_rendered_prompt"
 _TRACE_RENDERED_CHAT_MESSAGES_ATTR = "_pipeline_trace_rendered_chat_messages"
 _TRACE_HISTORY_TRIM_ATTR = "_pipeline_trace_history_trim"
+_ALLOWED_PRIORITIES = {"high", "normal", "low"}
 
 
 class CallModelAction(PipelineActionBase):
@@ -146,6 +148,9 @@ class CallModelAction(PipelineActionBase):
         top_k = opt_int(get_override(raw=step.raw, settings=runtime.pipeline_settings, key="top_k"))
         top_p = opt_float(get_override(raw=step.raw, settings=runtime.pipeline_settings, key="top_p"))
         server_name = str(get_override(raw=step.raw, settings=runtime.pipeline_settings, key="server_name") or "").strip()
+        priority = str(get_override(raw=step.raw, settings=runtime.pipeline_settings, key="priority") or "").strip().lower()
+        if priority and priority not in _ALLOWED_PRIORITIES:
+            raise ValueError(f"call_model: invalid priority={priority!r}. Allowed: {sorted(_ALLOWED_PRIORITIES)}")
 
         # Precedence: max_output_tokens overrides max_tokens if both are provided.
         if max_output_tokens is not None:
@@ -160,6 +165,11 @@ class CallModelAction(PipelineActionBase):
             model_kwargs["top_p"] = top_p
         if server_name and bool(getattr(model, "supports_server_name", False)):
             model_kwargs["server_name"] = server_name
+        if priority and bool(getattr(model, "supports_priority", False)):
+            model_kwargs["priority"] = priority
+        if not native_chat and bool(getattr(model, "supports_prefix_cache", False)):
+            # Manual prompts embed the system prompt; it keys the local model's prefix KV cache.
+            model_kwargs["cache_prefix"] = system_prompt
         if bool(getattr(model, "supports_security_context", False)):
             model_kwargs["security_context"] = {
                 "doc_level_max": getattr(state, "doc_level_max", None),
@@ -171,6 +181,14 @@ class CallModelAction(PipelineActionBase):
                 "state": state,
             }
 
+        # Token streaming to /pipeline/stream subscribers (answer steps only; routers stay silent).
+        emitter: Optional[AnswerStreamEmitter] = None
+        stream_answer = opt_bool(get_override(raw=raw, settings=runtime.pipeline_settings, key="stream_answer")) or False
+        run_id = str(getattr(state, "pipeline_run_id", None) or "").strip()
+        if stream_answer and run_id and bool(getattr(model, "supports_stream_callback", False)):
+            emitter = AnswerStreamEmitter(run_id=run_id, step_id=str(step.id))
+            model_kwargs["on_delta"] = emitter.on_delta
+
         setattr(state, _TRACE_PROMPT_NAME_ATTR, prompt_key)
 
         if native_chat:
@@ -198,6 +216,11 @@ class CallModelAction(PipelineActionBase):
                 model_kwargs=model_kwargs,
             )
 
+        if emitter is not None:
+            # The returned text is authoritative; it replaces the streamed draft on the client.
+            emitter.finish(str(out or "").strip(), pending_translation=bool(getattr(state, "translate_chat", False)))
+            mark_answer_streamed(state, str(step.id))
+
         state.last_model_response = str(out or "")
         return raw.get("next")
 
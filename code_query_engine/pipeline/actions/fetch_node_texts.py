@@ -4,7 +4,7 @@ from __future__ import annotations
 import json
 from typing import Any, Dict, List, Optional, Set, Tuple
 
-from classifiers.code_classifier import CodeKind, classify_text
+from classifiers.code_classifier import CODE_KIND_PROPERTY, CodeKind, classify_text_cached, precomputed_code_kind
 
 from ..definitions import StepDef
 from ..engine import PipelineRuntime
@@ -656,6 +656,7 @@ class FetchNodeTextsAction(PipelineActionBase):
                     "is_seed",
                     "depth",
                     "parent_id",
+                    CODE_KIND_PROPERTY,
                 }
                 if metadata_fields:
                     keys = metadata_fields
@@ -686,7 +687,10 @@ class FetchNodeTextsAction(PipelineActionBase):
             # token budget gate (count full context block, not raw text)
             tok = 0
             if budget_tokens is not None:
-                lang = _normalize_language(classify_text(str(text or "")).kind)
+                kind = precomputed_code_kind((node_props or {}).get(CODE_KIND_PROPERTY))
+                if kind is None:
+                    kind = classify_text_cached(str(text or "")).kind
+                lang = _normalize_language(kind)
                 path_for_budget = (
                     str((node_props or {}).get("path") or "")
                     or str((node_props or {}).get("repo_relative_path") or "")
@@ -735,6 +739,7 @@ class FetchNodeTextsAction(PipelineActionBase):
                 "sql_kind",
                 "sql_schema",
                 "sql_name",
+                CODE_KIND_PROPERTY,
                 "acl_allow",
                 "classification_labels",
                 "doc_level",
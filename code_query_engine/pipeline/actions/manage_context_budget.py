@@ -3,11 +3,14 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
-from classifiers.code_classifier import CodeKind, classify_text
+from classifiers.code_classifier import CODE_KIND_PROPERTY, CodeKind, precomputed_code_kind
+from classifiers.code_classifier import classify_text_cached as classify_text
 
+from ..context_budget_ledger import ContextBudgetLedger, ledger_for_blocks
 from ..definitions import StepDef
 from ..engine import PipelineRuntime
 from ..state import PipelineState
@@ -40,8 +43,34 @@ def _normalize_language(kind: CodeKind) -> str:
     return "unknown"
 
 
-def _context_text_from_blocks(blocks: List[str]) -> str:
-    return "\n\n".join([str(x) for x in (blocks or []) if str(x or "").strip()]).strip()
+def _node_kind(node: Dict[str, Any], text: str) -> CodeKind:
+    # Prefer the kind precomputed at import time (RagNode.code_kind); classify (memoized) otherwise.
+    kind = precomputed_code_kind(node.get(CODE_KIND_PROPERTY))
+    if kind is not None:
+        return kind
+    return classify_text(text).kind
+
+
+def _ledger_verify_enabled() -> bool:
+    # Debug/test mode: cross-check every incremental ledger update against a full recount.
+    v = (os.getenv("RAG_BUDGET_LEDGER_VERIFY") or "").strip().lower()
+    return v in ("1", "true", "yes", "on")
+
+
+def _node_fields(node: Dict[str, Any]) -> Tuple[str, str, str, Optional[List[str]]]:
+    node_id = str(node.get("node_id") or node.get("id") or "").strip()
+    path = str(
+        node.get("path")
+        or node.get("repo_relative_path")
+        or node.get("source_file")
+        or node.get("source")
+        or ""
+    ).strip()
+    text = str(node.get("text") or "")
+    metadata_lines = None
+    if isinstance(node.get("metadata_context"), list):
+        metadata_lines = [str(x) for x in node.get("metadata_context") if str(x or "").strip()]
+    return node_id, path, text, metadata_lines
 
 
 def _resolve_divide_new_content(step_raw: Dict[str, Any]) -> str:
@@ -220,36 +249,35 @@ class ManageContextBudgetAction(PipelineActionBase):
                 if str(x or "").strip()
             ]
             state.context_blocks = list(context_blocks)
-        current_context_text = _context_text_from_blocks(context_blocks)
+        token_counter = getattr(runtime, "token_counter", None)
+        if token_counter is None:
+            raise ValueError("manage_context_budget: runtime.token_counter is required")
+
+        # Incremental accounting: each block is tokenized once; candidates are projected on top of the ledger
+        # and only budget decisions near the limit pay for a recount of the joined context.
+        ledger = ledger_for_blocks(
+            lambda t: _token_count(token_counter, t),
+            context_blocks,
+            verify=_ledger_verify_enabled(),
+        )
 
         demand_topics = self._demand_topics_for_step(state, step_id=step.id)
 
         # Process nodes in order; build a candidate append list first (transactional semantics).
         to_append: List[str] = []
         debug_nodes: List[Dict[str, Any]] = []
+        raw_blocks: List[Tuple[str, int]] = []
 
-        # Precompute current context tokens once (used in logs and misconfig detection).
-        cur_tokens = _token_count(getattr(runtime, "token_counter", None), current_context_text)
+        # Current context tokens (used in logs and misconfig detection).
+        cur_tokens = ledger.total
 
         for idx, node in enumerate(incoming):
             if not isinstance(node, dict):
                 raise ValueError("manage_context_budget: state.node_texts items must be dicts (contract)")
 
-            node_id = str(node.get("node_id") or node.get("id") or "").strip()
-            path = str(
-                node.get("path")
-                or node.get("repo_relative_path")
-                or node.get("source_file")
-                or node.get("source")
-                or ""
-            ).strip()
-            text = str(node.get("text") or "")
-            metadata_lines = None
-            if isinstance(node.get("metadata_context"), list):
-                metadata_lines = [str(x) for x in node.get("metadata_context") if str(x or "").strip()]
-
-            kind = classify_text(text).kind
-            language = _normalize_language(kind)
+            node_id, path, text, metadata_lines = _node_fields(node)
+
+            language = _normalize_language(_node_kind(node, text))
 
             rule = _first_matching_rule(rules, language)
 
@@ -264,8 +292,9 @@ class ManageContextBudgetAction(PipelineActionBase):
 
             # Evaluate budget with raw candidate (before compaction).
             raw_with_divider = _with_divider(raw_formatted, divide_new_content)
-            candidate_ctx_raw = self._join_context(current_context_text, to_append, raw_with_divider)
-            tokens_raw = _token_count(getattr(runtime, "token_counter", None), candidate_ctx_raw)
+            raw_tokens = ledger.count_block(raw_with_divider)
+            raw_blocks.append((raw_with_divider, raw_tokens))
+            tokens_raw = ledger.projected_total(raw_with_divider, raw_tokens)
 
             compacted = False
             policy = rule.policy if rule else ""
@@ -293,6 +322,8 @@ class ManageContextBudgetAction(PipelineActionBase):
                 else:
                     raise ValueError(f"manage_context_budget: invalid policy '{rule.policy}' (internal)")
 
+            candidate_with_divider = raw_with_divider
+            candidate_tokens = raw_tokens
             if compacted:
                 compact_text = self._compact_text(language=language, text=text)
                 candidate_text = self.format_text(
@@ -303,10 +334,11 @@ class ManageContextBudgetAction(PipelineActionBase):
                     text=compact_text,
                     metadata_lines=metadata_lines,
                 )
+                candidate_with_divider = _with_divider(candidate_text, divide_new_content)
+                candidate_tokens = ledger.count_block(candidate_with_divider)
 
-            candidate_with_divider = _with_divider(candidate_text, divide_new_content)
-            candidate_ctx_final = self._join_context(current_context_text, to_append, candidate_with_divider)
-            tokens_final = _token_count(getattr(runtime, "token_counter", None), candidate_ctx_final)
+            # Estimate while clearly within budget; the joined text is recounted near the limit.
+            tokens_final = ledger.checked_total(max_context_tokens_i, candidate_with_divider, candidate_tokens)
 
             debug_nodes.append(
                 {
@@ -324,28 +356,29 @@ class ManageContextBudgetAction(PipelineActionBase):
 
             if tokens_final > max_context_tokens_i:
                 # Misconfiguration guard: if incoming retrieval context alone cannot fit, this will never succeed.
-                incoming_only_text = "\n\n".join(
-                    [
+                # Raw block counts of already processed nodes are reused; only the rest is formatted and counted.
+                incoming_only = ContextBudgetLedger(lambda t: _token_count(token_counter, t))
+                for n_idx, n in enumerate(incoming):
+                    if not isinstance(n, dict):
+                        continue
+                    if n_idx < len(raw_blocks):
+                        incoming_only.admit(*raw_blocks[n_idx])
+                        continue
+                    n_id, n_path, n_text, n_meta = _node_fields(n)
+                    incoming_only.admit(
                         _with_divider(
                             self.format_text(
-                                node_id=str((n or {}).get("node_id") or (n or {}).get("id") or "").strip(),
-                                path=str((n or {}).get("path") or (n or {}).get("repo_relative_path") or (n or {}).get("source_file") or "").strip(),
-                                language=_normalize_language(classify_text(str((n or {}).get("text") or "")).kind),
+                                node_id=n_id,
+                                path=n_path,
+                                language=_normalize_language(_node_kind(n, n_text)),
                                 compact=False,
-                                text=str((n or {}).get("text") or ""),
-                                metadata_lines=(
-                                    [str(x) for x in (n or {}).get("metadata_context") if str(x or "").strip()]
-                                    if isinstance((n or {}).get("metadata_context"), list)
-                                    else None
-                                ),
+                                text=n_text,
+                                metadata_lines=n_meta,
                             ),
                             divide_new_content,
                         )
-                        for n in (incoming or [])
-                        if isinstance(n, dict)
-                    ]
-                )
-                incoming_only_tokens = _token_count(getattr(runtime, "token_counter", None), incoming_only_text)
+                    )
+                incoming_only_tokens = incoming_only.checked_total(max_context_tokens_i)
                 if incoming_only_tokens > max_context_tokens_i:
                     raise RuntimeError(
                         "PIPELINE_BUDGET_MISCONFIG: fetch_node_texts produced retrieval texts that cannot fit into "
@@ -364,6 +397,7 @@ class ManageContextBudgetAction(PipelineActionBase):
                 )
                 return on_over
 
+            ledger.admit(candidate_with_divider, candidate_tokens)
             to_append.append(candidate_with_divider)
 
         # Success: append all prepared blocks and consume incoming retrieval buffer.
@@ -415,14 +449,6 @@ class ManageContextBudgetAction(PipelineActionBase):
     # Helpers
     # ------------------------------
 
-    def _join_context(self, current_context_text: str, appended: List[str], candidate: str) -> str:
-        parts: List[str] = []
-        if current_context_text.strip():
-            parts.append(current_context_text.strip())
-        parts.extend([x.strip() for x in appended if str(x or "").strip()])
-        parts.append(candidate.strip())
-        return "\n\n".join(parts).strip()
-
     def _demand_topics_for_step(self, state: PipelineState, *, step_id: str) -> List[str]:
         # base_action consumes inbox on entry and stores for action usage.
         msgs = list(getattr(state, "inbox_last_consumed", []) or [])
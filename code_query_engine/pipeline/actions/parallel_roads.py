@@ -1,13 +1,46 @@
 # code_query_engine/pipeline/actions/parallel_roads.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from ..cancellation import make_cancel_check
 from ..definitions import StepDef
-from ..engine import PipelineRuntime
+from ..engine import PipelineRuntime, execute_action
 from ..state import PipelineState
 from .base_action import PipelineActionBase
 
+# Upper bound of steps one fork may run between search_action and merge_action.
+_MAX_FORK_SEGMENT_STEPS = 64
+
+# Fields written by the search_action..merge_action segment (search_nodes, expand_dependency_tree,
+# fetch_node_texts). Folded back as "last fork wins", which is what the sequential loop leaves
+# behind for merge_action. Any other field a fork changes is discarded.
+_FORK_OUTPUT_FIELDS = (
+    "search_type",
+    "rerank",
+    "retrieval_query",
+    "retrieval_mode",
+    "retrieval_filters",
+    "last_search_query",
+    "last_search_type",
+    "last_search_filters",
+    "retrieval_seed_nodes",
+    "retrieval_hits",
+    "graph_seed_nodes",
+    "graph_expanded_nodes",
+    "graph_nodes",
+    "graph_edges",
+    "graph_debug",
+    "graph_node_texts",
+    "node_texts",
+    "inbox_last_consumed",
+    "_fetch_node_texts_debug",
+)
+
 
 def _resolve_snapshot_ref(raw_val: str, state: PipelineState) -> str:
     v = str(raw_val or "").strip()
@@ -79,6 +112,21 @@ def _node_block(node: Dict[str, Any]) -> str:
     )
 
 
+def _snapshot_blocks(
+    state: PipelineState,
+    labels_raw: Dict[str, Any],
+    name: str,
+    snapshot_id: str,
+    nodes: List[Any],
+) -> List[str]:
+    display_name = _display_snapshot_name(state=state, snapshot_id=snapshot_id, fallback=name)
+    blocks = [_render_label(str(labels_raw.get(name) or ""), display_name)]
+    for n in nodes:
+        if isinstance(n, dict):
+            blocks.append(_node_block(n))
+    return blocks
+
+
 def _clear_retrieval(state: PipelineState) -> None:
     state.retrieval_seed_nodes = []
     state.retrieval_hits = []
@@ -90,6 +138,132 @@ def _clear_retrieval(state: PipelineState) -> None:
     state.node_texts = []
 
 
+def _resolve_max_concurrency(step: StepDef, runtime: PipelineRuntime) -> int:
+    raw = step.raw or {}
+    value = raw.get("max_concurrency")
+    if value is None:
+        value = (runtime.pipeline_settings or {}).get("parallel_roads_max_concurrency", 1)
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"fork_action: max_concurrency must be an integer (got {value!r})")
+    return max(1, n)
+
+
+def _clone_state_for_fork(state: PipelineState) -> PipelineState:
+    """
+    Per-fork copy of the pipeline state: scalars are shared, containers are copied,
+    so actions inside one fork never mutate lists/dicts seen by another fork.
+    """
+    clone = copy.copy(state)
+    for key, value in vars(state).items():
+        if key == "inbox":
+            # Same message objects as the parent, so the fold can tell consumed ones apart.
+            clone.inbox = list(value or [])
+            continue
+        if isinstance(value, (list, dict, set)):
+            try:
+                setattr(clone, key, copy.deepcopy(value))
+            except Exception:
+                setattr(clone, key, copy.copy(value))
+    return clone
+
+
+class _ForkAborted(Exception):
+    pass
+
+
+def _run_fork_segment(
+    *,
+    fork_state: PipelineState,
+    runtime: PipelineRuntime,
+    steps_by_id: Dict[str, StepDef],
+    registry: Any,
+    start_step_id: str,
+    abort: threading.Event,
+    cancel_check: Optional[Callable[[], None]],
+    consumed: List[Dict[str, Any]],
+) -> str:
+    """
+    Runs steps from `start_step_id` until a merge_action step is reached. Returns that step id.
+    Every inbox message a step consumes is appended to `consumed`.
+    """
+    current = start_step_id
+    for _ in range(_MAX_FORK_SEGMENT_STEPS):
+        if abort.is_set():
+            raise _ForkAborted()
+        if cancel_check is not None:
+            cancel_check()
+        step = steps_by_id.get(current)
+        if step is None:
+            raise KeyError(f"Unknown step id: '{current}'")
+        if step.action == "merge_action":
+            return current
+
+        fork_state.steps_used += 1
+        fork_state.step_trace.append(current)
+        fork_state.inbox_last_consumed = []
+        try:
+            next_step_id = execute_action(registry.get(step.action), step, fork_state, runtime)
+        finally:
+            consumed.extend(fork_state.inbox_last_consumed or [])
+
+        if bool(step.end):
+            break
+        nxt = next_step_id or step.next
+        if not nxt:
+            break
+        current = nxt
+    raise ValueError(f"fork_action: fork segment starting at '{start_step_id}' did not reach a merge_action step")
+
+
+def _fold_fork_state(parent: PipelineState, fork: PipelineState, base: Dict[str, int]) -> None:
+    """Applies one fork's trace and outputs to the parent, as if the forks had run one after another."""
+    parent.steps_used += fork.steps_used - base["steps_used"]
+    parent.step_trace.extend(fork.step_trace[base["step_trace"] :])
+    events = list(getattr(fork, "pipeline_trace_events", None) or [])[base["pipeline_trace_events"] :]
+    if events:
+        if getattr(parent, "pipeline_trace_events", None) is None:
+            setattr(parent, "pipeline_trace_events", [])
+        parent.pipeline_trace_events.extend(events)
+    for q in fork.retrieval_queries_asked:
+        if q not in parent.retrieval_queries_asked:
+            parent.retrieval_queries_asked.append(q)
+    parent.retrieval_queries_asked_norm |= set(fork.retrieval_queries_asked_norm or ())
+
+    # The merged context holds every fork's nodes, so its security labels are the union.
+    for key in ("classification_labels_union", "acl_labels_union"):
+        merged = set(getattr(parent, key, None) or ()) | set(getattr(fork, key, None) or ())
+        setattr(parent, key, sorted(merged))
+    levels = [v for v in (getattr(parent, "doc_level_max", None), getattr(fork, "doc_level_max", None)) if v is not None]
+    parent.doc_level_max = max(levels) if levels else None
+
+    fork_vars = vars(fork)
+    for key in _FORK_OUTPUT_FIELDS:
+        if key in fork_vars:
+            setattr(parent, key, fork_vars[key])
+
+
+def _fold_fork_inboxes(
+    parent: PipelineState,
+    forks: List[PipelineState],
+    consumed: List[List[Dict[str, Any]]],
+) -> None:
+    """
+    Parent inbox after the forks: the messages no fork consumed, then each fork's own
+    still-pending messages in plan order.
+
+    Every fork sees the whole parent inbox, so a message for a step inside the segment is
+    delivered to each fork (the sequential loop delivers it to the first one only).
+    """
+    parent_ids = {id(m) for m in parent.inbox}
+    consumed_ids = {id(m) for msgs in consumed for m in msgs}
+    inbox = [m for m in parent.inbox if id(m) not in consumed_ids]
+    for fork in forks:
+        inbox.extend(m for m in fork.inbox if id(m) not in parent_ids)
+    parent.inbox = inbox
+
+
 class ParallelRoadsAction(PipelineActionBase):
     @property
     def action_id(self) -> str:
@@ -148,6 +322,8 @@ class ForkAction(PipelineActionBase):
             "next_step_id": next_step_id,
             "current_snapshot_name": cur.get("name"),
             "current_snapshot_id": cur.get("snapshot_id"),
+            "concurrent": bool(pr.get("fork_outputs")),
+            "fork_ms": dict(pr.get("fork_ms") or {}),
         }
 
     def do_execute(self, step: StepDef, state: PipelineState, runtime: PipelineRuntime) -> Optional[str]:
@@ -179,12 +355,107 @@ class ForkAction(PipelineActionBase):
         if idx >= len(plan):
             return raw.get("on_done")
 
+        steps_by_id = getattr(runtime, "pipeline_steps_by_id", None)
+        registry = getattr(runtime, "action_registry", None)
+        max_concurrency = _resolve_max_concurrency(step, runtime)
+        if idx == 0 and len(plan) > 1 and max_concurrency > 1 and steps_by_id and registry is not None:
+            return self._run_forks_concurrently(
+                state=state,
+                runtime=runtime,
+                pr=pr,
+                plan=plan,
+                steps_by_id=steps_by_id,
+                registry=registry,
+                max_concurrency=max_concurrency,
+            )
+
         name, snapshot_id = plan[idx]
         pr["current"] = {"name": name, "snapshot_id": snapshot_id}
 
         state.snapshot_id = snapshot_id
         return search_step_id
 
+    def _run_forks_concurrently(
+        self,
+        *,
+        state: PipelineState,
+        runtime: PipelineRuntime,
+        pr: Dict[str, Any],
+        plan: List[Tuple[str, str]],
+        steps_by_id: Dict[str, StepDef],
+        registry: Any,
+        max_concurrency: int,
+    ) -> str:
+        """
+        Runs the search_action..merge_action segment for every snapshot on its own state copy,
+        at most `max_concurrency` at a time, then folds the forks back in plan order.
+
+        The first failing fork (including PipelineCancelled) stops the others at their next
+        step boundary and its exception is re-raised here.
+        """
+        search_step_id = str(pr.get("search_step_id") or "")
+        abort = threading.Event()
+        # Checked against the parent state, so a CANCELLED event lands in the run's own trace.
+        cancel_check = make_cancel_check(state)
+        forks: List[PipelineState] = []
+        for name, snapshot_id in plan:
+            fork_state = _clone_state_for_fork(state)
+            fork_state.snapshot_id = snapshot_id
+            fork_state.parallel_roads = {**pr, "current": {"name": name, "snapshot_id": snapshot_id}}
+            forks.append(fork_state)
+        base = {
+            "steps_used": state.steps_used,
+            "step_trace": len(state.step_trace),
+            "pipeline_trace_events": len(getattr(state, "pipeline_trace_events", None) or []),
+        }
+        consumed: List[List[Dict[str, Any]]] = [[] for _ in plan]
+        fork_ms: Dict[str, int] = {}
+
+        def _run(i: int) -> str:
+            t0 = time.perf_counter()
+            try:
+                return _run_fork_segment(
+                    fork_state=forks[i],
+                    runtime=runtime,
+                    steps_by_id=steps_by_id,
+                    registry=registry,
+                    start_step_id=search_step_id,
+                    abort=abort,
+                    cancel_check=cancel_check,
+                    consumed=consumed[i],
+                )
+            except BaseException:
+                abort.set()
+                raise
+            finally:
+                fork_ms[plan[i][0]] = int((time.perf_counter() - t0) * 1000)
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(plan)), thread_name_prefix="fork") as pool:
+            futures = [pool.submit(_run, i) for i in range(len(plan))]
+            errors = [f.exception() for f in futures]
+
+        real_errors = [e for e in errors if e is not None and not isinstance(e, _ForkAborted)]
+        if real_errors:
+            raise real_errors[0]
+
+        merge_step_ids = [f.result() for f in futures]
+        if len(set(merge_step_ids)) != 1:
+            raise ValueError(f"fork_action: forks reached different merge steps: {sorted(set(merge_step_ids))}")
+
+        outputs: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, _), fork_state in zip(plan, forks):
+            outputs[name] = list(getattr(fork_state, "node_texts", []) or [])
+            _fold_fork_state(state, fork_state, base)
+        _fold_fork_inboxes(state, forks, consumed)
+
+        last_name, last_snapshot_id = plan[-1]
+        pr["current"] = {"name": last_name, "snapshot_id": last_snapshot_id}
+        pr["fork_outputs"] = outputs
+        pr["fork_ms"] = fork_ms
+        state.parallel_roads = pr
+        state.snapshot_id = last_snapshot_id
+        return merge_step_ids[0]
+
 
 class MergeAction(PipelineActionBase):
     @property
@@ -229,22 +500,23 @@ class MergeAction(PipelineActionBase):
         if idx >= len(plan):
             return raw.get("on_done")
 
-        name, snapshot_id = plan[idx]
-        display_name = _display_snapshot_name(state=state, snapshot_id=snapshot_id, fallback=name)
-        label = _render_label(str(labels_raw.get(name) or ""), display_name)
-
-        nodes = list(getattr(state, "node_texts", []) or [])
-        blocks = [label]
-        for n in nodes:
-            if isinstance(n, dict):
-                blocks.append(_node_block(n))
-
         results = pr.get("results")
         if not isinstance(results, dict):
             results = {}
-        results[name] = blocks
         pr["results"] = results
 
+        fork_outputs = pr.pop("fork_outputs", None)
+        if isinstance(fork_outputs, dict):
+            # Forks already ran concurrently: merge all of them at once, in plan order.
+            for name, snapshot_id in plan[idx:]:
+                results[name] = _snapshot_blocks(state, labels_raw, name, snapshot_id, fork_outputs.get(name) or [])
+            idx = len(plan) - 1
+        else:
+            name, snapshot_id = plan[idx]
+            results[name] = _snapshot_blocks(
+                state, labels_raw, name, snapshot_id, list(getattr(state, "node_texts", []) or [])
+            )
+
         _clear_retrieval(state)
 
         pr["index"] = idx + 1
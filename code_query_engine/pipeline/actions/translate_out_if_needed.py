@@ -6,6 +6,7 @@ import hashlib
 import os
 from typing import Any, Dict, Optional
 
+from code_query_engine.work_callback.answer_stream import publish_reconciled_answer
 from prompt_builder.factory import get_prompt_builder_by_prompt_format
 
 from ..definitions import StepDef
@@ -72,6 +73,13 @@ class TranslateOutIfNeededAction(PipelineActionBase):
         return out
 
     def do_execute(self, step: StepDef, state: PipelineState, runtime: PipelineRuntime) -> Optional[str]:
+        next_step_id = self._translate(step, state, runtime)
+        if getattr(state, "translate_chat", False):
+            # A streamed answer was sent in the neutral language; replace it with the translation.
+            publish_reconciled_answer(state, getattr(state, "answer_translated", None))
+        return next_step_id
+
+    def _translate(self, step: StepDef, state: PipelineState, runtime: PipelineRuntime) -> Optional[str]:
         # Logging-only: avoid leaking trace fields across steps/runs.
         try:
             setattr(state, _TRACE_TRANSLATE_RENDERED_PROMPT_ATTR, None)
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import logging
 import threading
 import time
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Callable
 
 
+logger = logging.getLogger(__name__)
+
 _CANCEL_TTL_SEC = 60 * 20
+_CANCEL_POLL_INTERVAL_SEC = 0.25
 
 
 @dataclass
@@ -33,7 +37,7 @@ class PipelineCancelRegistry:
             return
         with self._lock:
             self._items[rid] = CancelRecord(ts=time.time(), reason=reason or "cancelled")
-        self._cleanup_locked()
+            self._cleanup_locked()
 
     def is_cancelled(self, run_id: str) -> bool:
         rid = (run_id or "").strip()
@@ -56,7 +60,7 @@ class PipelineCancelRegistry:
             return
         with self._lock:
             self._items.pop(rid, None)
-        self._cleanup_locked()
+            self._cleanup_locked()
 
     def _cleanup_locked(self) -> None:
         now = time.time()
@@ -65,13 +69,103 @@ class PipelineCancelRegistry:
             self._items.pop(rid, None)
 
 
-_REGISTRY = PipelineCancelRegistry()
+class RedisPipelineCancelRegistry(PipelineCancelRegistry):
+    """
+    Cancellation shared by all server workers: `/pipeline/cancel` may hit any worker.
+
+    A cancel request is stored locally and as a Redis key with the same TTL
+    (`SET <prefix><run_id> <reason> EX ttl`). `is_cancelled()` answers from the local copy and
+    reads Redis at most once per `poll_interval_s` per run, so the per-token `cancel_check` of
+    the local model and the per-step check of PipelineEngine stay cheap. Redis errors are
+    logged and treated as "not cancelled".
+
+    `client` is a redis.Redis created with `decode_responses=True` (or an in-memory mock).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        key_prefix: str = "pcancel:",
+        ttl_sec: int = _CANCEL_TTL_SEC,
+        poll_interval_s: float = _CANCEL_POLL_INTERVAL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self._redis = client
+        self._prefix = key_prefix
+        self._ttl = max(1, int(ttl_sec))
+        self._poll_interval_s = max(0.0, float(poll_interval_s))
+        self._clock = clock
+        self._next_poll: Dict[str, float] = {}
+        self._polls = 0
+
+    def request_cancel(self, run_id: str, *, reason: str = "cancelled") -> None:
+        rid = (run_id or "").strip()
+        if not rid:
+            return
+        super().request_cancel(rid, reason=reason)
+        self._redis.set(self._key(rid), reason or "cancelled", ex=self._ttl)
+
+    def is_cancelled(self, run_id: str) -> bool:
+        rid = (run_id or "").strip()
+        if not rid:
+            return False
+        now = self._clock()
+        with self._lock:
+            if rid in self._items:
+                return True
+            if self._next_poll.get(rid, 0.0) > now:
+                return False
+            self._next_poll[rid] = now + self._poll_interval_s
+            self._polls += 1
+        try:
+            reason = self._redis.get(self._key(rid))
+        except Exception as e:
+            logger.warning("RedisPipelineCancelRegistry: cancel poll failed for %s: %s", rid, e)
+            return False
+        if reason is None:
+            return False
+        with self._lock:
+            self._items[rid] = CancelRecord(ts=time.time(), reason=str(reason) or "cancelled")
+        return True
+
+    def get_reason(self, run_id: str) -> Optional[str]:
+        reason = super().get_reason(run_id)
+        if reason is None and self.is_cancelled(run_id):
+            reason = super().get_reason(run_id)
+        return reason
+
+    def clear(self, run_id: str) -> None:
+        rid = (run_id or "").strip()
+        if not rid:
+            return
+        super().clear(rid)
+        with self._lock:
+            self._next_poll.pop(rid, None)
+        self._redis.delete(self._key(rid))
+
+    def poll_count(self) -> int:
+        with self._lock:
+            return self._polls
+
+    def _key(self, rid: str) -> str:
+        return f"{self._prefix}{rid}"
+
+
+_REGISTRY: PipelineCancelRegistry = PipelineCancelRegistry()
 
 
 def get_pipeline_cancel_registry() -> PipelineCancelRegistry:
     return _REGISTRY
 
 
+def set_pipeline_cancel_registry(registry: PipelineCancelRegistry) -> None:
+    """Replaces the process-wide registry (e.g. with RedisPipelineCancelRegistry at server startup)."""
+    global _REGISTRY
+    _REGISTRY = registry
+
+
 def append_cancel_event(state: Any, *, run_id: str, reason: str) -> None:
     try:
         if getattr(state, "_cancel_event_emitted", False):
@@ -0,0 +1,187 @@
+# code_query_engine/pipeline/compiled_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.lru_cache import BoundedLRU
+
+from .definitions import PipelineDef
+from .lockfile import apply_lockfile, load_lockfile, lockfile_path_for_yaml
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    """Content fingerprint of a single source file (stat is only a fast-path hint)."""
+    path: str
+    sha256: str
+    mtime_ns: int
+    size: int
+
+
+@dataclass(frozen=True)
+class CompiledPipeline:
+    """
+    Loaded, extends-merged, validated and lock-applied pipeline.
+
+    Instances are shared between requests and must be treated as read-only.
+    """
+    name: str
+    pipeline: PipelineDef
+    files: Tuple[str, ...]
+    fingerprint: Tuple[FileFingerprint, ...]
+    compiled_at: float
+
+
+def _stat_file(path: str) -> Tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return -1, -1
+    return int(st.st_mtime_ns), int(st.st_size)
+
+
+def _fingerprint_file(path: str) -> FileFingerprint:
+    mtime_ns, size = _stat_file(path)
+    if size < 0:
+        # Missing file is part of the fingerprint (e.g. lockfile not created yet).
+        return FileFingerprint(path=path, sha256="", mtime_ns=-1, size=-1)
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    return FileFingerprint(path=path, sha256=digest, mtime_ns=mtime_ns, size=size)
+
+
+def compile_pipeline(*, name: str, loader: Any, validator: Any) -> CompiledPipeline:
+    """
+    Loads `name` via the loader, validates it and applies the lockfile when
+    settings.compat_mode is `locked`/`strict`.
+
+    Raises the same errors the runner used to raise inline (ValueError for lockfile problems).
+    """
+    pipeline = loader.load_by_name(name)
+    validator.validate(pipeline)
+
+    files: List[str] = []
+    resolve_fn = getattr(loader, "resolve_files_by_name", None)
+    if callable(resolve_fn):
+        try:
+            files = [os.fspath(p) for p in (resolve_fn(name) or [])]
+        except Exception:
+            files = []
+
+    settings = pipeline.settings or {}
+    compat_mode = str(settings.get("compat_mode") or "").strip().lower()
+    behavior_version = str(settings.get("behavior_version") or "").strip()
+
+    lockfile_path: Optional[Path] = lockfile_path_for_yaml(Path(files[0])) if files else None
+
+    if compat_mode in ("locked", "strict"):
+        if lockfile_path is None:
+            raise ValueError("compat_mode locked requires lockfile path resolution")
+        if not lockfile_path.exists():
+            raise ValueError(f"compat_mode locked requires lockfile: {lockfile_path}")
+
+        lock = load_lockfile(lockfile_path)
+        if lock.behavior_version != behavior_version:
+            raise ValueError(
+                "lockfile.behavior_version does not match pipeline.settings.behavior_version"
+            )
+        if lock.pipeline_name != pipeline.name:
+            raise ValueError("lockfile.pipeline_name does not match pipeline.name")
+
+        pipeline = apply_lockfile(pipeline, lock)
+
+    tracked = list(files)
+    if lockfile_path is not None:
+        tracked.append(os.fspath(lockfile_path))
+
+    return CompiledPipeline(
+        name=name,
+        pipeline=pipeline,
+        files=tuple(files),
+        fingerprint=tuple(_fingerprint_file(p) for p in tracked),
+        compiled_at=time.time(),
+    )
+
+
+class CompiledPipelineCache:
+    """
+    Process-local cache of CompiledPipeline objects keyed by pipeline name.
+
+    An entry is reused only while the content of every file in its `extends`
+    chain (and the lockfile next to the root YAML) is unchanged. File stat
+    (mtime_ns, size) is checked first; content is re-hashed only when stat differs,
+    so a touched-but-identical file still counts as a hit.
+
+    Loaders that cannot resolve source files (unit-test stubs) are never cached.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._items: BoundedLRU[str, CompiledPipeline] = BoundedLRU()
+        self._invalidations = 0
+
+    def get_or_compile(self, name: str, *, loader: Any, validator: Any) -> CompiledPipeline:
+        cached = self._items.get(name, record=False)
+
+        if cached is not None:
+            fresh = self._revalidate(cached)
+            if fresh is not None:
+                self._items.record_hit()
+                if fresh is not cached:
+                    self._items.put(name, fresh)
+                return fresh
+
+        compiled = compile_pipeline(name=name, loader=loader, validator=validator)
+        self._items.record_miss()
+        if compiled.files:
+            self._items.put(name, compiled)
+        else:
+            self._items.pop(name)
+        return compiled
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        """Drops one pipeline (or all when name is None). Returns the number of removed entries."""
+        if name is None:
+            removed = self._items.clear()
+        else:
+            removed = 1 if self._items.pop(name) is not None else 0
+        with self._lock:
+            self._invalidations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        out = self._items.stats()
+        out.pop("evictions", None)
+        out["pipelines"] = sorted(self._items.keys())
+        with self._lock:
+            out["invalidations"] = self._invalidations
+        return out
+
+    def _revalidate(self, cached: CompiledPipeline) -> Optional[CompiledPipeline]:
+        refreshed: List[FileFingerprint] = []
+        changed_stat = False
+        for fp in cached.fingerprint:
+            mtime_ns, size = _stat_file(fp.path)
+            if mtime_ns == fp.mtime_ns and size == fp.size:
+                refreshed.append(fp)
+                continue
+            current = _fingerprint_file(fp.path)
+            if current.sha256 != fp.sha256:
+                return None
+            refreshed.append(current)
+            changed_stat = True
+
+        if not changed_stat:
+            return cached
+        return CompiledPipeline(
+            name=cached.name,
+            pipeline=cached.pipeline,
+            files=cached.files,
+            fingerprint=tuple(refreshed),
+            compiled_at=cached.compiled_at,
+        )
@@ -0,0 +1,142 @@
+# code_query_engine/pipeline/context_budget_ledger.py
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional
+
+
+_BLOCK_SEPARATOR = "\n\n"
+
+# Largest expected estimate error per block (rounding, a BOS/prefix token, a merge across the separator).
+BOUNDARY_SLACK_TOKENS = 2
+
+
+class ContextBudgetLedger:
+    """
+    Incremental token ledger for prompt context blocks.
+
+    Keeps a token count per block and a running total, so admitting a block
+    costs only that block's tokenization instead of a recount of the whole
+    joined context.
+
+    The joined context is "\\n\\n".join(stripped non-empty blocks) (same as
+    manage_context_budget). Its size is estimated as:
+
+        sum(block_tokens) + separator_tokens * (blocks - 1)
+
+    This is an estimate, not an exact count: tokens can merge across the
+    separator (BPE/SentencePiece overcount per block) and character-based
+    counters round each piece separately (ApproxTokenCounter undercounts the
+    joined text). Budget decisions therefore go through checked_total(), which
+    recounts the joined text whenever the estimate comes within
+    BOUNDARY_SLACK_TOKENS per block of the limit. With verify=True every
+    mutation checks that the estimate stays within that slack of a full
+    recount and raises RuntimeError otherwise (intended for tests).
+    """
+
+    def __init__(self, count_fn: Callable[[str], int], *, verify: bool = False) -> None:
+        self._count = count_fn
+        self._verify = bool(verify)
+        self._blocks: List[str] = []
+        self._tokens: List[int] = []
+        self._sum = 0
+        self._separator_tokens = int(count_fn(_BLOCK_SEPARATOR))
+        self.tokenizer_calls = 1
+
+    # ------------------------------
+    # Read API
+    # ------------------------------
+
+    @property
+    def total(self) -> int:
+        return self._total_for(len(self._tokens), self._sum)
+
+    @property
+    def blocks(self) -> List[str]:
+        return list(self._blocks)
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def count_block(self, block: str) -> int:
+        """Token count of a single (stripped) block; 0 for blank blocks."""
+        txt = str(block or "").strip()
+        if not txt:
+            return 0
+        self.tokenizer_calls += 1
+        return int(self._count(txt))
+
+    def projected_total(self, block: str, block_tokens: Optional[int] = None) -> int:
+        """Estimated total after appending `block` (not admitted). Pass block_tokens to reuse a known count."""
+        txt = str(block or "").strip()
+        if not txt:
+            return self.total
+        n = self.count_block(txt) if block_tokens is None else int(block_tokens)
+        out = self._total_for(len(self._tokens) + 1, self._sum + n)
+        if self._verify:
+            self._check(self._blocks + [txt], out)
+        return out
+
+    def checked_total(self, limit: int, block: Optional[str] = None, block_tokens: Optional[int] = None) -> int:
+        """
+        Total (after appending `block`, if given) to compare against `limit`.
+
+        Returns the estimate while it is clearly below the limit; near or over the
+        limit the joined text is recounted, so the returned value is exact there.
+        """
+        txt = str(block or "").strip()
+        blocks = self._blocks + [txt] if txt else self._blocks
+        estimate = self.projected_total(txt, block_tokens) if txt else self.total
+        if estimate + BOUNDARY_SLACK_TOKENS * len(blocks) <= int(limit):
+            return estimate
+        return self._recount(blocks)
+
+    # ------------------------------
+    # Mutations
+    # ------------------------------
+
+    def admit(self, block: str, block_tokens: Optional[int] = None) -> int:
+        """Appends a block; returns its token count (blank blocks are ignored)."""
+        txt = str(block or "").strip()
+        if not txt:
+            return 0
+        n = self.count_block(txt) if block_tokens is None else int(block_tokens)
+        self._blocks.append(txt)
+        self._tokens.append(n)
+        self._sum += n
+        self._verify_current()
+        return n
+
+    # ------------------------------
+    # Internals
+    # ------------------------------
+
+    def _total_for(self, blocks: int, block_sum: int) -> int:
+        if blocks <= 0:
+            return 0
+        return int(block_sum + self._separator_tokens * (blocks - 1))
+
+    def _verify_current(self) -> None:
+        if self._verify:
+            self._check(self._blocks, self.total)
+
+    def _recount(self, blocks: List[str]) -> int:
+        joined = _BLOCK_SEPARATOR.join(blocks).strip()
+        if not joined:
+            return 0
+        self.tokenizer_calls += 1
+        return int(self._count(joined))
+
+    def _check(self, blocks: List[str], expected: int) -> None:
+        joined = _BLOCK_SEPARATOR.join(blocks).strip()
+        actual = int(self._count(joined)) if joined else 0
+        if abs(actual - expected) > BOUNDARY_SLACK_TOKENS * len(blocks):
+            raise RuntimeError(
+                f"ContextBudgetLedger drift: ledger_total={expected} full_recount={actual} blocks={len(blocks)}"
+            )
+
+
+def ledger_for_blocks(count_fn: Callable[[str], int], blocks: List[Any], *, verify: bool = False) -> ContextBudgetLedger:
+    ledger = ContextBudgetLedger(count_fn, verify=verify)
+    for b in blocks or []:
+        ledger.admit(str(b or ""))
+    return ledger
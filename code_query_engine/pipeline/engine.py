@@ -106,6 +106,14 @@ class PipelineRuntime:
         return self.retrieval_backend
 
 
+def execute_action(action: Any, step: StepDef, state: Any, runtime: PipelineRuntime) -> Optional[str]:
+    # Actions in repo are mixed: some use positional, some keyword-only.
+    try:
+        return action.execute(step, state, runtime)  # type: ignore[attr-defined]
+    except TypeError:
+        return action.execute(step=step, state=state, runtime=runtime)  # type: ignore[attr-defined]
+
+
 class PipelineEngine:
     """
     Executes steps sequentially. Action decides branching by returning next step id.
@@ -158,6 +166,10 @@ class PipelineEngine:
             if getattr(state, "pipeline_trace_events", None) is None:
                 setattr(state, "pipeline_trace_events", [])
 
+        # fork_action runs its fork segments itself (concurrently) and needs the step graph + actions.
+        setattr(runtime, "pipeline_steps_by_id", steps_by_id)
+        setattr(runtime, "action_registry", self._actions)
+
         if trace_file_enabled:
             # Some actions may check runtime.pipeline_trace_enabled to decide if they should record events.
             # We set it dynamically to avoid changing PipelineRuntime signature.
@@ -221,13 +233,7 @@ class PipelineEngine:
                 state.step_trace.append(current_step_id)
 
                 action = self._actions.get(step.action)
-
-                # Actions in repo are mixed: some use positional, some keyword-only.
-                next_step_id: Optional[str]
-                try:
-                    next_step_id = action.execute(step, state, runtime)  # type: ignore[attr-defined]
-                except TypeError:
-                    next_step_id = action.execute(step=step, state=state, runtime=runtime)  # type: ignore[attr-defined]
+                next_step_id = execute_action(action, step, state, runtime)
 
                 _check_cancelled()
 
@@ -1,6 +1,7 @@
 # File: code_query_engine/pipeline/providers/fakes.py
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Sequence
 
@@ -167,6 +168,9 @@ class FakeRetrievalBackend(IRetrievalBackend):
     Minimal retrieval backend fake:
     - search() returns deterministic hits by query or a fixed list.
     - fetch_texts() returns provided texts by id (missing -> empty string).
+    - latency_s simulates a remote round trip on every call (search/fetch).
+    - hits_by_snapshot overrides hits per snapshot_id (for fork/merge tests).
+    - search_calls records every SearchRequest.
     """
 
     def __init__(
@@ -176,13 +180,29 @@ class FakeRetrievalBackend(IRetrievalBackend):
         default_hits: Optional[List[str]] = None,
         texts_by_id: Optional[Dict[str, str]] = None,
         meta_by_id: Optional[Dict[str, Dict[str, Any]]] = None,
+        hits_by_snapshot: Optional[Dict[str, List[str]]] = None,
+        latency_s: float = 0.0,
     ) -> None:
         self._hits_by_query = {k: list(v) for k, v in (hits_by_query or {}).items()}
         self._default_hits = list(default_hits or [])
         self._texts_by_id = dict(texts_by_id or {})
         self._meta_by_id = {k: dict(v) for k, v in (meta_by_id or {}).items()}
+        self._hits_by_snapshot = {k: list(v) for k, v in (hits_by_snapshot or {}).items()}
+        self._latency_s = max(0.0, float(latency_s))
+        self.search_calls: List[SearchRequest] = []
+
+    def _simulate_latency(self) -> None:
+        if self._latency_s > 0:
+            time.sleep(self._latency_s)
 
     def search(self, req: SearchRequest) -> SearchResponse:
+        self.search_calls.append(req)
+        self._simulate_latency()
+        snap_hits = self._hits_by_snapshot.get(str(req.snapshot_id or ""))
+        if snap_hits is not None:
+            return SearchResponse(
+                hits=[SearchHit(id=str(hid), score=0.0, rank=i) for i, hid in enumerate(snap_hits, start=1)]
+            )
         q = str(req.query or "")
         ids = self._hits_by_query.get(q)
         if ids is None:
@@ -203,6 +223,7 @@ class FakeRetrievalBackend(IRetrievalBackend):
         _ = repository
         _ = snapshot_id
         _ = retrieval_filters
+        self._simulate_latency()
         out: Dict[str, str] = {}
         for nid in node_ids:
             out[nid] = str(self._texts_by_id.get(nid, ""))
@@ -219,6 +240,7 @@ class FakeRetrievalBackend(IRetrievalBackend):
         _ = repository
         _ = snapshot_id
         _ = retrieval_filters
+        self._simulate_latency()
         out: Dict[str, Dict[str, Any]] = {}
         for nid in node_ids:
             node: Dict[str, Any] = {"text": str(self._texts_by_id.get(nid, ""))}
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from common.lru_cache import BoundedLRU
+
+_DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Rough CPython overhead of one dict slot (key ref + value ref + hash + table slack).
+_DICT_SLOT_BYTES = 100
+
+
+class CompactAdjacency:
+    """
+    Read-only directed graph in CSR (compressed sparse row) form.
+
+    - node ids are interned once (`node_ids[i]`, `index[node_id] -> i`)
+    - relation names are interned into small integer codes (`relations[code]`)
+    - out-edges of node i are `targets[offsets[i]:offsets[i + 1]]` with parallel `rel_codes`
+
+    Per-source edge order is the insertion order, so BFS expansion is identical to the
+    previous dict-of-lists representation.
+    """
+
+    __slots__ = ("node_ids", "index", "relations", "offsets", "targets", "rel_codes")
+
+    def __init__(
+        self,
+        *,
+        node_ids: List[str],
+        index: Dict[str, int],
+        relations: List[str],
+        offsets: Sequence[int],
+        targets: Sequence[int],
+        rel_codes: Sequence[int],
+    ) -> None:
+        self.node_ids = node_ids
+        self.index = index
+        self.relations = relations
+        self.offsets = offsets
+        self.targets = targets
+        self.rel_codes = rel_codes
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def neighbors(self, node_id: str) -> Iterator[Tuple[str, str]]:
+        """Yields (relation, target_node_id) for out-edges of node_id."""
+        i = self.index.get(node_id)
+        if i is None:
+            return
+        node_ids = self.node_ids
+        relations = self.relations
+        targets = self.targets
+        rel_codes = self.rel_codes
+        for e in range(self.offsets[i], self.offsets[i + 1]):
+            yield relations[rel_codes[e]], node_ids[targets[e]]
+
+    def get(self, node_id: str, default: Any = None) -> Any:
+        """dict-compatible lookup: list of (relation, target) or `default` when node has no out-edges."""
+        out = list(self.neighbors(node_id))
+        return out if out else default
+
+    def approx_bytes(self) -> int:
+        total = 0
+        for arr in (self.offsets, self.targets, self.rel_codes):
+            total += _sequence_bytes(arr)
+        total += sum(sys.getsizeof(s) for s in self.node_ids)
+        total += sys.getsizeof(self.node_ids) + len(self.index) * _DICT_SLOT_BYTES
+        total += sum(sys.getsizeof(s) for s in self.relations)
+        return total
+
+
+def _sequence_bytes(seq: Sequence[int]) -> int:
+    if isinstance(seq, array):
+        return seq.buffer_info()[1] * seq.itemsize
+    nbytes = getattr(seq, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(seq)
+
+
+class CompactAdjacencyBuilder:
+    """Accumulates (from, relation, to) edges and produces a CompactAdjacency."""
+
+    def __init__(self) -> None:
+        self._node_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._relations: List[str] = []
+        self._rel_index: Dict[str, int] = {}
+        self._src = array("I")
+        self._dst = array("I")
+        self._rel = array("H")
+
+    def _intern_node(self, node_id: str) -> int:
+        i = self._index.get(node_id)
+        if i is None:
+            i = len(self._node_ids)
+            node_id = sys.intern(node_id)
+            self._node_ids.append(node_id)
+            self._index[node_id] = i
+        return i
+
+    def _intern_relation(self, rel: str) -> int:
+        code = self._rel_index.get(rel)
+        if code is None:
+            code = len(self._relations)
+            if code > 0xFFFF:
+                raise ValueError("CompactAdjacencyBuilder: too many distinct relation types (max 65536).")
+            self._relations.append(rel)
+            self._rel_index[rel] = code
+        return code
+
+    def add(self, frm: str, rel: str, to: str) -> None:
+        self._src.append(self._intern_node(frm))
+        self._rel.append(self._intern_relation(rel))
+        self._dst.append(self._intern_node(to))
+
+    def build(self) -> CompactAdjacency:
+        n = len(self._node_ids)
+        m = len(self._src)
+
+        offsets = array("I", bytes(4 * (n + 1)))
+        for s in self._src:
+            offsets[s + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        # Stable counting sort by source keeps per-source insertion order.
+        cursor = array("I", offsets[:n]) if n else array("I")
+        targets = array("I", bytes(4 * m))
+        rel_codes = array("H", bytes(2 * m))
+        for e in range(m):
+            s = self._src[e]
+            pos = cursor[s]
+            targets[pos] = self._dst[e]
+            rel_codes[pos] = self._rel[e]
+            cursor[s] = pos + 1
+
+        return CompactAdjacency(
+            node_ids=self._node_ids,
+            index=self._index,
+            relations=self._relations,
+            offsets=offsets,
+            targets=targets,
+            rel_codes=rel_codes,
+        )
+
+
+@dataclass
+class _SnapshotEntry:
+    adjacency: CompactAdjacency
+    bytes: int
+    build_ms: int
+    built_at: float
+    hits: int = 0
+
+
+@dataclass
+class _BuildSlot:
+    lock: threading.Lock
+    waiters: int = 0
+
+
+class AdjacencyCache:
+    """
+    LRU of CompactAdjacency graphs keyed by (repo, snapshot_id), bounded by an approximate memory budget.
+
+    Builds are serialized per key (concurrent callers for the same snapshot wait for one build);
+    different snapshots build in parallel. A build lock lives only while some caller is building or
+    waiting for that key. The most recently built graph is always kept, even if it alone exceeds
+    the budget.
+    """
+
+    def __init__(self, *, max_bytes: int = _DEFAULT_MAX_BYTES) -> None:
+        self._lock = threading.Lock()
+        self._items: BoundedLRU[Tuple[str, str], _SnapshotEntry] = BoundedLRU(
+            max_weight=max_bytes,
+            weigh=lambda e: e.bytes,
+            keep_newest=True,
+        )
+        self._build_locks: Dict[Tuple[str, str], _BuildSlot] = {}
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        self._items.set_max_weight(max_bytes)
+
+    def get_or_build(self, key: Tuple[str, str], build: Callable[[], CompactAdjacency]) -> CompactAdjacency:
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry.adjacency
+
+        slot = self._acquire_build_slot(key)
+        try:
+            with slot.lock:
+                entry = self._lookup(key, count_miss=False)
+                if entry is not None:
+                    return entry.adjacency
+                t0 = time.perf_counter()
+                adjacency = build()
+                build_ms = int((time.perf_counter() - t0) * 1000)
+                self.put(key, adjacency, build_ms=build_ms)
+                return adjacency
+        finally:
+            self._release_build_slot(key, slot)
+
+    def put(self, key: Tuple[str, str], adjacency: CompactAdjacency, *, build_ms: int = 0) -> None:
+        entry = _SnapshotEntry(
+            adjacency=adjacency,
+            bytes=adjacency.approx_bytes(),
+            build_ms=int(build_ms),
+            built_at=time.time(),
+        )
+        self._items.put(key, entry)
+
+    def invalidate(self, repo: Optional[str] = None, snapshot_id: Optional[str] = None) -> int:
+        removed = self._items.remove_where(
+            lambda k, _: (repo is None or k[0] == repo) and (snapshot_id is None or k[1] == snapshot_id)
+        )
+        return len(removed)
+
+    def stats(self) -> Dict[str, Any]:
+        out = self._items.stats()
+        out["bytes"] = out.pop("weight", 0)
+        out["max_bytes"] = self._items.max_weight
+        out["snapshots"] = [
+            {
+                "repo": k[0],
+                "snapshot_id": k[1],
+                "nodes": e.adjacency.node_count,
+                "edges": e.adjacency.edge_count,
+                "relations": len(e.adjacency.relations),
+                "bytes": e.bytes,
+                "build_ms": e.build_ms,
+                "built_at": e.built_at,
+                "hits": e.hits,
+            }
+            for k, e in self._items.items()
+        ]
+        return out
+
+    def _lookup(self, key: Tuple[str, str], *, count_miss: bool = True) -> Optional[_SnapshotEntry]:
+        entry = self._items.get(key, record=False)
+        if entry is None:
+            if count_miss:
+                self._items.record_miss()
+            return None
+        entry.hits += 1
+        self._items.record_hit()
+        return entry
+
+    def _acquire_build_slot(self, key: Tuple[str, str]) -> _BuildSlot:
+        with self._lock:
+            slot = self._build_locks.get(key)
+            if slot is None:
+                slot = _BuildSlot(lock=threading.Lock())
+                self._build_locks[key] = slot
+            slot.waiters += 1
+            return slot
+
+    def _release_build_slot(self, key: Tuple[str, str], slot: _BuildSlot) -> None:
+        with self._lock:
+            slot.waiters -= 1
+            if slot.waiters <= 0 and self._build_locks.get(key) is slot:
+                del self._build_locks[key]
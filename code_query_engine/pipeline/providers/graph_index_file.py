@@ -0,0 +1,332 @@
+"""
+On-disk, memory-mappable graph index (one file per repo snapshot).
+
+Layout (little-endian, sections 8-byte aligned):
+
+    header   magic "RAGGIDX\\0", version u32, header_size u32,
+             node_count u64, edge_count u64, relation_count u32, meta_len u32,
+             checksum (BLAKE2b-256 of everything after the header)
+    meta     UTF-8 JSON: repo, snapshot_id, import_id, created_utc, source
+    rels     (relation_count + 1) u32 offsets + UTF-8 blob
+    nodes    (node_count + 1) u64 offsets + UTF-8 blob, node ids sorted by UTF-8 bytes
+    csr      (node_count + 1) u64 edge offsets, edge_count u32 targets, edge_count u16 relation codes
+
+Node ids are sorted so a lookup is a binary search over the mapped blob; nothing but the
+relation names is materialized on the Python heap. Per-source edge order is preserved.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .graph_adjacency import CompactAdjacency
+
+GRAPH_INDEX_MAGIC = b"RAGGIDX\0"
+GRAPH_INDEX_VERSION = 1
+GRAPH_INDEX_SUFFIX = ".rgx"
+
+_HEADER = struct.Struct("<8sIIQQII32s")
+_PROJECT_ROOT = Path(__file__).resolve().parents[3]
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class GraphIndexError(RuntimeError):
+    """Raised when a graph index file is missing, truncated, corrupted or of another version."""
+
+
+def resolve_graph_index_dir(configured: Optional[str] = None) -> Optional[Path]:
+    """
+    The one place that decides where snapshot graph indexes live (server, importer, CLI, purge).
+
+    Precedence: `RAG_GRAPH_INDEX_DIR`, then `configured` (runtime config `graph_index_dir`; None = not set,
+    "" = disabled -> None), then `<project>/graph_index`. Relative paths are resolved against the project root.
+    """
+    env = (os.getenv("RAG_GRAPH_INDEX_DIR") or "").strip()
+    if env:
+        raw = env
+    elif configured is not None:
+        raw = str(configured).strip()
+        if not raw:
+            return None
+    else:
+        raw = "graph_index"
+    path = Path(raw)
+    return path if path.is_absolute() else _PROJECT_ROOT / path
+
+
+def _configured_graph_index_dir() -> Optional[str]:
+    # Same file selection as the server: APP_CONFIG_PATH, else config.<APP_PROFILE>.json, else config.json.
+    explicit = (os.getenv("APP_CONFIG_PATH") or "").strip()
+    if explicit:
+        candidates = [Path(explicit) if os.path.isabs(explicit) else _PROJECT_ROOT / explicit]
+    else:
+        profile = (os.getenv("APP_PROFILE") or "").strip().lower() or "prod"
+        profile = {"production": "prod", "development": "dev"}.get(profile, profile)
+        candidates = [_PROJECT_ROOT / f"config.{profile}.json"]
+    candidates.append(_PROJECT_ROOT / "config.json")
+    for path in candidates:
+        if not path.is_file():
+            continue
+        try:
+            cfg = json.loads(path.read_text(encoding="utf-8")) or {}
+        except (OSError, ValueError):
+            return None
+        value = cfg.get("graph_index_dir") if isinstance(cfg, dict) else None
+        return None if value is None else str(value)
+    return None
+
+
+def default_graph_index_dir() -> Optional[Path]:
+    """resolve_graph_index_dir() with `graph_index_dir` read from the runtime config file; None = disabled."""
+    return resolve_graph_index_dir(_configured_graph_index_dir())
+
+
+def _safe_path_part(value: str) -> str:
+    part = _SAFE_NAME_RE.sub("_", str(value or "").strip()) or "_"
+    if part in (".", ".."):
+        raise ValueError(f"graph index: invalid path component {value!r}.")
+    return part
+
+
+def graph_index_path(root: Union[str, Path], *, repo: str, snapshot_id: str) -> Path:
+    return Path(root) / _safe_path_part(repo) / f"{_safe_path_part(snapshot_id)}{GRAPH_INDEX_SUFFIX}"
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != "little":
+        raise GraphIndexError("graph index files are little-endian; big-endian hosts are not supported.")
+
+
+def _pad8(buf: bytearray) -> None:
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def write_graph_index(
+    path: Union[str, Path],
+    adjacency: CompactAdjacency,
+    *,
+    repo: str,
+    snapshot_id: str,
+    import_id: str = "",
+    source: str = "",
+) -> Path:
+    """Writes `adjacency` atomically (temp file + rename). Returns the final path."""
+    _check_byteorder()
+    n = adjacency.node_count
+    m = adjacency.edge_count
+
+    encoded = [str(adjacency.node_ids[i]).encode("utf-8") for i in range(n)]
+    order = sorted(range(n), key=encoded.__getitem__)
+    new_index = array("I", bytes(4 * n))
+    for new_i, old_i in enumerate(order):
+        new_index[old_i] = new_i
+
+    meta = json.dumps(
+        {
+            "repo": repo,
+            "snapshot_id": snapshot_id,
+            "import_id": import_id,
+            "created_utc": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    ).encode("utf-8")
+
+    body = bytearray(meta)
+    _pad8(body)
+
+    rel_blob = bytearray()
+    rel_offsets = array("I", [0])
+    for rel in adjacency.relations:
+        rel_blob.extend(str(rel).encode("utf-8"))
+        rel_offsets.append(len(rel_blob))
+    body.extend(rel_offsets.tobytes())
+    body.extend(rel_blob)
+    _pad8(body)
+
+    node_blob = bytearray()
+    node_offsets = array("Q", [0])
+    for old_i in order:
+        node_blob.extend(encoded[old_i])
+        node_offsets.append(len(node_blob))
+    body.extend(node_offsets.tobytes())
+    body.extend(node_blob)
+    _pad8(body)
+
+    offsets = array("Q", [0])
+    targets = array("I")
+    rel_codes = array("H")
+    for old_i in order:
+        start, end = adjacency.offsets[old_i], adjacency.offsets[old_i + 1]
+        for e in range(start, end):
+            targets.append(new_index[adjacency.targets[e]])
+            rel_codes.append(adjacency.rel_codes[e])
+        offsets.append(len(targets))
+    body.extend(offsets.tobytes())
+    body.extend(targets.tobytes())
+    body.extend(rel_codes.tobytes())
+
+    checksum = hashlib.blake2b(bytes(body), digest_size=32).digest()
+    header = _HEADER.pack(
+        GRAPH_INDEX_MAGIC, GRAPH_INDEX_VERSION, _HEADER.size, n, m, len(adjacency.relations), len(meta), checksum
+    )
+
+    final = Path(path)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=final.name + ".", suffix=".tmp", dir=str(final.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, final)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return final
+
+
+class MappedGraphIndex:
+    """
+    Read-only adjacency backed by an mmap of a graph index file.
+
+    Exposes the same read API as CompactAdjacency (`neighbors`, `get`, `node_count`,
+    `edge_count`, `relations`, `approx_bytes`), so the provider can use either.
+    """
+
+    def __init__(self, path: Union[str, Path], *, verify: bool = True) -> None:
+        _check_byteorder()
+        self.path = Path(path)
+        try:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as ex:
+            raise GraphIndexError(f"cannot map graph index {self.path}: {ex}") from ex
+
+        size = len(self._mm)
+        if size < _HEADER.size:
+            raise GraphIndexError(f"graph index {self.path} is truncated (size={size}).")
+        magic, version, header_size, n, m, rel_count, meta_len, checksum = _HEADER.unpack_from(self._mm, 0)
+        if magic != GRAPH_INDEX_MAGIC:
+            raise GraphIndexError(f"graph index {self.path} has bad magic {magic!r}.")
+        if version != GRAPH_INDEX_VERSION or header_size != _HEADER.size:
+            raise GraphIndexError(
+                f"graph index {self.path} has version {version} (expected {GRAPH_INDEX_VERSION})."
+            )
+        self._checksum = checksum
+        if verify:
+            self.verify()
+
+        view = memoryview(self._mm)
+        pos = header_size
+        try:
+            self.meta: Dict[str, Any] = json.loads(bytes(view[pos : pos + meta_len]).decode("utf-8"))
+            pos = _align8(pos + meta_len)
+
+            rel_offsets = view[pos : pos + 4 * (rel_count + 1)].cast("I")
+            pos += 4 * (rel_count + 1)
+            rel_blob = view[pos : pos + rel_offsets[rel_count]]
+            self.relations: List[str] = [
+                bytes(rel_blob[rel_offsets[i] : rel_offsets[i + 1]]).decode("utf-8") for i in range(rel_count)
+            ]
+            pos = _align8(pos + rel_offsets[rel_count])
+
+            self._node_offsets = view[pos : pos + 8 * (n + 1)].cast("Q")
+            pos += 8 * (n + 1)
+            blob_len = self._node_offsets[n]
+            self._node_blob = view[pos : pos + blob_len]
+            pos = _align8(pos + blob_len)
+
+            self._offsets = view[pos : pos + 8 * (n + 1)].cast("Q")
+            pos += 8 * (n + 1)
+            self._targets = view[pos : pos + 4 * m].cast("I")
+            pos += 4 * m
+            self._rel_codes = view[pos : pos + 2 * m].cast("H")
+            pos += 2 * m
+        except (TypeError, ValueError, IndexError, UnicodeDecodeError) as ex:
+            raise GraphIndexError(f"graph index {self.path} is malformed: {ex}") from ex
+        if pos > size:
+            raise GraphIndexError(f"graph index {self.path} is truncated (need {pos} bytes, have {size}).")
+
+        self._n = int(n)
+        self._m = int(m)
+
+    @property
+    def node_count(self) -> int:
+        return self._n
+
+    @property
+    def edge_count(self) -> int:
+        return self._m
+
+    def verify(self) -> None:
+        actual = hashlib.blake2b(memoryview(self._mm)[_HEADER.size :], digest_size=32).digest()
+        if actual != self._checksum:
+            raise GraphIndexError(f"graph index {self.path} checksum mismatch.")
+
+    def node_id(self, i: int) -> str:
+        return bytes(self._node_blob[self._node_offsets[i] : self._node_offsets[i + 1]]).decode("utf-8")
+
+    def find(self, node_id: str) -> Optional[int]:
+        key = str(node_id).encode("utf-8")
+        lo, hi = 0, self._n
+        offs = self._node_offsets
+        blob = self._node_blob
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur = blob[offs[mid] : offs[mid + 1]]
+            if cur.tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and blob[offs[lo] : offs[lo + 1]].tobytes() == key:
+            return lo
+        return None
+
+    def neighbors(self, node_id: str) -> Iterator[Tuple[str, str]]:
+        i = self.find(node_id)
+        if i is None:
+            return
+        relations = self.relations
+        for e in range(self._offsets[i], self._offsets[i + 1]):
+            yield relations[self._rel_codes[e]], self.node_id(self._targets[e])
+
+    def get(self, node_id: str, default: Any = None) -> Any:
+        out = list(self.neighbors(node_id))
+        return out if out else default
+
+    def approx_bytes(self) -> int:
+        # The mapping is page cache, not heap; count it anyway so the LRU budget bounds address space.
+        return len(self._mm) + sum(sys.getsizeof(s) for s in self.relations)
+
+    def prewarm(self) -> int:
+        """Touches every page so the file is resident in the page cache. Returns the number of pages."""
+        pages = 0
+        for off in range(0, len(self._mm), mmap.PAGESIZE):
+            self._mm[off]
+            pages += 1
+        return pages
+
+
+def _align8(pos: int) -> int:
+    return pos + (-pos % 8)
+
+
+def open_graph_index(path: Union[str, Path], *, verify: bool = True) -> MappedGraphIndex:
+    return MappedGraphIndex(path, verify=verify)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from common.lru_cache import BoundedLRU
+
+_DEFAULT_MAX_ENTRIES = 4096
+_DEFAULT_BATCH_WINDOW_MS = 5.0
+_DEFAULT_MAX_BATCH_SIZE = 32
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query_text(query: str) -> str:
+    """Collapse whitespace runs and strip; casing is kept (embedding models are case-aware)."""
+    return _WS_RE.sub(" ", str(query or "")).strip()
+
+
+@dataclass
+class _PendingEncode:
+    key: bytes
+    text: str
+    done: threading.Event = field(default_factory=threading.Event)
+    vector: Optional[Tuple[float, ...]] = None
+    error: Optional[BaseException] = None
+
+
+class QueryEmbeddingService:
+    """
+    Query vectorization with a bounded LRU and a micro-batching window.
+
+    - Cache keys are BLAKE2b digests of (model name, normalized query).
+    - Concurrent misses (e.g. several Flask threads, parallel_roads) are coalesced:
+      the first caller becomes the batch leader, waits up to `batch_window_ms`
+      for more requests (or until `max_batch_size`), then runs ONE `encode` call
+      for the whole batch. Identical in-flight queries share one slot.
+    - `batch_window_ms=0` disables waiting; concurrent requests that arrive while
+      a batch is encoding are still picked up by the next batch.
+    - The leader returns as soon as its own query is encoded; if requests are still
+      pending, one of their callers takes over as leader (no window wait on handover).
+
+    `load_model` is called lazily (on the first miss) and must return an object with
+    `encode(texts, normalize_embeddings=True)` (SentenceTransformer-compatible).
+    """
+
+    def __init__(
+        self,
+        *,
+        model_name: str,
+        load_model: Callable[[], Any],
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+        batch_window_ms: float = _DEFAULT_BATCH_WINDOW_MS,
+        max_batch_size: int = _DEFAULT_MAX_BATCH_SIZE,
+    ) -> None:
+        self._model_name = str(model_name or "")
+        self._load_model = load_model
+        self._batch_window_s = max(0.0, float(batch_window_ms)) / 1000.0
+        self._max_batch_size = max(1, int(max_batch_size))
+
+        self._items: BoundedLRU[bytes, Tuple[float, ...]] = BoundedLRU(max_entries=max_entries)
+
+        self._batch_cond = threading.Condition()
+        self._pending: "OrderedDict[bytes, _PendingEncode]" = OrderedDict()
+        self._in_flight: Dict[bytes, _PendingEncode] = {}
+        self._leader_active = False
+        self._coalesced = 0
+        self._batches = 0
+        self._batched_texts = 0
+        self._max_batch_seen = 0
+        self._batch_size_hist: Dict[int, int] = {}
+        self._encode_errors = 0
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    def set_max_entries(self, max_entries: int) -> None:
+        self._items.set_max_entries(max_entries)
+
+    def make_key(self, normalized_query: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self._model_name.encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+        h.update(normalized_query.encode("utf-8", errors="ignore"))
+        return h.digest()
+
+    def encode(self, query: str) -> List[float]:
+        text = normalize_query_text(query)
+        key = self.make_key(text)
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            return list(cached)
+
+        pending, is_leader = self._enqueue(key, text)
+        self._await(pending, is_leader)
+        if pending.error is not None:
+            raise pending.error
+        assert pending.vector is not None
+        return list(pending.vector)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self._items.stats()
+        with self._batch_cond:
+            batches = self._batches
+            batched = self._batched_texts
+            hist = {str(k): v for k, v in sorted(self._batch_size_hist.items())}
+            coalesced = self._coalesced
+            max_batch = self._max_batch_seen
+            errors = self._encode_errors
+        return {
+            "model": self._model_name,
+            "entries": cache["entries"],
+            "max_entries": self._items.max_entries,
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "evictions": cache["evictions"],
+            "hit_rate": cache["hit_rate"],
+            "batches": batches,
+            "batched_texts": batched,
+            "avg_batch_size": (float(batched) / batches) if batches else 0.0,
+            "max_batch_size": max_batch,
+            "batch_size_histogram": hist,
+            "coalesced_in_flight": coalesced,
+            "encode_errors": errors,
+            "batch_window_ms": self._batch_window_s * 1000.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cache_get(self, key: bytes) -> Optional[Tuple[float, ...]]:
+        return self._items.get(key)
+
+    def _cache_put(self, key: bytes, vector: Tuple[float, ...]) -> None:
+        if not self._items.max_entries:
+            return
+        self._items.put(key, vector)
+
+    # ------------------------------------------------------------------
+    # Micro-batching
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, key: bytes, text: str) -> Tuple[_PendingEncode, bool]:
+        with self._batch_cond:
+            existing = self._pending.get(key) or self._in_flight.get(key)
+            if existing is not None:
+                self._coalesced += 1
+                return existing, False
+            pending = _PendingEncode(key=key, text=text)
+            self._pending[key] = pending
+            if self._leader_active:
+                self._batch_cond.notify_all()
+                return pending, False
+            self._leader_active = True
+            return pending, True
+
+    def _await(self, pending: _PendingEncode, is_leader: bool) -> None:
+        """Waits for `pending`, leading batches while this caller holds the leader role."""
+        window = True
+        while True:
+            if is_leader:
+                self._lead_batches(pending, window=window)
+                if pending.done.is_set():
+                    return
+            with self._batch_cond:
+                while not pending.done.is_set() and self._leader_active:
+                    self._batch_cond.wait()
+                if pending.done.is_set():
+                    return
+                # The previous leader returned with our request still pending: take over.
+                self._leader_active = True
+                is_leader = True
+                window = False
+
+    def _lead_batches(self, own: _PendingEncode, *, window: bool) -> None:
+        deadline = time.monotonic() + (self._batch_window_s if window else 0.0)
+        while True:
+            with self._batch_cond:
+                while len(self._pending) < self._max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._batch_cond.wait(remaining)
+                batch: List[_PendingEncode] = []
+                while self._pending and len(batch) < self._max_batch_size:
+                    _, item = self._pending.popitem(last=False)
+                    batch.append(item)
+                if not batch:
+                    self._leader_active = False
+                    self._batch_cond.notify_all()
+                    return
+                # In-flight entries stay discoverable until resolved so duplicates attach to them.
+                for item in batch:
+                    self._in_flight[item.key] = item
+
+            self._run_batch(batch)
+
+            with self._batch_cond:
+                for item in batch:
+                    self._in_flight.pop(item.key, None)
+                self._batches += 1
+                self._batched_texts += len(batch)
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                self._batch_size_hist[len(batch)] = self._batch_size_hist.get(len(batch), 0) + 1
+                if own.done.is_set() or not self._pending:
+                    # Wakes the resolved followers and lets a pending one take over leadership.
+                    self._leader_active = False
+                    self._batch_cond.notify_all()
+                    return
+            # Requests that arrived during encoding were already waiting; do not add another window.
+            deadline = time.monotonic()
+
+    def _run_batch(self, batch: Sequence[_PendingEncode]) -> None:
+        try:
+            model = self._load_model()
+            raw = model.encode([item.text for item in batch], normalize_embeddings=True)
+            vectors = [_to_float_tuple(raw[i]) for i in range(len(batch))]
+        except BaseException as ex:
+            with self._batch_cond:
+                self._encode_errors += 1
+            for item in batch:
+                item.error = ex
+                item.done.set()
+            return
+        for item, vec in zip(batch, vectors):
+            self._cache_put(item.key, vec)
+            item.vector = vec
+            item.done.set()
+
+
+def _to_float_tuple(vec: Any) -> Tuple[float, ...]:
+    try:
+        arr = vec.astype("float32").tolist()
+    except Exception:
+        arr = list(vec)
+    return tuple(float(x) for x in arr)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from code_query_engine.pipeline.providers.retrieval_backend_contract import SearchHit
+from common.lru_cache import BoundedLRU
+
+_DEFAULT_MAX_ENTRIES = 2048
+_DEFAULT_TTL_SECONDS = 600.0
+_DEFAULT_GENERATION_CHECK_SECONDS = 5.0
+
+
+def retrieval_request_signature(
+    *,
+    snapshot_id: str,
+    repository: str,
+    search_type: str,
+    query: str,
+    top_k: int,
+    retrieval_filters: Dict[str, Any],
+    bm25_operator: Optional[str] = None,
+    rrf_k: Optional[int] = None,
+    security_context: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """
+    Digest of everything that can change the result set of one search.
+
+    `retrieval_filters` is hashed as a whole (ACL tags, clearance level, classification
+    labels, owner/source filters, ...), so two callers only share an entry when their
+    security context is byte-for-byte identical. `security_context` carries the backend's
+    own security configuration.
+    """
+    payload = {
+        "snapshot_id": str(snapshot_id or ""),
+        "repository": str(repository or ""),
+        "search_type": str(search_type or ""),
+        "query": str(query or ""),
+        "top_k": int(top_k),
+        "bm25_operator": bm25_operator,
+        "rrf_k": rrf_k,
+        "retrieval_filters": retrieval_filters or {},
+        "security_context": security_context or {},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).digest()
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, (set, frozenset)):
+        return sorted(str(x) for x in obj)
+    return repr(obj)
+
+
+@dataclass(frozen=True)
+class _Entry:
+    snapshot_id: str
+    generation: str
+    hits: Tuple[SearchHit, ...]
+    expires_at: float
+
+
+class RetrievalResultCache:
+    """
+    Bounded TTL/LRU cache of search hits scoped to a snapshot tenant.
+
+    Snapshots are immutable per `snapshot_id`, but they can be purged or re-imported
+    (tools/weaviate/snapshot_sets.py purge-snapshot, tools/weaviate/import_branch_to_weaviate.py).
+    Both rewrite the snapshot's ImportRun rows, so `generation_fn(snapshot_id)` returns a
+    token derived from them; when it changes all entries of that snapshot are dropped.
+    The token is re-read at most every `generation_check_seconds` per snapshot.
+    If the generation cannot be determined (None), the cache is bypassed.
+    """
+
+    def __init__(
+        self,
+        *,
+        generation_fn: Callable[[str], Optional[str]],
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = _DEFAULT_TTL_SECONDS,
+        generation_check_seconds: float = _DEFAULT_GENERATION_CHECK_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._generation_fn = generation_fn
+        self._max_entries = max(0, int(max_entries))
+        self._ttl = max(0.0, float(ttl_seconds))
+        self._generation_check = max(0.0, float(generation_check_seconds))
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._items: BoundedLRU[bytes, _Entry] = BoundedLRU(
+            max_entries=self._max_entries,
+            on_evict=self._unindex_locked,
+        )
+        self._by_snapshot: Dict[str, Set[bytes]] = {}
+        self._generations: Dict[str, Tuple[Optional[str], float]] = {}
+        self._expirations = 0
+        self._invalidations = 0
+        self._bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0 and self._ttl > 0
+
+    def get(self, key: bytes, *, snapshot_id: str) -> Optional[List[SearchHit]]:
+        generation = self._current_generation(snapshot_id)
+        with self._lock:
+            if generation is None:
+                self._bypassed += 1
+                return None
+            entry = self._items.get(key, record=False)
+            if entry is None:
+                self._items.record_miss()
+                return None
+            if entry.generation != generation or entry.expires_at <= self._clock():
+                self._drop_locked(key)
+                self._expirations += 1
+                self._items.record_miss()
+                return None
+            self._items.record_hit()
+            return list(entry.hits)
+
+    def put(self, key: bytes, *, snapshot_id: str, hits: List[SearchHit]) -> None:
+        if not self.enabled:
+            return
+        generation = self._current_generation(snapshot_id)
+        if generation is None:
+            return
+        with self._lock:
+            self._drop_locked(key)
+            self._by_snapshot.setdefault(snapshot_id, set()).add(key)
+            # Evictions unindex their keys through on_evict (we hold self._lock).
+            self._items.put(
+                key,
+                _Entry(
+                    snapshot_id=snapshot_id,
+                    generation=generation,
+                    hits=tuple(hits),
+                    expires_at=self._clock() + self._ttl,
+                ),
+            )
+
+    def invalidate_snapshot(self, snapshot_id: str) -> int:
+        with self._lock:
+            self._generations.pop(snapshot_id, None)
+            return self._invalidate_snapshot_locked(snapshot_id)
+
+    def clear(self) -> int:
+        with self._lock:
+            n = self._items.clear()
+            self._by_snapshot.clear()
+            self._generations.clear()
+            self._invalidations += n
+            return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cache = self._items.stats()
+            return {
+                "entries": cache["entries"],
+                "snapshots": len(self._by_snapshot),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "hits": cache["hits"],
+                "misses": cache["misses"],
+                "evictions": cache["evictions"],
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+                "bypassed": self._bypassed,
+                "hit_rate": cache["hit_rate"],
+            }
+
+    def _current_generation(self, snapshot_id: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            known = self._generations.get(snapshot_id)
+            if known is not None and known[1] > now:
+                return known[0]
+        try:
+            generation = self._generation_fn(snapshot_id)
+        except Exception:
+            generation = None
+        with self._lock:
+            previous = self._generations.get(snapshot_id)
+            if previous is not None and previous[0] != generation:
+                self._invalidate_snapshot_locked(snapshot_id)
+            if generation is None:
+                self._generations.pop(snapshot_id, None)
+            else:
+                self._generations[snapshot_id] = (generation, now + self._generation_check)
+        return generation
+
+    def _invalidate_snapshot_locked(self, snapshot_id: str) -> int:
+        keys = self._by_snapshot.pop(snapshot_id, set())
+        for key in keys:
+            self._items.pop(key)
+        self._invalidations += len(keys)
+        return len(keys)
+
+    def _drop_locked(self, key: bytes) -> None:
+        entry = self._items.pop(key)
+        if entry is not None:
+            self._unindex_locked(key, entry)
+
+    def _unindex_locked(self, key: bytes, entry: _Entry) -> None:
+        keys = self._by_snapshot.get(entry.snapshot_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self._by_snapshot.pop(entry.snapshot_id, None)
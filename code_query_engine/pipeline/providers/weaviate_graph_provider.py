@@ -3,12 +3,13 @@ from __future__ import annotations
 import json
 import logging
 import os
-import threading
 import time
-from collections import defaultdict, deque
-from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Tuple
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from pathlib import Path
 
+from .graph_adjacency import AdjacencyCache, CompactAdjacency, CompactAdjacencyBuilder
+from .graph_index_file import GraphIndexError, MappedGraphIndex, graph_index_path, open_graph_index, write_graph_index
 from .ports import IGraphProvider
 from code_query_engine.weaviate_query_logger import log_weaviate_query
 
@@ -85,6 +86,8 @@ class WeaviateGraphProvider(IGraphProvider):
         classification_labels_universe: Optional[List[str]] = None,
         security_config: Optional[Dict[str, Any]] = None,
         page_size: int = 2000,
+        adjacency_cache: Optional[AdjacencyCache] = None,
+        graph_index_dir: Optional[str] = None,
     ) -> None:
         if client is None:
             raise ValueError("WeaviateGraphProvider: client is required")
@@ -111,8 +114,9 @@ class WeaviateGraphProvider(IGraphProvider):
         self._security_cfg = _normalize_security_config(security_config)
         self._page_size = int(page_size) if page_size else 2000
 
-        self._adj_cache: Dict[Tuple[str, str], Dict[str, List[Tuple[str, str]]]] = {}
-        self._cache_lock = threading.Lock()
+        self._adj_cache = adjacency_cache or AdjacencyCache()
+        # When set, adjacency is mapped from <dir>/<repo>/<snapshot_id>.rgx (written on first load if missing).
+        self._graph_index_dir = str(graph_index_dir or "").strip() or None
 
     # ------------------------------------------------------------------
     # IGraphProvider
@@ -183,7 +187,7 @@ class WeaviateGraphProvider(IGraphProvider):
             if depth >= max_depth:
                 continue
 
-            for rel, to in adj.get(node, []):
+            for rel, to in adj.neighbors(node):
                 rel_l = (rel or "").strip().lower()
                 if not allow_all:
                     rel_key = rel_l
@@ -354,23 +358,60 @@ class WeaviateGraphProvider(IGraphProvider):
                 )
         return repo, snapshot_id
 
-    def _get_adjacency(self, *, repo: str, snapshot_id: str) -> Dict[str, List[Tuple[str, str]]]:
-        key = (repo, snapshot_id)
-        cached = self._adj_cache.get(key)
-        if cached is not None:
-            return cached
-
-        with self._cache_lock:
-            cached = self._adj_cache.get(key)
-            if cached is not None:
-                return cached
-            adj = self._load_edges(repo=repo, snapshot_id=snapshot_id)
-            self._adj_cache[key] = adj
+    def _get_adjacency(self, *, repo: str, snapshot_id: str) -> Union[CompactAdjacency, MappedGraphIndex]:
+        return self._adj_cache.get_or_build(
+            (repo, snapshot_id),
+            lambda: self._load_adjacency(repo=repo, snapshot_id=snapshot_id),
+        )
+
+    def _load_adjacency(self, *, repo: str, snapshot_id: str) -> Union[CompactAdjacency, MappedGraphIndex]:
+        if not self._graph_index_dir:
+            return self._load_edges(repo=repo, snapshot_id=snapshot_id)
+
+        try:
+            path = graph_index_path(self._graph_index_dir, repo=repo, snapshot_id=snapshot_id)
+        except ValueError as ex:
+            py_logger.warning("WeaviateGraphProvider: %s; using in-memory graph", ex)
+            return self._load_edges(repo=repo, snapshot_id=snapshot_id)
+        if path.exists():
+            try:
+                mapped = open_graph_index(path)
+                if mapped.meta.get("repo") == repo and mapped.meta.get("snapshot_id") == snapshot_id:
+                    return mapped
+                py_logger.warning("WeaviateGraphProvider: graph index %s belongs to another snapshot; rebuilding", path)
+            except GraphIndexError as ex:
+                py_logger.warning("WeaviateGraphProvider: unusable graph index (%s); rebuilding from Weaviate", ex)
+
+        adj = self._load_edges(repo=repo, snapshot_id=snapshot_id)
+        try:
+            write_graph_index(path, adj, repo=repo, snapshot_id=snapshot_id, source="lazy")
+            return open_graph_index(path, verify=False)
+        except Exception:
+            py_logger.exception("WeaviateGraphProvider: failed to persist graph index %s; using in-memory graph", path)
             return adj
 
-    def _load_edges(self, *, repo: str, snapshot_id: str) -> Dict[str, List[Tuple[str, str]]]:
+    def build_graph_index(self, *, repo: str, snapshot_id: str, root: Optional[str] = None) -> Path:
+        """Scans RagEdge for one snapshot and (re)writes its graph index file."""
+        target_root = root or self._graph_index_dir
+        if not target_root:
+            raise ValueError("WeaviateGraphProvider: graph_index_dir is not configured.")
+        adj = self._load_edges(repo=repo, snapshot_id=snapshot_id)
+        path = graph_index_path(target_root, repo=repo, snapshot_id=snapshot_id)
+        return write_graph_index(path, adj, repo=repo, snapshot_id=snapshot_id, source="cli")
+
+    def prewarm(self, *, repo: str, snapshot_id: str) -> int:
+        """Loads the snapshot adjacency into the cache (graph index or RagEdge scan); returns its node count."""
+        return self._get_adjacency(repo=repo, snapshot_id=snapshot_id).node_count
+
+    def adjacency_cache_stats(self) -> Dict[str, Any]:
+        return self._adj_cache.stats()
+
+    def invalidate_adjacency(self, *, repo: Optional[str] = None, snapshot_id: Optional[str] = None) -> int:
+        return self._adj_cache.invalidate(repo=repo, snapshot_id=snapshot_id)
+
+    def _load_edges(self, *, repo: str, snapshot_id: str) -> CompactAdjacency:
         coll = self._client.collections.get(self._edge_collection).with_tenant(snapshot_id)
-        adj: DefaultDict[str, List[Tuple[str, str]]] = defaultdict(list)
+        builder = CompactAdjacencyBuilder()
         t0 = time.time()
         iter_count = 0
 
@@ -409,7 +450,7 @@ class WeaviateGraphProvider(IGraphProvider):
                 if not frm or not to:
                     continue
 
-                adj[frm].append((rel, to))
+                builder.add(frm, rel, to)
         except Exception as e:
             log_weaviate_query(
                 op="edge_iterator",
@@ -430,6 +471,7 @@ class WeaviateGraphProvider(IGraphProvider):
             )
             raise
         else:
+            adj = builder.build()
             log_weaviate_query(
                 op="edge_iterator",
                 request={
@@ -444,11 +486,11 @@ class WeaviateGraphProvider(IGraphProvider):
                         self._edge_type_prop,
                     ],
                 },
-                response={"iterated": iter_count, "adj_keys": len(adj)},
+                response={"iterated": iter_count, "nodes": adj.node_count, "edges": adj.edge_count},
                 duration_ms=int((time.time() - t0) * 1000),
             )
 
-        return dict(adj)
+        return adj
 
     def _build_id_filter(self, ids: List[str]) -> Any:
         try:
@@ -9,7 +9,13 @@ import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from classifiers.code_classifier import CODE_KIND_PROPERTY
 from code_query_engine.pipeline.providers.ports import IRetrievalBackend
+from code_query_engine.pipeline.providers.query_embedding_service import QueryEmbeddingService
+from code_query_engine.pipeline.providers.retrieval_result_cache import (
+    RetrievalResultCache,
+    retrieval_request_signature,
+)
 from code_query_engine.pipeline.providers.retrieval_backend_contract import SearchHit, SearchRequest, SearchResponse
 from code_query_engine.weaviate_query_logger import log_weaviate_query
 
@@ -43,6 +49,13 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
         security_config: Optional[Dict[str, Any]] = None,
         owner_id_property: str = "owner_id",
         source_system_id_property: str = "source_system_id",
+        query_embedding_service: Optional[QueryEmbeddingService] = None,
+        query_embedding_cache_max_entries: int = 4096,
+        query_embedding_batch_window_ms: float = 5.0,
+        result_cache_max_entries: int = 0,
+        result_cache_ttl_seconds: float = 600.0,
+        result_cache_generation_check_seconds: float = 5.0,
+        import_run_collection: str = "ImportRun",
     ) -> None:
         if client is None:
             raise ValueError("WeaviateRetrievalBackend: client is required")
@@ -67,6 +80,23 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
         self._source_system_prop = source_system_id_property
         self._query_embed_model = str(query_embed_model or "").strip()
         self._query_embedder: Any = None
+        self._query_embeddings = query_embedding_service or QueryEmbeddingService(
+            model_name=self._query_embed_model,
+            load_model=self._get_query_embedder,
+            max_entries=query_embedding_cache_max_entries,
+            batch_window_ms=query_embedding_batch_window_ms,
+        )
+        self._node_schema_props: Optional[set[str]] = None
+        self._import_run_collection = import_run_collection
+        # Disabled unless result_cache_max_entries > 0 (see RetrievalResultCache).
+        self._result_cache: Optional[RetrievalResultCache] = None
+        if int(result_cache_max_entries or 0) > 0 and float(result_cache_ttl_seconds or 0) > 0:
+            self._result_cache = RetrievalResultCache(
+                generation_fn=self.snapshot_generation,
+                max_entries=result_cache_max_entries,
+                ttl_seconds=result_cache_ttl_seconds,
+                generation_check_seconds=result_cache_generation_check_seconds,
+            )
 
     # ---------------------------------------------------------------------
     # IRetrievalBackend
@@ -103,6 +133,27 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
         if not snapshot_id:
             raise ValueError("WeaviateRetrievalBackend: snapshot_id is required.")
 
+        cache_key: Optional[bytes] = None
+        if self._result_cache is not None:
+            cache_key = retrieval_request_signature(
+                snapshot_id=snapshot_id,
+                repository=request.repository,
+                search_type=(request.search_type or "").strip().lower(),
+                query=q,
+                top_k=max(int(request.top_k or 1), 1),
+                retrieval_filters=rf,
+                bm25_operator=getattr(request, "bm25_operator", None),
+                rrf_k=getattr(request, "rrf_k", None),
+                security_context={
+                    "security": self._security_cfg,
+                    "classification_universe": self._classification_universe,
+                    "collection": self._node_collection,
+                },
+            )
+            cached_hits = self._result_cache.get(cache_key, snapshot_id=snapshot_id)
+            if cached_hits is not None:
+                return SearchResponse(hits=cached_hits)
+
         collection = self._client.collections.get(self._node_collection).with_tenant(snapshot_id)  # Ensure we read from the correct snapshot in multi-tenant setup
 
         where_filter = self._build_where_filter(
@@ -285,8 +336,53 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
             hits.append(SearchHit(id=node_id, score=0.0, rank=rank))
             rank += 1
 
+        if cache_key is not None and self._result_cache is not None:
+            self._result_cache.put(cache_key, snapshot_id=snapshot_id, hits=hits)
         return SearchResponse(hits=hits)
 
+    def snapshot_generation(self, snapshot_id: str) -> Optional[str]:
+        """
+        Token identifying the current import of a snapshot, derived from its ImportRun rows.
+
+        Purge deletes those rows and a re-import rewrites them, so the token changes in both
+        cases. Returns None when ImportRun cannot be read (callers must not cache then).
+        """
+        sid = str(snapshot_id or "").strip()
+        if not sid:
+            return None
+        try:
+            from weaviate.classes.query import Filter
+
+            coll = self._client.collections.get(self._import_run_collection)
+            res = coll.query.fetch_objects(
+                filters=Filter.by_property("snapshot_id").equal(sid),
+                limit=100,
+                return_properties=["import_id", "status", "started_utc", "finished_utc"],
+            )
+        except Exception:
+            py_logger.debug("WeaviateRetrievalBackend: ImportRun generation lookup failed", exc_info=True)
+            return None
+        rows = []
+        for obj in list(getattr(res, "objects", []) or []):
+            props = getattr(obj, "properties", {}) or {}
+            rows.append(
+                "|".join(
+                    str(props.get(k) or "")
+                    for k in ("import_id", "status", "started_utc", "finished_utc")
+                )
+            )
+        return "\n".join(sorted(rows)) or "-"
+
+    def result_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._result_cache.stats() if self._result_cache is not None else None
+
+    def invalidate_result_cache(self, snapshot_id: Optional[str] = None) -> int:
+        if self._result_cache is None:
+            return 0
+        if snapshot_id:
+            return self._result_cache.invalidate_snapshot(snapshot_id)
+        return self._result_cache.clear()
+
     def _query_bm25(
         self,
         *,
@@ -428,13 +524,14 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
         return self._query_embedder
 
     def _encode_query(self, query: str) -> List[float]:
-        model = self._get_query_embedder()
-        vec = model.encode([query], normalize_embeddings=True)
-        try:
-            arr = vec[0].astype("float32").tolist()
-        except Exception:
-            arr = list(vec[0])
-        return [float(x) for x in arr]
+        return self._query_embeddings.encode(query)
+
+    def warmup(self) -> None:
+        """Loads the query embedding model and pays the first-encode cost before real traffic."""
+        self._encode_query("warmup")
+
+    def query_embedding_stats(self) -> Dict[str, Any]:
+        return self._query_embeddings.stats()
 
     def fetch_texts(
         self,
@@ -462,6 +559,18 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
             out[str(nid)] = str(props.get("text") or "")
         return out
 
+    def _node_has_property(self, name: str) -> bool:
+        if self._node_schema_props is None:
+            try:
+                cfg = self._client.collections.get(self._node_collection).config.get()
+                self._node_schema_props = {
+                    str(getattr(p, "name", "") or "").strip() for p in (getattr(cfg, "properties", None) or [])
+                }
+            except Exception:
+                py_logger.debug("WeaviateRetrievalBackend: cannot read %s schema; optional properties disabled", self._node_collection)
+                self._node_schema_props = set()
+        return name in self._node_schema_props
+
     def fetch_nodes(
         self,
         *,
@@ -509,6 +618,9 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
             "sql_schema",
             "sql_name",
         ]
+        # Older snapshots were imported without the precomputed classification.
+        if self._node_has_property(CODE_KIND_PROPERTY):
+            return_props.append(CODE_KIND_PROPERTY)
         sec = self._security_cfg
         if sec.get("acl_enabled", True):
             return_props.append("acl_allow")
@@ -584,6 +696,9 @@ class WeaviateRetrievalBackend(IRetrievalBackend):
                 "classification_labels": props.get(self._classification_prop),
                 "doc_level": props.get(self._doc_level_prop),
             }
+            code_kind = str(props.get(CODE_KIND_PROPERTY) or "").strip()
+            if code_kind:
+                out[node_id][CODE_KIND_PROPERTY] = code_kind
 
         return out
 
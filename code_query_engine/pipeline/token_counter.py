@@ -1,8 +1,15 @@
 # code_query_engine/pipeline/token_counter.py
 from __future__ import annotations
 
+import hashlib
+import sys
 from dataclasses import dataclass
-from typing import Protocol, runtime_checkable, List
+from typing import Any, Dict, Optional, Protocol, runtime_checkable, List
+
+from common.lru_cache import BoundedLRU
+
+
+_DEFAULT_TOKEN_CACHE_MAX_ENTRIES = 50_000
 
 
 @runtime_checkable
@@ -82,6 +89,124 @@ class ApproxTokenCounter(TokenCounter):
         return self.count_tokens(text)
 
 
+class TokenCountCache:
+    """
+    Bounded LRU of token counts keyed by (model identity, text digest).
+
+    Keys are BLAKE2b digests, so memory does not grow with text length.
+    One instance is shared per process (see get_token_count_cache) and may serve
+    several counters; the model identity in the key keeps their counts apart.
+    """
+
+    def __init__(self, *, max_entries: int = _DEFAULT_TOKEN_CACHE_MAX_ENTRIES) -> None:
+        self._lru: "BoundedLRU[bytes, int]" = BoundedLRU(max_entries=max_entries)
+
+    @property
+    def max_entries(self) -> int:
+        return int(self._lru.max_entries or 0)
+
+    def set_max_entries(self, max_entries: int) -> None:
+        self._lru.set_max_entries(max_entries)
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(model_id or "").encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+        h.update(str(text or "").encode("utf-8", errors="ignore"))
+        return h.digest()
+
+    def get(self, key: bytes) -> Optional[int]:
+        return self._lru.get(key)
+
+    def put(self, key: bytes, value: int) -> None:
+        self._lru.put(key, int(value))
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        out = self._lru.stats()
+        out["max_entries"] = self.max_entries
+        out["approx_bytes"] = out["entries"] * _approx_entry_bytes()
+        return out
+
+
+def _approx_entry_bytes() -> int:
+    # digest key + small int + LRU slot/link overhead (CPython estimate).
+    return sys.getsizeof(b"\0" * 16) + sys.getsizeof(1 << 20) + 104
+
+
+_TOKEN_COUNT_CACHE = TokenCountCache()
+
+
+def get_token_count_cache() -> TokenCountCache:
+    return _TOKEN_COUNT_CACHE
+
+
+def token_counter_model_id(counter: object) -> str:
+    """
+    Best-effort stable identity of the tokenizer behind a counter.
+
+    LlamaCppTokenCounter -> llama model_path (falls back to object id),
+    ApproxTokenCounter -> its heuristic parameters.
+    """
+    explicit = getattr(counter, "model_id", None)
+    if isinstance(explicit, str) and explicit.strip():
+        return explicit.strip()
+    if isinstance(counter, ApproxTokenCounter):
+        return f"approx:{counter.chars_per_token}:{counter.min_tokens}"
+    llama = getattr(counter, "llama", None)
+    if llama is not None:
+        model_path = getattr(llama, "model_path", None)
+        if isinstance(model_path, str) and model_path.strip():
+            return f"llama:{model_path.strip()}"
+        return f"llama:{type(llama).__name__}:{id(llama)}"
+    return f"{type(counter).__name__}:{id(counter)}"
+
+
+@dataclass(frozen=True)
+class CachingTokenCounter(TokenCounter):
+    """
+    Content-addressed cache in front of any TokenCounter.
+
+    Identical texts (node bodies, metadata blocks, system prompts, history turns)
+    are tokenized once per process as long as they stay in the LRU.
+    """
+
+    inner: TokenCounter
+    model_id: str = ""
+    cache: Optional[TokenCountCache] = None
+
+    def __post_init__(self) -> None:
+        if self.inner is None:
+            raise ValueError("CachingTokenCounter: inner is None")
+        if not self.model_id:
+            object.__setattr__(self, "model_id", token_counter_model_id(self.inner))
+        if self.cache is None:
+            object.__setattr__(self, "cache", get_token_count_cache())
+
+    def count_tokens(self, text: str) -> int:
+        s = str(text or "")
+        if not s:
+            return int(self.inner.count_tokens(s))
+        key = TokenCountCache.make_key(self.model_id, s)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        n = int(self.inner.count_tokens(s))
+        self.cache.put(key, n)
+        return n
+
+    def count(self, text: str) -> int:
+        return self.count_tokens(text)
+
+    def stats(self) -> Dict[str, Any]:
+        out = self.cache.stats()
+        out["model_id"] = self.model_id
+        return out
+
+
 def require_token_counter(obj: object) -> TokenCounter:
     """
     Strict validator used by actions/runners.
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from common.lru_cache import BoundedLRU
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+_DEFAULT_MIN_PREFIX_TOKENS = 64
+_MAX_PENDING = 64
+
+
+@dataclass
+class _PrefixState:
+    state: Any
+    n_tokens: int
+    size_bytes: int
+
+
+class PromptPrefixCache:
+    """
+    Bounded LRU of llama-cpp KV states for prompt prefixes shared between calls.
+
+    Keys are BLAKE2b digests of (model identity, call mode, prefix text), where the prefix
+    text is the system prompt of a call_model step. The token boundary of the shared prefix
+    is learned, not guessed: the first call for a key only remembers its evaluated tokens,
+    the second call computes the longest common token prefix with the first one, evaluates
+    exactly that prefix and saves the KV state (`llm.save_state()`). Later calls restore it
+    (`llm.load_state()`) and llama-cpp evaluates only the tokens after the prefix.
+
+    This works the same for manual prompts (prompt_builder formatting) and native chat
+    templates, because the boundary is found on the tokens llama-cpp actually evaluated.
+
+    Not thread-safe with respect to `llm`: restore/learn must run inside the model's
+    InferenceScheduler job. Failures are logged and counted, never raised.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = _DEFAULT_MAX_BYTES,
+        min_prefix_tokens: int = _DEFAULT_MIN_PREFIX_TOKENS,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._items: BoundedLRU[bytes, _PrefixState] = BoundedLRU(
+            max_weight=max_bytes,
+            weigh=lambda e: e.size_bytes,
+        )
+        self._pending: "OrderedDict[bytes, List[int]]" = OrderedDict()
+        self._min_prefix_tokens = max(1, int(min_prefix_tokens))
+        self._states_saved = 0
+        self._too_large = 0
+        self._errors = 0
+        self._saved_prefix_tokens = 0
+        self._restore_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._items.max_weight)
+
+    @staticmethod
+    def make_key(model_id: str, mode: str, prefix_text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(model_id or "").encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+        h.update(str(mode or "").encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+        h.update(str(prefix_text or "").encode("utf-8", errors="ignore"))
+        return h.digest()
+
+    def restore(self, llm: Any, key: bytes) -> int:
+        """Loads the cached prefix state into `llm`. Returns the restored prefix length (0 = miss)."""
+        if not self.enabled:
+            return 0
+        entry = self._items.get(key, record=False)
+        if entry is None:
+            self._items.record_miss()
+            return 0
+
+        t0 = time.perf_counter()
+        try:
+            llm.load_state(entry.state)
+        except Exception as ex:
+            logger.warning("Prompt prefix restore failed, dropping entry: %s", ex)
+            self._reset_quietly(llm)
+            with self._lock:
+                self._errors += 1
+            self._items.record_miss()
+            self._items.pop(key)
+            return 0
+
+        self._items.record_hit()
+        with self._lock:
+            self._saved_prefix_tokens += entry.n_tokens
+            self._restore_ms += (time.perf_counter() - t0) * 1000.0
+        return entry.n_tokens
+
+    def learn(self, llm: Any, key: bytes) -> None:
+        """
+        Called after a completion that missed the cache.
+
+        Remembers the evaluated tokens; once a second call shares at least `min_prefix_tokens`
+        leading tokens, evaluates that prefix and stores its state.
+        """
+        if not self.enabled:
+            return
+        try:
+            tokens = _evaluated_tokens(llm)
+        except Exception as ex:
+            logger.warning("Prompt prefix cache: cannot read evaluated tokens: %s", ex)
+            with self._lock:
+                self._errors += 1
+            return
+        if not tokens:
+            return
+
+        with self._lock:
+            if key in self._items:
+                return
+            previous = self._pending.pop(key, None)
+            if previous is None:
+                self._pending[key] = tokens
+                while len(self._pending) > _MAX_PENDING:
+                    self._pending.popitem(last=False)
+                return
+
+        n = _common_prefix_len(previous, tokens)
+        if n < self._min_prefix_tokens:
+            with self._lock:
+                self._pending[key] = tokens
+            return
+
+        try:
+            llm.reset()
+            llm.eval(tokens[:n])
+            state = llm.save_state()
+        except Exception as ex:
+            logger.warning("Prompt prefix cache: saving state failed: %s", ex)
+            self._reset_quietly(llm)
+            with self._lock:
+                self._errors += 1
+            return
+        self.put(key, state, n_tokens=n)
+
+    def put(self, key: bytes, state: Any, *, n_tokens: int) -> None:
+        size = _state_size_bytes(state)
+        with self._lock:
+            if size > (self._items.max_weight or 0):
+                self._too_large += 1
+                return
+            self._items.put(key, _PrefixState(state=state, n_tokens=int(n_tokens), size_bytes=size))
+            self._states_saved += 1
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        self._items.set_max_weight(max_bytes)
+
+    def clear(self) -> int:
+        with self._lock:
+            self._pending.clear()
+            return self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self._items.stats()
+        with self._lock:
+            hits = cache["hits"]
+            return {
+                "entries": cache["entries"],
+                "pending": len(self._pending),
+                "bytes": cache["weight"],
+                "max_bytes": self._items.max_weight,
+                "min_prefix_tokens": self._min_prefix_tokens,
+                "hits": hits,
+                "misses": cache["misses"],
+                "evictions": cache["evictions"],
+                "hit_rate": cache["hit_rate"],
+                "states_saved": self._states_saved,
+                "too_large": self._too_large,
+                "errors": self._errors,
+                "saved_prefix_tokens": self._saved_prefix_tokens,
+                "avg_restore_ms": round(self._restore_ms / hits, 2) if hits else 0.0,
+            }
+
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _reset_quietly(llm: Any) -> None:
+        try:
+            llm.reset()
+        except Exception:
+            pass
+
+
+def _evaluated_tokens(llm: Any) -> List[int]:
+    n = int(getattr(llm, "n_tokens", 0) or 0)
+    ids = getattr(llm, "input_ids", None)
+    if n <= 0 or ids is None:
+        return []
+    return [int(t) for t in ids[:n]]
+
+
+def _common_prefix_len(a: Sequence[int], b: Sequence[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _state_size_bytes(state: Any) -> int:
+    # llama_cpp.LlamaState: llama_state_size (KV + logits) plus the input_ids/scores arrays.
+    size = getattr(state, "llama_state_size", None)
+    if not isinstance(size, int):
+        raw = getattr(state, "llama_state", None)
+        size = len(raw) if raw is not None else 0
+    for attr in ("input_ids", "scores"):
+        arr = getattr(state, attr, None)
+        nbytes = getattr(arr, "nbytes", None)
+        if isinstance(nbytes, int):
+            size += nbytes
+    return int(size)
+
+
+def prefix_cache_model_id(model_path: Optional[str], n_ctx: int) -> str:
+    return f"{model_path or ''}#ctx={int(n_ctx)}"
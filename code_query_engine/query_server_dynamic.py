@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import atexit
 import logging
 import json
 import os
@@ -7,6 +8,8 @@ import re
 import time
 import uuid
 import base64
+import functools
+import hmac
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
@@ -16,6 +19,7 @@ from typing import Any, Dict, List, Optional, Tuple
 from flask import Flask, jsonify, request, send_file, send_from_directory, g, Response
 from flask_cors import CORS
 
+from classifiers.code_classifier import get_classification_cache
 from common.logging_setup import LoggingConfig, configure_logging, logging_config_from_runtime_config
 from common.markdown_translator_en_pl import MarkdownTranslator
 from common.translator_pl_en import Translator
@@ -24,26 +28,38 @@ from common.translator_pl_en import Translator
 from .dynamic_pipeline import DynamicPipelineRunner
 from history.redis_backend import RedisBackend
 from history.mock_redis import InMemoryMockRedis
+from history.history_backend import parse_namespace_ttls
 from .log_utils import InteractionLogger
 from vector_db.weaviate_client import get_settings as get_weaviate_settings, create_client as create_weaviate_client
 from code_query_engine.pipeline.providers.weaviate_retrieval_backend import WeaviateRetrievalBackend
 from code_query_engine.pipeline.providers.weaviate_graph_provider import WeaviateGraphProvider
+from code_query_engine.pipeline.providers.graph_adjacency import AdjacencyCache
+from code_query_engine.pipeline.providers.graph_index_file import resolve_graph_index_dir
 from server.auth import DevUserAccessProvider, UserAccessContext
 from server.auth.policies_provider import AuthPoliciesProvider, default_json_provider
 from server.auth.sql_policies_provider import SqlAuthPoliciesProvider
 from server.app_config import AppConfigService, default_templates_store
 from server.chat_history.sql_store import SqlChatHistoryStore, SqlConversationHistoryStore
 from server.pipelines import PipelineAccessService, PipelineSnapshotStore
-from server.snapshots import SnapshotRegistry
+from server.snapshots import SnapshotRegistry, snapshot_registry_cache
 from code_query_engine.conversation_history.types import ConversationTurn
 from code_query_engine.conversation_history.ports import IUserConversationStore
 from code_query_engine.work_callback import (
+    RedisWorkCallbackBroker,
     get_work_callback_broker,
     register_cancel_routes,
     register_work_callback_routes,
     resolve_callback_policy,
+    set_work_callback_broker,
+)
+from code_query_engine.local_inference_scheduler import LocalModelBusy
+from code_query_engine import serving
+from code_query_engine.warmup import SyntheticQuery, WarmupRunner, warmup_config_from_runtime_config
+from code_query_engine.pipeline.cancellation import (
+    PipelineCancelled,
+    RedisPipelineCancelRegistry,
+    set_pipeline_cancel_registry,
 )
-from code_query_engine.pipeline.cancellation import PipelineCancelled
 
 
 py_logger = logging.getLogger(__name__)
@@ -84,6 +100,8 @@ MAX_QUERY_LEN = int(os.getenv("APP_MAX_QUERY_LEN", "8000"))
 MAX_FIELD_LEN = int(os.getenv("APP_MAX_FIELD_LEN", "128"))
 
 API_TOKEN = (os.getenv("API_TOKEN") or "").strip()
+# Operator-only endpoints (DELETE /pipeline/cache); unset -> those endpoints are disabled.
+OPERATOR_TOKEN = (os.getenv("APP_OPERATOR_TOKEN") or "").strip()
 
 ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -883,13 +901,63 @@ _idp_jwk_client = None
 def _make_history_backend() -> Any:
     use_redis = (os.getenv("APP_USE_REDIS") or "").strip().lower() in ("1", "true", "yes", "y", "on")
     if not use_redis:
-        return InMemoryMockRedis()
-    return RedisBackend()
+        return InMemoryMockRedis(namespace_ttls=parse_namespace_ttls(os.getenv("APP_REDIS_NAMESPACE_TTLS") or ""))
+    # Pool size, timeouts and namespace TTLs: APP_REDIS_* (see RedisBackend.from_env).
+    return RedisBackend.from_env()
 
 
 _history_backend = _make_history_backend()
 
+
+# ------------------------------------------------------------
+# Work-callback broker and pipeline cancellation (in-process / Redis)
+# ------------------------------------------------------------
+
+_coordination_redis = None
+
+
+def _get_coordination_redis() -> Any:
+    global _coordination_redis
+    if _coordination_redis is None:
+        import redis
+
+        url = (os.getenv("APP_REDIS_URL") or "redis://localhost:6379/0").strip()
+        _coordination_redis = redis.Redis.from_url(url, decode_responses=True)
+    return _coordination_redis
+
+
+def _make_work_callback_broker() -> Optional[RedisWorkCallbackBroker]:
+    # Redis is required when /pipeline/stream may land on a different worker than /query.
+    backend = (os.getenv("APP_WORK_CALLBACK_BACKEND") or "memory").strip().lower()
+    if backend != "redis":
+        return None
+    return RedisWorkCallbackBroker(_get_coordination_redis())
+
+
+def _make_pipeline_cancel_registry() -> Optional[RedisPipelineCancelRegistry]:
+    # Redis is required when /pipeline/cancel may land on a different worker than /query.
+    backend = (os.getenv("APP_PIPELINE_CANCEL_BACKEND") or "memory").strip().lower()
+    if backend != "redis":
+        return None
+    return RedisPipelineCancelRegistry(_get_coordination_redis())
+
+
+_work_callback_broker = _make_work_callback_broker()
+if _work_callback_broker is not None:
+    set_work_callback_broker(_work_callback_broker)
+    serving.register_shutdown("work-callback-broker", _work_callback_broker.shutdown)
+    py_logger.info("Work-callback broker: redis (multi-worker SSE).")
+
+_pipeline_cancel_registry = _make_pipeline_cancel_registry()
+if _pipeline_cancel_registry is not None:
+    set_pipeline_cancel_registry(_pipeline_cancel_registry)
+    py_logger.info("Pipeline cancellation: redis (multi-worker).")
+
 from code_query_engine.conversation_history.factory import build_conversation_history_service  # noqa: E402
+from code_query_engine.conversation_history.write_behind import (  # noqa: E402
+    WriteBehindConfig,
+    WriteBehindUserConversationStore,
+)
 
 # ------------------------------------------------------------
 # Mock SQL history store (development only)
@@ -999,6 +1067,17 @@ if _sql_enabled:
     )
 else:
     _durable_store = _ReadOnlyMockSqlHistoryStore()
+
+# APP_CONV_HIST_DURABILITY=write_behind|best_effort moves SQL history writes off the request path.
+_durable_writer: Optional[WriteBehindUserConversationStore] = None
+_durable_write_cfg = WriteBehindConfig.from_env()
+if _sql_enabled and _durable_write_cfg.durability != "sync":
+    _durable_writer = WriteBehindUserConversationStore(_durable_store, config=_durable_write_cfg)
+    _durable_store = _durable_writer
+    serving.register_post_fork("conversation-history-writer", _durable_writer.reset_after_fork)
+    serving.register_shutdown("conversation-history-writer", _durable_writer.close)
+    atexit.register(_durable_writer.close)  # dev server: no gunicorn worker_exit
+
 _conversation_history_service = build_conversation_history_service(
     session_backend=_history_backend,
     durable_store=_durable_store,
@@ -1033,7 +1112,7 @@ _server_llm_enabled = bool(_runtime_cfg.get("serverLLM"))
 _local_model_enabled = bool(_runtime_cfg.get("enable_model_path_analysis", True))
 
 
-def _load_llm_servers() -> tuple[dict[str, "ServerLLMConfig"], str, list[str]]:
+def _load_llm_servers() -> tuple[dict[str, "ServerLLMConfig"], str, list[str], "RoutingConfig"]:
     path = os.path.join(PROJECT_ROOT, "ServersLLM.json")
     if not os.path.isfile(path):
         raise ValueError(f"ServersLLM.json not found: {path}")
@@ -1089,6 +1168,17 @@ def _load_llm_servers() -> tuple[dict[str, "ServerLLMConfig"], str, list[str]]:
         allowed_classification_labels = item.get("allowed_classification_labels")
         if not isinstance(allowed_classification_labels, list):
             allowed_classification_labels = []
+        pool_raw = item.get("pool")
+        pool_cfg = None
+        if isinstance(pool_raw, dict):
+            read_timeout = pool_raw.get("read_timeout_seconds")
+            pool_cfg = PoolConfig(
+                max_connections=int(pool_raw.get("max_connections", 8)),
+                connect_timeout_seconds=float(pool_raw.get("connect_timeout_seconds", 10.0)),
+                read_timeout_seconds=float(read_timeout) if read_timeout is not None else None,
+                idle_timeout_seconds=float(pool_raw.get("idle_timeout_seconds", 60.0)),
+                block=bool(pool_raw.get("block", False)),
+            )
 
         servers[name] = ServerLLMConfig(
             name=name,
@@ -1106,6 +1196,8 @@ def _load_llm_servers() -> tuple[dict[str, "ServerLLMConfig"], str, list[str]]:
             allowed_classification_labels=tuple(str(x) for x in allowed_classification_labels if str(x).strip()),
             is_trusted_server=bool(item.get("is_trusted_server", False)),
             is_trusted_for_all_acl=bool(item.get("is_trusted_for_all_acl", False)),
+            pool=pool_cfg,
+            routing_group=str(item.get("routing_group") or "").strip(),
         )
     if not servers:
         raise ValueError("ServersLLM.json: no valid servers found")
@@ -1117,7 +1209,25 @@ def _load_llm_servers() -> tuple[dict[str, "ServerLLMConfig"], str, list[str]]:
             f"using first: {default_candidates[0]} (candidates: {default_candidates})"
         )
         py_logger.warning(msg)
-    return servers, default_candidates[0], ordered_names
+
+    routing_raw = data.get("routing")
+    routing_cfg = RoutingConfig()
+    if isinstance(routing_raw, dict):
+        breaker_raw = routing_raw.get("circuit_breaker")
+        if not isinstance(breaker_raw, dict):
+            breaker_raw = {}
+        policy = str(routing_raw.get("policy") or "least_outstanding").strip()
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"ServersLLM.json: routing.policy must be one of {list(ROUTING_POLICIES)}, got {policy!r}")
+        routing_cfg = RoutingConfig(
+            policy=policy,
+            ewma_alpha=float(routing_raw.get("ewma_alpha", 0.3)),
+            circuit_breaker=CircuitBreakerConfig(
+                failure_threshold=int(breaker_raw.get("failure_threshold", 5)),
+                cooldown_seconds=float(breaker_raw.get("cooldown_seconds", 30.0)),
+            ),
+        )
+    return servers, default_candidates[0], ordered_names, routing_cfg
 
 _model = None
 _local_model = None
@@ -1133,11 +1243,17 @@ if _local_model_enabled:
         n_ctx=int(_runtime_cfg.get("model_context_window", 4096) or 4096),
         use_gpu=bool(_runtime_cfg.get("use_gpu", True)),
         n_gpu_layers=_runtime_cfg.get("model_n_gpu_layers", _runtime_cfg.get("n_gpu_layers")),
+        max_queue_size=int(_runtime_cfg.get("model_max_queue_size", 16)),
+        max_queue_wait_seconds=float(_runtime_cfg.get("model_max_queue_wait_seconds", 120.0)),
+        prefix_cache_max_mb=float(_runtime_cfg.get("model_prefix_cache_max_mb", 1024) or 0),
+        prefix_cache_min_tokens=int(_runtime_cfg.get("model_prefix_cache_min_tokens", 64) or 64),
     )
 else:
     py_logger.warning("local model disabled: enable_model_path_analysis=false")
 
 if _server_llm_enabled:
+    from .llm_http_pool import PoolConfig  # noqa: E402
+    from .llm_routing import ROUTING_POLICIES, CircuitBreakerConfig, RoutingConfig  # noqa: E402
     from .llm_server_client import (  # noqa: E402
         ServerLLMClient,
         ServerLLMConfig,
@@ -1146,16 +1262,32 @@ if _server_llm_enabled:
     )
 
     try:
-        servers, default_name, ordered_names = _load_llm_servers()
+        servers, default_name, ordered_names, routing_cfg = _load_llm_servers()
         _server_client = ServerLLMClient(
             servers=servers,
             default_name=default_name,
             ordered_names=ordered_names,
+            routing=routing_cfg,
         )
     except Exception as e:
         py_logger.error("serverLLM=true but failed to load ServersLLM.json: %s", e)
         raise
 
+if _server_client is not None:
+    # Keep-alive sockets opened in the master must not be shared by workers.
+    serving.register_post_fork("server-llm-pools", _server_client.reset_after_fork)
+    serving.register_shutdown("server-llm-pools", _server_client.close)
+
+if _local_model is not None and getattr(_local_model, "use_gpu", False):
+
+    def _warn_gpu_model_forked() -> None:
+        py_logger.error(
+            "Local model was loaded on GPU before fork; CUDA contexts are not fork-safe. "
+            "Use APP_WORKERS=1, APP_PRELOAD=false or serverLLM for multi-worker serving."
+        )
+
+    serving.register_post_fork("local-model-gpu", _warn_gpu_model_forked)
+
 if _server_client is not None and _local_model is not None:
     _model = HybridLLMClient(local_model=_local_model, server_client=_server_client)
     py_logger.info("LLM routing: hybrid (server-first, local fallback).")
@@ -1187,7 +1319,13 @@ _translator_pl_en = Translator(_resolve_cfg_path(str(_runtime_cfg.get("model_tra
 
 _interaction_logger = InteractionLogger(cfg=_logging_cfg)
 
-from code_query_engine.pipeline.token_counter import LlamaCppTokenCounter, ApproxTokenCounter, require_token_counter
+from code_query_engine.pipeline.token_counter import (
+    ApproxTokenCounter,
+    CachingTokenCounter,
+    LlamaCppTokenCounter,
+    get_token_count_cache,
+    require_token_counter,
+)
 
 token_counter = None
 
@@ -1197,7 +1335,8 @@ try:
         token_counter = ApproxTokenCounter()
         py_logger.warning("degraded-mode: model has no .llm; using approximate token counter")
     else:
-        token_counter = LlamaCppTokenCounter(llama=llm)
+        get_token_count_cache().set_max_entries(int(_runtime_cfg.get("token_count_cache_max_entries", 50000) or 0))
+        token_counter = CachingTokenCounter(inner=LlamaCppTokenCounter(llama=llm))
 except Exception as e:
     py_logger.exception("soft-failure: token counter init failed; continuing without token counter")
     token_counter = None
@@ -1220,7 +1359,10 @@ if _skip_weaviate_init:
 else:
     try:
         _weaviate_settings = get_weaviate_settings()
-        _weaviate_client = create_weaviate_client(_weaviate_settings)
+        # gRPC channels are not fork-safe: each worker opens its own client.
+        _weaviate_client = serving.ProcessLocal(lambda: create_weaviate_client(_weaviate_settings), name="weaviate-client")
+        _weaviate_client.get()
+        serving.register_shutdown("weaviate-client", _weaviate_client.close_local)
     except Exception:
         py_logger.exception("fatal: cannot initialize Weaviate client (vector_db/weaviate_client.py)")
         raise
@@ -1259,6 +1401,9 @@ else:
         _doc_level_field = str(_clearance_cfg.get("doc_level_field") or _doc_level_field)
     if _kind in ("labels_universe_subset", "classification_labels"):
         _doc_labels_field = str(_labels_or_cls_cfg.get("doc_labels_field") or _doc_labels_field)
+    _retrieval_cache_cfg = (
+        _runtime_cfg.get("retrieval_result_cache") if isinstance(_runtime_cfg.get("retrieval_result_cache"), dict) else {}
+    )
     _retrieval_backend = WeaviateRetrievalBackend(
         client=_weaviate_client,
         query_embed_model=_embed_model_path,
@@ -1266,6 +1411,15 @@ else:
         doc_level_property=_doc_level_field,
         classification_labels_universe=_classification_universe,
         security_config=_security_cfg,
+        query_embedding_cache_max_entries=int(_runtime_cfg.get("query_embedding_cache_max_entries", 4096) or 0),
+        query_embedding_batch_window_ms=float(_runtime_cfg.get("query_embedding_batch_window_ms", 5) or 0),
+        result_cache_max_entries=int(_retrieval_cache_cfg.get("max_entries", 2048) or 0),
+        result_cache_ttl_seconds=float(_retrieval_cache_cfg.get("ttl_seconds", 600) or 0),
+        result_cache_generation_check_seconds=float(_retrieval_cache_cfg.get("generation_check_seconds", 5) or 0),
+    )
+    # Same resolver as the importer / CLI / snapshot purge: RAG_GRAPH_INDEX_DIR, then config, then <project>/graph_index.
+    _graph_index_dir = resolve_graph_index_dir(
+        None if _runtime_cfg.get("graph_index_dir") is None else str(_runtime_cfg.get("graph_index_dir"))
     )
     _graph_provider = WeaviateGraphProvider(
         client=_weaviate_client,
@@ -1273,11 +1427,19 @@ else:
         doc_level_property=_doc_level_field,
         classification_labels_universe=_classification_universe,
         security_config=_security_cfg,
+        adjacency_cache=AdjacencyCache(
+            max_bytes=int(float(_runtime_cfg.get("graph_adjacency_cache_max_mb", 512) or 0) * 1024 * 1024)
+        ),
+        graph_index_dir=str(_graph_index_dir) if _graph_index_dir is not None else None,
     )
 
 _templates_store = default_templates_store(PROJECT_ROOT)
 _pipeline_access = PipelineAccessService()
 _snapshot_registry = SnapshotRegistry(_weaviate_client) if _weaviate_client else None
+if _snapshot_registry is not None:
+    _snapshot_registry_cache = snapshot_registry_cache(_weaviate_client)
+    if _snapshot_registry_cache is not None:
+        _snapshot_registry_cache.set_ttl(float(_runtime_cfg.get("snapshot_registry_cache_ttl_seconds", 30) or 0))
 _pipeline_settings_by_name = {}
 try:
     from code_query_engine.pipeline.loader import PipelineLoader
@@ -1322,6 +1484,94 @@ _runner = DynamicPipelineRunner(
 )
 
 
+# ------------------------------------------------------------
+# Warmup (/ready)
+# ------------------------------------------------------------
+
+_warmup_cfg = warmup_config_from_runtime_config(_runtime_cfg)
+
+
+def _warmup_pipelines() -> dict:
+    results = _runner.warm_compiled_pipelines()
+    failed = {name: err for name, err in results.items() if err}
+    for name, err in failed.items():
+        py_logger.error("warmup: pipeline %s failed to compile: %s", name, err)
+    if failed:
+        raise RuntimeError(f"pipelines failed to compile: {sorted(failed)}")
+    return {"compiled": sorted(results)}
+
+
+def _warmup_translation() -> None:
+    _translator_pl_en.translate("Rozgrzewka.")
+    _markdown_translator.translate("Warmup.")
+
+
+def _warmup_local_llm() -> None:
+    _local_model.ask(prompt="Reply with OK.", max_tokens=1, temperature=0.0)
+
+
+def _warmup_snapshot_set(snapshot_set_id: str) -> dict:
+    rec = _snapshot_registry.fetch_snapshot_set(snapshot_set_id=snapshot_set_id, repository=None)
+    if rec is None:
+        raise ValueError(f"Unknown snapshot_set_id '{snapshot_set_id}'.")
+    repo = str(rec.get("repo") or "").strip()
+    nodes = {}
+    for snapshot in _snapshot_registry.list_snapshots(snapshot_set_id=snapshot_set_id, repository=repo or None):
+        nodes[snapshot.id] = _graph_provider.prewarm(repo=repo, snapshot_id=snapshot.id)
+    return {"repo": repo, "nodes": nodes}
+
+
+def _warmup_query(q: SyntheticQuery) -> None:
+    # Throwaway history backend and conversation history (in-memory session + durable stores):
+    # warmup turns must not reach real sessions or the durable KV/SQL store.
+    warmup_backend = InMemoryMockRedis()
+    _runner.run(
+        user_query=q.query,
+        session_id=f"warmup-{uuid.uuid4().hex}",
+        consultant=q.pipeline,
+        pipeline_name=q.pipeline,
+        repository=q.repository or None,
+        snapshot_id=q.snapshot_id or None,
+        snapshot_set_id=q.snapshot_set_id or None,
+        mock_redis=warmup_backend,
+        conversation_history_service=build_conversation_history_service(session_backend=warmup_backend),
+    )
+
+
+def _build_warmup_steps() -> list:
+    steps: list = [("pipelines", _warmup_pipelines)]
+    if _warmup_cfg.embedding and _retrieval_backend is not None:
+        steps.append(("embedding", _retrieval_backend.warmup))
+    if _warmup_cfg.translation:
+        steps.append(("translation", _warmup_translation))
+    if _warmup_cfg.llm and _local_model is not None:
+        steps.append(("llm", _warmup_local_llm))
+    if _graph_provider is not None and _snapshot_registry is not None:
+        snapshot_sets = _warmup_cfg.snapshot_sets or tuple(
+            dict.fromkeys(
+                str(settings.get("snapshot_set_id") or "").strip()
+                for settings in _pipeline_settings_by_name.values()
+                if str(settings.get("snapshot_set_id") or "").strip()
+            )
+        )
+        for snapshot_set_id in snapshot_sets:
+            steps.append((f"graph:{snapshot_set_id}", functools.partial(_warmup_snapshot_set, snapshot_set_id)))
+    for i, q in enumerate(_warmup_cfg.queries):
+        name = f"query:{q.pipeline}"
+        if any(existing == name for existing, _ in steps):
+            name = f"{name}#{i}"
+        steps.append((name, functools.partial(_warmup_query, q)))
+    return steps
+
+
+_warmup_enabled = _warmup_cfg.enabled and not bool(os.getenv("PYTEST_CURRENT_TEST"))
+_warmup = WarmupRunner(_build_warmup_steps() if _warmup_enabled else [], optional=_warmup_cfg.optional)
+if _warmup_enabled:
+    serving.run_per_worker("warmup", _warmup.start)
+else:
+    _warmup.run()
+
+
 # ------------------------------------------------------------
 # Flask app
 # ------------------------------------------------------------
@@ -1666,6 +1916,17 @@ def _require_bearer_strict(auth_header: str):
 _require_prod_bearer = _require_bearer_strict  # backward-compatible alias
 
 
+def _require_operator_token(auth_header: str):
+    """Operator endpoints take APP_OPERATOR_TOKEN only; user logins (IDP, API_TOKEN, fake users) are not enough."""
+    if not OPERATOR_TOKEN:
+        _log_security_abuse(reason="operator_token_not_configured", status_code=403)
+        return jsonify({"ok": False, "error": "operator endpoints are disabled (APP_OPERATOR_TOKEN is not set)"}), 403
+    if not hmac.compare_digest(_extract_bearer_token(auth_header).encode("utf-8"), OPERATOR_TOKEN.encode("utf-8")):
+        _log_security_abuse(reason="invalid_operator_token", status_code=401)
+        return jsonify({"ok": False, "error": "unauthorized"}), 401
+    return None
+
+
 def _require_bearer_if_needed(auth_header: str):
     if _auth_required:
         return _require_bearer_strict(auth_header)
@@ -1771,6 +2032,9 @@ register_cancel_routes(
 def health():
     # Keep backward-compatible keys for existing tests/UI:
     # - searcher_ok/searcher_error reflect the semantic searcher (the "default" retriever).
+    if serving.is_draining():
+        # Tell the load balancer to stop routing here while in-flight requests finish.
+        return jsonify({"ok": False, "draining": True}), 503
     return jsonify(
         {
             "ok": True,
@@ -1778,6 +2042,16 @@ def health():
     )
 
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    # Readiness for the load balancer: 200 only after warmup; /health stays a liveness probe.
+    status = _warmup.status()
+    if serving.is_draining():
+        status["ready"] = False
+        status["draining"] = True
+    return jsonify(status), (200 if status["ready"] else 503)
+
+
 @app.get("/")
 def ui_index():
     if not os.path.isfile(FRONTEND_HTML_PATH):
@@ -2397,6 +2671,20 @@ def _handle_query_request():
     except PipelineCancelled as e:
         py_logger.info("Pipeline cancelled: run_id=%s reason=%s", e.run_id, e.reason)
         return jsonify({"ok": False, "cancelled": True, "error": "cancelled", "pipeline_run_id": e.run_id}), 200
+    except LocalModelBusy as e:
+        py_logger.warning("Local model busy: %s", e)
+        resp = jsonify(
+            {
+                "ok": False,
+                "busy": True,
+                "error": "busy",
+                "message": str(e),
+                "queue_depth": e.queue_depth,
+                "retry_after_seconds": e.retry_after_seconds,
+            }
+        )
+        resp.headers["Retry-After"] = str(max(1, int(round(e.retry_after_seconds))))
+        return resp, 503
     except Exception as e:
         py_logger.exception("Unhandled exception in /query")
         return jsonify({"ok": False, "error": str(e)}), 500
@@ -2437,6 +2725,98 @@ def query():
     return _handle_query_request()
 
 
+def _retrieval_result_cache_stats():
+    return _retrieval_backend.result_cache_stats() if _retrieval_backend is not None else None
+
+
+@app.route("/pipeline/cache", methods=["GET", "DELETE"])
+def pipeline_cache():
+    auth_header = (request.headers.get("Authorization") or "").strip()
+    if request.method == "DELETE":
+        auth_error = _require_operator_token(auth_header)
+    else:
+        auth_error = _require_bearer_if_needed(auth_header)
+    if auth_error is not None:
+        return auth_error
+    if request.method == "DELETE":
+        snapshot_id = (request.args.get("snapshot_id") or "").strip()
+        snapshot_set_id = (request.args.get("snapshot_set_id") or "").strip()
+        if snapshot_id or snapshot_set_id:
+            removed = 0
+            if snapshot_id and _retrieval_backend is not None:
+                removed += _retrieval_backend.invalidate_result_cache(snapshot_id)
+            if snapshot_id and _graph_provider is not None:
+                removed += _graph_provider.invalidate_adjacency(snapshot_id=snapshot_id)
+            if _snapshot_registry is not None:
+                removed += _snapshot_registry.invalidate_cache(
+                    snapshot_set_id=snapshot_set_id or None,
+                    snapshot_id=snapshot_id or None,
+                )
+            return jsonify(
+                {
+                    "ok": True,
+                    "removed": removed,
+                    "retrieval_results": _retrieval_result_cache_stats(),
+                    "graph_adjacency": _graph_provider.adjacency_cache_stats() if _graph_provider is not None else None,
+                    "snapshot_registry": _snapshot_registry.cache_stats() if _snapshot_registry is not None else None,
+                }
+            )
+        name = (request.args.get("pipeline") or "").strip() or None
+        removed = _runner.invalidate_compiled_pipelines(name)
+        out = {"ok": True, "removed": removed, "compiled_pipelines": _runner.compiled_pipeline_cache_stats()}
+        if name is None and _graph_provider is not None:
+            # Global clear: also drop every cached dependency graph (re-read from the graph index / RagEdge).
+            out["graph_adjacency_removed"] = _graph_provider.invalidate_adjacency()
+            out["graph_adjacency"] = _graph_provider.adjacency_cache_stats()
+        return jsonify(out)
+    return jsonify(
+        {
+            "ok": True,
+            "compiled_pipelines": _runner.compiled_pipeline_cache_stats(),
+            "token_counts": get_token_count_cache().stats(),
+            "classifications": get_classification_cache().stats(),
+            "query_embeddings": _retrieval_backend.query_embedding_stats() if _retrieval_backend is not None else None,
+            "retrieval_results": _retrieval_result_cache_stats(),
+            "graph_adjacency": _graph_provider.adjacency_cache_stats() if _graph_provider is not None else None,
+            "snapshot_registry": _snapshot_registry.cache_stats() if _snapshot_registry is not None else None,
+            "prompt_prefix_states": _local_model.prefix_cache_stats() if _local_model is not None else None,
+        }
+    )
+
+
+@app.route("/llm/scheduler", methods=["GET"])
+def llm_scheduler_stats():
+    auth_header = (request.headers.get("Authorization") or "").strip()
+    auth_error = _require_bearer_if_needed(auth_header)
+    if auth_error is not None:
+        return auth_error
+    stats_fn = getattr(_local_model, "scheduler_stats", None)
+    return jsonify(
+        {
+            "ok": True,
+            "local_model": stats_fn() if callable(stats_fn) else None,
+            "server_connections": _server_client.transport_stats() if _server_client is not None else None,
+            "server_routing": _server_client.routing_stats() if _server_client is not None else None,
+        }
+    )
+
+
+@app.route("/history/backend", methods=["GET"])
+def history_backend_stats():
+    auth_header = (request.headers.get("Authorization") or "").strip()
+    auth_error = _require_bearer_if_needed(auth_header)
+    if auth_error is not None:
+        return auth_error
+    stats_fn = getattr(_history_backend, "stats", None)
+    return jsonify(
+        {
+            "ok": True,
+            "history_backend": stats_fn() if callable(stats_fn) else None,
+            "durable_writer": _durable_writer.stats() if _durable_writer is not None else None,
+        }
+    )
+
+
 @app.route("/auth-check", methods=["GET"])
 def auth_check():
     auth_header = (request.headers.get("Authorization") or "").strip()
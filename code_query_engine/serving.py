@@ -0,0 +1,200 @@
+"""
+Production serving support for the query server.
+
+The query server builds its heavy state at import time. Under a pre-forking WSGI server with
+preload enabled (gunicorn, see `gunicorn.conf.py`) that import runs once in the master process,
+so read-only model weights are shared copy-on-write by all workers. Objects holding sockets,
+gRPC channels, connection pools or threads are not fork-safe: they register a post-fork hook
+here or are wrapped in `ProcessLocal`, and each worker rebuilds them. The hooks run only when the
+WSGI server calls `run_post_fork_hooks()` for a new worker (gunicorn: `post_fork`), never for
+other forked children (multiprocessing, subprocess).
+
+Graceful drain: on SIGTERM a worker stops accepting connections and waits up to its graceful
+timeout for in-flight requests (both done by the WSGI server); meanwhile it reports itself as
+draining on /health and ends open SSE streams so clients reconnect elsewhere. The shutdown hooks
+run last.
+
+In-process caches (compiled pipelines, SnapshotSet records and labels, retrieval results, graph
+adjacency) are per worker: DELETE /pipeline/cache only clears the worker that handled it, the
+others converge through their TTLs and generation checks (see docs/start/40_production.md).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Iterable, List, Mapping, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _parse_bool(raw: Optional[str], default: bool) -> bool:
+    val = str(raw or "").strip().lower()
+    if val in ("1", "true", "yes", "on"):
+        return True
+    if val in ("0", "false", "no", "off"):
+        return False
+    return default
+
+
+@dataclass(frozen=True)
+class ServingConfig:
+    bind: str = "0.0.0.0:5000"
+    workers: int = 1
+    threads: int = 8
+    preload: bool = True
+    graceful_timeout_s: float = 30.0
+    timeout_s: float = 300.0
+    keepalive_s: float = 5.0
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> "ServingConfig":
+        env = os.environ if env is None else env
+        default = cls()
+        return cls(
+            bind=f"{(env.get('APP_HOST') or '0.0.0.0').strip()}:{int(env.get('APP_PORT') or 5000)}",
+            workers=max(1, int(env.get("APP_WORKERS") or default.workers)),
+            threads=max(1, int(env.get("APP_WORKER_THREADS") or default.threads)),
+            preload=_parse_bool(env.get("APP_PRELOAD"), default.preload),
+            graceful_timeout_s=max(0.0, float(env.get("APP_GRACEFUL_TIMEOUT") or default.graceful_timeout_s)),
+            timeout_s=max(1.0, float(env.get("APP_WORKER_TIMEOUT") or default.timeout_s)),
+            keepalive_s=max(0.0, float(env.get("APP_KEEPALIVE") or default.keepalive_s)),
+        )
+
+
+# ------------------------------------------------------------
+# Fork and shutdown hooks
+# ------------------------------------------------------------
+
+_hooks_lock = threading.Lock()
+_post_fork_hooks: List[Tuple[str, Callable[[], None]]] = []
+_shutdown_hooks: List[Tuple[str, Callable[[], None]]] = []
+_prefork_master = False
+
+
+def register_post_fork(name: str, fn: Callable[[], None]) -> None:
+    """Run `fn` in every forked worker before it serves requests."""
+    with _hooks_lock:
+        _post_fork_hooks.append((name, fn))
+
+
+def register_shutdown(name: str, fn: Callable[[], None]) -> None:
+    """Run `fn` once when the worker exits (after in-flight requests were drained)."""
+    with _hooks_lock:
+        _shutdown_hooks.append((name, fn))
+
+
+def _run_hooks(kind: str, hooks: Iterable[Tuple[str, Callable[[], None]]]) -> None:
+    for name, fn in hooks:
+        try:
+            fn()
+        except Exception:
+            logger.exception("soft-failure: %s hook %s failed", kind, name)
+
+
+def mark_prefork_master() -> None:
+    """Called by the WSGI server config when the app is preloaded in the master before forking."""
+    global _prefork_master
+    _prefork_master = True
+
+
+def run_per_worker(name: str, fn: Callable[[], None]) -> None:
+    """Run `fn` now, or in every forked worker while the app is being preloaded by a pre-fork master."""
+    if _prefork_master:
+        register_post_fork(name, fn)
+    else:
+        fn()
+
+
+def run_post_fork_hooks() -> None:
+    """Called by the WSGI server in each newly forked worker (gunicorn: `post_fork`)."""
+    global _hooks_lock, _prefork_master
+    # The parent may have held the lock while forking; the worker starts with a fresh one.
+    _hooks_lock = threading.Lock()
+    _prefork_master = False
+    _run_hooks("post-fork", list(_post_fork_hooks))
+
+
+def run_shutdown_hooks() -> None:
+    with _hooks_lock:
+        hooks, _shutdown_hooks[:] = list(reversed(_shutdown_hooks)), []
+    _run_hooks("shutdown", hooks)
+
+
+class ProcessLocal(Generic[T]):
+    """
+    Proxy to an object that must not be shared across fork (gRPC / HTTP clients).
+
+    The wrapped object is created lazily by `factory` and again on first use after every fork.
+    The copy inherited from the parent is dropped, not closed: closing it could tear down the
+    parent's connections.
+    """
+
+    def __init__(self, factory: Callable[[], T], *, name: str = "process-local") -> None:
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._obj: Optional[T] = None
+        register_post_fork(name, self._after_fork)
+
+    def get(self) -> T:
+        obj = self._obj
+        if obj is not None:
+            return obj
+        with self._lock:
+            if self._obj is None:
+                self._obj = self._factory()
+            return self._obj
+
+    def close_local(self) -> None:
+        """Close the object created in this process, if any."""
+        with self._lock:
+            obj, self._obj = self._obj, None
+        close = getattr(obj, "close", None)
+        if close is not None:
+            close()
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._obj = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+
+# ------------------------------------------------------------
+# Graceful drain
+# ------------------------------------------------------------
+
+_draining = False
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+def begin_drain() -> None:
+    global _draining
+    _draining = True
+    logger.info("Worker %s draining.", os.getpid())
+
+
+def install_drain_signal_handler(sig: int = signal.SIGTERM) -> None:
+    """
+    Chain a drain step in front of the worker's own SIGTERM handler.
+
+    Must run after the WSGI server installed its handlers (gunicorn: `post_worker_init`).
+    """
+    previous = signal.getsignal(sig)
+
+    def _handler(signum: int, frame: Any) -> None:
+        begin_drain()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(sig, _handler)
+
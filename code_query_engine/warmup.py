@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Tuple[str, Callable[[], Any]]
+
+
+@dataclass(frozen=True)
+class SyntheticQuery:
+    pipeline: str
+    query: str
+    repository: str = ""
+    snapshot_set_id: str = ""
+    snapshot_id: str = ""
+
+
+@dataclass(frozen=True)
+class WarmupConfig:
+    enabled: bool = True
+    # Empty: the snapshot_set_id values found in the pipeline settings.
+    snapshot_sets: Tuple[str, ...] = ()
+    queries: Tuple[SyntheticQuery, ...] = ()
+    embedding: bool = True
+    translation: bool = True
+    llm: bool = True
+    # Components whose failure is reported but does not block readiness.
+    optional: Tuple[str, ...] = ()
+
+
+def warmup_config_from_runtime_config(runtime_cfg: Mapping[str, Any]) -> WarmupConfig:
+    raw = runtime_cfg.get("warmup") if isinstance(runtime_cfg.get("warmup"), dict) else {}
+    default = WarmupConfig()
+
+    def _str_list(value: Any) -> Tuple[str, ...]:
+        if isinstance(value, str):
+            value = value.split(",")
+        if not isinstance(value, list):
+            return ()
+        return tuple(s for s in (str(v).strip() for v in value) if s)
+
+    queries: List[SyntheticQuery] = []
+    for item in raw.get("queries") or []:
+        if not isinstance(item, dict):
+            continue
+        pipeline = str(item.get("pipeline") or "").strip()
+        query = str(item.get("query") or "").strip()
+        if not pipeline or not query:
+            raise ValueError("warmup.queries[]: 'pipeline' and 'query' are required")
+        queries.append(
+            SyntheticQuery(
+                pipeline=pipeline,
+                query=query,
+                repository=str(item.get("repository") or "").strip(),
+                snapshot_set_id=str(item.get("snapshot_set_id") or "").strip(),
+                snapshot_id=str(item.get("snapshot_id") or "").strip(),
+            )
+        )
+
+    return WarmupConfig(
+        enabled=bool(raw.get("enabled", default.enabled)),
+        snapshot_sets=_str_list(raw.get("snapshot_sets")),
+        queries=tuple(queries),
+        embedding=bool(raw.get("embedding", default.embedding)),
+        translation=bool(raw.get("translation", default.translation)),
+        llm=bool(raw.get("llm", default.llm)),
+        optional=_str_list(raw.get("optional")),
+    )
+
+
+@dataclass
+class ComponentStatus:
+    name: str
+    optional: bool = False
+    state: str = "pending"  # pending | running | ok | failed
+    duration_ms: Optional[int] = None
+    detail: Any = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"state": self.state, "duration_ms": self.duration_ms}
+        if self.optional:
+            out["optional"] = True
+        if self.detail is not None:
+            out["detail"] = self.detail
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+
+class WarmupRunner:
+    """
+    Runs warmup steps once, in order, and tracks per-component status for /ready.
+
+    Each step is a callable returning an optional JSON-friendly detail. The instance is ready
+    when every step finished and no step outside `optional` failed. Error messages stay in the
+    log; the status only exposes the exception type.
+    """
+
+    def __init__(
+        self,
+        steps: Sequence[WarmupStep],
+        *,
+        optional: Sequence[str] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._steps = list(steps)
+        self._optional = set(optional)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._components: Dict[str, ComponentStatus] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget previous results (a forked worker warms up its own caches)."""
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started_at = None
+        self._finished_at = None
+        self._components = {name: ComponentStatus(name=name, optional=name in self._optional) for name, _ in self._steps}
+
+    def start(self) -> threading.Thread:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def run(self) -> None:
+        with self._lock:
+            if self._started_at is not None:
+                return
+            self._started_at = self._clock()
+        for name, fn in self._steps:
+            status = self._components[name]
+            status.state = "running"
+            t0 = self._clock()
+            try:
+                status.detail = fn()
+                status.state = "ok"
+            except Exception as ex:
+                status.state = "failed"
+                status.error = type(ex).__name__
+                logger.exception("warmup: %s failed", name)
+            status.duration_ms = int((self._clock() - t0) * 1000)
+        self._finished_at = self._clock()
+        logger.info("warmup: finished in %.1fs (ready=%s)", self._finished_at - self._started_at, self.is_ready())
+
+    def is_ready(self) -> bool:
+        if self._finished_at is None:
+            return False
+        return all(c.state == "ok" or c.optional for c in self._components.values())
+
+    def status(self) -> Dict[str, Any]:
+        if self._finished_at is not None:
+            state = "done"
+        elif self._started_at is not None:
+            state = "running"
+        else:
+            state = "pending"
+        duration_ms = None
+        if self._started_at is not None:
+            end = self._finished_at if self._finished_at is not None else self._clock()
+            duration_ms = int((end - self._started_at) * 1000)
+        return {
+            "ready": self.is_ready(),
+            "warmup": state,
+            "duration_ms": duration_ms,
+            "components": {name: c.to_dict() for name, c in self._components.items()},
+        }
+
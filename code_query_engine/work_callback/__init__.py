@@ -1,4 +1,6 @@
-from .broker import get_work_callback_broker, WorkCallbackBroker
+from .broker import get_work_callback_broker, set_work_callback_broker, WorkCallbackBroker
+from .redis_broker import RedisWorkCallbackBroker
+from .answer_stream import AnswerStreamEmitter, mark_answer_streamed, publish_reconciled_answer
 from .policy import (
     CallbackPolicy,
     DEFAULT_CALLBACK_POLICY,
@@ -25,7 +27,12 @@ def register_cancel_routes(*args, **kwargs):
 
 __all__ = [
     "WorkCallbackBroker",
+    "RedisWorkCallbackBroker",
     "get_work_callback_broker",
+    "set_work_callback_broker",
+    "AnswerStreamEmitter",
+    "mark_answer_streamed",
+    "publish_reconciled_answer",
     "register_work_callback_routes",
     "register_cancel_routes",
     "CallbackPolicy",
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .broker import WorkCallbackBroker, get_work_callback_broker
+
+
+_ANSWER_STREAM_STEP_ATTR = "_answer_stream_step_id"
+_DEFAULT_FLUSH_INTERVAL_S = 0.05
+_DEFAULT_FLUSH_CHARS = 256
+
+
+class AnswerStreamEmitter:
+    """
+    Forwards model tokens of one call_model step to the run's SSE subscribers.
+
+    Tokens are coalesced (at most one `answer_delta` event per `flush_interval_s`, or earlier
+    once `flush_chars` are buffered), so a fast model does not produce one event per token.
+    `finish()` publishes the whole answer as an `answer` event: clients replace their draft
+    with it, which also repairs drafts of subscribers whose deltas were dropped (see
+    WorkCallbackBroker.emit_answer_delta).
+    """
+
+    def __init__(
+        self,
+        *,
+        run_id: str,
+        step_id: str,
+        broker: Optional[WorkCallbackBroker] = None,
+        flush_interval_s: float = _DEFAULT_FLUSH_INTERVAL_S,
+        flush_chars: int = _DEFAULT_FLUSH_CHARS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.run_id = run_id
+        self.step_id = step_id
+        self._broker = broker or get_work_callback_broker()
+        self._flush_interval_s = max(0.0, float(flush_interval_s))
+        self._flush_chars = max(1, int(flush_chars))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buf: list[str] = []
+        self._buf_chars = 0
+        self._last_flush = clock()
+        self._started = False
+
+    def on_delta(self, text: str) -> None:
+        if not text:
+            return
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._broker.begin_answer(self.run_id, step_id=self.step_id)
+            self._buf.append(text)
+            self._buf_chars += len(text)
+            if self._buf_chars < self._flush_chars and (self._clock() - self._last_flush) < self._flush_interval_s:
+                return
+            self._flush_locked()
+
+    def finish(self, text: str, *, pending_translation: bool = False) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._broker.emit_answer(
+                self.run_id,
+                step_id=self.step_id,
+                text=str(text or ""),
+                final=not pending_translation,
+                pending_translation=pending_translation,
+            )
+
+    def _flush_locked(self) -> None:
+        self._last_flush = self._clock()
+        if not self._buf:
+            return
+        chunk = "".join(self._buf)
+        self._buf = []
+        self._buf_chars = 0
+        self._broker.emit_answer_delta(self.run_id, step_id=self.step_id, text=chunk)
+
+
+def mark_answer_streamed(state: Any, step_id: str) -> None:
+    try:
+        setattr(state, _ANSWER_STREAM_STEP_ATTR, step_id)
+    except Exception:
+        pass
+
+
+def publish_reconciled_answer(state: Any, text: Optional[str], *, broker: Optional[WorkCallbackBroker] = None) -> bool:
+    """
+    Replaces a streamed (neutral) draft with the translated answer. No-op if nothing was streamed.
+    """
+    step_id = getattr(state, _ANSWER_STREAM_STEP_ATTR, None)
+    run_id = str(getattr(state, "pipeline_run_id", None) or "").strip()
+    final = str(text or "").strip()
+    if not step_id or not run_id or not final:
+        return False
+    (broker or get_work_callback_broker()).emit_answer(
+        run_id,
+        step_id=str(step_id),
+        text=final,
+        final=True,
+        translated=True,
+    )
+    return True
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import heapq
 import threading
 import time
-from queue import Queue
-from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from queue import Full, Queue
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
 from .formatter import summarize_trace_event_for_ui
 from .policy import (
@@ -16,36 +18,86 @@ from .policy import (
 
 _MAX_EVENTS_PER_RUN = 600
 _RUN_TTL_SEC = 60 * 20
+# Runs that are never closed (e.g. a stream opened for an unknown run_id) are dropped after
+# this much inactivity once no subscriber is connected.
+_IDLE_RUN_TTL_SEC = 60 * 60
+# A subscriber with this many undelivered events stops receiving answer deltas until it catches up;
+# it then gets one `answer` event with the full draft instead of the skipped deltas.
+_MAX_PENDING_FOR_DELTAS = 64
+_MAX_SUBSCRIBER_QUEUE = 1024
+DROP_POLICIES = ("drop_oldest", "drop_newest")
+# Never dropped by either policy: the oldest queued non-critical event makes room instead, and if
+# every queued event is critical the queue briefly exceeds its bound.
+_CRITICAL_EVENT_TYPES = frozenset({"done", "answer"})
 
 
 class _TraceRun:
-    def __init__(self) -> None:
-        self.events: List[Dict[str, Any]] = []
+    def __init__(self, max_events: int = _MAX_EVENTS_PER_RUN, *, now: Optional[float] = None) -> None:
+        # Ring buffer: the oldest events fall out once `max_events` is reached.
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
         self.queues: List[Queue] = []
         self.closed = False
         self.closed_reason = ""
-        self.created_ts = time.time()
+        self.created_ts = time.time() if now is None else now
         self.last_emit_ts = self.created_ts
         self.policy: CallbackPolicy = DEFAULT_CALLBACK_POLICY
+        # Streamed answer of the current call_model step (replayed to late subscribers).
+        self.answer: Optional[Dict[str, Any]] = None
+        self.answer_seq = 0
+        self.lagging: List[Queue] = []
+        self.dropped_deltas = 0
+        # Last `event_seq` given to a trace event of this run (SSE `id:`, used to resume).
+        self.event_seq = 0
+        self.dropped_events = 0
+        # Deadline of this run's live entry in the broker's expiry heap.
+        self.expires_at = 0.0
 
 
 class WorkCallbackBroker:
-    def __init__(self) -> None:
+    """
+    In-process broker of work-callback (trace) events and streamed answers for SSE subscribers.
+
+    Trace events get a per-run `event_seq`; `open_stream(after_seq=...)` skips events a
+    reconnecting client already has. For multi-worker deployments see RedisWorkCallbackBroker.
+
+    Retention:
+    - each run keeps its last `max_events_per_run` events in a ring buffer;
+    - runs expire `run_ttl_sec` after their last activity once closed (`idle_run_ttl_sec` if
+      never closed and nobody is subscribed). Deadlines live in a heap that is re-checked lazily,
+      so cleanup costs O(log runs) per expired run instead of a scan of all runs per event;
+    - subscriber queues hold at most `subscriber_queue_max` events. When one is full, the
+      oldest queued event (`drop_oldest`) or the new one (`drop_newest`) is dropped and counted.
+      `done` and full `answer` events are never dropped: a full queue evicts its oldest other
+      event for them, and queued ones are skipped when choosing what to evict.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_events_per_run: int = _MAX_EVENTS_PER_RUN,
+        run_ttl_sec: float = _RUN_TTL_SEC,
+        idle_run_ttl_sec: float = _IDLE_RUN_TTL_SEC,
+        subscriber_queue_max: int = _MAX_SUBSCRIBER_QUEUE,
+        drop_policy: str = "drop_oldest",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}, got {drop_policy!r}")
         self._lock = threading.Lock()
         self._runs: Dict[str, _TraceRun] = {}
+        self._max_events = max(1, int(max_events_per_run))
+        self._run_ttl = float(run_ttl_sec)
+        self._idle_ttl = float(idle_run_ttl_sec)
+        self._queue_max = max(1, int(subscriber_queue_max))
+        self._drop_policy = drop_policy
+        self._clock = clock
+        self._expiry: List[Tuple[float, str]] = []
+        self._expired_runs = 0
+        self._evicted_events = 0
+        self._dropped_events = 0
 
     def ensure_run(self, run_id: str, *, policy: Optional[CallbackPolicy] = None) -> None:
-        rid = (run_id or "").strip()
-        if not rid:
-            return
-        with self._lock:
-            run = self._runs.get(rid)
-            if run is None:
-                run = _TraceRun()
-                self._runs[rid] = run
-            if policy is not None:
-                run.policy = policy
-        self._cleanup_locked()
+        self.configure_run(run_id, policy=policy)
 
     def configure_run(
         self,
@@ -57,29 +109,25 @@ class WorkCallbackBroker:
         if not rid:
             return
         with self._lock:
-            run = self._runs.get(rid)
-            if run is None:
-                run = _TraceRun()
-                self._runs[rid] = run
+            run = self._run_locked(rid)
             if policy is not None:
                 run.policy = policy
-        self._cleanup_locked()
+            self._cleanup_locked(self._clock())
 
-    def open_stream(self, run_id: str) -> Tuple[Queue, List[Dict[str, Any]], bool, str]:
+    def open_stream(self, run_id: str, *, after_seq: int = 0) -> Tuple[Queue, List[Dict[str, Any]], bool, str]:
         rid = (run_id or "").strip()
         if not rid:
             raise ValueError("run_id is required")
         with self._lock:
-            run = self._runs.get(rid)
-            if run is None:
-                run = _TraceRun()
-                self._runs[rid] = run
-            q: Queue = Queue()
+            run = self._run_locked(rid)
+            q = self._new_queue()
             run.queues.append(q)
-            snapshot = list(run.events)
+            snapshot = [e for e in run.events if int(e.get("event_seq") or 0) > after_seq]
+            if run.answer is not None:
+                snapshot.append(dict(run.answer))
             closed = bool(run.closed)
             reason = run.closed_reason
-        self._cleanup_locked()
+            self._cleanup_locked(self._clock())
         return q, snapshot, closed, reason
 
     def remove_stream(self, run_id: str, q: Queue) -> None:
@@ -91,7 +139,8 @@ class WorkCallbackBroker:
             if run is None:
                 return
             run.queues = [x for x in run.queues if x is not q]
-        self._cleanup_locked()
+            run.lagging = [x for x in run.lagging if x is not q]
+            run.last_emit_ts = max(run.last_emit_ts, self._clock())
 
     def emit(self, run_id: str, event: Dict[str, Any]) -> None:
         rid = (run_id or "").strip()
@@ -99,11 +148,7 @@ class WorkCallbackBroker:
             return
 
         with self._lock:
-            run = self._runs.get(rid)
-            if run is None:
-                run = _TraceRun()
-                self._runs[rid] = run
-            policy = run.policy
+            policy = self._run_locked(rid).policy
 
         ui_event = summarize_trace_event_for_ui(event, policy=policy)
         if ui_event is None:
@@ -113,34 +158,116 @@ class WorkCallbackBroker:
             run = self._runs.get(rid)
             if run is None:
                 return
-            run.last_emit_ts = time.time()
+            now = self._clock()
+            run.last_emit_ts = now
+            run.event_seq += 1
+            ui_event["event_seq"] = run.event_seq
+            if len(run.events) == run.events.maxlen:
+                self._evicted_events += 1
             run.events.append(ui_event)
-            if len(run.events) > _MAX_EVENTS_PER_RUN:
-                run.events = run.events[-_MAX_EVENTS_PER_RUN:]
-            for q in list(run.queues):
-                try:
-                    q.put(ui_event)
-                except Exception:
-                    pass
-        self._cleanup_locked()
+            self._deliver_locked(run, ui_event)
+            self._cleanup_locked(now)
 
-    def close(self, run_id: str, *, reason: str = "done") -> None:
+    def begin_answer(self, run_id: str, *, step_id: str) -> None:
+        """Starts a new streamed answer draft (a later call_model step replaces the previous one)."""
+        rid = (run_id or "").strip()
+        if not rid:
+            return
+        with self._lock:
+            run = self._runs.get(rid)
+            if run is None or not run.policy.enabled:
+                return
+            run.answer = {"type": "answer", "run_id": rid, "step_id": step_id, "text": "", "final": False}
+            run.lagging = []
+
+    def emit_answer_delta(self, run_id: str, *, step_id: str, text: str) -> None:
+        """
+        Appends `text` to the answer draft and pushes an `answer_delta` event.
+
+        Never blocks the model: subscribers that fall behind skip deltas and are resynchronized
+        with one `answer` event carrying the whole draft once their backlog drains.
+        """
+        rid = (run_id or "").strip()
+        if not rid or not text:
+            return
+        with self._lock:
+            run = self._runs.get(rid)
+            if run is None or not run.policy.enabled:
+                return
+            if run.answer is None or run.answer.get("step_id") != step_id:
+                run.answer = {"type": "answer", "run_id": rid, "step_id": step_id, "text": "", "final": False}
+            offset = len(run.answer["text"])
+            run.answer["text"] += text
+            run.answer_seq += 1
+            run.last_emit_ts = self._clock()
+            delta = {
+                "type": "answer_delta",
+                "run_id": rid,
+                "step_id": step_id,
+                "seq": run.answer_seq,
+                "offset": offset,
+                "text": text,
+            }
+            self._deliver_delta_locked(run, delta)
+
+    def emit_answer(
+        self,
+        run_id: str,
+        *,
+        step_id: str,
+        text: str,
+        final: bool = True,
+        translated: bool = False,
+        pending_translation: bool = False,
+    ) -> None:
+        """Publishes the complete answer text; clients replace their draft with it."""
         rid = (run_id or "").strip()
         if not rid:
             return
+        with self._lock:
+            run = self._runs.get(rid)
+            if run is None or not run.policy.enabled:
+                return
+            run.answer = {
+                "type": "answer",
+                "run_id": rid,
+                "step_id": step_id,
+                "text": str(text or ""),
+                "final": bool(final),
+            }
+            if translated:
+                run.answer["translated"] = True
+            if pending_translation:
+                run.answer["pending_translation"] = True
+            run.lagging = []
+            run.last_emit_ts = self._clock()
+            self._deliver_locked(run, run.answer)
+
+    def answer_stream_stats(self, run_id: str) -> Dict[str, Any]:
+        rid = (run_id or "").strip()
         with self._lock:
             run = self._runs.get(rid)
             if run is None:
-                run = _TraceRun()
-                self._runs[rid] = run
+                return {"deltas": 0, "dropped_deltas": 0, "lagging_streams": 0}
+            return {
+                "deltas": run.answer_seq,
+                "dropped_deltas": run.dropped_deltas,
+                "lagging_streams": len(run.lagging),
+            }
+
+    def close(self, run_id: str, *, reason: str = "done") -> None:
+        rid = (run_id or "").strip()
+        if not rid:
+            return
+        with self._lock:
+            now = self._clock()
+            run = self._run_locked(rid)
             run.closed = True
             run.closed_reason = reason or "done"
-            for q in list(run.queues):
-                try:
-                    q.put({"type": "done", "reason": run.closed_reason})
-                except Exception:
-                    pass
-        self._cleanup_locked()
+            run.last_emit_ts = now
+            self._deliver_locked(run, {"type": "done", "reason": run.closed_reason})
+            self._schedule_locked(rid, run, now + self._run_ttl)
+            self._cleanup_locked(now)
 
     def get_run_policy_dict(self, run_id: str) -> Dict[str, Any]:
         rid = (run_id or "").strip()
@@ -156,19 +283,125 @@ class WorkCallbackBroker:
         policy = callback_policy_from_dict(raw)
         self.configure_run(run_id, policy=policy)
 
-    def _cleanup_locked(self) -> None:
-        now = time.time()
-        stale: List[str] = []
-        for rid, run in self._runs.items():
-            if run.closed and (now - run.last_emit_ts) > _RUN_TTL_SEC:
-                stale.append(rid)
-        for rid in stale:
-            self._runs.pop(rid, None)
+    def retention_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": len(self._runs),
+                "subscribers": sum(len(run.queues) for run in self._runs.values()),
+                "scheduled_expiries": len(self._expiry),
+                "expired_runs": self._expired_runs,
+                "evicted_events": self._evicted_events,
+                "dropped_events": self._dropped_events,
+                "drop_policy": self._drop_policy,
+                "subscriber_queue_max": self._queue_max,
+            }
+
+    def _new_queue(self) -> Queue:
+        return Queue(maxsize=self._queue_max)
 
+    def _run_locked(self, rid: str) -> _TraceRun:
+        run = self._runs.get(rid)
+        if run is None:
+            now = self._clock()
+            run = _TraceRun(self._max_events, now=now)
+            self._runs[rid] = run
+            self._schedule_locked(rid, run, now + self._idle_ttl)
+        return run
 
-_BROKER = WorkCallbackBroker()
+    def _schedule_locked(self, rid: str, run: _TraceRun, deadline: float) -> None:
+        # Only an earlier deadline needs a new heap entry; later activity is picked up when
+        # the existing entry is popped and re-checked.
+        if run.expires_at and run.expires_at <= deadline:
+            return
+        run.expires_at = deadline
+        heapq.heappush(self._expiry, (deadline, rid))
+
+    def _due_locked(self, run: _TraceRun, now: float) -> float:
+        if run.closed:
+            return run.last_emit_ts + self._run_ttl
+        due = run.last_emit_ts + self._idle_ttl
+        if run.queues:
+            due = max(due, now + self._run_ttl)
+        return due
+
+    def _cleanup_locked(self, now: float) -> None:
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            deadline, rid = heapq.heappop(expiry)
+            run = self._runs.get(rid)
+            if run is None or run.expires_at != deadline:
+                continue  # run already removed, or superseded by an earlier entry
+            due = self._due_locked(run, now)
+            if due <= now:
+                del self._runs[rid]
+                self._expired_runs += 1
+                self._forget_run_locked(rid)
+                continue
+            run.expires_at = due
+            heapq.heappush(expiry, (due, rid))
+
+    def _forget_run_locked(self, rid: str) -> None:
+        """Called when an expired run is removed; subclasses drop their own per-run state."""
+
+    def _offer_locked(self, run: _TraceRun, q: Queue, event: Dict[str, Any]) -> None:
+        try:
+            q.put_nowait(event)
+            return
+        except Full:
+            pass
+        critical = event.get("type") in _CRITICAL_EVENT_TYPES
+        if self._drop_policy == "drop_newest" and not critical:
+            self._count_dropped_locked(run)
+            return
+        # The subscriber may drain concurrently; edit the queue's deque under its own mutex.
+        with q.mutex:
+            items = q.queue
+            victim = next((i for i, e in enumerate(items) if e.get("type") not in _CRITICAL_EVENT_TYPES), None)
+            if victim is None and not critical:
+                dropped = True  # only critical events queued: the new one gives way
+            else:
+                if victim is not None:
+                    del items[victim]
+                else:
+                    q.unfinished_tasks += 1  # every queued event is critical: exceed the bound
+                items.append(event)
+                q.not_empty.notify()
+                dropped = victim is not None
+        if dropped:
+            self._count_dropped_locked(run)
+
+    def _count_dropped_locked(self, run: _TraceRun) -> None:
+        run.dropped_events += 1
+        self._dropped_events += 1
+
+    def _deliver_locked(self, run: _TraceRun, event: Dict[str, Any]) -> None:
+        for q in list(run.queues):
+            self._offer_locked(run, q, dict(event))
+
+    def _deliver_delta_locked(self, run: _TraceRun, delta: Dict[str, Any]) -> None:
+        for q in list(run.queues):
+            lagging = any(x is q for x in run.lagging)
+            if q.qsize() >= _MAX_PENDING_FOR_DELTAS:
+                run.dropped_deltas += 1
+                if not lagging:
+                    run.lagging.append(q)
+                continue
+            if lagging and run.answer is not None:
+                run.lagging = [x for x in run.lagging if x is not q]
+                self._offer_locked(run, q, dict(run.answer))
+                continue
+            self._offer_locked(run, q, delta)
+
+
+_BROKER: WorkCallbackBroker = WorkCallbackBroker()
 
 
 def get_work_callback_broker() -> WorkCallbackBroker:
     return _BROKER
 
+
+def set_work_callback_broker(broker: WorkCallbackBroker) -> None:
+    """Replaces the process-wide broker (e.g. with RedisWorkCallbackBroker at server startup)."""
+    global _BROKER
+    _BROKER = broker
+
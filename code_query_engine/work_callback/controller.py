@@ -6,6 +6,7 @@ from typing import Callable, Optional
 
 from flask import Response, jsonify, request, stream_with_context
 
+from .. import serving
 from .broker import get_work_callback_broker
 
 
@@ -32,27 +33,33 @@ def _handle_trace_stream(*, require_bearer_fn: AuthCheckFn):
     if not run_id:
         return jsonify({"ok": False, "error": "missing run_id"}), 400
 
+    # EventSource sends Last-Event-ID on reconnect; events up to that `event_seq` are not replayed.
+    after_seq = _parse_seq(request.headers.get("Last-Event-ID") or request.args.get("after_seq"))
+
     broker = get_work_callback_broker()
-    q, snapshot, closed, reason = broker.open_stream(run_id)
+    q, snapshot, closed, reason = broker.open_stream(run_id, after_seq=after_seq)
 
     def _stream():
         try:
             for ev in snapshot:
-                yield f"data: {json.dumps(ev, ensure_ascii=False)}\n\n"
+                yield _sse(ev)
             if closed:
-                yield f"data: {json.dumps({'type': 'done', 'reason': reason}, ensure_ascii=False)}\n\n"
+                yield _sse({"type": "done", "reason": reason})
                 return
 
             while True:
                 try:
                     ev = q.get(timeout=10)
                 except Empty:
+                    if serving.is_draining():
+                        # Worker shutting down: the client reconnects with Last-Event-ID elsewhere.
+                        break
                     yield ": keep-alive\n\n"
                     continue
                 if isinstance(ev, dict) and ev.get("type") == "done":
-                    yield f"data: {json.dumps(ev, ensure_ascii=False)}\n\n"
+                    yield _sse(ev)
                     break
-                yield f"data: {json.dumps(ev, ensure_ascii=False)}\n\n"
+                yield _sse(ev)
         finally:
             broker.remove_stream(run_id, q)
 
@@ -60,3 +67,18 @@ def _handle_trace_stream(*, require_bearer_fn: AuthCheckFn):
     resp.headers["Cache-Control"] = "no-cache"
     resp.headers["X-Accel-Buffering"] = "no"
     return resp
+
+
+def _sse(ev: dict) -> str:
+    data = f"data: {json.dumps(ev, ensure_ascii=False)}\n\n"
+    seq = ev.get("event_seq") if isinstance(ev, dict) else None
+    if seq:
+        return f"id: {int(seq)}\n{data}"
+    return data
+
+
+def _parse_seq(raw: Optional[str]) -> int:
+    try:
+        return max(0, int(str(raw or "").strip() or 0))
+    except ValueError:
+        return 0
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from queue import Empty, Queue
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class InMemoryMockBrokerRedis:
+    """
+    In-memory stand-in for the Redis commands used by RedisWorkCallbackBroker and
+    RedisPipelineCancelRegistry (strings, hashes, capped streams, pub/sub). Only string keys
+    honour TTLs (`set(..., ex=)`, `expire`).
+
+    Several brokers sharing one instance behave like workers sharing one Redis server.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._strings: Dict[str, str] = {}
+        self._string_deadlines: Dict[str, float] = {}
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._streams: Dict[str, List[Tuple[str, Dict[str, str]]]] = {}
+        self._stream_ids = itertools.count(1)
+        self._subscribers: Dict[str, List["_MockPubSub"]] = {}
+
+    # strings
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            deadline = self._string_deadlines.get(key)
+            if deadline is not None and deadline <= time.monotonic():
+                self._strings.pop(key, None)
+                self._string_deadlines.pop(key, None)
+            return self._strings.get(key)
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        with self._lock:
+            self._strings[key] = str(value)
+            self._string_deadlines.pop(key, None)
+            if ex is not None:
+                self._string_deadlines[key] = time.monotonic() + float(ex)
+            return True
+
+    def append(self, key: str, value: str) -> int:
+        with self._lock:
+            self._strings[key] = self._strings.get(key, "") + str(value)
+            return len(self._strings[key].encode("utf-8"))
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._strings.get(key) or 0) + 1
+            self._strings[key] = str(value)
+            return value
+
+    def delete(self, *keys: str) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                self._string_deadlines.pop(key, None)
+                for store in (self._strings, self._hashes, self._streams):
+                    if store.pop(key, None) is not None:
+                        removed += 1
+        return removed
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if key in self._strings:
+                self._string_deadlines[key] = time.monotonic() + float(seconds)
+            return True
+
+    # hashes
+    def hset(self, name: str, key: Optional[str] = None, value: Any = None, mapping: Optional[Dict[str, Any]] = None) -> int:
+        with self._lock:
+            h = self._hashes.setdefault(name, {})
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            for k, v in items.items():
+                h[str(k)] = str(v)
+            return len(items)
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._lock:
+            return (self._hashes.get(name) or {}).get(key)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._hashes.get(name) or {})
+
+    # streams
+    def xadd(
+        self,
+        name: str,
+        fields: Dict[str, Any],
+        maxlen: Optional[int] = None,
+        approximate: bool = True,
+    ) -> str:
+        with self._lock:
+            entries = self._streams.setdefault(name, [])
+            entry_id = f"{int(time.time() * 1000)}-{next(self._stream_ids)}"
+            entries.append((entry_id, {str(k): str(v) for k, v in fields.items()}))
+            if maxlen is not None and len(entries) > maxlen:
+                del entries[: len(entries) - maxlen]
+            return entry_id
+
+    def xrange(self, name: str, min: str = "-", max: str = "+") -> List[Tuple[str, Dict[str, str]]]:  # noqa: A002
+        with self._lock:
+            return [(entry_id, dict(fields)) for entry_id, fields in self._streams.get(name) or []]
+
+    def xlen(self, name: str) -> int:
+        with self._lock:
+            return len(self._streams.get(name) or [])
+
+    # pub/sub
+    def publish(self, channel: str, message: str) -> int:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel) or [])
+        for sub in subscribers:
+            sub._queue.put({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "_MockPubSub":
+        return _MockPubSub(self)
+
+    def pipeline(self, transaction: bool = True) -> "_MockPipeline":
+        return _MockPipeline(self)
+
+
+class _MockPubSub:
+    def __init__(self, owner: InMemoryMockBrokerRedis) -> None:
+        self._owner = owner
+        self._queue: "Queue[Dict[str, Any]]" = Queue()
+        self._channels: List[str] = []
+
+    def subscribe(self, *channels: str) -> None:
+        with self._owner._lock:
+            for channel in channels:
+                self._owner._subscribers.setdefault(channel, []).append(self)
+                self._channels.append(channel)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        try:
+            return self._queue.get(timeout=max(0.0, float(timeout))) if timeout else self._queue.get_nowait()
+        except Empty:
+            return None
+
+    def close(self) -> None:
+        with self._owner._lock:
+            for channel in self._channels:
+                subs = self._owner._subscribers.get(channel) or []
+                self._owner._subscribers[channel] = [s for s in subs if s is not self]
+            self._channels = []
+
+
+class _MockPipeline:
+    def __init__(self, owner: InMemoryMockBrokerRedis) -> None:
+        self._owner = owner
+        self._calls: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def _queue_call(*args: Any, **kwargs: Any) -> "_MockPipeline":
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return _queue_call
+
+    def execute(self) -> List[Any]:
+        calls, self._calls = self._calls, []
+        with self._owner._lock:
+            return [getattr(self._owner, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+    def __enter__(self) -> "_MockPipeline":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._calls = []
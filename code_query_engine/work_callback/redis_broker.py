@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from queue import Empty, Queue
+from typing import Any, Dict, List, Optional, Tuple
+
+from .broker import _MAX_EVENTS_PER_RUN, _RUN_TTL_SEC, WorkCallbackBroker, _TraceRun
+from .formatter import summarize_trace_event_for_ui
+from .policy import CallbackPolicy, DEFAULT_CALLBACK_POLICY, callback_policy_from_dict, callback_policy_to_dict
+
+
+logger = logging.getLogger(__name__)
+
+_CHANNEL = "events"
+
+
+class RedisWorkCallbackBroker(WorkCallbackBroker):
+    """
+    WorkCallbackBroker shared by several server workers through Redis.
+
+    - Trace events: `INCR` gives the run's `event_seq`, the event goes to a capped stream
+      (`XADD MAXLEN ~`) for replay and is published on one pub/sub channel.
+    - Streamed answer: the draft text and its metadata are kept in Redis (for late subscribers);
+      deltas are only published.
+    - Closed state and callback policy: a per-run hash.
+
+    Every worker subscribes to the channel once (on its first `open_stream`) and fans messages
+    out to its local SSE queues with the same backpressure rules as WorkCallbackBroker, so a
+    `/pipeline/stream` request can land on any worker. All keys expire `run_ttl_sec` after the
+    last write.
+
+    `client` is a redis.Redis created with `decode_responses=True` (or InMemoryMockBrokerRedis).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        key_prefix: str = "wcb:",
+        max_events_per_run: int = _MAX_EVENTS_PER_RUN,
+        run_ttl_sec: int = _RUN_TTL_SEC,
+        poll_timeout_s: float = 1.0,
+        **local_retention: Any,
+    ) -> None:
+        super().__init__(max_events_per_run=max_events_per_run, run_ttl_sec=run_ttl_sec, **local_retention)
+        self._redis = client
+        self._prefix = key_prefix
+        self._max_events = max(1, int(max_events_per_run))
+        self._ttl = max(1, int(run_ttl_sec))
+        self._poll_timeout_s = float(poll_timeout_s)
+        self._channel = f"{key_prefix}{_CHANNEL}"
+        # Answer drafts of the runs this worker produces (offsets are counted in characters).
+        self._drafts: Dict[str, Dict[str, Any]] = {}
+        # Callback policies of the runs this worker produces or streams (loaded from Redis once per
+        # run); dropped on close() or when the local run expires.
+        self._policies: Dict[str, CallbackPolicy] = {}
+        self._listener_lock = threading.Lock()
+        self._pubsub: Any = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    # ------------------------------------------------------------------ #
+    # Producer side (the worker running the pipeline)
+
+    def ensure_run(self, run_id: str, *, policy: Optional[CallbackPolicy] = None) -> None:
+        self.configure_run(run_id, policy=policy)
+
+    def configure_run(self, run_id: str, *, policy: Optional[CallbackPolicy] = None) -> None:
+        rid = (run_id or "").strip()
+        if not rid or policy is None:
+            return
+        with self._lock:
+            self._policies[rid] = policy
+        meta = self._key(rid, "meta")
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hset(meta, mapping={"policy": json.dumps(callback_policy_to_dict(policy))})
+        pipe.expire(meta, self._ttl)
+        pipe.execute()
+
+    def emit(self, run_id: str, event: Dict[str, Any]) -> None:
+        rid = (run_id or "").strip()
+        if not rid or not isinstance(event, dict):
+            return
+        ui_event = summarize_trace_event_for_ui(event, policy=self._policy(rid))
+        if ui_event is None:
+            return
+        ui_event["event_seq"] = int(self._redis.incr(self._key(rid, "seq")))
+        events = self._key(rid, "events")
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.xadd(events, {"event": json.dumps(ui_event, ensure_ascii=False)}, maxlen=self._max_events, approximate=True)
+        pipe.expire(events, self._ttl)
+        pipe.expire(self._key(rid, "seq"), self._ttl)
+        pipe.publish(self._channel, self._message(rid, "event", ui_event))
+        pipe.execute()
+
+    def begin_answer(self, run_id: str, *, step_id: str) -> None:
+        rid = (run_id or "").strip()
+        if not rid or not self._policy(rid).enabled:
+            return
+        answer = {"type": "answer", "run_id": rid, "step_id": step_id, "text": "", "final": False}
+        with self._lock:
+            self._drafts[rid] = {"answer": answer, "seq": 0}
+        self._store_answer(rid, answer, kind="begin")
+
+    def emit_answer_delta(self, run_id: str, *, step_id: str, text: str) -> None:
+        rid = (run_id or "").strip()
+        if not rid or not text or not self._policy(rid).enabled:
+            return
+        with self._lock:
+            draft = self._drafts.get(rid)
+            if draft is None or draft["answer"].get("step_id") != step_id:
+                draft = {
+                    "answer": {"type": "answer", "run_id": rid, "step_id": step_id, "text": "", "final": False},
+                    "seq": 0,
+                }
+                self._drafts[rid] = draft
+                restart = True
+            else:
+                restart = False
+            offset = len(draft["answer"]["text"])
+            draft["answer"]["text"] += text
+            draft["seq"] += 1
+            delta = {
+                "type": "answer_delta",
+                "run_id": rid,
+                "step_id": step_id,
+                "seq": draft["seq"],
+                "offset": offset,
+                "text": text,
+            }
+            answer = dict(draft["answer"])
+        if restart:
+            self._store_answer(rid, answer, kind="begin")
+            return
+        text_key = self._key(rid, "answer")
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.append(text_key, text)
+        pipe.expire(text_key, self._ttl)
+        pipe.publish(self._channel, self._message(rid, "delta", delta))
+        pipe.execute()
+
+    def emit_answer(
+        self,
+        run_id: str,
+        *,
+        step_id: str,
+        text: str,
+        final: bool = True,
+        translated: bool = False,
+        pending_translation: bool = False,
+    ) -> None:
+        rid = (run_id or "").strip()
+        if not rid or not self._policy(rid).enabled:
+            return
+        answer: Dict[str, Any] = {
+            "type": "answer",
+            "run_id": rid,
+            "step_id": step_id,
+            "text": str(text or ""),
+            "final": bool(final),
+        }
+        if translated:
+            answer["translated"] = True
+        if pending_translation:
+            answer["pending_translation"] = True
+        with self._lock:
+            draft = self._drafts.setdefault(rid, {"answer": answer, "seq": 0})
+            draft["answer"] = dict(answer)
+        self._store_answer(rid, answer, kind="answer")
+
+    def close(self, run_id: str, *, reason: str = "done") -> None:
+        rid = (run_id or "").strip()
+        if not rid:
+            return
+        reason = reason or "done"
+        with self._lock:
+            self._drafts.pop(rid, None)
+            self._policies.pop(rid, None)
+            run = self._runs.get(rid)
+            if run is not None:
+                run.closed = True
+                run.closed_reason = reason
+        meta = self._key(rid, "meta")
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hset(meta, mapping={"closed": "1", "reason": reason})
+        pipe.expire(meta, self._ttl)
+        pipe.publish(self._channel, self._message(rid, "done", {"type": "done", "reason": reason}))
+        pipe.execute()
+        with self._lock:
+            self._cleanup_locked(self._clock())
+
+    def get_run_policy_dict(self, run_id: str) -> Dict[str, Any]:
+        rid = (run_id or "").strip()
+        if not rid:
+            return callback_policy_to_dict(DEFAULT_CALLBACK_POLICY)
+        return callback_policy_to_dict(self._policy(rid))
+
+    # ------------------------------------------------------------------ #
+    # Subscriber side (the worker serving /pipeline/stream)
+
+    def open_stream(self, run_id: str, *, after_seq: int = 0) -> Tuple[Queue, List[Dict[str, Any]], bool, str]:
+        rid = (run_id or "").strip()
+        if not rid:
+            raise ValueError("run_id is required")
+        self._ensure_listener()
+
+        with self._lock:
+            run = self._run_locked(rid)
+            q = self._new_queue()
+            run.queues.append(q)
+            self._cleanup_locked(self._clock())
+
+        # Subscribed before reading: anything published from now on is either in the snapshot
+        # or in `q` (duplicates are removed below).
+        events = [json.loads(fields["event"]) for _, fields in self._redis.xrange(self._key(rid, "events"))]
+        meta = self._redis.hgetall(self._key(rid, "meta")) or {}
+        stored_answer = self._load_answer(rid, meta)
+
+        with self._lock:
+            snapshot = [e for e in events if int(e.get("event_seq") or 0) > after_seq]
+            last_seq = max([after_seq] + [int(e.get("event_seq") or 0) for e in events])
+            if run.answer is None and stored_answer is not None:
+                run.answer = stored_answer
+            pending = self._drain(q)
+            for ev in pending:
+                kind = ev.get("type")
+                if kind in ("answer", "answer_delta"):
+                    continue
+                if int(ev.get("event_seq") or 0) and int(ev["event_seq"]) <= last_seq:
+                    continue
+                q.put_nowait(ev)
+            if run.answer is not None:
+                snapshot.append(dict(run.answer))
+            closed = run.closed or meta.get("closed") == "1"
+            reason = run.closed_reason or meta.get("reason") or ("done" if closed else "")
+        return q, snapshot, closed, reason
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        with self._listener_lock:
+            listener, self._listener = self._listener, None
+            pubsub, self._pubsub = self._pubsub, None
+        if listener is not None:
+            listener.join(timeout=self._poll_timeout_s + 1.0)
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(self._channel)
+            self._listener = threading.Thread(target=self._listen, name="work-callback-redis", daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        pubsub = self._pubsub
+        while not self._stopped.is_set():
+            try:
+                msg = pubsub.get_message(ignore_subscribe_messages=True, timeout=self._poll_timeout_s)
+            except Exception:
+                logger.exception("RedisWorkCallbackBroker: pub/sub read failed")
+                time.sleep(self._poll_timeout_s)
+                continue
+            if not msg or msg.get("type") != "message":
+                continue
+            try:
+                self._handle_message(json.loads(msg["data"]))
+            except Exception:
+                logger.exception("RedisWorkCallbackBroker: bad pub/sub message")
+
+    def _handle_message(self, msg: Dict[str, Any]) -> None:
+        rid = str(msg.get("run_id") or "")
+        kind = msg.get("kind")
+        payload = msg.get("payload") or {}
+        resync = False
+        with self._lock:
+            run = self._runs.get(rid)
+            if run is None:
+                return
+            run.last_emit_ts = self._clock()
+            if kind == "event":
+                run.event_seq = max(run.event_seq, int(payload.get("event_seq") or 0))
+                self._deliver_locked(run, payload)
+            elif kind == "begin":
+                run.answer = dict(payload)
+                run.lagging = []
+            elif kind == "answer":
+                run.answer = dict(payload)
+                run.lagging = []
+                self._deliver_locked(run, run.answer)
+            elif kind == "delta":
+                resync = not self._apply_delta_locked(run, payload)
+            elif kind == "done":
+                run.closed = True
+                run.closed_reason = str(payload.get("reason") or "done")
+                self._deliver_locked(run, payload)
+                self._schedule_locked(rid, run, run.last_emit_ts + self._run_ttl)
+                self._cleanup_locked(self._clock())
+        if resync:
+            self._resync_answer(rid, run)
+
+    def _apply_delta_locked(self, run: _TraceRun, delta: Dict[str, Any]) -> bool:
+        """Appends an in-order delta to the local draft; False when the draft must be reloaded."""
+        answer = run.answer
+        offset = int(delta.get("offset") or 0)
+        text = str(delta.get("text") or "")
+        run.answer_seq = max(run.answer_seq, int(delta.get("seq") or 0))
+        if answer is not None and answer.get("step_id") == delta.get("step_id"):
+            current = len(answer["text"])
+            if offset + len(text) <= current:
+                return True  # already part of the draft this worker loaded from Redis
+            if offset == current:
+                answer["text"] += text
+                self._deliver_delta_locked(run, delta)
+                return True
+        return False
+
+    def _resync_answer(self, rid: str, run: _TraceRun) -> None:
+        """Missed deltas (e.g. pub/sub reconnect): reload the draft and resynchronize every queue."""
+        # Redis is read without holding the lock, so emits and stream changes are not blocked.
+        stored = self._load_answer(rid, self._redis.hgetall(self._key(rid, "meta")) or {})
+        if stored is None:
+            return
+        with self._lock:
+            if self._runs.get(rid) is not run:
+                return  # expired meanwhile
+            current = run.answer
+            if (
+                current is not None
+                and current.get("step_id") == stored.get("step_id")
+                and len(current.get("text") or "") >= len(stored.get("text") or "")
+            ):
+                return  # the local draft caught up meanwhile (e.g. open_stream loaded it)
+            run.answer = stored
+            run.lagging = []
+            self._deliver_locked(run, stored)
+
+    # ------------------------------------------------------------------ #
+
+    def _policy(self, rid: str) -> CallbackPolicy:
+        with self._lock:
+            policy = self._policies.get(rid)
+        if policy is not None:
+            return policy
+        policy = DEFAULT_CALLBACK_POLICY
+        raw = self._redis.hget(self._key(rid, "meta"), "policy")
+        if raw:
+            try:
+                policy = callback_policy_from_dict(json.loads(raw))
+            except Exception:
+                policy = DEFAULT_CALLBACK_POLICY
+        with self._lock:
+            # Cached only for runs this worker tracks, so the entry goes away with the run.
+            if rid in self._runs:
+                self._policies[rid] = policy
+        return policy
+
+    def _forget_run_locked(self, rid: str) -> None:
+        self._policies.pop(rid, None)
+
+    def _store_answer(self, rid: str, answer: Dict[str, Any], *, kind: str) -> None:
+        meta_key = self._key(rid, "meta")
+        text_key = self._key(rid, "answer")
+        header = {k: v for k, v in answer.items() if k != "text"}
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(text_key, answer.get("text") or "")
+        pipe.hset(meta_key, mapping={"answer": json.dumps(header, ensure_ascii=False)})
+        pipe.expire(text_key, self._ttl)
+        pipe.expire(meta_key, self._ttl)
+        pipe.publish(self._channel, self._message(rid, kind, answer))
+        pipe.execute()
+
+    def _load_answer(self, rid: str, meta: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        raw = meta.get("answer")
+        if not raw:
+            return None
+        answer = json.loads(raw)
+        answer["text"] = self._redis.get(self._key(rid, "answer")) or ""
+        return answer
+
+    def _key(self, rid: str, suffix: str) -> str:
+        return f"{self._prefix}run:{rid}:{suffix}"
+
+    @staticmethod
+    def _message(rid: str, kind: str, payload: Dict[str, Any]) -> str:
+        return json.dumps({"run_id": rid, "kind": kind, "payload": payload}, ensure_ascii=False)
+
+    @staticmethod
+    def _drain(q: Queue) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        while True:
+            try:
+                out.append(q.get_nowait())
+            except Empty:
+                return out
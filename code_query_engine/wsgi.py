@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+def create_app() -> Any:
+    """
+    WSGI application factory used by production servers (`gunicorn.conf.py`).
+
+    Importing the query server builds all heavy state (models, translators, clients). With
+    preload enabled this happens once in the master before the workers are forked.
+    """
+    from .query_server_dynamic import app
+
+    return app
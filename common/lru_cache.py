@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BoundedLRU(Generic[K, V]):
+    """
+    Thread-safe LRU with hit/miss/eviction counters, shared by the in-process caches.
+
+    Bounds (both optional, checked after every put):
+    - `max_entries`: number of entries (0 = store nothing);
+    - `max_weight`: sum of `weigh(value)` over all entries (e.g. approximate bytes).
+
+    `keep_newest=True` never evicts the entry that was just put, even if it alone exceeds
+    the bounds. `on_evict(key, value)` runs under the cache lock for entries dropped by the
+    bounds (not for pop/remove_where/clear, whose callers already know what they removed).
+    Values must not be None: get() returns None for a miss.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: Optional[int] = None,
+        max_weight: Optional[int] = None,
+        weigh: Optional[Callable[[V], int]] = None,
+        keep_newest: bool = False,
+        on_evict: Optional[Callable[[K, V], None]] = None,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+        self._weights: Dict[K, int] = {}
+        self._max_entries = None if max_entries is None else max(0, int(max_entries))
+        self._max_weight = None if max_weight is None else max(0, int(max_weight))
+        self._weigh = weigh
+        self._keep_newest = bool(keep_newest)
+        self._on_evict = on_evict
+        self._weight = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def max_entries(self) -> Optional[int]:
+        return self._max_entries
+
+    @property
+    def max_weight(self) -> Optional[int]:
+        return self._max_weight
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def set_max_entries(self, max_entries: Optional[int]) -> None:
+        with self._lock:
+            self._max_entries = None if max_entries is None else max(0, int(max_entries))
+            self._evict_locked(keep=None)
+
+    def set_max_weight(self, max_weight: Optional[int]) -> None:
+        with self._lock:
+            self._max_weight = None if max_weight is None else max(0, int(max_weight))
+            self._evict_locked(keep=None)
+
+    def get(self, key: K, *, record: bool = True) -> Optional[V]:
+        """Value for `key` (marked most recently used) or None; counted as a hit/miss unless record=False."""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                if record:
+                    self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            if record:
+                self._hits += 1
+            return value
+
+    def peek(self, key: K) -> Optional[V]:
+        """Value for `key` without touching recency or counters."""
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._pop_locked(key)
+            weight = int(self._weigh(value)) if self._weigh is not None else 0
+            self._items[key] = value
+            self._weights[key] = weight
+            self._weight += weight
+            self._evict_locked(keep=key if self._keep_newest else None)
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            return self._pop_locked(key)
+
+    def remove_where(self, predicate: Callable[[K, V], bool]) -> List[Tuple[K, V]]:
+        """Removes and returns every (key, value) matching `predicate`."""
+        with self._lock:
+            removed = [(k, v) for k, v in self._items.items() if predicate(k, v)]
+            for k, _ in removed:
+                self._pop_locked(k)
+            return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._items)
+            self._items.clear()
+            self._weights.clear()
+            self._weight = 0
+            return n
+
+    def items(self) -> List[Tuple[K, V]]:
+        """Snapshot of the entries, least recently used first."""
+        with self._lock:
+            return list(self._items.items())
+
+    def keys(self) -> List[K]:
+        with self._lock:
+            return list(self._items.keys())
+
+    def record_hit(self, n: int = 1) -> None:
+        with self._lock:
+            self._hits += int(n)
+
+    def record_miss(self, n: int = 1) -> None:
+        with self._lock:
+            self._misses += int(n)
+
+    def stats(self) -> Dict[str, Any]:
+        """entries, hits, misses, evictions, hit_rate (+ weight when weighted); callers add their own fields."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            out: Dict[str, Any] = {
+                "entries": len(self._items),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (float(self._hits) / lookups) if lookups else 0.0,
+            }
+            if self._weigh is not None:
+                out["weight"] = self._weight
+            return out
+
+    # ------------------------------------------------------------------ #
+
+    def _pop_locked(self, key: K) -> Optional[V]:
+        value = self._items.pop(key, None)
+        if value is not None:
+            self._weight -= self._weights.pop(key, 0)
+        return value
+
+    def _over_locked(self) -> bool:
+        if self._max_entries is not None and len(self._items) > self._max_entries:
+            return True
+        return self._max_weight is not None and self._weight > self._max_weight
+
+    def _evict_locked(self, *, keep: Optional[K]) -> None:
+        while self._items and self._over_locked():
+            oldest = next(iter(self._items))
+            if oldest == keep:
+                if len(self._items) == 1:
+                    return
+                self._items.move_to_end(oldest)
+                continue
+            value = self._pop_locked(oldest)
+            self._evictions += 1
+            if self._on_evict is not None and value is not None:
+                self._on_evict(oldest, value)
@@ -43,11 +43,11 @@ IF NOT EXISTS (
   SELECT 1
   FROM sys.indexes
   WHERE object_id = OBJECT_ID(N'history.chat_sessions')
-    AND name = N'ix_chat_sessions_tenant_user_updated'
+    AND name = N'ix_chat_sessions_tenant_user_updated_id'
 )
 BEGIN
-  CREATE INDEX ix_chat_sessions_tenant_user_updated
-    ON history.chat_sessions (tenant_id, user_id, updated_at);
+  CREATE INDEX ix_chat_sessions_tenant_user_updated_id
+    ON history.chat_sessions (tenant_id, user_id, updated_at DESC, id DESC);
 END;
 
 IF NOT EXISTS (
@@ -33,7 +33,7 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
   updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
   deleted_at DATETIME(6),
   deleted_by VARCHAR(80),
-  KEY ix_chat_sessions_tenant_user_updated (tenant_id, user_id, updated_at),
+  KEY ix_chat_sessions_tenant_user_updated_id (tenant_id, user_id, updated_at, id),
   KEY ix_chat_sessions_tenant_deleted (tenant_id, deleted_at),
   CONSTRAINT fk_chat_sessions_tenant FOREIGN KEY (tenant_id) REFERENCES chat_tenants(id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -29,8 +29,14 @@ CREATE TABLE IF NOT EXISTS history.chat_sessions (
   deleted_by VARCHAR(80)
 );
 
-CREATE INDEX IF NOT EXISTS ix_chat_sessions_tenant_user_updated
-  ON history.chat_sessions (tenant_id, user_id, updated_at);
+-- Session list: keyset pagination on (updated_at, id) within one user.
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_tenant_user_updated_id
+  ON history.chat_sessions (tenant_id, user_id, updated_at DESC, id DESC);
+
+-- Session list: case-insensitive title substring search (LOWER(title) LIKE '%...%').
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_title_trgm
+  ON history.chat_sessions USING gin (LOWER(title) gin_trgm_ops);
 
 CREATE INDEX IF NOT EXISTS ix_chat_sessions_tenant_deleted
   ON history.chat_sessions (tenant_id, deleted_at);
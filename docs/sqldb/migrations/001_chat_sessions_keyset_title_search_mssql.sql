@@ -0,0 +1,24 @@
+-- Migration 001 (SQL Server): session list keyset pagination on (updated_at, id).
+-- The title filter (LOWER(title) LIKE '%...%') runs on the per-user range of this index;
+-- SQL Server full-text search does not do substring matching, so it is not used.
+
+IF NOT EXISTS (
+  SELECT 1
+  FROM sys.indexes
+  WHERE object_id = OBJECT_ID(N'history.chat_sessions')
+    AND name = N'ix_chat_sessions_tenant_user_updated_id'
+)
+BEGIN
+  CREATE INDEX ix_chat_sessions_tenant_user_updated_id
+    ON history.chat_sessions (tenant_id, user_id, updated_at DESC, id DESC);
+END;
+
+IF EXISTS (
+  SELECT 1
+  FROM sys.indexes
+  WHERE object_id = OBJECT_ID(N'history.chat_sessions')
+    AND name = N'ix_chat_sessions_tenant_user_updated'
+)
+BEGIN
+  DROP INDEX ix_chat_sessions_tenant_user_updated ON history.chat_sessions;
+END;
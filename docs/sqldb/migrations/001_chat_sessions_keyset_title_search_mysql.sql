@@ -0,0 +1,20 @@
+-- Migration 001 (MySQL): session list keyset pagination on (updated_at, id).
+-- MySQL has no index for LIKE '%...%'; the title filter runs on the per-user range of this index.
+
+USE localai_rag_history;
+
+SET @has_new := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'chat_sessions' AND index_name = 'ix_chat_sessions_tenant_user_updated_id'
+);
+SET @ddl := IF(@has_new = 0,
+  'CREATE INDEX ix_chat_sessions_tenant_user_updated_id ON chat_sessions (tenant_id, user_id, updated_at, id)',
+  'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @has_old := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'chat_sessions' AND index_name = 'ix_chat_sessions_tenant_user_updated'
+);
+SET @ddl := IF(@has_old > 0, 'DROP INDEX ix_chat_sessions_tenant_user_updated ON chat_sessions', 'DO 0');
+PREPARE stmt FROM @ddl; EXECUTE stmt; DEALLOCATE PREPARE stmt;
@@ -0,0 +1,12 @@
+-- Migration 001 (PostgreSQL): session list keyset pagination and indexed title search.
+-- Safe to re-run. CONCURRENTLY keeps the table writable; run outside a transaction block.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_sessions_tenant_user_updated_id
+  ON history.chat_sessions (tenant_id, user_id, updated_at DESC, id DESC);
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_sessions_title_trgm
+  ON history.chat_sessions USING gin (LOWER(title) gin_trgm_ops);
+
+-- Superseded by ix_chat_sessions_tenant_user_updated_id.
+DROP INDEX CONCURRENTLY IF EXISTS history.ix_chat_sessions_tenant_user_updated;
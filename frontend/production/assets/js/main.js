@@ -1561,8 +1561,45 @@
     }
   }
 
+  // Streamed answer draft (answer_delta / answer events); replaced by the /query result.
+  let streamingDraftEl = null;
+  let streamingDraftText = "";
+
+  function resetStreamingDraft() {
+    if (streamingDraftEl && streamingDraftEl.parentNode) streamingDraftEl.parentNode.removeChild(streamingDraftEl);
+    streamingDraftEl = null;
+    streamingDraftText = "";
+  }
+
+  function renderStreamingDraft(text) {
+    if (!responseDiv) return;
+    streamingDraftText = String(text || "");
+    if (!streamingDraftEl) {
+      streamingDraftEl = document.createElement("div");
+      streamingDraftEl.className = "bg-white p-4 rounded-xl shadow-sm border border-gray-100 response-entry streaming-draft";
+      streamingDraftEl.innerHTML = '<div class="markdown-content text-gray-900"></div>';
+      responseDiv.insertBefore(streamingDraftEl, responseDiv.firstChild);
+    }
+    const body = streamingDraftEl.querySelector(".markdown-content");
+    if (body) body.innerHTML = DOMPurify.sanitize(marked.parse(streamingDraftText || " "));
+  }
+
+  function handleAnswerStreamEvent(evt) {
+    if (evt.type === "answer") {
+      renderStreamingDraft(evt.text);
+      return;
+    }
+    // A gap (dropped deltas) is repaired by the next full `answer` event.
+    if (typeof evt.offset === "number" && evt.offset !== streamingDraftText.length) return;
+    renderStreamingDraft(streamingDraftText + String(evt.text || ""));
+  }
+
   function handleTraceEvent(evt) {
     if (!evt || typeof evt !== "object") return;
+    if (evt.type === "answer_delta" || evt.type === "answer") {
+      handleAnswerStreamEvent(evt);
+      return;
+    }
     if (evt.type === "done") {
       setTraceStatusByKey("done");
       stopTraceStream({ hidePanel: false });
@@ -2908,6 +2945,7 @@
       if (typeof setTraceOpen === "function") setTraceOpen(false);
       if (typeof resetTracePanel === "function") resetTracePanel();
       if (typeof setTraceStatusByKey === "function") setTraceStatusByKey("connecting");
+      resetStreamingDraft();
       if (typeof startTraceStream === "function") startTraceStream(traceRunId);
 
       activeAbortController = new AbortController();
@@ -2944,6 +2982,7 @@
         if (typeof setTraceStatusByKey === "function") setTraceStatusByKey("no_run_id");
       }
 
+      resetStreamingDraft();
       const markdown = json.results || t.noResponse;
       const html = DOMPurify.sanitize(marked.parse(markdown), { ADD_ATTR: ["data-xmi-b64", "data-filename"] });
       const timestamp = new Date().toLocaleString(t.locale);
@@ -2978,6 +3017,7 @@
       addCommandLinkHandlers();
       scrollToLatestResponse();
     } catch (error) {
+      resetStreamingDraft();
       if (error && error.name === "AbortError") {
         if (typeof stopTraceStream === "function") stopTraceStream({ hidePanel: false });
         if (typeof setTraceAvailable === "function") setTraceAvailable(true);
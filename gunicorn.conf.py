@@ -0,0 +1,43 @@
+# Gunicorn settings for the production serving mode.
+#
+#   gunicorn -c gunicorn.conf.py
+#   python start_AI_server.py --env --production [--workers N]
+#
+# All values come from APP_* environment variables (see code_query_engine/serving.py and
+# docs/start/40_production.md). Worker lifecycle:
+#   master:  imports the app once (preload_app) -> model weights shared copy-on-write
+#   fork:    post-fork hooks registered by the app rebuild non-fork-safe clients
+#   SIGTERM: worker drains (/health -> 503, SSE streams end), then shutdown hooks run
+
+from code_query_engine import serving
+
+_cfg = serving.ServingConfig.from_env()
+
+wsgi_app = "code_query_engine.wsgi:create_app()"
+bind = _cfg.bind
+workers = _cfg.workers
+threads = _cfg.threads
+worker_class = "gthread"
+preload_app = _cfg.preload
+graceful_timeout = _cfg.graceful_timeout_s
+timeout = _cfg.timeout_s
+keepalive = _cfg.keepalive_s
+
+if preload_app:
+    # Per-worker work (warmup) is deferred until after the fork.
+    serving.mark_prefork_master()
+
+
+def post_fork(server, worker):
+    # Only gunicorn workers rebuild clients / start warmup; other forked children do not.
+    serving.run_post_fork_hooks()
+
+
+def post_worker_init(worker):
+    serving.install_drain_signal_handler()
+
+
+def worker_exit(server, worker):
+    # Called after gunicorn waited up to graceful_timeout for in-flight requests.
+    serving.begin_drain()
+    serving.run_shutdown_hooks()
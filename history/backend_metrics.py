@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500)
+
+
+class _OpStats:
+    __slots__ = ("calls", "errors", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{b}ms" for b in LATENCY_BUCKETS_MS] + ["gt_%dms" % LATENCY_BUCKETS_MS[-1]]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else None,
+            "max_ms": round(self.max_ms, 3),
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class BackendLatencyStats:
+    """
+    Per-command latency counters of a history backend (thread-safe).
+
+    `timed(op)` measures one backend call (a pipeline's `execute()` is one "pipeline" call);
+    `incr(name)` bumps a plain counter such as optimistic-transaction conflicts.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ops: Dict[str, _OpStats] = {}
+        self._counters: Dict[str, int] = {}
+
+    @contextmanager
+    def timed(self, op: str) -> Iterator[None]:
+        t0 = self._clock()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record(op, (self._clock() - t0) * 1000.0, failed=failed)
+
+    def record(self, op: str, elapsed_ms: float, *, failed: bool = False) -> None:
+        idx = next((i for i, b in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= b), len(LATENCY_BUCKETS_MS))
+        with self._lock:
+            st = self._ops.get(op)
+            if st is None:
+                st = self._ops[op] = _OpStats()
+            st.calls += 1
+            st.errors += int(failed)
+            st.total_ms += elapsed_ms
+            st.max_ms = max(st.max_ms, elapsed_ms)
+            st.buckets[idx] += 1
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ops": {op: st.to_dict() for op, st in sorted(self._ops.items())},
+                "counters": dict(self._counters),
+            }
+
+
+def timed_op(op: str) -> Callable[[F], F]:
+    """Method decorator recording the call into `self._metrics` (a BackendLatencyStats)."""
+
+    def _decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def _wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with self._metrics.timed(op):
+                return fn(self, *args, **kwargs)
+
+        return _wrapper  # type: ignore[return-value]
+
+    return _decorate
@@ -1,6 +1,39 @@
 # File: history/history_backend.py
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Callable, Iterable, Mapping, Optional
+
+
+class HistoryConflictError(RuntimeError):
+    """`update()` gave up because the key kept changing under concurrent writers."""
+
+
+def parse_namespace_ttls(spec: str) -> dict[str, int]:
+    """
+    Parse "prefix=seconds" pairs separated by commas, e.g. "conv_hist:=86400,tmp:=60".
+
+    Raises ValueError on malformed entries so that a typo in the environment fails at startup.
+    """
+    out: dict[str, int] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        prefix, sep, seconds = part.rpartition("=")
+        if not sep or not prefix.strip():
+            raise ValueError(f"Invalid namespace TTL entry: {part!r} (expected prefix=seconds)")
+        out[prefix.strip()] = int(seconds)
+    return out
+
+
+def namespace_ttl(namespace_ttls: Mapping[str, int], key: str) -> Optional[int]:
+    """TTL of the longest namespace prefix matching `key` (None when no prefix matches)."""
+    best: Optional[str] = None
+    for prefix in namespace_ttls:
+        if key.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    if best is None:
+        return None
+    return int(namespace_ttls[best]) or None
 
 
 class HistoryBackend(ABC):
@@ -24,3 +57,101 @@ class HistoryBackend(ABC):
     def delete(self, key: str) -> None:
         """Remove `key` and its value; no-op if the key does not exist."""
         ...
+
+    # Batched and transactional operations. The defaults below loop over the single-key
+    # methods and are NOT atomic; backends shared between processes override them.
+
+    def mget(self, keys: Iterable[str]) -> list[Optional[str]]:
+        """Return the values of `keys` in order (None for missing keys)."""
+        return [self.get(k) for k in keys]
+
+    def set_many(self, mapping: Mapping[str, str], ttl: Optional[int] = None) -> None:
+        """Set several keys at once (`ttl` applies to each of them)."""
+        for key, value in mapping.items():
+            self._set_with_ttl(key, value, ttl)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove several keys at once."""
+        for key in keys:
+            self.delete(key)
+
+    def update(
+        self,
+        key: str,
+        fn: Callable[[Optional[str]], Optional[str]],
+        *,
+        ttl: Optional[int] = None,
+    ) -> Optional[str]:
+        """
+        Read-modify-write of one key: `fn` gets the current value and returns the new one
+        (None leaves the key untouched). Returns the value stored after the call.
+
+        Atomic backends retry `fn` when another writer changed the key in between and raise
+        HistoryConflictError once their retries are exhausted, so `fn` must be side-effect free.
+        """
+        current = self.get(key)
+        new = fn(current)
+        if new is None:
+            return current
+        self._set_with_ttl(key, new, ttl)
+        return new
+
+    def _set_with_ttl(self, key: str, value: str, ttl: Optional[int]) -> None:
+        # TTL is best-effort for plain key/value backends whose set() has no ttl parameter.
+        if ttl is None:
+            self.set(key, value)
+            return
+        try:
+            self.set(key, value, ttl=ttl)  # type: ignore[call-arg]
+        except TypeError:
+            self.set(key, value)
+
+
+class AppendOnlyHistoryBackend(HistoryBackend):
+    """
+    History backend that also offers the Redis list/hash commands used by the append-only
+    session layout of `HistoryManager` (one list of events plus one hash per session).
+
+    `pipeline()` returns an object accepting the same write commands plus `execute()`;
+    queued commands are sent in one round trip.
+    """
+
+    @abstractmethod
+    def rpush(self, key: str, *values: str) -> int:
+        """Append values to the list at `key`; returns the new length."""
+        ...
+
+    @abstractmethod
+    def lpush(self, key: str, *values: str) -> int:
+        """Prepend values (each one becomes the new head) to the list at `key`."""
+        ...
+
+    @abstractmethod
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        """Return list items from `start` to `end` (inclusive, negative indexes count from the tail)."""
+        ...
+
+    @abstractmethod
+    def hset(self, key: str, mapping: dict[str, str]) -> int:
+        """Set hash fields."""
+        ...
+
+    @abstractmethod
+    def hsetnx(self, key: str, field: str, value: str) -> bool:
+        """Set a hash field only if it does not exist; True when it was set."""
+        ...
+
+    @abstractmethod
+    def hgetall(self, key: str) -> dict[str, str]:
+        """Return all hash fields (empty dict if the key does not exist)."""
+        ...
+
+    @abstractmethod
+    def expire(self, key: str, seconds: int) -> bool:
+        """Set a TTL on `key`; False if the key does not exist."""
+        ...
+
+    @abstractmethod
+    def pipeline(self) -> Any:
+        """Return a command pipeline (see class docstring)."""
+        ...
@@ -6,7 +6,7 @@ import time
 import uuid
 from typing import Any, Optional
 
-from .history_backend import HistoryBackend
+from .history_backend import AppendOnlyHistoryBackend, HistoryBackend
 
 
 class HistoryManager:
@@ -23,11 +23,22 @@ class HistoryManager:
     - Keep `session_id` as the primary key, but also store `user_id` metadata
       (reserved for future authenticated users).
 
+    Storage
+    -------
+    - Append-only (backends implementing `AppendOnlyHistoryBackend`, e.g. Redis and
+      `InMemoryMockRedis`): every write appends one event to the list
+      "<session_id>:events" and updates the hash "<session_id>:session" in a single
+      pipeline. History is materialized lazily on read, and later reads only fetch the
+      events appended since the previous read.
+    - Legacy blob (any other backend): the whole history is one JSON list under
+      "<session_id>" and metadata one JSON object under "<session_id>:meta".
+      Sessions written in this format are migrated to events on first read.
+
     Notes
     -----
-    - `ttl` (in seconds) is optional and only used if the backend supports it.
-      If the backend does not accept a `ttl` argument, the call gracefully
-      falls back to a plain `set(key, value)`.
+    - `ttl` (in seconds) is optional. Append-only storage refreshes it on both session
+      keys at every write; blob storage passes it to `set(..., ttl=...)` when the backend
+      accepts it, otherwise it falls back to a plain `set(key, value)`.
     """
 
     def __init__(
@@ -41,6 +52,11 @@ class HistoryManager:
         self.backend = backend
         self.ttl = ttl  # optional TTL in seconds; used only if the backend supports it
         self._user_id: Optional[str] = user_id
+        self._append_only = isinstance(backend, AppendOnlyHistoryBackend)
+        # Lazily materialized history and the number of events folded into it.
+        self._materialized: Optional[list[dict[str, Any]]] = None
+        self._events_read = 0
+        self._has_open_query = False
 
         # Persist initial user_id if provided (best effort).
         if user_id:
@@ -53,12 +69,106 @@ class HistoryManager:
     def _meta_key(self) -> str:
         return f"{self.session_id}:meta"
 
+    @property
+    def _events_key(self) -> str:
+        return f"{self.session_id}:events"
+
+    @property
+    def _session_key(self) -> str:
+        return f"{self.session_id}:session"
+
+    # ------------------------------
+    # Append-only storage
+    # ------------------------------
+    def _append_event(self, event: dict[str, Any], *, session_fields: dict[str, str]) -> None:
+        """Append one event and update the session hash in one round trip."""
+        pipe = self.backend.pipeline()  # type: ignore[attr-defined]
+        pipe.rpush(self._events_key, json.dumps(event, ensure_ascii=False))
+        pipe.hset(self._session_key, mapping=session_fields)
+        pipe.hsetnx(self._session_key, "created_at", str(time.time()))
+        if self.ttl:
+            pipe.expire(self._events_key, int(self.ttl))
+            pipe.expire(self._session_key, int(self.ttl))
+        pipe.execute()
+
+    @staticmethod
+    def _fold_events(history: list[dict[str, Any]], raw_events: list[str]) -> None:
+        for raw in raw_events:
+            try:
+                event = json.loads(raw)
+            except (TypeError, json.JSONDecodeError):
+                continue
+            if not isinstance(event, dict):
+                continue
+            op = event.get("op")
+            if op == "query":
+                history.append(
+                    {
+                        "timestamp": event.get("timestamp"),
+                        "user_query": event.get("user_query"),
+                        "final_answer": None,
+                    }
+                )
+            elif op == "answer" and history:
+                history[-1]["final_answer"] = event.get("final_answer")
+
+    @staticmethod
+    def _entry_to_events(entry: dict[str, Any]) -> list[str]:
+        events = [json.dumps({"op": "query", "timestamp": entry.get("timestamp"), "user_query": entry.get("user_query")}, ensure_ascii=False)]
+        if entry.get("final_answer") is not None:
+            events.append(json.dumps({"op": "answer", "final_answer": entry.get("final_answer")}, ensure_ascii=False))
+        return events
+
+    def _read_events(self) -> list[dict[str, Any]]:
+        """
+        Materialize the history from the event list. The first read also checks for a
+        legacy blob and migrates it; later reads fetch only new events.
+        """
+        if self._materialized is not None:
+            new_events = self.backend.lrange(self._events_key, self._events_read, -1)  # type: ignore[attr-defined]
+            self._fold_events(self._materialized, new_events)
+            self._events_read += len(new_events)
+            return [dict(e) for e in self._materialized]
+
+        pipe = self.backend.pipeline()  # type: ignore[attr-defined]
+        pipe.get(self.session_id)
+        pipe.lrange(self._events_key, 0, -1)
+        raw_blob, events = pipe.execute()
+
+        legacy = self._parse_history_blob(raw_blob)
+        legacy_events = [ev for entry in legacy for ev in self._entry_to_events(entry)]
+        if legacy_events:
+            self._migrate_blob(legacy_events)
+
+        history: list[dict[str, Any]] = []
+        self._fold_events(history, legacy_events + list(events))
+        self._materialized = history
+        self._events_read = len(legacy_events) + len(events)
+        return [dict(e) for e in history]
+
+    def _migrate_blob(self, legacy_events: list[str]) -> None:
+        # Only one concurrent reader wins the marker and moves the blob in front of the events
+        # appended since (writers never touch the blob, so no entry is lost or duplicated).
+        if not self.backend.hsetnx(self._session_key, "migrated_blob", "1"):  # type: ignore[attr-defined]
+            return
+        pipe = self.backend.pipeline()  # type: ignore[attr-defined]
+        pipe.lpush(self._events_key, *reversed(legacy_events))
+        pipe.delete(self.session_id)
+        if self.ttl:
+            pipe.expire(self._events_key, int(self.ttl))
+        pipe.execute()
+
     def _load_history(self) -> list[dict[str, Any]]:
         """
         Load the full session history from the backend.
         Returns an empty list if the key does not exist or if the payload is invalid.
         """
-        raw = self.backend.get(self.session_id)
+        if self._append_only:
+            return self._read_events()
+        return self._parse_history_blob(self.backend.get(self.session_id))
+
+    @staticmethod
+    def _parse_history_blob(raw: Optional[str]) -> list[dict[str, Any]]:
         if raw:
             try:
                 data = json.loads(raw)
@@ -111,6 +221,9 @@ class HistoryManager:
         It's reserved for future: authenticated users → list/restore sessions.
         """
         self._user_id = user_id
+        if self._append_only:
+            self._set_session_fields({"user_id": user_id, "updated_at": str(time.time())})
+            return
         meta = self._load_meta()
         meta["user_id"] = user_id
         meta["updated_at"] = time.time()
@@ -118,9 +231,21 @@ class HistoryManager:
             meta["created_at"] = time.time()
         self._save_meta(meta)
 
+    def _set_session_fields(self, fields: dict[str, str]) -> None:
+        pipe = self.backend.pipeline()  # type: ignore[attr-defined]
+        pipe.hset(self._session_key, mapping=fields)
+        pipe.hsetnx(self._session_key, "created_at", str(time.time()))
+        if self.ttl:
+            pipe.expire(self._session_key, int(self.ttl))
+        pipe.execute()
+
     def get_user_id(self) -> Optional[str]:
         if self._user_id:
             return self._user_id
+        if self._append_only:
+            u = self.backend.hgetall(self._session_key).get("user_id")  # type: ignore[attr-defined]
+            if u and u.strip():
+                return u
         meta = self._load_meta()
         u = meta.get("user_id")
         return u if isinstance(u, str) and u.strip() else None
@@ -144,17 +269,24 @@ class HistoryManager:
         if user_id:
             self.set_user_id(user_id)
 
-        history = self._load_history()
         question_en = (en or pl or "")  # keep non-None string
 
         # IMPORTANT: keep history compact: only original question and final answer.
-        history.append(
-            {
-                "timestamp": time.time(),
-                "user_query": {"pl": pl, "en": question_en},
-                "final_answer": None,
-            }
-        )
+        entry = {
+            "timestamp": time.time(),
+            "user_query": {"pl": pl, "en": question_en},
+            "final_answer": None,
+        }
+        if self._append_only:
+            self._append_event(
+                {"op": "query", "timestamp": entry["timestamp"], "user_query": entry["user_query"]},
+                session_fields={"updated_at": str(entry["timestamp"])},
+            )
+            self._has_open_query = True
+            return
+
+        history = self._load_history()
+        history.append(entry)
         self._save_history(history)
 
     def add_iteration(self, codellama_query: str, faiss_results: list[dict[str, Any]]) -> None:
@@ -178,10 +310,21 @@ class HistoryManager:
         pl : Optional[str]
             Final Polish answer (optional). If not provided, falls back to `en`.
         """
+        final_answer = {"en": en, "pl": (pl or en)}
+        if self._append_only:
+            # A query started through this manager needs no read-back.
+            if not self._has_open_query and not self._read_events():
+                raise RuntimeError("No user query to attach final answer.")
+            self._append_event(
+                {"op": "answer", "final_answer": final_answer},
+                session_fields={"updated_at": str(time.time())},
+            )
+            return
+
         history = self._load_history()
         if not history:
             raise RuntimeError("No user query to attach final answer.")
-        history[-1]["final_answer"] = {"en": en, "pl": (pl or en)}
+        history[-1]["final_answer"] = final_answer
         self._save_history(history)
 
     def get_history(self) -> list[dict[str, Any]]:
@@ -190,8 +333,14 @@ class HistoryManager:
 
     def clear_history(self) -> None:
         """Delete the entire session history for the current session id (and its metadata)."""
-        self.backend.delete(self.session_id)
-        self.backend.delete(self._meta_key)
+        keys = [self.session_id, self._meta_key]
+        if self._append_only:
+            keys += [self._events_key, self._session_key]
+        self.backend.delete_many(keys)
+        if self._append_only:
+            self._materialized = None
+            self._events_read = 0
+            self._has_open_query = False
 
     def get_context_blocks(self) -> list[str]:
         """
@@ -1,18 +1,245 @@
-from typing import Optional
-from .history_backend import HistoryBackend
+import threading
+import time
+from typing import Any, Callable, Iterable, Mapping, Optional
 
-class InMemoryMockRedis(HistoryBackend):
-    """Prosty mock backend historii w pamięci."""
-    def __init__(self):
+from .backend_metrics import BackendLatencyStats, timed_op
+from .history_backend import AppendOnlyHistoryBackend, HistoryConflictError, namespace_ttl
+
+
+class InMemoryMockRedis(AppendOnlyHistoryBackend):
+    """
+    Prosty mock backend historii w pamięci (strings, lists, hashes, TTL, pipeline).
+
+    Mirrors the RedisBackend semantics used by the app: namespace TTLs for set(), batched
+    mget/set_many/delete_many, optimistic `update()` (a per-key version plays the role of
+    WATCH: `fn` runs outside the lock and the write is retried if the key changed meanwhile)
+    and `stats()` latency metrics.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        *,
+        namespace_ttls: Optional[Mapping[str, int]] = None,
+        watch_retries: int = 5,
+    ):
         self.storage: dict[str, str] = {}
+        self.lists: dict[str, list[str]] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+        self._deadlines: dict[str, float] = {}
+        self._versions: dict[str, int] = {}
+        self._write_seq = 0
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._namespace_ttls = dict(namespace_ttls or {})
+        self._watch_retries = max(1, int(watch_retries))
+        self._metrics = BackendLatencyStats()
+
+    # TTL bookkeeping: expired keys are dropped lazily on access, like Redis.
+    def _expire_if_due(self, key: str) -> None:
+        deadline = self._deadlines.get(key)
+        if deadline is not None and deadline <= self._clock():
+            self._drop(key)
+
+    def _drop(self, key: str) -> bool:
+        self._deadlines.pop(key, None)
+        found = False
+        for store in (self.storage, self.lists, self.hashes):
+            if store.pop(key, None) is not None:
+                found = True
+        if found:
+            self._touch(key)
+        return found
+
+    def _touch(self, key: str) -> None:
+        # Any modification (including expiry) invalidates a pending update(), like WATCH.
+        self._write_seq += 1
+        self._versions[key] = self._write_seq
+
+    def _exists(self, key: str) -> bool:
+        return key in self.storage or key in self.lists or key in self.hashes
 
+    # strings
+    @timed_op("get")
     def get(self, key: str) -> Optional[str]:
-        return self.storage.get(key)
+        with self._lock:
+            self._expire_if_due(key)
+            return self.storage.get(key)
 
+    @timed_op("set")
     def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
-        """Ustawia wartość w pamięci, TTL jest ignorowany w mocku."""
+        """Ustawia wartość w pamięci; `ttl` (sekundy) działa jak SET ... EX, domyślnie TTL przestrzeni nazw."""
+        with self._lock:
+            self._set_locked(key, value, ttl)
+
+    def _set_locked(self, key: str, value: str, ttl: Optional[int]) -> None:
+        self._drop(key)
         self.storage[key] = value
+        self._touch(key)
+        ttl = ttl or namespace_ttl(self._namespace_ttls, key)
+        if ttl:
+            self._deadlines[key] = self._clock() + float(ttl)
 
+    @timed_op("delete")
     def delete(self, key: str) -> None:
-        self.storage.pop(key, None)
+        with self._lock:
+            self._drop(key)
+
+    @timed_op("mget")
+    def mget(self, keys: Iterable[str]) -> list[Optional[str]]:
+        with self._lock:
+            out: list[Optional[str]] = []
+            for key in keys:
+                self._expire_if_due(key)
+                out.append(self.storage.get(key))
+            return out
+
+    @timed_op("set_many")
+    def set_many(self, mapping: Mapping[str, str], ttl: Optional[int] = None) -> None:
+        with self._lock:
+            for key, value in mapping.items():
+                self._set_locked(key, value, ttl)
+
+    @timed_op("delete_many")
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._drop(key)
+
+    @timed_op("update")
+    def update(
+        self,
+        key: str,
+        fn: Callable[[Optional[str]], Optional[str]],
+        *,
+        ttl: Optional[int] = None,
+    ) -> Optional[str]:
+        for _ in range(self._watch_retries):
+            with self._lock:
+                self._expire_if_due(key)
+                version = self._versions.get(key)
+                current = self.storage.get(key)
+            new = fn(current)
+            with self._lock:
+                self._expire_if_due(key)
+                if self._versions.get(key) != version:
+                    self._metrics.incr("update_conflicts")
+                    continue
+                if new is None:
+                    return current
+                self._set_locked(key, new, ttl)
+                return new
+        self._metrics.incr("update_gave_up")
+        raise HistoryConflictError(f"update({key!r}): key changed on every attempt ({self._watch_retries})")
+
+    @timed_op("expire")
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            self._expire_if_due(key)
+            if not self._exists(key):
+                return False
+            self._deadlines[key] = self._clock() + float(seconds)
+            self._touch(key)
+            return True
+
+    def ttl(self, key: str) -> int:
+        """Redis TTL semantics: -2 missing key, -1 no expiry, else remaining seconds."""
+        with self._lock:
+            self._expire_if_due(key)
+            if not self._exists(key):
+                return -2
+            deadline = self._deadlines.get(key)
+            return -1 if deadline is None else max(0, int(round(deadline - self._clock())))
+
+    # lists
+    @timed_op("rpush")
+    def rpush(self, key: str, *values: str) -> int:
+        with self._lock:
+            self._expire_if_due(key)
+            items = self.lists.setdefault(key, [])
+            items.extend(str(v) for v in values)
+            self._touch(key)
+            return len(items)
+
+    @timed_op("lpush")
+    def lpush(self, key: str, *values: str) -> int:
+        with self._lock:
+            self._expire_if_due(key)
+            items = self.lists.setdefault(key, [])
+            for v in values:
+                items.insert(0, str(v))
+            self._touch(key)
+            return len(items)
+
+    @timed_op("lrange")
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        with self._lock:
+            self._expire_if_due(key)
+            items = self.lists.get(key) or []
+            n = len(items)
+            start = max(0, n + start if start < 0 else start)
+            end = n + end if end < 0 else end
+            return list(items[start : end + 1])
+
+    def llen(self, key: str) -> int:
+        with self._lock:
+            self._expire_if_due(key)
+            return len(self.lists.get(key) or [])
+
+    # hashes
+    @timed_op("hset")
+    def hset(self, key: str, mapping: dict[str, str]) -> int:
+        with self._lock:
+            self._expire_if_due(key)
+            h = self.hashes.setdefault(key, {})
+            added = sum(1 for k in mapping if str(k) not in h)
+            h.update({str(k): str(v) for k, v in mapping.items()})
+            self._touch(key)
+            return added
+
+    @timed_op("hsetnx")
+    def hsetnx(self, key: str, field: str, value: str) -> bool:
+        with self._lock:
+            self._expire_if_due(key)
+            h = self.hashes.setdefault(key, {})
+            if field in h:
+                return False
+            h[field] = str(value)
+            self._touch(key)
+            return True
+
+    @timed_op("hgetall")
+    def hgetall(self, key: str) -> dict[str, str]:
+        with self._lock:
+            self._expire_if_due(key)
+            return dict(self.hashes.get(key) or {})
+
+    def pipeline(self) -> "_MockPipeline":
+        return _MockPipeline(self)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            keys = len(self.storage) + len(self.lists) + len(self.hashes)
+        return {"backend": "memory", "keys": keys, "namespace_ttls": dict(self._namespace_ttls), **self._metrics.snapshot()}
+
+
+class _MockPipeline:
+    """Queues commands and runs them under the mock lock (atomic, like MULTI/EXEC)."""
+
+    def __init__(self, owner: InMemoryMockRedis):
+        self._owner = owner
+        self._calls: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        target = getattr(self._owner, name)
+
+        def _queue(*args: Any, **kwargs: Any) -> "_MockPipeline":
+            self._calls.append((name, args, kwargs))
+            return self
+
+        return _queue if callable(target) else target
 
+    def execute(self) -> list[Any]:
+        calls, self._calls = self._calls, []
+        with self._owner._metrics.timed("pipeline"), self._owner._lock:
+            return [getattr(self._owner, name)(*args, **kwargs) for name, args, kwargs in calls]
@@ -1,17 +1,207 @@
+import os
+from typing import Any, Callable, Iterable, Mapping, Optional
+
 import redis
-from typing import Optional
-from .history_backend import HistoryBackend
 
-class RedisBackend(HistoryBackend):
-    """Backend historii korzystający z prawdziwego Redis."""
-    def __init__(self, host: str = "localhost", port: int = 6379):
-        self.client = redis.Redis(host=host, port=port, decode_responses=True)
+from .backend_metrics import BackendLatencyStats, timed_op
+from .history_backend import AppendOnlyHistoryBackend, HistoryConflictError, namespace_ttl, parse_namespace_ttls
+
+
+class RedisBackend(AppendOnlyHistoryBackend):
+    """
+    Backend historii korzystający z prawdziwego Redis.
+
+    - One bounded BlockingConnectionPool per process: callers wait up to `pool_timeout` for a
+      free connection instead of opening unbounded sockets. redis-py rebuilds the pool in a
+      forked child on first use, so pre-fork workers never share sockets.
+    - `namespace_ttls` maps key prefixes to TTLs; set()/set_many()/update() without an
+      explicit ttl use the longest matching prefix.
+    - `update()` is an optimistic WATCH/MULTI/EXEC read-modify-write retried on WatchError.
+    - Every command and pipeline is timed; see `stats()`.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        url: Optional[str] = None,
+        db: int = 0,
+        password: Optional[str] = None,
+        max_connections: int = 50,
+        pool_timeout: float = 5.0,
+        socket_timeout: Optional[float] = 5.0,
+        socket_connect_timeout: Optional[float] = 2.0,
+        health_check_interval: int = 30,
+        namespace_ttls: Optional[Mapping[str, int]] = None,
+        watch_retries: int = 5,
+        client: Any = None,
+    ):
+        if client is None:
+            pool_kwargs: dict[str, Any] = dict(
+                max_connections=int(max_connections),
+                timeout=float(pool_timeout),
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_connect_timeout,
+                health_check_interval=int(health_check_interval),
+                decode_responses=True,
+            )
+            if url:
+                pool = redis.BlockingConnectionPool.from_url(url, **pool_kwargs)
+            else:
+                pool = redis.BlockingConnectionPool(host=host, port=port, db=db, password=password, **pool_kwargs)
+            client = redis.Redis(connection_pool=pool)
+        self.client = client
+        self._max_connections = int(max_connections)
+        self._namespace_ttls = dict(namespace_ttls or {})
+        self._watch_retries = max(1, int(watch_retries))
+        self._metrics = BackendLatencyStats()
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> "RedisBackend":
+        env = os.environ if env is None else env
+
+        def _num(name: str, default: float) -> float:
+            raw = (env.get(name) or "").strip()
+            return float(raw) if raw else default
+
+        return cls(
+            url=(env.get("APP_REDIS_URL") or "redis://localhost:6379/0").strip(),
+            max_connections=int(_num("APP_REDIS_MAX_CONNECTIONS", 50)),
+            pool_timeout=_num("APP_REDIS_POOL_TIMEOUT_S", 5.0),
+            socket_timeout=_num("APP_REDIS_SOCKET_TIMEOUT_S", 5.0),
+            socket_connect_timeout=_num("APP_REDIS_CONNECT_TIMEOUT_S", 2.0),
+            namespace_ttls=parse_namespace_ttls(env.get("APP_REDIS_NAMESPACE_TTLS") or ""),
+            watch_retries=int(_num("APP_REDIS_WATCH_RETRIES", 5)),
+        )
 
+    def _ttl_for(self, key: str, ttl: Optional[int]) -> Optional[int]:
+        return ttl or namespace_ttl(self._namespace_ttls, key)
+
+    @timed_op("get")
     def get(self, key: str) -> Optional[str]:
         return self.client.get(key)
 
-    def set(self, key: str, value: str) -> None:
-        self.client.set(key, value)
+    @timed_op("set")
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self.client.set(key, value, ex=self._ttl_for(key, ttl))
 
+    @timed_op("delete")
     def delete(self, key: str) -> None:
         self.client.delete(key)
+
+    @timed_op("mget")
+    def mget(self, keys: Iterable[str]) -> list[Optional[str]]:
+        keys = list(keys)
+        return list(self.client.mget(keys)) if keys else []
+
+    @timed_op("set_many")
+    def set_many(self, mapping: Mapping[str, str], ttl: Optional[int] = None) -> None:
+        if not mapping:
+            return
+        # MSET has no per-key expiry: one non-transactional pipeline keeps it to a single round trip.
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, value, ex=self._ttl_for(key, ttl))
+        pipe.execute()
+
+    @timed_op("delete_many")
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if keys:
+            self.client.delete(*keys)
+
+    @timed_op("update")
+    def update(
+        self,
+        key: str,
+        fn: Callable[[Optional[str]], Optional[str]],
+        *,
+        ttl: Optional[int] = None,
+    ) -> Optional[str]:
+        with self.client.pipeline(transaction=True) as pipe:
+            for _ in range(self._watch_retries):
+                try:
+                    pipe.watch(key)
+                    current = pipe.get(key)
+                    new = fn(current)
+                    if new is None:
+                        pipe.unwatch()
+                        return current
+                    pipe.multi()
+                    pipe.set(key, new, ex=self._ttl_for(key, ttl))
+                    pipe.execute()
+                    return new
+                except redis.WatchError:
+                    self._metrics.incr("update_conflicts")
+        self._metrics.incr("update_gave_up")
+        raise HistoryConflictError(f"update({key!r}): key changed on every attempt ({self._watch_retries})")
+
+    @timed_op("expire")
+    def expire(self, key: str, seconds: int) -> bool:
+        return bool(self.client.expire(key, seconds))
+
+    @timed_op("rpush")
+    def rpush(self, key: str, *values: str) -> int:
+        return int(self.client.rpush(key, *values))
+
+    @timed_op("lpush")
+    def lpush(self, key: str, *values: str) -> int:
+        return int(self.client.lpush(key, *values))
+
+    @timed_op("lrange")
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        return list(self.client.lrange(key, start, end))
+
+    @timed_op("hset")
+    def hset(self, key: str, mapping: dict[str, str]) -> int:
+        return int(self.client.hset(key, mapping=mapping))
+
+    @timed_op("hsetnx")
+    def hsetnx(self, key: str, field: str, value: str) -> bool:
+        return bool(self.client.hsetnx(key, field, value))
+
+    @timed_op("hgetall")
+    def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.client.hgetall(key))
+
+    def pipeline(self) -> "_TimedPipeline":
+        # MULTI/EXEC: the queued commands of one history write apply atomically.
+        return _TimedPipeline(self, self.client.pipeline(transaction=True))
+
+    def stats(self) -> dict[str, Any]:
+        created = getattr(getattr(self.client, "connection_pool", None), "_connections", None)
+        return {
+            "backend": "redis",
+            "max_connections": self._max_connections,
+            "connections_created": len(created) if created is not None else None,
+            "namespace_ttls": dict(self._namespace_ttls),
+            **self._metrics.snapshot(),
+        }
+
+
+class _TimedPipeline:
+    """redis-py pipeline wrapper: applies namespace TTLs to set() and times execute()."""
+
+    def __init__(self, owner: RedisBackend, pipe: Any):
+        self._owner = owner
+        self._pipe = pipe
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> "_TimedPipeline":
+        self._pipe.set(key, value, ex=self._owner._ttl_for(key, ttl))
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        target = getattr(self._pipe, name)
+        if not callable(target):
+            return target
+
+        def _queue(*args: Any, **kwargs: Any) -> "_TimedPipeline":
+            target(*args, **kwargs)
+            return self
+
+        return _queue
+
+    def execute(self) -> list[Any]:
+        with self._owner._metrics.timed("pipeline"):
+            return self._pipe.execute()
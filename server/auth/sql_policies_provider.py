@@ -4,6 +4,8 @@ from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Dict, Iterable, List, Optional, Tuple
 
+from code_query_engine import serving
+
 from .policies_provider import AuthPoliciesProvider, GroupPolicy
 
 
@@ -523,7 +525,10 @@ class SqlAuthPoliciesProvider:
             connect_args["connect_timeout"] = int(self._connect_timeout_seconds)
         elif self._database_type == "mssql":
             connect_args["timeout"] = int(self._connect_timeout_seconds)
-        self._engine_instance = create_engine(self._connection_url, pool_pre_ping=True, connect_args=connect_args)
+        engine = create_engine(self._connection_url, pool_pre_ping=True, connect_args=connect_args)
+        # Pooled connections opened before a fork belong to the parent process.
+        serving.register_post_fork("sql-engine", lambda: engine.dispose(close=False))
+        self._engine_instance = engine
         return self._engine_instance
 
 
@@ -41,7 +41,7 @@ class ChatSession(Base):
     tags: Mapped[list["ChatSessionTag"]] = relationship(back_populates="session")
 
     __table_args__ = (
-        Index("ix_chat_sessions_tenant_user_updated", "tenant_id", "user_id", "updated_at"),
+        Index("ix_chat_sessions_tenant_user_updated_id", "tenant_id", "user_id", "updated_at", "id"),
         Index("ix_chat_sessions_tenant_deleted", "tenant_id", "deleted_at"),
     )
 
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import json
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Any, Callable, Dict, Iterable, List, Optional
 
+from code_query_engine import serving
 from code_query_engine.conversation_history.ports import IUserConversationStore
 from code_query_engine.conversation_history.types import ConversationTurn
 
@@ -66,6 +67,62 @@ def _dt_to_ms(value: Any) -> Optional[int]:
     return None
 
 
+def _as_utc_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _encode_session_cursor(updated_at: Any, session_id: str) -> Optional[str]:
+    # Microsecond precision: the cursor must compare equal to the stored updated_at.
+    dt = _as_utc_datetime(updated_at)
+    if dt is None:
+        return None
+    delta = dt - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}:{session_id}"
+
+
+def _decode_session_cursor(cursor: Optional[str]) -> tuple[Optional[datetime], Optional[str]]:
+    """
+    Returns (updated_at, session_id) of the last row of the previous page.
+
+    Cursors from before keyset pagination are a bare `updatedAt` in ms (session_id None).
+    """
+    raw = str(cursor or "").strip()
+    if not raw:
+        return None, None
+    stamp, sep, session_id = raw.partition(":")
+    try:
+        value = int(stamp)
+    except ValueError:
+        return None, None
+    if sep:
+        return datetime.fromtimestamp(value // 1_000_000, timezone.utc).replace(microsecond=value % 1_000_000), session_id
+    return datetime.fromtimestamp(value / 1000.0, timezone.utc), None
+
+
+# Above this many tenant-wide title matches the FTS row list costs more than scanning the user's sessions.
+_FTS_SELECTIVE_MAX_MATCHES = 1000
+
+
+# append_messages: rows per INSERT statement (MSSQL allows 2100 parameters, a message row takes 9).
+_APPEND_ROWS_PER_INSERT = 200
+
+
+def _like_contains(term: str) -> str:
+    """LIKE pattern for a substring match; always use it with `ESCAPE '!'` (the default escape differs per dialect)."""
+    escaped = term
+    for ch in ("!", "%", "_", "["):
+        escaped = escaped.replace(ch, "!" + ch)
+    return f"%{escaped}%"
+
+
 def _loads_meta(raw: Any) -> Any:
     text = str(raw or "").strip()
     if not text:
@@ -97,8 +154,10 @@ class SqlChatHistoryStore:
         self._connection_url = str(connection_url or "").strip()
         self._connect_timeout_seconds = max(1, int(connect_timeout_seconds or 5))
         self._engine_instance = None
-        if self._database_type not in {"postgres", "mysql", "mssql"}:
-            raise ValueError("SqlChatHistoryStore requires database_type in {'postgres','mysql','mssql'}")
+        self._sqlite_title_fts: Optional[bool] = None
+        # sqlite: local benchmarks and tests (schema: create_sqlite_schema).
+        if self._database_type not in {"postgres", "mysql", "mssql", "sqlite"}:
+            raise ValueError("SqlChatHistoryStore requires database_type in {'postgres','mysql','mssql','sqlite'}")
         if not self._connection_url:
             raise ValueError("SqlChatHistoryStore requires a non-empty connection_url")
 
@@ -117,7 +176,27 @@ class SqlChatHistoryStore:
         user_id = _safe_user_id(user_id)
         lim = max(1, min(200, int(limit or 50)))
         qn = str(q or "").strip().lower()
+        params: Dict[str, Any] = {
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "important_tag": "important",
+            "row_limit": lim + 1,
+        }
+        # Keyset pagination on (updated_at, id): served by ix_chat_sessions_tenant_user_updated_id.
+        where = ["s.tenant_id = :tenant_id", "s.user_id = :user_id", "s.deleted_at IS NULL"]
+        cursor_updated_at, cursor_id = _decode_session_cursor(cursor)
+        if cursor_updated_at is not None:
+            params["cursor_updated_at"] = cursor_updated_at
+            if cursor_id is None:
+                where.append("s.updated_at < :cursor_updated_at")
+            else:
+                params["cursor_id"] = cursor_id
+                where.append(
+                    "(s.updated_at < :cursor_updated_at OR (s.updated_at = :cursor_updated_at AND s.id < :cursor_id))"
+                )
         with self._engine().connect() as conn:
+            if qn:
+                where.append(self._title_search_clause(conn, qn, params))
             rows = conn.execute(
                 text(
                     f"""
@@ -140,29 +219,71 @@ class SqlChatHistoryStore:
                           AND t.name = :important_tag
                       ) THEN 1 ELSE 0 END AS important
                     FROM {self._tn('chat_sessions')} s
-                    WHERE s.tenant_id = :tenant_id
-                      AND s.user_id = :user_id
-                      AND s.deleted_at IS NULL
+                    WHERE {" AND ".join(where)}
                     ORDER BY s.updated_at DESC, s.id DESC
+                    {self._row_limit_clause()}
                     """
                 ),
-                {"tenant_id": tenant_id, "user_id": user_id, "important_tag": "important"},
+                params,
             ).mappings().all()
 
-        items = [self._session_payload(row) for row in rows]
-        if qn:
-            items = [item for item in items if qn in str(item.get("title") or "").lower()]
-
-        start_idx = 0
-        cur = str(cursor or "").strip()
-        if cur:
-            for idx, item in enumerate(items):
-                if str(item.get("updatedAt")) == cur:
-                    start_idx = idx + 1
-                    break
-        sliced = items[start_idx : start_idx + lim]
-        next_cursor = str(sliced[-1]["updatedAt"]) if len(sliced) == lim else None
-        return {"items": sliced, "next_cursor": next_cursor}
+        page = rows[:lim]
+        next_cursor = None
+        if len(rows) > lim:
+            next_cursor = _encode_session_cursor(page[-1].get("updated_at"), str(page[-1].get("session_id") or ""))
+        return {"items": [self._session_payload(row) for row in page], "next_cursor": next_cursor}
+
+    def _title_search_clause(self, conn, term: str, params: Dict[str, Any]) -> str:
+        """
+        Case-insensitive title substring filter.
+
+        - postgres: LOWER(title) LIKE; the planner picks the pg_trgm index ix_chat_sessions_title_trgm
+          for selective terms and the keyset index scan for common ones;
+        - sqlite: the FTS5 trigram table chat_sessions_title_fts for selective terms of 3+ chars
+          without LIKE wildcards (SQLite has no statistics for that choice: a capped probe decides);
+        - otherwise LIKE evaluated on the user's rows of the keyset index, which stops once the
+          page is full.
+
+        The LIKE always carries `ESCAPE '!'`: PostgreSQL and MySQL treat a backslash as the default
+        escape, so a term like `c:\\temp` would not match itself without it. FTS5 does not use the
+        trigram index for LIKE ... ESCAPE, so only terms with nothing to escape go that way.
+        """
+        from sqlalchemy import text  # type: ignore
+
+        pattern = _like_contains(term)
+        params["title_like"] = pattern
+        plain = pattern == f"%{term}%"
+        if self._database_type == "sqlite" and plain and len(term) >= 3 and self._has_sqlite_title_fts(conn):
+            probe = conn.execute(
+                text(
+                    """
+                    SELECT COUNT(*) FROM (
+                      SELECT 1 FROM chat_sessions_title_fts WHERE title LIKE :title_like LIMIT :probe_cap
+                    ) p
+                    """
+                ),
+                {"title_like": pattern, "probe_cap": _FTS_SELECTIVE_MAX_MATCHES},
+            ).scalar()
+            if int(probe or 0) < _FTS_SELECTIVE_MAX_MATCHES:
+                return "s.rowid IN (SELECT rowid FROM chat_sessions_title_fts WHERE title LIKE :title_like)"
+        return "LOWER(s.title) LIKE :title_like ESCAPE '!'"
+
+    def _has_sqlite_title_fts(self, conn) -> bool:
+        from sqlalchemy import text  # type: ignore
+
+        if self._sqlite_title_fts is None:
+            self._sqlite_title_fts = (
+                conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_sessions_title_fts'")
+                ).first()
+                is not None
+            )
+        return self._sqlite_title_fts
+
+    def _row_limit_clause(self) -> str:
+        if self._database_type == "mssql":
+            return "OFFSET 0 ROWS FETCH NEXT :row_limit ROWS ONLY"
+        return "LIMIT :row_limit"
 
     def create_session(
         self,
@@ -397,114 +518,174 @@ class SqlChatHistoryStore:
         a: str,
         meta: Any,
     ) -> dict:
+        return self.append_messages(
+            tenant_id=tenant_id,
+            user_id=user_id,
+            session_id=session_id,
+            messages=[{"message_id": message_id, "q": q, "a": a, "meta": meta}],
+        )[0]
+
+    def append_messages(
+        self,
+        *,
+        tenant_id: str,
+        user_id: str,
+        session_id: str,
+        messages: Iterable[Dict[str, Any]],
+    ) -> List[dict]:
+        """
+        Appends messages (dicts with message_id, q, a, meta) to a session in one transaction.
+
+        Statements: tenant upsert, session upsert, one multi-row message insert per
+        `_APPEND_ROWS_PER_INSERT` messages and one session update (count, updated_at, title),
+        whatever the batch size. Message ids already stored in the session are kept as they are
+        (idempotent retries); only then one more SELECT reads them back (always on MySQL, whose
+        rowcount does not tell them apart). Returns the message payloads in input order.
+        """
         from sqlalchemy import text  # type: ignore
 
         tenant_id = _safe_tenant_id(tenant_id)
         user_id = _safe_user_id(user_id)
         session_id = _safe_session_id(session_id)
-        message_id = _safe_message_id(message_id)
         now = _utcnow()
-        with self._engine().begin() as conn:
-            self._ensure_tenant(conn, tenant_id=tenant_id)
-            session = self._get_session_row(
-                conn,
-                tenant_id=tenant_id,
-                user_id=user_id,
-                session_id=session_id,
-                include_deleted=True,
-            )
-            if session is None:
-                conn.execute(
-                    text(
-                        f"""
-                        INSERT INTO {self._tn('chat_sessions')}
-                          (id, tenant_id, user_id, title, consultant_id, message_count, created_at, updated_at, deleted_at, deleted_by)
-                        VALUES
-                          (:id, :tenant_id, :user_id, :title, :consultant_id, :message_count, :created_at, :updated_at, :deleted_at, :deleted_by)
-                        """
-                    ),
-                    {
-                        "id": session_id,
-                        "tenant_id": tenant_id,
-                        "user_id": user_id,
-                        "title": "New chat",
-                        "consultant_id": "",
-                        "message_count": 0,
-                        "created_at": now,
-                        "updated_at": now,
-                        "deleted_at": None,
-                        "deleted_by": None,
-                    },
-                )
-            existing_message = conn.execute(
-                text(
-                    f"""
-                    SELECT
-                      id AS message_id,
-                      session_id AS session_id,
-                      ts AS ts,
-                      q AS q,
-                      a AS a,
-                      meta_json AS meta_json,
-                      deleted_at AS deleted_at
-                    FROM {self._tn('chat_messages')}
-                    WHERE id = :id AND session_id = :session_id AND tenant_id = :tenant_id
-                    """
-                ),
-                {"id": message_id, "session_id": session_id, "tenant_id": tenant_id},
-            ).mappings().first()
-            if existing_message is not None:
-                return self._message_payload(existing_message)
-            conn.execute(
-                text(
-                    f"""
-                    INSERT INTO {self._tn('chat_messages')}
-                      (id, session_id, tenant_id, ts, q, a, meta_json, deleted_at, deleted_by)
-                    VALUES
-                      (:id, :session_id, :tenant_id, :ts, :q, :a, :meta_json, :deleted_at, :deleted_by)
-                    """
-                ),
+        rows: List[Dict[str, Any]] = []
+        seen = set()
+        for msg in messages:
+            message_id = _safe_message_id(msg.get("message_id"))
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+            rows.append(
                 {
                     "id": message_id,
                     "session_id": session_id,
                     "tenant_id": tenant_id,
-                    "ts": now,
-                    "q": str(q or ""),
-                    "a": str(a or ""),
-                    "meta_json": _dumps_meta(meta),
+                    # Distinct ts keep the batch order (list_messages orders by ts).
+                    "ts": now + timedelta(microseconds=len(rows)),
+                    "q": str(msg.get("q") or ""),
+                    "a": str(msg.get("a") or ""),
+                    "meta_json": _dumps_meta(msg.get("meta")),
                     "deleted_at": None,
                     "deleted_by": None,
-                },
+                }
             )
-            title = str(q or "").replace("\n", " ").strip()[:64]
-            self._touch_session_after_message(
-                conn,
-                tenant_id=tenant_id,
-                user_id=user_id,
-                session_id=session_id,
-                title_hint=title,
-                now=now,
+        if not rows:
+            return []
+        title = next((str(r["q"]).replace("\n", " ").strip()[:64] for r in rows if str(r["q"]).strip()), "")
+
+        with self._engine().begin() as conn:
+            conn.execute(
+                text(self._insert_if_absent_sql("chat_tenants", ["id", "name", "created_at"], 1)),
+                {"id_0": tenant_id, "name_0": tenant_id, "created_at_0": now},
+            )
+            session_row = {
+                "id": session_id,
+                "tenant_id": tenant_id,
+                "user_id": user_id,
+                "title": "New chat",
+                "consultant_id": "",
+                "message_count": 0,
+                "created_at": now,
+                "updated_at": now,
+                "deleted_at": None,
+                "deleted_by": None,
+            }
+            conn.execute(
+                text(self._insert_if_absent_sql("chat_sessions", list(session_row), 1)),
+                {f"{k}_0": v for k, v in session_row.items()},
             )
-            row = conn.execute(
+            inserted = 0
+            # MySQL: SQLAlchemy connects with CLIENT_FOUND_ROWS, so a skipped duplicate also counts
+            # as 1 affected row; the rowcount cannot tell new rows from retried ones.
+            rowcount_exact = self._database_type != "mysql"
+            columns = list(rows[0])
+            for start in range(0, len(rows), _APPEND_ROWS_PER_INSERT):
+                chunk = rows[start : start + _APPEND_ROWS_PER_INSERT]
+                params = {f"{k}_{i}": v for i, row in enumerate(chunk) for k, v in row.items()}
+                result = conn.execute(text(self._insert_if_absent_sql("chat_messages", columns, len(chunk))), params)
+                inserted += max(0, int(result.rowcount or 0))
+
+            params = {"id": session_id, "tenant_id": tenant_id, "user_id": user_id}
+            set_parts = [
+                f"""message_count = (
+                      SELECT COUNT(*)
+                      FROM {self._tn('chat_messages')} m
+                      WHERE m.session_id = :id AND m.tenant_id = :tenant_id AND m.deleted_at IS NULL
+                    )"""
+            ]
+            if inserted or not rowcount_exact:
+                params["updated_at"] = now
+                set_parts.append("updated_at = :updated_at")
+                if title:
+                    params["title"] = title
+                    set_parts.append(
+                        "title = CASE WHEN title IS NULL OR LOWER(LTRIM(RTRIM(title))) IN ('', 'new chat', 'nowy czat')"
+                        " THEN :title ELSE title END"
+                    )
+            # The session id exists (upsert above); no match means it belongs to another user.
+            touched = conn.execute(
+                text(
+                    f"""
+                    UPDATE {self._tn('chat_sessions')}
+                    SET {", ".join(set_parts)}
+                    WHERE id = :id AND tenant_id = :tenant_id AND user_id = :user_id
+                    """
+                ),
+                params,
+            ).rowcount
+            if not touched:
+                raise ValueError(f"Chat session {session_id!r} belongs to another tenant or user.")
+            if rowcount_exact and inserted == len(rows):
+                return [self._message_payload({**row, "message_id": row["id"]}) for row in rows]
+
+            id_params = {f"id_{i}": row["id"] for i, row in enumerate(rows)}
+            stored = conn.execute(
                 text(
                     f"""
                     SELECT
                       id AS message_id,
                       session_id AS session_id,
+                      tenant_id AS tenant_id,
                       ts AS ts,
                       q AS q,
                       a AS a,
                       meta_json AS meta_json,
                       deleted_at AS deleted_at
                     FROM {self._tn('chat_messages')}
-                    WHERE id = :id
+                    WHERE id IN ({", ".join(":" + k for k in id_params)})
                     """
                 ),
-                {"id": message_id},
-            ).mappings().first()
-            if row is None:
-                raise RuntimeError("Failed to create SQL chat message.")
-            return self._message_payload(row)
+                id_params,
+            ).mappings().all()
+            by_id = {str(row["message_id"]): row for row in stored}
+            out = []
+            for row in rows:
+                found = by_id.get(row["id"])
+                if found is None or found["session_id"] != session_id or found["tenant_id"] != tenant_id:
+                    raise ValueError(f"Chat message id {row['id']!r} is already used by another session.")
+                out.append(self._message_payload(found))
+            return out
+
+    def _insert_if_absent_sql(self, table_name: str, columns: List[str], row_count: int) -> str:
+        """
+        Multi-row INSERT that skips rows whose primary key (`id`) already exists.
+
+        Parameters are named `<column>_<row>`; the statement's rowcount is the number of inserted rows
+        (except on MySQL, see append_messages).
+        """
+        table = self._tn(table_name)
+        cols = ", ".join(columns)
+        values = ", ".join("(" + ", ".join(f":{c}_{i}" for c in columns) + ")" for i in range(row_count))
+        if self._database_type == "mysql":
+            # Not INSERT IGNORE: that also downgrades truncation and FK errors to warnings.
+            return f"INSERT INTO {table} ({cols}) VALUES {values} ON DUPLICATE KEY UPDATE id = id"
+        if self._database_type == "mssql":
+            src_cols = ", ".join(f"src.{c}" for c in columns)
+            return (
+                f"MERGE INTO {table} WITH (HOLDLOCK) AS tgt USING (VALUES {values}) AS src ({cols}) "
+                f"ON tgt.id = src.id WHEN NOT MATCHED THEN INSERT ({cols}) VALUES ({src_cols});"
+            )
+        return f"INSERT INTO {table} ({cols}) VALUES {values} ON CONFLICT (id) DO NOTHING"
 
     def _touch_session_after_message(self, conn, *, tenant_id: str, user_id: str, session_id: str, title_hint: str, now: datetime) -> None:
         from sqlalchemy import text  # type: ignore
@@ -705,7 +886,7 @@ class SqlChatHistoryStore:
         }
 
     def _tn(self, table_name: str) -> str:
-        if self._database_type == "mysql":
+        if self._database_type in {"mysql", "sqlite"}:
             return table_name
         return f"history.{table_name}"
 
@@ -717,12 +898,57 @@ class SqlChatHistoryStore:
         connect_args = {}
         if self._database_type in {"postgres", "mysql"}:
             connect_args["connect_timeout"] = int(self._connect_timeout_seconds)
-        elif self._database_type == "mssql":
+        elif self._database_type in {"mssql", "sqlite"}:
             connect_args["timeout"] = int(self._connect_timeout_seconds)
-        self._engine_instance = create_engine(self._connection_url, pool_pre_ping=True, connect_args=connect_args)
+        engine = create_engine(self._connection_url, pool_pre_ping=True, connect_args=connect_args)
+        # Pooled connections opened before a fork belong to the parent process.
+        serving.register_post_fork("sql-engine", lambda: engine.dispose(close=False))
+        self._engine_instance = engine
         return self._engine_instance
 
 
+# External-content FTS5 index over chat_sessions.title, kept in sync by triggers.
+_SQLITE_TITLE_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_sessions_title_fts
+    USING fts5(title, content='chat_sessions', content_rowid='rowid', tokenize='trigram')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_title_fts_ai AFTER INSERT ON chat_sessions BEGIN
+      INSERT INTO chat_sessions_title_fts (rowid, title) VALUES (new.rowid, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_title_fts_ad AFTER DELETE ON chat_sessions BEGIN
+      INSERT INTO chat_sessions_title_fts (chat_sessions_title_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_title_fts_au AFTER UPDATE OF title ON chat_sessions
+    WHEN old.title IS NOT new.title BEGIN
+      INSERT INTO chat_sessions_title_fts (chat_sessions_title_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+      INSERT INTO chat_sessions_title_fts (rowid, title) VALUES (new.rowid, new.title);
+    END
+    """,
+)
+
+
+def create_sqlite_schema(engine) -> None:
+    """Create the history tables (models.py) and the title search index on SQLite; idempotent."""
+    from sqlalchemy import text  # type: ignore
+
+    from .models import Base
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        missing = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'chat_sessions_title_fts'")).first() is None
+        for ddl in _SQLITE_TITLE_FTS_DDL:
+            conn.execute(text(ddl))
+        if missing:
+            # Index sessions created before the FTS table existed.
+            conn.execute(text("INSERT INTO chat_sessions_title_fts (chat_sessions_title_fts) VALUES ('rebuild')"))
+
+
 class SqlConversationHistoryStore(IUserConversationStore):
     def __init__(
         self,
@@ -735,6 +961,16 @@ class SqlConversationHistoryStore(IUserConversationStore):
         self._tenant_resolver = tenant_resolver
         self._user_resolver = user_resolver
 
+    def bind_request_context(self) -> "SqlConversationHistoryStore":
+        """Copy with tenant/user resolved now, for writes completed outside the request (write-behind)."""
+        tenant_id = self._tenant_resolver()
+        user_id = self._user_resolver()
+        return SqlConversationHistoryStore(
+            history_store=self._history_store,
+            tenant_resolver=lambda: tenant_id,
+            user_resolver=lambda: user_id,
+        )
+
     def upsert_session_link(self, *, identity_id: str, session_id: str) -> None:
         tenant_id = _safe_tenant_id(self._tenant_resolver())
         user_id = _safe_user_id(identity_id or self._user_resolver())
@@ -746,26 +982,46 @@ class SqlConversationHistoryStore(IUserConversationStore):
             consultant_id="",
         )
 
+    def batch_key(self, *, identity_id: Optional[str], session_id: str) -> tuple[str, str, str]:
+        """(tenant, user, session) a write lands in; writes with equal keys may share one insert_turns call."""
+        return (
+            _safe_tenant_id(self._tenant_resolver()),
+            _safe_user_id(identity_id or self._user_resolver()),
+            _normalize_visible_session_id(session_id),
+        )
+
     def insert_turn(self, *, turn: ConversationTurn) -> None:
-        tenant_id = _safe_tenant_id(self._tenant_resolver())
-        user_id = _safe_user_id(turn.identity_id or self._user_resolver())
-        session_id = _normalize_visible_session_id(turn.session_id)
-        self._history_store.add_message(
+        self.insert_turns(turns=[turn])
+
+    def insert_turns(self, *, turns: List[ConversationTurn]) -> None:
+        """Appends turns of one session (equal batch_key) in one append_messages transaction."""
+        if not turns:
+            return
+        keys = {self.batch_key(identity_id=t.identity_id, session_id=t.session_id) for t in turns}
+        if len(keys) != 1:
+            raise ValueError("SqlConversationHistoryStore.insert_turns: turns must belong to one session and user.")
+        tenant_id, user_id, session_id = keys.pop()
+        self._history_store.append_messages(
             tenant_id=tenant_id,
             user_id=user_id,
             session_id=session_id,
-            message_id=turn.turn_id,
-            q=turn.question_neutral or "",
-            a=turn.answer_neutral or "",
-            meta={
-                "request_id": turn.request_id,
-                "question_translated": turn.question_translated,
-                "answer_translated": turn.answer_translated,
-                "answer_translated_is_fallback": turn.answer_translated_is_fallback,
-                "metadata": dict(turn.metadata or {}),
-                "created_at_utc": turn.created_at_utc,
-                "finalized_at_utc": turn.finalized_at_utc,
-            },
+            messages=[
+                {
+                    "message_id": turn.turn_id,
+                    "q": turn.question_neutral or "",
+                    "a": turn.answer_neutral or "",
+                    "meta": {
+                        "request_id": turn.request_id,
+                        "question_translated": turn.question_translated,
+                        "answer_translated": turn.answer_translated,
+                        "answer_translated_is_fallback": turn.answer_translated_is_fallback,
+                        "metadata": dict(turn.metadata or {}),
+                        "created_at_utc": turn.created_at_utc,
+                        "finalized_at_utc": turn.finalized_at_utc,
+                    },
+                }
+                for turn in turns
+            ],
         )
 
     def upsert_turn_final(
@@ -1,6 +1,8 @@
-from .snapshot_registry import SnapshotInfo, SnapshotRegistry
+from .snapshot_registry import SnapshotInfo, SnapshotRegistry, SnapshotRegistryCache, snapshot_registry_cache
 
 __all__ = [
     "SnapshotInfo",
     "SnapshotRegistry",
+    "SnapshotRegistryCache",
+    "snapshot_registry_cache",
 ]
@@ -1,16 +1,36 @@
 from __future__ import annotations
 
 import logging
+import threading
 import time
+import weakref
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from weaviate.classes.query import Filter
+from weaviate.classes.query import Filter, Sort
 from code_query_engine.weaviate_query_logger import log_weaviate_query
+from common.lru_cache import BoundedLRU
 
 
 LOG = logging.getLogger(__name__)
 
+_DEFAULT_CACHE_TTL_SECONDS = 30.0
+_DEFAULT_CACHE_MAX_ENTRIES = 4096
+# Snapshots without a labelled ImportRun are re-checked after this long (a new import shows up quickly).
+_DEFAULT_NEGATIVE_LABEL_TTL_SECONDS = 5.0
+# Page size of the batched ImportRun label query.
+_IMPORT_LABEL_PAGE_SIZE = 100
+_IMPORT_LABEL_PROPERTIES = [
+    "snapshot_id",
+    "head_sha",
+    "friendly_name",
+    "tag",
+    "ref_name",
+    "branch",
+    "finished_utc",
+    "started_utc",
+]
+
 
 @dataclass(frozen=True)
 class SnapshotInfo:
@@ -19,6 +39,152 @@ class SnapshotInfo:
     label: str
 
 
+class SnapshotRegistryCache:
+    """
+    TTL cache of SnapshotSet records and snapshot labels, each bounded to `max_entries` (LRU).
+
+    One instance is shared by every SnapshotRegistry built on the same Weaviate client
+    (see snapshot_registry_cache), so the /query handler, search_nodes and AppConfigService
+    all hit the same entries. `ttl_seconds <= 0` disables caching.
+    Unknown SnapshotSets are not cached, so a newly created set is visible immediately.
+    Snapshots without a label are cached as "" for `negative_ttl_seconds` (capped by `ttl_seconds`).
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = _DEFAULT_CACHE_TTL_SECONDS,
+        max_entries: int = _DEFAULT_CACHE_MAX_ENTRIES,
+        negative_ttl_seconds: float = _DEFAULT_NEGATIVE_LABEL_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl = float(ttl_seconds)
+        self._negative_ttl = float(negative_ttl_seconds)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sets: BoundedLRU[Tuple[str, str], Tuple[Dict[str, object], float]] = BoundedLRU(max_entries=max_entries)
+        self._labels: BoundedLRU[Tuple[str, str], Tuple[str, float]] = BoundedLRU(max_entries=max_entries)
+        self._invalidations = 0
+        self._label_queries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    def set_ttl(self, ttl_seconds: float) -> None:
+        with self._lock:
+            self._ttl = float(ttl_seconds)
+            if self._ttl <= 0:
+                self._sets.clear()
+                self._labels.clear()
+
+    def get_set(self, key: Tuple[str, str]) -> Optional[Dict[str, object]]:
+        with self._lock:
+            item = self._sets.get(key, record=False)
+            if item is None or item[1] <= self._clock():
+                self._sets.pop(key)
+                self._sets.record_miss()
+                return None
+            self._sets.record_hit()
+            return dict(item[0])
+
+    def put_set(self, key: Tuple[str, str], rec: Dict[str, object]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._sets.put(key, (dict(rec), self._clock() + self._ttl))
+
+    def get_labels(self, repo: str, snapshot_ids: List[str]) -> Tuple[Dict[str, str], List[str]]:
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            now = self._clock()
+            for sid in snapshot_ids:
+                item = self._labels.get((repo, sid), record=False)
+                if item is None or item[1] <= now:
+                    self._labels.pop((repo, sid))
+                    missing.append(sid)
+                else:
+                    found[sid] = item[0]
+            self._labels.record_hit(len(found))
+            self._labels.record_miss(len(missing))
+        return found, missing
+
+    def put_labels(self, repo: str, labels: Dict[str, str]) -> None:
+        """Caches labels; an empty label means "no labelled ImportRun" and expires after the negative TTL."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = self._clock()
+            expires = now + self._ttl
+            negative_expires = now + min(self._ttl, self._negative_ttl)
+            for sid, label in labels.items():
+                if label:
+                    self._labels.put((repo, sid), (label, expires))
+                elif self._negative_ttl > 0:
+                    self._labels.put((repo, sid), ("", negative_expires))
+
+    def note_label_query(self) -> None:
+        with self._lock:
+            self._label_queries += 1
+
+    def invalidate(self, *, snapshot_set_id: Optional[str] = None, snapshot_id: Optional[str] = None) -> int:
+        """
+        Drops cached entries. No arguments: everything. `snapshot_set_id`: that set's records.
+        `snapshot_id`: its label and every cached set (membership may have changed, e.g. after a purge).
+        """
+        with self._lock:
+            if not snapshot_set_id and not snapshot_id:
+                n = self._sets.clear() + self._labels.clear()
+            else:
+                n = 0
+                if snapshot_set_id:
+                    n += len(self._sets.remove_where(lambda k, _: k[0] == snapshot_set_id))
+                if snapshot_id:
+                    n += len(self._labels.remove_where(lambda k, _: k[1] == snapshot_id))
+                    n += self._sets.clear()
+            self._invalidations += n
+            return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sets = self._sets.stats()
+            labels = self._labels.stats()
+            hits = sets["hits"] + labels["hits"]
+            misses = sets["misses"] + labels["misses"]
+            lookups = hits + misses
+            return {
+                "ttl_seconds": self._ttl,
+                "negative_ttl_seconds": min(self._ttl, self._negative_ttl),
+                "max_entries": self._sets.max_entries,
+                "snapshot_sets": sets["entries"],
+                "labels": labels["entries"],
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": (float(hits) / lookups) if lookups else 0.0,
+                "evictions": sets["evictions"] + labels["evictions"],
+                "invalidations": self._invalidations,
+                "import_run_label_queries": self._label_queries,
+            }
+
+
+_CACHES: "weakref.WeakKeyDictionary[Any, SnapshotRegistryCache]" = weakref.WeakKeyDictionary()
+_CACHES_LOCK = threading.Lock()
+
+
+def snapshot_registry_cache(client: Any) -> Optional[SnapshotRegistryCache]:
+    """Shared cache for a Weaviate client (None if the client cannot be weakly referenced)."""
+    with _CACHES_LOCK:
+        try:
+            cache = _CACHES.get(client)
+            if cache is None:
+                cache = SnapshotRegistryCache()
+                _CACHES[client] = cache
+            return cache
+        except TypeError:
+            return None
+
+
 @dataclass(frozen=True)
 class SnapshotRegistry:
     client: "weaviate.WeaviateClient"
@@ -49,10 +215,32 @@ class SnapshotRegistry:
         labels = self._resolve_snapshot_labels(rec, repo, allowed)
         return [SnapshotInfo(id=sid, label=labels.get(sid, sid)) for sid in allowed]
 
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        cache = snapshot_registry_cache(self.client)
+        return cache.stats() if cache is not None else None
+
+    def invalidate_cache(self, *, snapshot_set_id: Optional[str] = None, snapshot_id: Optional[str] = None) -> int:
+        cache = snapshot_registry_cache(self.client)
+        if cache is None:
+            return 0
+        return cache.invalidate(snapshot_set_id=snapshot_set_id, snapshot_id=snapshot_id)
+
     def fetch_snapshot_set(self, *, snapshot_set_id: str, repository: Optional[str]) -> Optional[Dict[str, object]]:
         sid = (snapshot_set_id or "").strip()
         if not sid:
             return None
+        cache = snapshot_registry_cache(self.client)
+        key = (sid, (repository or "").strip())
+        if cache is not None and cache.enabled:
+            cached = cache.get_set(key)
+            if cached is not None:
+                return cached
+        rec = self._fetch_snapshot_set_uncached(sid, repository)
+        if rec is not None and cache is not None:
+            cache.put_set(key, rec)
+        return rec
+
+    def _fetch_snapshot_set_uncached(self, sid: str, repository: Optional[str]) -> Optional[Dict[str, object]]:
         coll = self.client.collections.use(self.snapshot_set_collection)
         base = Filter.by_property("snapshot_set_id").equal(sid)
         filters = base
@@ -157,86 +345,102 @@ class SnapshotRegistry:
                 if ref:
                     labels[sid] = ref
 
-        for sid in allowed_ids:
-            if sid not in labels:
-                labels[sid] = self._resolve_snapshot_label(repo, sid)
-
+        missing = [sid for sid in allowed_ids if sid not in labels]
+        if missing:
+            labels.update(self._resolve_import_labels(repo, missing))
         return labels
 
     def _resolve_snapshot_label(self, repo: str, snapshot_id: str) -> str:
         if not snapshot_id:
             return "unknown"
+        return self._resolve_import_labels(repo, [snapshot_id]).get(snapshot_id, snapshot_id)
+
+    def _resolve_import_labels(self, repo: str, snapshot_ids: List[str]) -> Dict[str, str]:
+        cache = snapshot_registry_cache(self.client)
+        labels: Dict[str, str] = {}
+        missing = list(snapshot_ids)
+        if cache is not None and cache.enabled:
+            labels, missing = cache.get_labels(repo, missing)
+        if missing:
+            fetched = self._fetch_import_labels(repo, missing)
+            if fetched is not None:
+                if cache is not None:
+                    # Snapshots without a label (no ImportRun yet) are cached briefly as "".
+                    cache.put_labels(repo, {sid: fetched.get(sid, "") for sid in missing})
+                labels.update(fetched)
+        return {sid: labels.get(sid) or sid for sid in snapshot_ids}
+
+    def _fetch_import_labels(self, repo: str, snapshot_ids: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Resolves labels from the latest ImportRun of each snapshot with one batched query
+        (`snapshot_id` contains_any, newest first). Ids not resolved by the first page (their runs are
+        crowded out by many runs of other snapshots) are queried again on their own, so every id gets its
+        newest run without a shared limit. Snapshots without an ImportRun or without a label are absent
+        from the result; None means the query failed (logged).
+        """
+        unresolved = self._unique_preserve_order([str(x).strip() for x in snapshot_ids if str(x).strip()])
+        cache = snapshot_registry_cache(self.client)
+        out: Dict[str, str] = {}
+        while unresolved:
+            if cache is not None:
+                cache.note_label_query()
+            rows = self._fetch_latest_import_runs(repo, unresolved)
+            if rows is None:
+                return None
+            seen: List[str] = []
+            for props in rows:
+                sid = str(props.get("snapshot_id") or "").strip()
+                if sid not in unresolved or sid in seen:
+                    continue
+                seen.append(sid)
+                label = _import_run_label(props)
+                if label:
+                    out[sid] = label
+            if len(rows) < _IMPORT_LABEL_PAGE_SIZE or not seen:
+                break
+            unresolved = [sid for sid in unresolved if sid not in seen]
+        return out
+
+    def _fetch_latest_import_runs(self, repo: str, snapshot_ids: List[str]) -> Optional[List[Dict[str, object]]]:
+        # IMPORTANT: resolve by snapshot_id only (head_sha is informational).
+        filters = Filter.all_of(
+            [Filter.by_property("repo").equal(repo), Filter.by_property("snapshot_id").contains_any(list(snapshot_ids))]
+        )
+        # started_utc is set when the run is created (finished_utc stays empty until it completes).
+        sort = Sort.by_property("started_utc", ascending=False)
+        request = {
+            "collection": self.import_collection,
+            "limit": _IMPORT_LABEL_PAGE_SIZE,
+            "filters": repr(filters),
+            "filters_debug": {"repo": repo, "snapshot_ids": list(snapshot_ids)},
+            "sort": "started_utc desc",
+            "return_properties": list(_IMPORT_LABEL_PROPERTIES),
+        }
+        t0 = time.time()
         try:
             coll = self.client.collections.use(self.import_collection)
-            filters = Filter.all_of(
-                [
-                    Filter.by_property("repo").equal(repo),
-                    # IMPORTANT: resolve by snapshot_id only (head_sha is informational).
-                    Filter.by_property("snapshot_id").equal(snapshot_id),
-                ]
-            )
-            t0 = time.time()
             res = coll.query.fetch_objects(
                 filters=filters,
-                limit=5,
-                return_properties=[
-                    "snapshot_id",
-                    "head_sha",
-                    "friendly_name",
-                    "tag",
-                    "ref_name",
-                    "branch",
-                    "finished_utc",
-                    "started_utc",
-                ],
+                limit=_IMPORT_LABEL_PAGE_SIZE,
+                sort=sort,
+                return_properties=list(_IMPORT_LABEL_PROPERTIES),
             )
+        except Exception as e:
             log_weaviate_query(
                 op="import_run_fetch_objects",
-                request={
-                    "collection": self.import_collection,
-                    "limit": 5,
-                    "filters": repr(filters),
-                    "return_properties": [
-                        "snapshot_id",
-                        "head_sha",
-                        "friendly_name",
-                        "tag",
-                        "ref_name",
-                        "branch",
-                        "finished_utc",
-                        "started_utc",
-                    ],
-                },
-                response=_weaviate_resp_summary(res),
+                request=request,
+                error=f"{type(e).__name__}: {e}",
                 duration_ms=int((time.time() - t0) * 1000),
             )
-        except Exception:
-            log_weaviate_query(
-                op="import_run_fetch_objects",
-                request={
-                    "collection": self.import_collection,
-                    "limit": 5,
-                    "filters": repr(Filter.all_of([Filter.by_property("repo").equal(repo), Filter.by_property("snapshot_id").equal(snapshot_id)])),
-                },
-                error="Exception (see server logs)",
-            )
-            LOG.exception("soft-failure: failed to resolve snapshot label for %s", snapshot_id)
-            return snapshot_id
-
-        if not res.objects:
-            return snapshot_id
-
-        def key(o) -> str:
-            p = o.properties or {}
-            return str(p.get("finished_utc") or p.get("started_utc") or "")
-
-        best = sorted(res.objects, key=key, reverse=True)[0]
-        props = best.properties or {}
-        for k in ("friendly_name", "tag", "ref_name", "branch"):
-            v = str(props.get(k) or "").strip()
-            if v:
-                return v
-        return snapshot_id
+            LOG.exception("soft-failure: failed to resolve snapshot labels for %s", list(snapshot_ids))
+            return None
+        log_weaviate_query(
+            op="import_run_fetch_objects",
+            request=request,
+            response=_weaviate_resp_summary(res),
+            duration_ms=int((time.time() - t0) * 1000),
+        )
+        return [o.properties or {} for o in (getattr(res, "objects", []) or [])]
 
     def resolve_snapshot_label(self, *, repository: str, snapshot_id: str) -> str:
         return self._resolve_snapshot_label(repository, snapshot_id)
@@ -252,6 +456,14 @@ class SnapshotRegistry:
         return out
 
 
+def _import_run_label(props: Dict[str, object]) -> str:
+    for k in ("friendly_name", "tag", "ref_name", "branch"):
+        v = str(props.get(k) or "").strip()
+        if v:
+            return v
+    return ""
+
+
 def _weaviate_resp_summary(res: object) -> Dict[str, object]:
     try:
         objs = list(getattr(res, "objects", []) or [])
@@ -4,11 +4,13 @@
 AI Server entrypoint with optional .env loading.
 Use:
     python start_AI_server.py --env
+    python start_AI_server.py --env --production --workers 4
 """
 
 import argparse
 import json
 import os
+import sys
 from dotenv import load_dotenv
 
 PROJECT_ROOT = os.path.dirname(__file__)
@@ -20,6 +22,12 @@ RUNTIME_CONFIG_TEST_PATH = os.path.join(PROJECT_ROOT, "config.test.json")
 # --- Optional --env flag ---
 parser = argparse.ArgumentParser()
 parser.add_argument("--env", action="store_true", help="Load environment variables from .env file")
+parser.add_argument(
+    "--production",
+    action="store_true",
+    help="Serve with gunicorn (pre-fork workers, see gunicorn.conf.py) instead of the Flask dev server",
+)
+parser.add_argument("--workers", type=int, default=None, help="Worker processes in --production mode (APP_WORKERS)")
 args, unknown = parser.parse_known_args()
 
 if args.env:
@@ -62,6 +70,7 @@ def _print_start_banner(host: str, port: int) -> None:
     print("")
     print("🔎 Health / config")
     print(f"➜  /health:     http://127.0.0.1:{port}/health")
+    print(f"➜  /ready:      http://127.0.0.1:{port}/ready")
     print(f"➜  /app-config: http://127.0.0.1:{port}/app-config")
     print("")
     print("🔐 Auth check")
@@ -135,6 +144,18 @@ def _is_development_enabled() -> bool:
     return bool(cfg.get("development", True))
 
 
+def _run_production() -> None:
+    # English comments only.
+    try:
+        from gunicorn.app.wsgiapp import WSGIApplication
+    except ImportError as ex:
+        raise RuntimeError("--production requires gunicorn (pip install gunicorn; Linux/macOS only).") from ex
+
+    # The app itself is loaded by gunicorn from gunicorn.conf.py (wsgi_app + preload_app).
+    sys.argv = ["gunicorn", "--config", os.path.join(PROJECT_ROOT, "gunicorn.conf.py")]
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+
+
 if __name__ == "__main__":
     profile = _resolve_app_profile()
     os.environ.setdefault("APP_PROFILE", profile)
@@ -142,6 +163,17 @@ if __name__ == "__main__":
     if profile == "prod" and dev_allow_no_auth:
         raise RuntimeError("DEV_ALLOW_NO_AUTH=true is forbidden when APP_PROFILE=prod.")
 
+    if args.production:
+        from code_query_engine.serving import ServingConfig
+
+        if args.workers is not None:
+            os.environ["APP_WORKERS"] = str(args.workers)
+        serving_cfg = ServingConfig.from_env()
+        print(f"🏭 Production mode: {serving_cfg.workers} worker(s) x {serving_cfg.threads} thread(s), preload={serving_cfg.preload}")
+        _print_start_banner(host=serving_cfg.bind.rsplit(":", 1)[0], port=int(serving_cfg.bind.rsplit(":", 1)[1]))
+        _run_production()
+        raise SystemExit(0)
+
     # Import the Flask app ONLY inside __main__.
     # This is required when semantic search uses multiprocessing "spawn":
     # child processes re-import the main module, and importing the server at top-level
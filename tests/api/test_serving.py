@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from code_query_engine import serving
+from code_query_engine.serving import ProcessLocal, ServingConfig
+
+
+def test_serving_config_from_env() -> None:
+    cfg = ServingConfig.from_env(
+        {"APP_HOST": "127.0.0.1", "APP_PORT": "8080", "APP_WORKERS": "4", "APP_PRELOAD": "false", "APP_WORKER_THREADS": "0"}
+    )
+    assert cfg.bind == "127.0.0.1:8080"
+    assert (cfg.workers, cfg.threads, cfg.preload) == (4, 1, False)
+    assert ServingConfig.from_env({}) == ServingConfig()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_process_local_is_rebuilt_only_by_the_post_fork_hooks(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(serving, "_post_fork_hooks", [])
+    created = []
+    client = ProcessLocal(lambda: created.append(os.getpid()) or object(), name="test-client")
+    parent_obj = client.get()
+    assert client.get() is parent_obj
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child
+        try:
+            # A plain fork (multiprocessing, subprocess) runs no hooks; a gunicorn worker calls them in post_fork.
+            inherited = client.get() is parent_obj
+            serving.run_post_fork_hooks()
+            rebuilt = client.get() is not parent_obj and created[-1] == os.getpid()
+            os.write(write_fd, b"1" if inherited and rebuilt else b"0")
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    assert result == b"1"
+    assert client.get() is parent_obj
+    assert created == [os.getpid()]
+
+
+def test_begin_drain_marks_the_worker_as_draining(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(serving, "_draining", False)
+    assert serving.is_draining() is False
+    serving.begin_drain()
+    assert serving.is_draining() is True
@@ -0,0 +1,220 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+from code_query_engine import serving
+from code_query_engine.warmup import SyntheticQuery, WarmupRunner, warmup_config_from_runtime_config
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _stub_module(monkeypatch: pytest.MonkeyPatch, module_name: str, attrs: dict) -> None:
+    mod = types.ModuleType(module_name)
+    for key, value in attrs.items():
+        setattr(mod, key, value)
+    monkeypatch.setitem(sys.modules, module_name, mod)
+
+
+def _import_server(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("APP_USE_REDIS", "false")
+    monkeypatch.setenv("IDP_AUTH_ENABLED", "0")
+    monkeypatch.setenv("APP_PROFILE", "dev")
+    monkeypatch.setenv("APP_DEVELOPMENT", "1")
+    monkeypatch.setenv("DEV_ALLOW_NO_AUTH", "true")
+
+    _stub_module(monkeypatch, "common.markdown_translator_en_pl", {"MarkdownTranslator": lambda *a, **k: object()})
+    _stub_module(monkeypatch, "common.translator_pl_en", {"Translator": lambda *a, **k: object()})
+    _stub_module(monkeypatch, "code_query_engine.model", {"Model": lambda *a, **k: object()})
+    _stub_module(monkeypatch, "code_query_engine.log_utils", {"InteractionLogger": lambda *a, **k: object()})
+
+    class _DummyRunner:
+        """Writes one turn through the history service like the finalize action does."""
+
+        def __init__(self, *args, **kwargs):
+            self.conversation_history_service = kwargs.get("conversation_history_service")
+
+        def run(self, *, session_id, conversation_history_service=None, **kwargs):
+            svc = conversation_history_service or self.conversation_history_service
+            turn_id = svc.on_request_started(
+                session_id=session_id,
+                request_id="r1",
+                identity_id="u1",
+                translate_chat=False,
+                question_neutral=kwargs["user_query"],
+                question_translated=None,
+            )
+            svc.on_request_finalized(
+                session_id=session_id,
+                request_id="r1",
+                identity_id="u1",
+                turn_id=turn_id,
+                answer_neutral="ok",
+                answer_translated=None,
+                answer_translated_is_fallback=None,
+            )
+
+    _stub_module(monkeypatch, "code_query_engine.dynamic_pipeline", {"DynamicPipelineRunner": _DummyRunner})
+    _stub_module(monkeypatch, "vector_db.weaviate_client", {"get_settings": lambda: {}, "create_client": lambda settings: None})
+
+    sys.modules.pop("code_query_engine.query_server_dynamic", None)
+    return importlib.import_module("code_query_engine.query_server_dynamic")
+
+
+def test_warmup_runner_reports_components_and_readiness() -> None:
+    clock = _Clock()
+
+    def _compile():
+        clock.now += 0.25
+        return {"compiled": ["ada"]}
+
+    def _broken():
+        raise RuntimeError("weaviate down")
+
+    runner = WarmupRunner([("pipelines", _compile), ("graph:s1", _broken)], clock=clock)
+    assert runner.status()["warmup"] == "pending"
+    assert runner.is_ready() is False
+
+    runner.run()
+    status = runner.status()
+    assert status["warmup"] == "done"
+    assert status["ready"] is False
+    assert status["components"]["pipelines"] == {"state": "ok", "duration_ms": 250, "detail": {"compiled": ["ada"]}}
+    assert status["components"]["graph:s1"] == {"state": "failed", "duration_ms": 0, "error": "RuntimeError"}
+
+    optional = WarmupRunner([("pipelines", _compile), ("graph:s1", _broken)], optional=["graph:s1"], clock=clock)
+    optional.start().join(timeout=2.0)
+    assert optional.is_ready() is True
+
+
+def test_warmup_config_from_runtime_config() -> None:
+    cfg = warmup_config_from_runtime_config(
+        {
+            "warmup": {
+                "llm": False,
+                "snapshot_sets": "a, b",
+                "queries": [{"pipeline": "ada", "query": "Where is Foo?", "snapshot_set_id": "a"}],
+                "optional": ["llm"],
+            }
+        }
+    )
+    assert cfg.enabled is True and cfg.llm is False
+    assert cfg.snapshot_sets == ("a", "b")
+    assert cfg.queries == (SyntheticQuery(pipeline="ada", query="Where is Foo?", snapshot_set_id="a"),)
+    with pytest.raises(ValueError):
+        warmup_config_from_runtime_config({"warmup": {"queries": [{"pipeline": "ada"}]}})
+
+
+def test_ready_endpoint_follows_warmup_and_drain(monkeypatch: pytest.MonkeyPatch) -> None:
+    qsd = _import_server(monkeypatch)
+    client = qsd.app.test_client()
+
+    # Warmup is disabled under pytest: nothing to wait for.
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()["ready"] is True
+
+    pending = WarmupRunner([("llm", lambda: None)])
+    monkeypatch.setattr(qsd, "_warmup", pending)
+    resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert resp.get_json()["components"]["llm"]["state"] == "pending"
+
+    pending.run()
+    assert client.get("/ready").status_code == 200
+
+    monkeypatch.setattr(serving, "_draining", True)
+    resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert resp.get_json()["draining"] is True
+    assert client.get("/health").status_code == 503
+
+
+def test_warmup_query_does_not_write_to_the_real_conversation_history(monkeypatch: pytest.MonkeyPatch) -> None:
+    qsd = _import_server(monkeypatch)
+
+    class _RecordingService:
+        def __init__(self) -> None:
+            self.calls: list = []
+
+        def on_request_started(self, **kwargs):
+            self.calls.append("on_request_started")
+            return "t1"
+
+        def on_request_finalized(self, **kwargs):
+            self.calls.append("on_request_finalized")
+
+    real = _RecordingService()
+    monkeypatch.setattr(qsd._runner, "conversation_history_service", real)
+
+    qsd._warmup_query(SyntheticQuery(pipeline="ada", query="Where is Foo?"))
+    assert real.calls == []
+
+    # Regular requests still use the real service.
+    qsd._runner.run(session_id="s1", user_query="q")
+    assert real.calls == ["on_request_started", "on_request_finalized"]
+
+
+def test_pipeline_cache_delete_drops_cached_graphs(monkeypatch: pytest.MonkeyPatch) -> None:
+    qsd = _import_server(monkeypatch)
+    client = qsd.app.test_client()
+
+    class _Graphs:
+        def __init__(self) -> None:
+            self.calls: list = []
+
+        def invalidate_adjacency(self, *, repo=None, snapshot_id=None):
+            self.calls.append(snapshot_id)
+            return 1
+
+        def adjacency_cache_stats(self):
+            return {"entries": 0}
+
+    graphs = _Graphs()
+    monkeypatch.setattr(qsd, "OPERATOR_TOKEN", "op-secret")
+    monkeypatch.setattr(qsd, "_graph_provider", graphs)
+    monkeypatch.setattr(qsd, "_retrieval_backend", None)
+    monkeypatch.setattr(qsd, "_snapshot_registry", None)
+    monkeypatch.setattr(qsd._runner, "invalidate_compiled_pipelines", lambda name: 0, raising=False)
+    monkeypatch.setattr(qsd._runner, "compiled_pipeline_cache_stats", lambda: {}, raising=False)
+
+    operator = {"Authorization": "Bearer op-secret"}
+    resp = client.delete("/pipeline/cache?snapshot_id=S1", headers=operator)
+    assert resp.status_code == 200 and resp.get_json()["removed"] == 1
+    assert graphs.calls == ["S1"]
+
+    resp = client.delete("/pipeline/cache", headers=operator)
+    assert resp.get_json()["graph_adjacency_removed"] == 1
+    assert graphs.calls == ["S1", None]
+
+    client.delete("/pipeline/cache?pipeline=ada", headers=operator)
+    assert graphs.calls == ["S1", None]
+
+
+def test_pipeline_cache_delete_requires_the_operator_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    qsd = _import_server(monkeypatch)
+    client = qsd.app.test_client()
+    flushed: list = []
+    # Any logged-in user passes the regular bearer check.
+    monkeypatch.setattr(qsd, "_require_bearer_if_needed", lambda auth_header: None)
+    monkeypatch.setattr(qsd._runner, "invalidate_compiled_pipelines", lambda name: flushed.append(name) or 0, raising=False)
+    monkeypatch.setattr(qsd._runner, "compiled_pipeline_cache_stats", lambda: {}, raising=False)
+    monkeypatch.setattr(qsd, "_graph_provider", None)
+
+    monkeypatch.setattr(qsd, "OPERATOR_TOKEN", "")
+    assert client.delete("/pipeline/cache", headers={"Authorization": "Bearer user-token"}).status_code == 403
+
+    monkeypatch.setattr(qsd, "OPERATOR_TOKEN", "op-secret")
+    assert client.delete("/pipeline/cache", headers={"Authorization": "Bearer user-token"}).status_code == 401
+    assert client.delete("/pipeline/cache").status_code == 401
+    assert flushed == []
+
+    assert client.delete("/pipeline/cache", headers={"Authorization": "Bearer op-secret"}).status_code == 200
+    assert flushed == [None]
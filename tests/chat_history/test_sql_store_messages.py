@@ -0,0 +1,88 @@
+import contextlib
+
+import pytest
+
+sa = pytest.importorskip("sqlalchemy")
+
+from server.chat_history.sql_store import SqlChatHistoryStore, create_sqlite_schema
+
+
+@pytest.fixture()
+def store(tmp_path):
+    st = SqlChatHistoryStore(database_type="sqlite", connection_url=f"sqlite:///{tmp_path / 'history.db'}")
+    create_sqlite_schema(st._engine())
+    return st
+
+
+@contextlib.contextmanager
+def _count_statements(store: SqlChatHistoryStore):
+    statements: list[str] = []
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = store._engine()
+    sa.event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        yield statements
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", _on_execute)
+
+
+def _msgs(*ids: str) -> list:
+    return [{"message_id": mid, "q": f"Question {mid}\nmore", "a": f"Answer {mid}", "meta": {"n": mid}} for mid in ids]
+
+
+def test_append_messages_statement_counts(store: SqlChatHistoryStore) -> None:
+    # New tenant and session: tenant upsert, session upsert, message insert, session update.
+    with _count_statements(store) as statements:
+        msg = store.add_message(tenant_id="t1", user_id="u1", session_id="s1", message_id="m0", q="First question", a="", meta=None)
+    assert len(statements) == 4
+    assert msg["messageId"] == "m0" and msg["q"] == "First question"
+
+    # The batch size does not change the count.
+    with _count_statements(store) as statements:
+        out = store.append_messages(tenant_id="t1", user_id="u1", session_id="s1", messages=_msgs(*[f"m{i}" for i in range(1, 51)]))
+    assert len(statements) == 4
+    assert [m["messageId"] for m in out] == [f"m{i}" for i in range(1, 51)]
+
+    # A retried batch reads the already stored messages back: one more statement.
+    with _count_statements(store) as statements:
+        retry = store.append_messages(tenant_id="t1", user_id="u1", session_id="s1", messages=_msgs("m2", "m51"))
+    assert len(statements) == 5
+    assert retry[0] == out[1] and retry[1]["messageId"] == "m51"
+
+    session = store.get_session(tenant_id="t1", user_id="u1", session_id="s1")
+    assert session["messageCount"] == 52
+    assert session["title"] == "First question"
+    page = store.list_messages(tenant_id="t1", user_id="u1", session_id="s1", limit=200, before=None)
+    assert [m["messageId"] for m in page["items"]] == [f"m{i}" for i in range(52)]
+    assert page["items"][3]["meta"] == {"n": "m3"}
+
+
+def test_append_messages_titles_new_session_and_rejects_foreign_session(store: SqlChatHistoryStore) -> None:
+    store.create_session(tenant_id="t1", user_id="u1", session_id="s1", title="New chat", consultant_id="")
+    store.append_messages(
+        tenant_id="t1",
+        user_id="u1",
+        session_id="s1",
+        messages=[{"message_id": "a", "q": "  ", "a": "x", "meta": None}] + _msgs("b"),
+    )
+    assert store.get_session(tenant_id="t1", user_id="u1", session_id="s1")["title"] == "Question b more"
+
+    with pytest.raises(ValueError):
+        store.append_messages(tenant_id="t1", user_id="intruder", session_id="s1", messages=_msgs("c"))
+    # The whole transaction was rolled back.
+    page = store.list_messages(tenant_id="t1", user_id="u1", session_id="s1", limit=10, before=None)
+    assert [m["messageId"] for m in page["items"]] == ["a", "b"]
+    assert store.get_session(tenant_id="t1", user_id="u1", session_id="s1")["messageCount"] == 2
+
+
+def test_insert_if_absent_sql_only_skips_duplicate_keys() -> None:
+    mysql = SqlChatHistoryStore(database_type="mysql", connection_url="mysql+pymysql://u:p@h/db")
+    sql = mysql._insert_if_absent_sql("chat_messages", ["id", "q"], 2)
+    assert sql == "INSERT INTO chat_messages (id, q) VALUES (:id_0, :q_0), (:id_1, :q_1) ON DUPLICATE KEY UPDATE id = id"
+    assert "IGNORE" not in sql
+
+    mssql = SqlChatHistoryStore(database_type="mssql", connection_url="mssql+pyodbc://u:p@dsn")
+    assert mssql._insert_if_absent_sql("chat_tenants", ["id"], 1).startswith("MERGE INTO history.chat_tenants WITH (HOLDLOCK)")
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sa = pytest.importorskip("sqlalchemy")
+
+from server.chat_history.sql_store import SqlChatHistoryStore, create_sqlite_schema
+
+
+@pytest.fixture()
+def store(tmp_path):
+    st = SqlChatHistoryStore(database_type="sqlite", connection_url=f"sqlite:///{tmp_path / 'history.db'}")
+    create_sqlite_schema(st._engine())
+    return st
+
+
+def _set_updated_at(store: SqlChatHistoryStore, session_id: str, updated_at: datetime) -> None:
+    with store._engine().begin() as conn:
+        conn.execute(
+            sa.text("UPDATE chat_sessions SET updated_at = :updated_at WHERE id = :id"),
+            {"updated_at": updated_at, "id": session_id},
+        )
+
+
+def test_list_sessions_keyset_pages_cover_ties_exactly_once(store: SqlChatHistoryStore) -> None:
+    base = datetime(2026, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    for i in range(7):
+        store.create_session(tenant_id="t1", user_id="u1", session_id=f"s{i}", title=f"Chat {i}", consultant_id="")
+        # Three sessions share one timestamp: only the id breaks the tie.
+        _set_updated_at(store, f"s{i}", base if i < 3 else base + timedelta(microseconds=i))
+    store.create_session(tenant_id="t1", user_id="other", session_id="x1", title="Chat x", consultant_id="")
+    store.patch_session(tenant_id="t1", user_id="u1", session_id="s4", payload={"softDeleted": True})
+
+    seen, cursor = [], None
+    while True:
+        page = store.list_sessions(tenant_id="t1", user_id="u1", limit=2, cursor=cursor, q=None)
+        seen += [item["sessionId"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["s6", "s5", "s3", "s2", "s1", "s0"]
+
+    # A legacy cursor (updatedAt in ms) still pages by time.
+    legacy = store.list_sessions(tenant_id="t1", user_id="u1", limit=10, cursor=str(int((base.timestamp() + 1) * 1000)), q=None)
+    assert [item["sessionId"] for item in legacy["items"]] == seen
+
+
+def test_list_sessions_title_search_uses_fts_and_escapes_wildcards(store: SqlChatHistoryStore) -> None:
+    for sid, title in [("a", "Invoice totals in NopCommerce"), ("b", "Discount 50% rule"), ("c", "invoice_export job"), ("d", "Other"), ("e", "Logs in C:\\Temp")]:
+        store.create_session(tenant_id="t1", user_id="u1", session_id=sid, title=title, consultant_id="")
+    store.patch_session(tenant_id="t1", user_id="u1", session_id="d", payload={"title": "Invoice renamed"})
+
+    def _search(q: str) -> set:
+        return {item["sessionId"] for item in store.list_sessions(tenant_id="t1", user_id="u1", limit=50, cursor=None, q=q)["items"]}
+
+    assert _search("INVOICE") == {"a", "c", "d"}
+    assert _search("50%") == {"b"}
+    assert _search("e_e") == {"c"}
+    assert _search("0%") == {"b"}
+    assert _search("c:\\temp") == {"e"}
+    assert store._sqlite_title_fts is True
+
+    with store._engine().connect() as conn:
+        plan = conn.execute(
+            sa.text("EXPLAIN QUERY PLAN SELECT rowid FROM chat_sessions_title_fts WHERE title LIKE '%voice%'")
+        ).all()
+    assert "INDEX 0:L" in " ".join(str(row[-1]) for row in plan)
+
+
+def test_title_search_clause_always_sets_the_escape_character() -> None:
+    # PostgreSQL/MySQL default to a backslash escape: a plain term with a backslash needs ESCAPE too.
+    pg = SqlChatHistoryStore(database_type="postgres", connection_url="postgresql+psycopg://u:p@h/db")
+    params: dict = {}
+    assert pg._title_search_clause(None, "c:\\temp", params) == "LOWER(s.title) LIKE :title_like ESCAPE '!'"
+    assert params == {"title_like": "%c:\\temp%"}
+
+    pg._title_search_clause(None, "50%_!", params)
+    assert params == {"title_like": "%50!%!_!!%"}
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 from code_query_engine.conversation_history.durable_store_memory import InMemoryUserConversationStore
@@ -81,3 +83,52 @@ def test_on_request_finalized_without_turn_id_raises() -> None:
     turns = session_store.list_recent_finalized_turns(session_id="s1", limit=10)
     assert len(turns) == 0
     assert svc.get_recent_qa_neutral(session_id="s1", limit=10) == []
+
+
+class _RacingRedis(InMemoryMockRedis):
+    """Runs `race` inside the first update() callback, i.e. between WATCH and EXEC."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.race = None
+
+    def update(self, key, fn, *, ttl=None):
+        def _fn(raw):
+            race, self.race = self.race, None
+            if race is not None:
+                race()
+            return fn(raw)
+
+        return super().update(key, _fn, ttl=ttl)
+
+
+def test_session_store_concurrent_turns_do_not_clobber_each_other() -> None:
+    backend = _RacingRedis()
+    store = KvSessionConversationStore(backend=backend, ttl_s=None, max_turns=50)
+
+    def _start(request_id: str) -> str:
+        return store.start_turn(
+            session_id="s1",
+            request_id=request_id,
+            identity_id=None,
+            question_neutral=f"Q_{request_id}",
+            question_translated=None,
+            translate_chat=False,
+            meta=None,
+        )
+
+    backend.race = lambda: _start("r2")
+    t1 = _start("r1")
+    assert set(json.loads(backend.get("conv_hist:s1"))["by_request"]) == {"r1", "r2"}
+    assert backend.stats()["counters"]["update_conflicts"] == 1
+
+    backend.race = lambda: store.finalize_turn(
+        session_id="s1", request_id="r2", turn_id=_start("r2"), answer_neutral="A2",
+        answer_translated=None, answer_translated_is_fallback=None, meta=None,
+    )
+    store.finalize_turn(
+        session_id="s1", request_id="r1", turn_id=t1, answer_neutral="A1",
+        answer_translated=None, answer_translated_is_fallback=None, meta=None,
+    )
+    answers = {t.request_id: t.answer_neutral for t in store.list_recent_finalized_turns(session_id="s1", limit=10)}
+    assert answers == {"r1": "A1", "r2": "A2"}
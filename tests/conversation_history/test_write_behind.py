@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+
+from code_query_engine.conversation_history.durable_store_memory import InMemoryUserConversationStore
+from code_query_engine.conversation_history.service import ConversationHistoryService
+from code_query_engine.conversation_history.session_store_kv import KvSessionConversationStore
+from code_query_engine.conversation_history.write_behind import WriteBehindConfig, WriteBehindUserConversationStore
+from history.mock_redis import InMemoryMockRedis
+
+
+class _FlakyStore(InMemoryUserConversationStore):
+    """Fails the first `failures` writes; `gate` (when set) blocks every write until released."""
+
+    def __init__(self, failures: int = 0) -> None:
+        super().__init__()
+        self.failures = failures
+        self.gate = None
+        self.calls: list[str] = []
+
+    def _maybe_fail(self, name: str) -> None:
+        if self.gate is not None:
+            self.gate.wait(timeout=5.0)
+        self.calls.append(name)
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+
+    def insert_turn(self, *, turn) -> None:
+        self._maybe_fail("insert_turn")
+        super().insert_turn(turn=turn)
+
+    def upsert_turn_final(self, **kwargs) -> None:
+        self._maybe_fail("upsert_turn_final")
+        super().upsert_turn_final(**kwargs)
+
+
+def _service(durable) -> ConversationHistoryService:
+    session_store = KvSessionConversationStore(backend=InMemoryMockRedis(), ttl_s=None, max_turns=50)
+    return ConversationHistoryService(session_store=session_store, durable_store=durable)
+
+
+def _turn(svc: ConversationHistoryService, n: int, session_id: str = "s1") -> None:
+    turn_id = svc.on_request_started(
+        session_id=session_id,
+        request_id=f"r{n}",
+        identity_id="u1",
+        translate_chat=False,
+        question_neutral=f"Q{n}",
+        question_translated=None,
+    )
+    svc.on_request_finalized(
+        session_id=session_id,
+        request_id=f"r{n}",
+        identity_id="u1",
+        turn_id=turn_id,
+        answer_neutral=f"A{n}",
+        answer_translated=None,
+        answer_translated_is_fallback=None,
+    )
+
+
+def test_write_behind_batches_in_order_and_retries_with_backoff() -> None:
+    inner = _FlakyStore(failures=2)
+    inner.gate = threading.Event()
+    writer = WriteBehindUserConversationStore(
+        inner, config=WriteBehindConfig(durability="write_behind", batch_size=10, backoff_base_s=0.01)
+    )
+    svc = _service(writer)
+
+    for n in range(3):
+        _turn(svc, n)
+    # Nothing reached the durable store yet; the session store answers reads meanwhile.
+    assert inner.calls == []
+    assert svc.get_recent_qa_neutral(session_id="s1", limit=10) == [("Q0", "A0"), ("Q1", "A1"), ("Q2", "A2")]
+    assert writer.stats()["depth"] > 0
+
+    inner.gate.set()
+    assert writer.flush(timeout_s=5.0) is True
+    stats = writer.stats()
+    assert stats["depth"] == 0 and stats["lag_ms"] == 0
+    assert stats["retries"] == 2 and stats["failed"] == 0
+    assert stats["written"] == stats["enqueued"]
+    assert inner.calls[2:] == ["insert_turn", "upsert_turn_final"] * 3
+    turns = inner.list_recent_finalized_turns_by_session(session_id="s1", limit=10)
+    assert [t.answer_neutral for t in turns] == ["A0", "A1", "A2"]
+
+
+def test_write_behind_gives_up_after_max_attempts_and_close_flushes() -> None:
+    inner = _FlakyStore(failures=3)
+    writer = WriteBehindUserConversationStore(
+        inner, config=WriteBehindConfig(durability="write_behind", max_attempts=3, backoff_base_s=0.01)
+    )
+    svc = _service(writer)
+    _turn(svc, 0)
+    _turn(svc, 1)
+    writer.close()
+
+    stats = writer.stats()
+    # The first insert is dropped after three attempts; its finalization is then rejected.
+    assert stats["failed"] == 2
+    assert stats["written"] == 6
+    # Writes after close() run inline.
+    _turn(svc, 2)
+    assert writer.stats()["inline_writes"] == 4
+
+
+def test_best_effort_drops_when_full_and_sync_writes_inline() -> None:
+    inner = _FlakyStore()
+    inner.gate = threading.Event()
+    writer = WriteBehindUserConversationStore(inner, config=WriteBehindConfig(durability="best_effort", queue_size=1))
+    svc = _service(writer)
+    for n in range(3):
+        _turn(svc, n)
+    inner.gate.set()
+    writer.close()
+    stats = writer.stats()
+    assert stats["dropped_queue_full"] >= 1
+    assert stats["enqueued"] + stats["dropped_queue_full"] == 12
+
+    strict = _FlakyStore(failures=1)
+    svc = _service(WriteBehindUserConversationStore(strict, config=WriteBehindConfig(durability="sync")))
+    with pytest.raises(ConnectionError):
+        _turn(svc, 0)
+
+
+def test_write_behind_config_from_env() -> None:
+    cfg = WriteBehindConfig.from_env({"APP_CONV_HIST_DURABILITY": "Write_Behind", "APP_CONV_HIST_BATCH_SIZE": "7"})
+    assert cfg.durability == "write_behind" and cfg.batch_size == 7 and cfg.queue_size == 1000
+    assert WriteBehindConfig.from_env({}).durability == "sync"
+    with pytest.raises(ValueError):
+        WriteBehindConfig.from_env({"APP_CONV_HIST_DURABILITY": "eventually"})
+
+
+class _SessionDownStore(InMemoryUserConversationStore):
+    """Every write of `down_session` fails; the others are recorded."""
+
+    def __init__(self, down_session: str) -> None:
+        super().__init__()
+        self.down_session = down_session
+        self.calls: list[tuple[str, str]] = []
+
+    def insert_turn(self, *, turn) -> None:
+        if turn.session_id == self.down_session:
+            raise ConnectionError("partition unavailable")
+        self.calls.append(("insert_turn", turn.session_id))
+        super().insert_turn(turn=turn)
+
+    def upsert_turn_final(self, **kwargs) -> None:
+        self.calls.append(("upsert_turn_final", kwargs["session_id"]))
+        super().upsert_turn_final(**kwargs)
+
+
+def test_failing_session_does_not_block_other_sessions() -> None:
+    inner = _SessionDownStore(down_session="s1")
+    writer = WriteBehindUserConversationStore(
+        inner,
+        config=WriteBehindConfig(durability="write_behind", max_attempts=3, backoff_base_s=30.0, flush_timeout_s=0.5),
+    )
+    svc = _service(writer)
+    _turn(svc, 0, session_id="s1")
+    _turn(svc, 1, session_id="s2")
+
+    # s1 waits for its first retry (backoff capped at 5 s); s2 is written meanwhile.
+    assert writer.flush(timeout_s=0.5) is False
+    assert inner.calls == [("insert_turn", "s2"), ("upsert_turn_final", "s2")]
+    stats = writer.stats()
+    assert stats["parked_sessions"] == 1 and stats["depth"] == 3 and stats["retries"] == 1
+
+    # close() runs the remaining attempts without delay: the insert is dropped, its finalization rejected.
+    writer.close()
+    stats = writer.stats()
+    assert stats["depth"] == 0 and stats["failed"] == 2 and stats["retries"] == 2
+
+
+def test_sql_store_gets_one_append_per_session_batch(tmp_path) -> None:
+    pytest.importorskip("sqlalchemy")
+    from server.chat_history.sql_store import SqlChatHistoryStore, SqlConversationHistoryStore, create_sqlite_schema
+
+    history = SqlChatHistoryStore(database_type="sqlite", connection_url=f"sqlite:///{tmp_path / 'history.db'}")
+    create_sqlite_schema(history._engine())
+    appends: list[list[str]] = []
+    gate = threading.Event()
+    original = history.append_messages
+
+    def _append(**kwargs):
+        messages = list(kwargs.pop("messages"))
+        appends.append([m["message_id"] for m in messages])
+        gate.wait(timeout=5.0)
+        return original(messages=messages, **kwargs)
+
+    history.append_messages = _append
+    store = SqlConversationHistoryStore(history_store=history, tenant_resolver=lambda: "t1", user_resolver=lambda: "u1")
+    writer = WriteBehindUserConversationStore(store, config=WriteBehindConfig(durability="write_behind", batch_size=50))
+    svc = _service(writer)
+
+    # The worker holds the first write at the gate while the next five turns queue up behind it.
+    for n in range(6):
+        _turn(svc, n)
+    gate.set()
+    assert writer.flush(timeout_s=5.0) is True
+
+    stats = writer.stats()
+    assert stats["failed"] == 0 and stats["written"] == stats["enqueued"]
+    assert len(appends) < 6 and sum(len(a) for a in appends) == 6
+    assert max(len(a) for a in appends) >= 4
+    assert stats["grouped_inserts"] >= 4 and stats["folded_finals"] >= 4
+
+    turns = store.list_recent_finalized_turns_by_session(session_id="s1", limit=10)
+    assert [(t.question_neutral, t.answer_neutral) for t in turns] == [(f"Q{n}", f"A{n}") for n in range(6)]
+    assert all(t.finalized_at_utc for t in turns)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Set
+
+import pytest
+
+from code_query_engine.llm_http_pool import HttpConnectionPool, PoolConfig
+from code_query_engine.llm_server_client import ServerLLMClient, ServerLLMConfig, ThrottleConfig
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports: Set[int] = set()
+    delay_s = 0.0
+    status_queue: List[int] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        type(self).client_ports.add(self.client_address[1])
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if type(self).delay_s:
+            time.sleep(type(self).delay_s)
+        status = type(self).status_queue.pop(0) if type(self).status_queue else 200
+        if self.path.endswith("/chat/completions"):
+            self._stream_chunked()
+            return
+        body = json.dumps({"choices": [{"text": f"ok-{status}"}]}).encode("utf-8")
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_chunked(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        frames = [{"choices": [{"delta": {"content": p}}]} for p in ("a", "b", "c")]
+        for data in [json.dumps(f) for f in frames] + ["[DONE]"]:
+            chunk = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args: Any) -> None:
+        return None
+
+
+@pytest.fixture()
+def base_url() -> Iterator[str]:
+    _Handler.client_ports = set()
+    _Handler.delay_s = 0.0
+    _Handler.status_queue = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _client(base_url: str, **cfg: Any) -> ServerLLMClient:
+    return ServerLLMClient(servers={"s1": ServerLLMConfig(name="s1", base_url=base_url, **cfg)}, default_name="s1")
+
+
+def test_sequential_calls_reuse_one_connection(base_url: str) -> None:
+    client = _client(base_url)
+    for _ in range(5):
+        assert client.ask(prompt="hi") == "ok-200"
+
+    assert len(_Handler.client_ports) == 1
+    stats = client.transport_stats()["s1"]
+    assert stats["created"] == 1
+    assert stats["reused"] == 4
+    assert stats["in_use"] == 0
+
+
+def test_chunked_stream_and_following_request_share_connection(base_url: str) -> None:
+    client = _client(base_url)
+    deltas: List[str] = []
+    assert client.ask_chat(prompt="hi", on_delta=deltas.append) == "abc"
+    assert deltas == ["a", "b", "c"]
+    assert client.ask(prompt="hi") == "ok-200"
+    assert len(_Handler.client_ports) == 1
+
+
+def test_throttle_retries_429_on_pooled_connection(base_url: str) -> None:
+    _Handler.status_queue = [429, 429]
+    client = _client(
+        base_url,
+        throttling_enabled=True,
+        throttling=ThrottleConfig(max_concurrency=1, max_retries=3, base_backoff_seconds=0.0, jitter_seconds=0.0),
+    )
+    assert client.ask(prompt="hi") == "ok-200"
+    assert len(_Handler.client_ports) == 1
+
+
+def test_error_status_raises_http_error(base_url: str) -> None:
+    _Handler.status_queue = [500]
+    pool = HttpConnectionPool(base_url)
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        pool.request("POST", base_url + "/v1/completions", body=b"{}")
+    assert exc.value.code == 500
+    assert json.loads(exc.value.read())["choices"][0]["text"] == "ok-500"
+    # The connection went back to the pool after the error body was read.
+    assert pool.stats()["idle"] == 1
+
+
+def test_pool_size_follows_throttle_concurrency(base_url: str) -> None:
+    _Handler.delay_s = 0.2
+    client = _client(
+        base_url,
+        throttling_enabled=True,
+        throttling=ThrottleConfig(max_concurrency=3),
+        pool=PoolConfig(max_connections=1, block=True),
+    )
+    threads = [threading.Thread(target=lambda: client.ask(prompt="hi")) for _ in range(3)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    # Three throttle slots -> three pooled connections, no waiting for a connection.
+    assert time.perf_counter() - t0 < 0.5
+    stats = client.transport_stats()["s1"]
+    assert stats["max_connections"] == 3
+    assert stats["waits"] == 0
+    assert stats["overflow"] == 0
+
+
+def test_non_blocking_pool_overflows_instead_of_waiting(base_url: str) -> None:
+    _Handler.delay_s = 0.2
+    pool = HttpConnectionPool(base_url, PoolConfig(max_connections=1))
+
+    def _call() -> None:
+        with pool.request("POST", base_url + "/v1/completions", body=b"{}") as resp:
+            resp.read()
+
+    threads = [threading.Thread(target=_call) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    stats = pool.stats()
+    assert stats["overflow"] == 1
+    assert stats["idle"] == 1
+
+
+def test_failed_request_closes_and_discards_its_connection(base_url: str) -> None:
+    pool = HttpConnectionPool(base_url, PoolConfig(max_connections=1, read_timeout_seconds=0.1))
+    _Handler.delay_s = 0.5
+    with pytest.raises(TimeoutError):
+        pool.request("POST", base_url + "/v1/completions", body=b"{}")
+
+    stats = pool.stats()
+    assert (stats["in_use"], stats["idle"], stats["discarded"]) == (0, 0, 1)
+
+    _Handler.delay_s = 0.0
+    with pool.request("POST", base_url + "/v1/completions", body=b"{}") as resp:
+        resp.read()
+    assert pool.stats()["created"] == 2
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Iterator, List
+
+import pytest
+
+from code_query_engine.llm_routing import CircuitBreakerConfig, RoutingConfig, ServerRouter
+from code_query_engine.llm_server_client import HybridLLMClient, ServerLLMClient, ServerLLMConfig
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _router(clock: _Clock, **cfg: Any) -> ServerRouter:
+    return ServerRouter(
+        RoutingConfig(circuit_breaker=CircuitBreakerConfig(failure_threshold=2, cooldown_seconds=10.0), **cfg),
+        clock=clock,
+    )
+
+
+def test_least_outstanding_prefers_idle_peer() -> None:
+    router = _router(_Clock())
+    router.start("a")
+    assert router.route([["a", "b"]]) == "b"
+    router.finish("a", failed=False, latency_s=0.1)
+    router.start("b")
+    assert router.route([["a", "b"]]) == "a"
+    assert router.stats()["decisions"] == {"primary": 1, "balanced": 1, "failover": 0, "unavailable": 0}
+
+
+def test_ewma_latency_avoids_slow_server() -> None:
+    router = _router(_Clock(), policy="ewma_latency")
+    for _ in range(3):
+        router.start("a")
+        router.finish("a", failed=False, latency_s=2.0)
+        router.start("b")
+        router.finish("b", failed=False, latency_s=0.1)
+    assert router.route([["a", "b"]]) == "b"
+    assert router.stats()["servers"]["a"]["ewma_latency_ms"] == pytest.approx(2000.0)
+
+
+def test_backing_off_server_is_ranked_last() -> None:
+    clock = _Clock()
+    router = _router(clock)
+    router.record_backoff("a", 5.0)
+    assert router.route([["a", "b"]]) == "b"
+    clock.now = 6.0
+    assert router.route([["a", "b"]]) == "a"
+
+
+def test_circuit_opens_then_half_open_probe_closes_it() -> None:
+    clock = _Clock()
+    router = _router(clock)
+    for _ in range(2):
+        router.start("a")
+        router.finish("a", failed=True)
+    assert router.stats()["servers"]["a"]["state"] == "open"
+    assert router.route([["a"], ["b"]]) == "b"
+    assert router.route([["a"]]) is None
+
+    clock.now = 11.0
+    assert router.route([["a"]]) == "a"
+    router.start("a")
+    # Only one probe at a time while half-open.
+    assert router.route([["a"]]) is None
+    router.finish("a", failed=False, latency_s=0.05)
+    assert router.stats()["servers"]["a"]["state"] == "closed"
+    assert router.stats()["decisions"]["failover"] == 1
+
+
+def test_route_reserves_the_half_open_probe_and_neutral_finish_keeps_state() -> None:
+    clock = _Clock()
+    router = _router(clock)
+    for _ in range(2):
+        router.start("a")
+        router.finish("a", failed=True)
+
+    clock.now = 11.0
+    # Two callers route before either starts its request: only one may probe.
+    assert router.route([["a"]]) == "a"
+    assert router.route([["a"]]) is None
+
+    # A cancelled probe neither closes nor re-opens the circuit; the next caller probes again.
+    router.start("a")
+    router.finish("a", failed=None)
+    assert router.stats()["servers"]["a"]["state"] == "half_open"
+    assert router.stats()["servers"]["a"]["consecutive_failures"] == 2
+    assert router.route([["a"]]) == "a"
+    router.start("a")
+    router.finish("a", failed=True)
+    assert router.stats()["servers"]["a"]["state"] == "open"
+
+    # A reservation whose request never started lapses after another cooldown.
+    clock.now = 22.0
+    assert router.route([["a"]]) == "a"
+    clock.now = 33.0
+    assert router.route([["a"]]) == "a"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    status = 200
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        port = self.server.server_address[1]
+        body = json.dumps({"choices": [{"text": f"from-{port}"}]}).encode("utf-8")
+        self.send_response(type(self).status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        return None
+
+
+class _FailingHandler(_Handler):
+    status = 500
+
+
+@pytest.fixture()
+def servers() -> Iterator[List[str]]:
+    started = [ThreadingHTTPServer(("127.0.0.1", 0), h) for h in (_FailingHandler, _Handler)]
+    for srv in started:
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield [f"http://127.0.0.1:{srv.server_address[1]}" for srv in started]
+    finally:
+        for srv in started:
+            srv.shutdown()
+            srv.server_close()
+
+
+def _client(urls: List[str], *, groups=("g", "g"), **extra: Any) -> ServerLLMClient:
+    configs = {
+        "bad": ServerLLMConfig(name="bad", base_url=urls[0], routing_group=groups[0], **extra),
+        "good": ServerLLMConfig(name="good", base_url=urls[1], routing_group=groups[1]),
+    }
+    return ServerLLMClient(
+        servers=configs,
+        default_name="bad",
+        routing=RoutingConfig(circuit_breaker=CircuitBreakerConfig(failure_threshold=2, cooldown_seconds=60.0)),
+    )
+
+
+def test_failing_server_is_taken_out_of_rotation(servers: List[str]) -> None:
+    client = _client(servers, groups=("", ""))
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError):
+            client.ask(prompt="hi")
+
+    # Circuit of the default server is open: calls fail over to the next server.
+    port = servers[1].rsplit(":", 1)[1]
+    assert client.ask(prompt="hi") == f"from-{port}"
+    stats = client.routing_stats()
+    assert stats["servers"]["bad"]["state"] == "open"
+    assert stats["servers"]["bad"]["failures"] == 2
+    assert stats["decisions"]["failover"] == 1
+
+
+def test_routing_never_picks_security_ineligible_peer(servers: List[str]) -> None:
+    client = _client(servers, allowed_doc_level=5)
+    security_context = {"doc_level_max": 3}
+    # Make the eligible "bad" server look busy: the idle peer must still not be chosen.
+    client._router.start("bad")
+    server, notice = client._select_server(None, security_context=security_context)
+    assert (server.name, notice) == ("bad", None)
+
+    server, _ = client._select_server(None)
+    assert server.name == "good"
+
+
+def test_hybrid_uses_local_model_while_all_circuits_are_open(servers: List[str]) -> None:
+    client = _client(servers, groups=("g", "g"))
+    for name in ("bad", "good"):
+        for _ in range(2):
+            client._router.start(name)
+            client._router.finish(name, failed=True)
+
+    local = SimpleNamespace(ask=lambda **kwargs: "local-answer")
+    state = SimpleNamespace()
+    hybrid = HybridLLMClient(local_model=local, server_client=client)
+    assert hybrid.ask(prompt="hi", security_context={"state": state}) == "local-answer"
+    assert not hasattr(state, "llm_server_security_override_notice")
+
+    # Without a local model the primary server is tried anyway.
+    assert client._select_server(None)[0].name == "bad"
+
+
+class _HtmlHandler(_Handler):
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b"<html>proxy login</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_unparseable_body_is_a_failure_and_cancellation_is_neutral() -> None:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _HtmlHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        client = _client([f"http://127.0.0.1:{srv.server_address[1]}", "http://127.0.0.1:9"], groups=("", ""))
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                client.ask(prompt="hi")
+        stats = client.routing_stats()["servers"]["bad"]
+        assert (stats["state"], stats["failures"]) == ("open", 2)
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    def _cancelled() -> None:
+        raise KeyboardInterrupt()
+
+    server = client._servers["good"]
+    client._router.start("good")
+    client._router.finish("good", failed=True)
+    with pytest.raises(KeyboardInterrupt):
+        client._tracked(server, _cancelled)
+    stats = client.routing_stats()["servers"]["good"]
+    assert (stats["consecutive_failures"], stats["in_flight"]) == (1, 0)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from code_query_engine.llm_server_client import ServerLLMClient, ServerLLMConfig
+
+
+class _SseHandler(BaseHTTPRequestHandler):
+    requests: List[Dict[str, Any]] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        type(self).requests.append({"path": self.path, "body": body})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chat = self.path.endswith("/chat/completions")
+        for piece in ("Hello", " wor", "ld"):
+            choice = {"delta": {"content": piece}} if chat else {"text": piece}
+            self.wfile.write(f"data: {json.dumps({'choices': [choice]})}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args: Any) -> None:
+        return None
+
+
+@pytest.fixture()
+def sse_server() -> Iterator[str]:
+    _SseHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SseHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("chat", [False, True])
+def test_server_client_streams_deltas(sse_server: str, chat: bool) -> None:
+    client = ServerLLMClient(
+        servers={"s1": ServerLLMConfig(name="s1", base_url=sse_server, timeout_seconds=5)},
+        default_name="s1",
+    )
+    deltas: List[str] = []
+    if chat:
+        out = client.ask_chat(prompt="hi", system_prompt="SYS", on_delta=deltas.append)
+    else:
+        out = client.ask(prompt="hi", on_delta=deltas.append)
+
+    assert deltas == ["Hello", " wor", "ld"]
+    assert out == "Hello world"
+    assert _SseHandler.requests[-1]["body"]["stream"] is True
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import List
+
+import pytest
+
+from code_query_engine.local_inference_scheduler import (
+    InferenceScheduler,
+    LocalModelBusy,
+    SchedulerConfig,
+    resolve_priority,
+)
+from code_query_engine.pipeline.cancellation import PipelineCancelled
+
+
+def _start_blocking_job(scheduler: InferenceScheduler, release: threading.Event) -> threading.Thread:
+    started = threading.Event()
+
+    def _job() -> str:
+        started.set()
+        release.wait(5)
+        return "first"
+
+    t = threading.Thread(target=lambda: scheduler.run(_job, priority="low"))
+    t.start()
+    assert started.wait(5)
+    return t
+
+
+def _wait_queued(scheduler: InferenceScheduler, n: int) -> None:
+    deadline = time.time() + 5
+    while scheduler.queue_depth() < n:
+        assert time.time() < deadline
+        time.sleep(0.005)
+
+
+def test_high_priority_jobs_run_before_queued_normal_jobs() -> None:
+    scheduler = InferenceScheduler(SchedulerConfig(max_queue_size=8))
+    release = threading.Event()
+    first = _start_blocking_job(scheduler, release)
+
+    order: List[str] = []
+    threads = []
+    for name, prio in (("answer-1", "normal"), ("answer-2", "normal"), ("router", "high")):
+        t = threading.Thread(target=lambda n=name, p=prio: scheduler.run(lambda: order.append(n), priority=p))
+        t.start()
+        threads.append(t)
+        _wait_queued(scheduler, len(threads))
+
+    release.set()
+    for t in [first, *threads]:
+        t.join(5)
+
+    assert order == ["router", "answer-1", "answer-2"]
+    stats = scheduler.stats()
+    assert stats["completed"] == 4
+    assert stats["by_priority"] == {"high": 1, "normal": 2, "low": 1}
+    assert stats["queue_ms"]["count"] == 4
+    assert stats["generation_ms"]["count"] == 4
+
+
+def test_full_queue_rejects_with_busy() -> None:
+    scheduler = InferenceScheduler(SchedulerConfig(max_queue_size=1))
+    release = threading.Event()
+    first = _start_blocking_job(scheduler, release)
+
+    waiter = threading.Thread(target=lambda: scheduler.run(lambda: None))
+    waiter.start()
+    _wait_queued(scheduler, 1)
+
+    with pytest.raises(LocalModelBusy) as exc:
+        scheduler.run(lambda: None)
+    assert exc.value.queue_depth == 1
+    assert exc.value.retry_after_seconds >= 1.0
+
+    release.set()
+    first.join(5)
+    waiter.join(5)
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_queue_wait_timeout_is_busy() -> None:
+    scheduler = InferenceScheduler(SchedulerConfig(max_queue_size=4, max_queue_wait_seconds=0.1))
+    release = threading.Event()
+    first = _start_blocking_job(scheduler, release)
+
+    with pytest.raises(LocalModelBusy):
+        scheduler.run(lambda: None)
+
+    release.set()
+    first.join(5)
+    assert scheduler.stats()["timed_out"] == 1
+    assert scheduler.queue_depth() == 0
+
+
+def test_cancelled_job_leaves_queue_without_running() -> None:
+    scheduler = InferenceScheduler(SchedulerConfig(max_queue_size=4))
+    release = threading.Event()
+    first = _start_blocking_job(scheduler, release)
+    cancelled = threading.Event()
+
+    def _cancel_check() -> None:
+        if cancelled.is_set():
+            raise PipelineCancelled("run-1", "user")
+
+    calls: List[str] = []
+    errors: List[BaseException] = []
+
+    def _queued() -> None:
+        try:
+            scheduler.run(lambda: calls.append("ran"), cancel_check=_cancel_check)
+        except BaseException as ex:  # noqa: BLE001
+            errors.append(ex)
+
+    t = threading.Thread(target=_queued)
+    t.start()
+    _wait_queued(scheduler, 1)
+    cancelled.set()
+    t.join(5)
+
+    assert calls == []
+    assert isinstance(errors[0], PipelineCancelled)
+    assert scheduler.queue_depth() == 0
+
+    release.set()
+    first.join(5)
+    assert scheduler.stats()["cancelled_in_queue"] == 1
+
+
+def test_resolve_priority() -> None:
+    assert resolve_priority(None) == resolve_priority("normal")
+    assert resolve_priority("HIGH") < resolve_priority("low")
+    with pytest.raises(ValueError):
+        resolve_priority("urgent")
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import List
+
+from code_query_engine.prompt_prefix_cache import PromptPrefixCache
+
+
+class _FakeLlama:
+    """Mimics llama-cpp prefix reuse: only tokens after the common prefix with the KV cache are evaluated."""
+
+    BYTES_PER_TOKEN = 10
+
+    def __init__(self) -> None:
+        self.input_ids: List[int] = []
+        self.n_tokens = 0
+        self.evaluated = 0
+        self.loads = 0
+
+    def reset(self) -> None:
+        self.n_tokens = 0
+
+    def eval(self, tokens: List[int]) -> None:
+        self.input_ids = self.input_ids[: self.n_tokens] + list(tokens)
+        self.n_tokens = len(self.input_ids)
+        self.evaluated += len(tokens)
+
+    def save_state(self):
+        ids = list(self.input_ids[: self.n_tokens])
+        return SimpleNamespace(input_ids=ids, n_tokens=len(ids), llama_state_size=len(ids) * self.BYTES_PER_TOKEN)
+
+    def load_state(self, state) -> None:
+        self.loads += 1
+        self.input_ids = list(state.input_ids)
+        self.n_tokens = state.n_tokens
+
+    def __call__(self, prompt: str) -> str:
+        tokens = [ord(c) for c in prompt]
+        keep = 0
+        for a, b in zip(self.input_ids[: self.n_tokens], tokens[:-1]):
+            if a != b:
+                break
+            keep += 1
+        self.n_tokens = keep
+        self.eval(tokens[keep:])
+        self.eval([ord("!")] * 3)  # generated tokens
+        return "ok"
+
+
+SYSTEM = "You are a router. Answer with one word. " * 4
+
+
+def _call(cache: PromptPrefixCache, llm: _FakeLlama, question: str) -> int:
+    key = PromptPrefixCache.make_key("model.gguf", "completion", SYSTEM)
+    before = llm.evaluated
+    restored = cache.restore(llm, key)
+    llm(f"[INST] {SYSTEM}\n{question} [/INST]")
+    if not restored:
+        cache.learn(llm, key)
+    return llm.evaluated - before
+
+
+def test_shared_prefix_is_learned_then_restored() -> None:
+    cache = PromptPrefixCache(max_bytes=1 << 20, min_prefix_tokens=16)
+    llm = _FakeLlama()
+
+    _call(cache, llm, "first question?")
+    _call(cache, llm, "second one")
+    # Unrelated work in between overwrites the KV cache.
+    llm.reset()
+    llm("something else entirely")
+
+    third = _call(cache, llm, "third question")
+
+    prefix_len = len(f"[INST] {SYSTEM}\n")
+    # Only the question part (+ generated tokens) is evaluated after the restore.
+    assert third == len("third question [/INST]") + 3
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["states_saved"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["saved_prefix_tokens"] == prefix_len
+    assert stats["bytes"] == prefix_len * _FakeLlama.BYTES_PER_TOKEN
+
+
+def test_short_common_prefix_is_not_saved() -> None:
+    cache = PromptPrefixCache(max_bytes=1 << 20, min_prefix_tokens=64)
+    llm = _FakeLlama()
+    key = PromptPrefixCache.make_key("model.gguf", "completion", "sys")
+    for prompt in ("short A", "short B"):
+        llm(prompt)
+        cache.learn(llm, key)
+    assert cache.stats()["entries"] == 0
+    assert cache.restore(llm, key) == 0
+
+
+def test_byte_budget_evicts_least_recently_used() -> None:
+    cache = PromptPrefixCache(max_bytes=250)
+    keys = [PromptPrefixCache.make_key("m", "chat", str(i)) for i in range(3)]
+    for key in keys:
+        cache.put(key, SimpleNamespace(input_ids=[1] * 10, n_tokens=10, llama_state_size=100), n_tokens=10)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 200
+
+    llm = _FakeLlama()
+    assert cache.restore(llm, keys[0]) == 0
+    assert cache.restore(llm, keys[2]) == 10
+
+    # A state larger than the whole budget is never stored.
+    cache.put(PromptPrefixCache.make_key("m", "chat", "big"), SimpleNamespace(llama_state_size=1000), n_tokens=99)
+    assert cache.stats()["too_large"] == 1
+
+
+def test_keys_separate_models_and_modes() -> None:
+    k = PromptPrefixCache.make_key
+    assert k("a.gguf", "chat", SYSTEM) != k("b.gguf", "chat", SYSTEM)
+    assert k("a.gguf", "chat", SYSTEM) != k("a.gguf", "completion", SYSTEM)
+    assert k("a.gguf", "chat", SYSTEM) == k("a.gguf", "chat", SYSTEM)
+
+
+def test_disabled_cache_is_a_no_op() -> None:
+    cache = PromptPrefixCache(max_bytes=0)
+    llm = _FakeLlama()
+    key = PromptPrefixCache.make_key("m", "completion", SYSTEM)
+    llm(SYSTEM + "q1")
+    cache.learn(llm, key)
+    llm(SYSTEM + "q2")
+    cache.learn(llm, key)
+    assert cache.restore(llm, key) == 0
+    assert cache.stats()["misses"] == 0
@@ -64,3 +64,42 @@ def test_call_model_max_output_tokens_overrides_max_tokens(monkeypatch: pytest.M
     assert model.calls
     assert model.calls[0]["kwargs"].get("max_tokens") == 123
 
+
+
+def test_call_model_passes_priority_only_to_models_that_support_it(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(CallModelAction, "_load_system_prompt", lambda self, *, prompts_dir, prompt_key: "SYS")
+    monkeypatch.setattr(CallModelAction, "_build_manual_prompt", staticmethod(lambda **_kw: "PROMPT"))
+
+    class _State:
+        consultant = "c"
+        last_model_response = ""
+        context_blocks = ["CTX"]
+        user_question_neutral = "Q"
+        history_dialog = []
+
+    step = type(
+        "S",
+        (),
+        {"raw": {"prompt_key": "x", "priority": "high", "user_parts": {"q": {"source": "user_question_neutral", "template": "{}"}}}},
+    )()
+
+    plain = _CaptureModel()
+    scheduled = _CaptureModel()
+    scheduled.supports_priority = True  # type: ignore[attr-defined]
+    for model in (plain, scheduled):
+        runtime = PipelineRuntime(
+            pipeline_settings={"prompts_dir": "dummy"},
+            model=model,
+            searcher=None,
+            markdown_translator=None,
+            translator_pl_en=None,
+            history_manager=None,
+        )
+        CallModelAction().do_execute(step, _State(), runtime)
+
+    assert "priority" not in plain.calls[0]["kwargs"]
+    assert scheduled.calls[0]["kwargs"]["priority"] == "high"
+
+    step.raw["priority"] = "urgent"
+    with pytest.raises(ValueError, match="invalid priority"):
+        CallModelAction().do_execute(step, _State(), runtime)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from queue import Empty
+from typing import Any, Dict, List
+
+import pytest
+
+from code_query_engine.pipeline.actions.call_model import CallModelAction
+from code_query_engine.pipeline.actions.translate_out_if_needed import TranslateOutIfNeededAction
+from code_query_engine.pipeline.engine import PipelineRuntime
+from code_query_engine.work_callback.broker import WorkCallbackBroker, get_work_callback_broker
+
+
+class _StreamingModel:
+    supports_stream_callback = True
+
+    def __init__(self, tokens: List[str]) -> None:
+        self.tokens = tokens
+        self.calls: List[Dict[str, Any]] = []
+
+    def ask(self, *, prompt: str, system_prompt=None, on_delta=None, **kwargs):
+        self.calls.append({"on_delta": on_delta, "kwargs": dict(kwargs)})
+        for tok in self.tokens:
+            if on_delta is not None:
+                on_delta(tok)
+        return "".join(self.tokens).strip()
+
+
+class _State:
+    def __init__(self, run_id: str, *, translate_chat: bool = False) -> None:
+        self.pipeline_run_id = run_id
+        self.translate_chat = translate_chat
+        self.consultant = "c"
+        self.last_model_response = ""
+        self.context_blocks = ["CTX"]
+        self.user_question_neutral = "Q"
+        self.history_dialog = []
+        self.answer_neutral = None
+        self.answer_translated = None
+
+
+def _runtime(model: Any, **kwargs: Any) -> PipelineRuntime:
+    return PipelineRuntime(
+        pipeline_settings={"prompts_dir": "dummy"},
+        model=model,
+        searcher=None,
+        markdown_translator=kwargs.get("markdown_translator"),
+        translator_pl_en=None,
+        history_manager=None,
+        logger=None,
+        constants=None,
+        graph_provider=None,
+        token_counter=None,
+        add_plant_link=lambda x: x,
+    )
+
+
+def _step(**raw: Any):
+    base = {
+        "prompt_key": "x",
+        "user_parts": {"user_question": {"source": "user_question_neutral", "template": "{}"}},
+    }
+    base.update(raw)
+    return type("S", (), {"id": "call_model_sure_answer", "raw": base})()
+
+
+def _drain(q) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    while True:
+        try:
+            out.append(q.get_nowait())
+        except Empty:
+            return out
+
+
+@pytest.fixture(autouse=True)
+def _no_prompt_files(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(CallModelAction, "_load_system_prompt", lambda self, *, prompts_dir, prompt_key: "SYS")
+    monkeypatch.setattr(CallModelAction, "_build_manual_prompt", staticmethod(lambda **_kw: "PROMPT"))
+
+
+def test_stream_answer_emits_deltas_and_final_answer() -> None:
+    run_id = "run-stream-answer"
+    broker = get_work_callback_broker()
+    broker.ensure_run(run_id)
+    q, _, _, _ = broker.open_stream(run_id)
+    model = _StreamingModel(["The ", "class ", "is ", "defined ", "in Foo.cs. "])
+
+    try:
+        CallModelAction().do_execute(_step(stream_answer=True), _State(run_id), _runtime(model))
+        events = _drain(q)
+    finally:
+        broker.remove_stream(run_id, q)
+
+    deltas = [e for e in events if e["type"] == "answer_delta"]
+    finals = [e for e in events if e["type"] == "answer"]
+    assert deltas, events
+    assert "".join(d["text"] for d in deltas) == "The class is defined in Foo.cs. "
+    assert deltas[0]["offset"] == 0
+    assert all(d["step_id"] == "call_model_sure_answer" for d in deltas)
+    assert finals[-1]["text"] == "The class is defined in Foo.cs."
+    assert finals[-1]["final"] is True
+
+    # Late subscribers get the answer without replaying every delta.
+    _, snapshot, _, _ = broker.open_stream(run_id)
+    assert snapshot[-1]["type"] == "answer"
+    assert snapshot[-1]["text"] == "The class is defined in Foo.cs."
+
+
+def test_stream_answer_is_off_by_default_and_without_run_id() -> None:
+    model = _StreamingModel(["x"])
+    CallModelAction().do_execute(_step(), _State("run-no-stream"), _runtime(model))
+    CallModelAction().do_execute(_step(stream_answer=True), _State(""), _runtime(model))
+    assert [c["on_delta"] for c in model.calls] == [None, None]
+
+
+def test_translated_answer_replaces_streamed_draft() -> None:
+    run_id = "run-stream-translate"
+    broker = get_work_callback_broker()
+    broker.ensure_run(run_id)
+    q, _, _, _ = broker.open_stream(run_id)
+    state = _State(run_id, translate_chat=True)
+
+    class _Translator:
+        def translate_markdown(self, text: str) -> str:
+            return "Klasa jest w Foo.cs."
+
+    try:
+        CallModelAction().do_execute(_step(stream_answer=True), state, _runtime(_StreamingModel(["In Foo.cs."])))
+        state.answer_neutral = state.last_model_response
+        TranslateOutIfNeededAction().do_execute(
+            type("S", (), {"id": "translate_out", "raw": {}})(),
+            state,
+            _runtime(None, markdown_translator=_Translator()),
+        )
+        events = _drain(q)
+    finally:
+        broker.remove_stream(run_id, q)
+
+    answers = [e for e in events if e["type"] == "answer"]
+    assert answers[0]["pending_translation"] is True
+    assert answers[0]["final"] is False
+    assert answers[-1]["text"] == "Klasa jest w Foo.cs."
+    assert answers[-1]["translated"] is True
+    assert answers[-1]["final"] is True
+
+
+def test_slow_subscriber_skips_deltas_and_is_resynchronized() -> None:
+    broker = WorkCallbackBroker()
+    run_id = "run-backpressure"
+    broker.ensure_run(run_id)
+    slow, _, _, _ = broker.open_stream(run_id)
+
+    broker.begin_answer(run_id, step_id="s")
+    for i in range(200):
+        broker.emit_answer_delta(run_id, step_id="s", text=f"{i} ")
+
+    # The backlog stays bounded; the producer never waited.
+    backlog = _drain(slow)
+    assert len(backlog) < 200
+    assert broker.answer_stream_stats(run_id)["dropped_deltas"] > 0
+
+    broker.emit_answer_delta(run_id, step_id="s", text="end")
+    resync = _drain(slow)
+    assert resync == [
+        {
+            "type": "answer",
+            "run_id": run_id,
+            "step_id": "s",
+            "text": "".join(f"{i} " for i in range(200)) + "end",
+            "final": False,
+        }
+    ]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from code_query_engine.pipeline.compiled_cache import CompiledPipelineCache
+from code_query_engine.pipeline.loader import PipelineLoader
+from code_query_engine.pipeline.lockfile import generate_lockfile, lockfile_path_for_yaml, write_lockfile
+from code_query_engine.pipeline.validator import PipelineValidator
+
+
+class _CountingLoader(PipelineLoader):
+    def __init__(self, *, pipelines_root: str) -> None:
+        super().__init__(pipelines_root=pipelines_root)
+        self.load_calls = 0
+
+    def load_by_name(self, name: str):
+        self.load_calls += 1
+        return super().load_by_name(name)
+
+
+def _write_pipelines(root: Path, *, child_max_history: int = 250, compat_mode: str = "latest") -> Path:
+    (root / "base").mkdir(parents=True, exist_ok=True)
+    (root / "base" / "base.yaml").write_text(
+        """
+YAMLpipeline:
+  name: base
+  settings:
+    entry_step_id: a
+    behavior_version: "0.2.0"
+    compat_mode: latest
+    max_history_tokens: 100
+  steps:
+    - id: a
+      action: search_nodes
+      search_type: bm25
+      next: b
+    - id: b
+      action: finalize
+      end: true
+""".strip(),
+        encoding="utf-8",
+    )
+    child = root / "child.yaml"
+    child.write_text(
+        f"""
+YAMLpipeline:
+  name: child
+  extends: ./base/base.yaml
+  settings:
+    compat_mode: {compat_mode}
+    max_history_tokens: {child_max_history}
+""".strip(),
+        encoding="utf-8",
+    )
+    return child
+
+
+def _bump_mtime(path: Path) -> None:
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+
+def test_compiled_cache_hits_until_extends_chain_changes(tmp_path: Path) -> None:
+    _write_pipelines(tmp_path)
+    loader = _CountingLoader(pipelines_root=str(tmp_path))
+    cache = CompiledPipelineCache()
+
+    c1 = cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+    c2 = cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+
+    assert c1 is c2
+    assert loader.load_calls == 1
+    assert c1.pipeline.settings["max_history_tokens"] == 250
+    assert len(c1.files) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    base = tmp_path / "base" / "base.yaml"
+    base.write_text(base.read_text(encoding="utf-8").replace("search_type: bm25", "search_type: semantic"), encoding="utf-8")
+    _bump_mtime(base)
+
+    c3 = cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+    assert c3 is not c1
+    assert loader.load_calls == 2
+    assert c3.pipeline.steps_by_id()["a"].raw["search_type"] == "semantic"
+
+
+def test_compiled_cache_touch_without_content_change_is_a_hit(tmp_path: Path) -> None:
+    child = _write_pipelines(tmp_path)
+    loader = _CountingLoader(pipelines_root=str(tmp_path))
+    cache = CompiledPipelineCache()
+
+    first = cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+    _bump_mtime(child)
+    second = cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+
+    assert loader.load_calls == 1
+    assert second.pipeline is first.pipeline
+    assert cache.stats()["hits"] == 1
+
+
+def test_compiled_cache_applies_lockfile_and_tracks_it(tmp_path: Path) -> None:
+    child = _write_pipelines(tmp_path, compat_mode="latest")
+    loader = _CountingLoader(pipelines_root=str(tmp_path))
+    write_lockfile(lockfile=generate_lockfile(loader.load_by_name("child")), path=lockfile_path_for_yaml(child))
+
+    child.write_text(child.read_text(encoding="utf-8").replace("compat_mode: latest", "compat_mode: locked"), encoding="utf-8")
+    cache = CompiledPipelineCache()
+    compiled = cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+
+    # Lockfile defaults are applied once at compile time.
+    assert compiled.pipeline.steps_by_id()["a"].raw["rerank"] == "none"
+    assert any(fp.path.endswith(".lock.json") for fp in compiled.fingerprint)
+
+    lock_path = lockfile_path_for_yaml(child)
+    lock_path.write_text(lock_path.read_text(encoding="utf-8").replace('"0.2.0"', '"0.1.0"'), encoding="utf-8")
+    _bump_mtime(lock_path)
+
+    with pytest.raises(ValueError, match="behavior_version"):
+        cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+
+
+def test_compiled_cache_invalidate_and_stub_loaders_are_not_cached(tmp_path: Path) -> None:
+    _write_pipelines(tmp_path)
+    loader = _CountingLoader(pipelines_root=str(tmp_path))
+    cache = CompiledPipelineCache()
+    cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+
+    assert cache.invalidate("child") == 1
+    assert cache.invalidate("child") == 0
+    cache.get_or_compile("child", loader=loader, validator=PipelineValidator())
+    assert loader.load_calls == 2
+    assert cache.stats()["invalidations"] == 1
+
+    class _StubLoader:
+        def load_by_name(self, name: str):
+            return loader.load_from_path(str(tmp_path / "child.yaml"))
+
+    stub = _StubLoader()
+    cache.get_or_compile("stub", loader=stub, validator=PipelineValidator())
+    assert "stub" not in cache.stats()["pipelines"]
@@ -808,6 +808,39 @@ def test_fetch_node_texts_include_metadata_context_with_selected_fields() -> Non
     assert all("class_name" not in line for line in meta)
 
 
+def test_fetch_node_texts_metadata_context_never_includes_precomputed_code_kind() -> None:
+    step = StepDef(
+        id="fetch_texts",
+        action="fetch_node_texts",
+        raw={
+            "id": "fetch_texts",
+            "action": "fetch_node_texts",
+            "budget_tokens": 100,
+            "include_metadata_in_context": True,
+        },
+    )
+    state = PipelineState(user_query="q", session_id="s", consultant="c", branch=None, translate_chat=False, snapshot_id="snap")
+    state.retrieval_seed_nodes = ["S1"]
+    backend = _RetrievalBackendFetchNodesStub(
+        nodes={"S1": {"text": "SELECT 1", "project_name": "Nop.Data", "code_kind": "sql"}}
+    )
+    rendered: List[str] = []
+    counter = SimpleNamespace(count_tokens=lambda text: rendered.append(str(text)) or 1)
+    rt = SimpleNamespace(
+        pipeline_settings={"repository": "nopCommerce", "snapshot_id": "snap", "max_context_tokens": 4096},
+        retrieval_backend=backend,
+        token_counter=counter,
+    )
+
+    FetchNodeTextsAction().execute(step, state, rt)
+
+    assert len(state.node_texts) == 1
+    meta = list(state.node_texts[0].get("metadata_context") or [])
+    assert meta == ["project_name: Nop.Data"]
+    # The budgeted context block is what the LLM sees.
+    assert rendered and all("code_kind" not in block for block in rendered)
+
+
 def test_fetch_node_texts_metadata_fields_invalid_type_fails() -> None:
     step = StepDef(
         id="fetch_texts",
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import random
+import threading
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from code_query_engine.pipeline.providers.graph_adjacency import AdjacencyCache, CompactAdjacencyBuilder
+from code_query_engine.pipeline.providers.weaviate_graph_provider import WeaviateGraphProvider
+
+
+def _edges(n_nodes: int, n_edges: int, seed: int = 7) -> List[Tuple[str, str, str]]:
+    rnd = random.Random(seed)
+    rels = ["calls", "uses", "sql_reads", "cs_inherits"]
+    return [
+        (f"R::S::k::{rnd.randrange(n_nodes)}", rnd.choice(rels), f"R::S::k::{rnd.randrange(n_nodes)}")
+        for _ in range(n_edges)
+    ]
+
+
+def test_csr_matches_dict_of_lists_order() -> None:
+    edges = _edges(200, 2000)
+    expected: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    builder = CompactAdjacencyBuilder()
+    for frm, rel, to in edges:
+        expected[frm].append((rel, to))
+        builder.add(frm, rel, to)
+    adj = builder.build()
+
+    assert adj.edge_count == 2000
+    assert len(adj.relations) == 4
+    for node in adj.node_ids:
+        assert list(adj.neighbors(node)) == expected.get(node, [])
+    assert list(adj.neighbors("missing")) == []
+    assert adj.get("missing", []) == []
+
+
+def test_adjacency_cache_respects_memory_budget() -> None:
+    def build(seed: int):
+        b = CompactAdjacencyBuilder()
+        for frm, rel, to in _edges(100, 500, seed):
+            b.add(frm, rel, to)
+        return b.build()
+
+    one = build(1).approx_bytes()
+    cache = AdjacencyCache(max_bytes=int(one * 2.5))
+    calls: List[int] = []
+
+    for seed in (1, 2, 3):
+        cache.get_or_build(("R", f"s{seed}"), lambda seed=seed: calls.append(seed) or build(seed))
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert {s["snapshot_id"] for s in stats["snapshots"]} == {"s2", "s3"}
+    assert all(s["bytes"] > 0 and s["build_ms"] >= 0 for s in stats["snapshots"])
+
+    cache.get_or_build(("R", "s3"), lambda: build(3))
+    assert calls == [1, 2, 3]
+    assert cache.stats()["hits"] == 1
+
+    assert cache.invalidate(snapshot_id="s2") == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_adjacency_cache_drops_build_locks_after_builds() -> None:
+    cache = AdjacencyCache(max_bytes=0)
+    started = threading.Event()
+    release = threading.Event()
+    calls: List[str] = []
+
+    def slow_build():
+        calls.append("slow")
+        started.set()
+        release.wait(5)
+        b = CompactAdjacencyBuilder()
+        b.add("a", "calls", "b")
+        return b.build()
+
+    waiter = threading.Thread(target=lambda: cache.get_or_build(("R", "s1"), slow_build))
+    waiter.start()
+    assert started.wait(5)
+    assert set(cache._build_locks) == {("R", "s1")}
+    release.set()
+    waiter.join(5)
+
+    def failing_build():
+        raise RuntimeError("boom")
+
+    try:
+        cache.get_or_build(("R", "s2"), failing_build)
+    except RuntimeError:
+        pass
+    for i in range(20):
+        cache.get_or_build(("R", f"x{i}"), lambda: CompactAdjacencyBuilder().build())
+    cache.invalidate(repo="R")
+
+    assert calls == ["slow"]
+    assert cache._build_locks == {}
+
+
+class _FakeEdgeCollection:
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows = rows
+        self.iterations = 0
+
+    def with_tenant(self, _tenant: str) -> "_FakeEdgeCollection":
+        return self
+
+    def iterator(self, **_kwargs: Any):
+        self.iterations += 1
+        for r in self.rows:
+            yield SimpleNamespace(properties=r)
+
+
+def test_provider_expands_from_compact_adjacency_and_caches() -> None:
+    rows = [
+        {"repo": "R", "snapshot_id": "S", "from_canonical_id": "R::S::k::a", "to_canonical_id": "R::S::k::b", "edge_type": "calls"},
+        {"repo": "R", "snapshot_id": "S", "from_canonical_id": "R::S::k::a", "to_canonical_id": "R::S::k::c", "edge_type": "uses"},
+        {"repo": "R", "snapshot_id": "S", "from_canonical_id": "R::S::k::b", "to_canonical_id": "R::S::k::d", "edge_type": "calls"},
+        {"repo": "Other", "snapshot_id": "S", "from_canonical_id": "R::S::k::a", "to_canonical_id": "R::S::k::x", "edge_type": "calls"},
+    ]
+    coll = _FakeEdgeCollection(rows)
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda _name: coll))
+    provider = WeaviateGraphProvider(client=client, classification_labels_universe=[], security_config={})
+
+    out = provider.expand_dependency_tree(seed_nodes=["R::S::k::a"], max_depth=2, edge_allowlist=["calls"], repository="R")
+    assert out["nodes"] == ["R::S::k::a", "R::S::k::b", "R::S::k::d"]
+    assert [e["type"] for e in out["edges"]] == ["calls", "calls"]
+
+    provider.expand_dependency_tree(seed_nodes=["R::S::k::a"], repository="R")
+    assert coll.iterations == 1
+    snap = provider.adjacency_cache_stats()["snapshots"][0]
+    assert (snap["repo"], snap["snapshot_id"], snap["edges"]) == ("R", "S", 3)
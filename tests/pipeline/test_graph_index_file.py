@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from code_query_engine.pipeline.providers import graph_index_file
+from code_query_engine.pipeline.providers.graph_adjacency import CompactAdjacencyBuilder
+from code_query_engine.pipeline.providers.graph_index_file import (
+    GraphIndexError,
+    MappedGraphIndex,
+    default_graph_index_dir,
+    graph_index_path,
+    open_graph_index,
+    resolve_graph_index_dir,
+    write_graph_index,
+)
+from code_query_engine.pipeline.providers.weaviate_graph_provider import WeaviateGraphProvider
+
+
+def _adjacency(seed: int = 3):
+    rnd = random.Random(seed)
+    b = CompactAdjacencyBuilder()
+    for _ in range(1500):
+        b.add(f"R::S::k::ń{rnd.randrange(300)}", rnd.choice(["calls", "uses", "sql_reads"]), f"R::S::k::{rnd.randrange(300)}")
+    return b.build()
+
+
+def test_roundtrip_preserves_neighbors_and_order(tmp_path) -> None:
+    adj = _adjacency()
+    path = write_graph_index(tmp_path / "g.rgx", adj, repo="R", snapshot_id="S", import_id="imp-1")
+    idx = open_graph_index(path)
+
+    assert (idx.node_count, idx.edge_count) == (adj.node_count, adj.edge_count)
+    assert idx.meta["repo"] == "R" and idx.meta["import_id"] == "imp-1"
+    for node in adj.node_ids:
+        assert list(idx.neighbors(node)) == list(adj.neighbors(node))
+    assert list(idx.neighbors("R::S::k::missing")) == []
+    assert idx.prewarm() >= 1
+
+
+def test_corruption_and_version_are_detected(tmp_path) -> None:
+    path = write_graph_index(tmp_path / "g.rgx", _adjacency(), repo="R", snapshot_id="S")
+    raw = bytearray(path.read_bytes())
+
+    flipped = bytearray(raw)
+    flipped[-1] ^= 0xFF
+    path.write_bytes(bytes(flipped))
+    with pytest.raises(GraphIndexError, match="checksum"):
+        open_graph_index(path)
+
+    bad_version = bytearray(raw)
+    bad_version[8] = 99
+    path.write_bytes(bytes(bad_version))
+    with pytest.raises(GraphIndexError, match="version"):
+        open_graph_index(path)
+
+    path.write_bytes(bytes(raw[:40]))
+    with pytest.raises(GraphIndexError, match="truncated"):
+        open_graph_index(path)
+
+
+class _FakeEdgeCollection:
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows = rows
+        self.iterations = 0
+
+    def with_tenant(self, _tenant: str) -> "_FakeEdgeCollection":
+        return self
+
+    def iterator(self, **_kwargs: Any):
+        self.iterations += 1
+        for r in self.rows:
+            yield SimpleNamespace(properties=r)
+
+
+def test_provider_writes_index_lazily_and_maps_it_on_restart(tmp_path) -> None:
+    rows = [
+        {"repo": "R", "snapshot_id": "S", "from_canonical_id": "R::S::k::a", "to_canonical_id": "R::S::k::b", "edge_type": "calls"},
+        {"repo": "R", "snapshot_id": "S", "from_canonical_id": "R::S::k::b", "to_canonical_id": "R::S::k::c", "edge_type": "calls"},
+    ]
+    coll = _FakeEdgeCollection(rows)
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda _name: coll))
+
+    def provider() -> WeaviateGraphProvider:
+        return WeaviateGraphProvider(
+            client=client, classification_labels_universe=[], security_config={}, graph_index_dir=str(tmp_path)
+        )
+
+    first = provider().expand_dependency_tree(seed_nodes=["R::S::k::a"], repository="R", max_depth=3)
+    assert graph_index_path(tmp_path, repo="R", snapshot_id="S").exists()
+    assert coll.iterations == 1
+
+    restarted = provider()
+    second = restarted.expand_dependency_tree(seed_nodes=["R::S::k::a"], repository="R", max_depth=3)
+    assert second == first
+    assert coll.iterations == 1
+    assert isinstance(restarted._get_adjacency(repo="R", snapshot_id="S"), MappedGraphIndex)
+
+
+def test_graph_index_path_rejects_dot_components(tmp_path) -> None:
+    assert graph_index_path(tmp_path, repo="a/../b", snapshot_id="s..1") == tmp_path / "a_.._b" / "s..1.rgx"
+    with pytest.raises(ValueError):
+        graph_index_path(tmp_path, repo="..", snapshot_id="S")
+    with pytest.raises(ValueError):
+        graph_index_path(tmp_path, repo="R", snapshot_id=" . ")
+
+
+def test_resolve_graph_index_dir_precedence(tmp_path, monkeypatch) -> None:
+    monkeypatch.delenv("RAG_GRAPH_INDEX_DIR", raising=False)
+    project_root = graph_index_file._PROJECT_ROOT
+    assert resolve_graph_index_dir(None) == project_root / "graph_index"
+    assert resolve_graph_index_dir("idx") == project_root / "idx"
+    assert resolve_graph_index_dir(str(tmp_path)) == tmp_path
+    assert resolve_graph_index_dir("") is None
+
+    monkeypatch.setenv("RAG_GRAPH_INDEX_DIR", str(tmp_path / "env"))
+    assert resolve_graph_index_dir("") == tmp_path / "env"
+    assert resolve_graph_index_dir("idx") == tmp_path / "env"
+
+
+def test_default_graph_index_dir_reads_the_runtime_config(tmp_path, monkeypatch) -> None:
+    monkeypatch.delenv("RAG_GRAPH_INDEX_DIR", raising=False)
+    cfg = tmp_path / "runtime.json"
+    cfg.write_text('{"graph_index_dir": "%s"}' % (tmp_path / "cfg").as_posix(), encoding="utf-8")
+    monkeypatch.setenv("APP_CONFIG_PATH", str(cfg))
+    assert default_graph_index_dir() == tmp_path / "cfg"
+
+    cfg.write_text('{"graph_index_dir": ""}', encoding="utf-8")
+    assert default_graph_index_dir() is None
@@ -320,3 +320,89 @@ def test_divide_new_content_old_marker_removed_without_new_append(monkeypatch: p
     nxt = ManageContextBudgetAction().execute(step, state, rt)
     assert nxt == "ok"
     assert state.context_blocks == ["OLD BLOCK"]
+
+
+class _CountingTokenCounter(_TokenCounter):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def count_tokens(self, text: str) -> int:
+        self.calls += 1
+        return super().count_tokens(text)
+
+
+def test_ledger_admission_is_linear_in_tokenizer_calls_and_matches_full_recount(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("RAG_BUDGET_LEDGER_VERIFY", "1")
+    monkeypatch.setattr(
+        "code_query_engine.pipeline.actions.manage_context_budget.classify_text",
+        lambda _t: type("R", (), {"kind": CodeKind.SQL})(),
+    )
+
+    rt = _rt(max_context_tokens=10_000)
+    state = _state(
+        node_texts=[{"node_id": f"n{i}", "text": f"select {i} from t{i}"} for i in range(20)],
+        context_blocks=["existing context block", "  ", "another block"],
+    )
+    step = _step({"on_ok": "ok", "on_over": "over"})
+
+    # Verify mode raises on any drift between the ledger and a full recount.
+    assert ManageContextBudgetAction().execute(step, state, rt) == "ok"
+    assert len(state.context_blocks) == 23
+
+    # Without verification each block is tokenized exactly once (+1 for the separator).
+    monkeypatch.delenv("RAG_BUDGET_LEDGER_VERIFY")
+    counter = _CountingTokenCounter()
+    rt.token_counter = counter
+    state2 = _state(
+        node_texts=[{"node_id": f"n{i}", "text": f"select {i}"} for i in range(20)],
+        context_blocks=["existing context block"],
+    )
+    assert ManageContextBudgetAction().execute(step, state2, rt) == "ok"
+    assert counter.calls == 1 + 1 + 20
+
+
+def test_ledger_recounts_joined_text_at_the_budget_boundary(monkeypatch: pytest.MonkeyPatch):
+    from code_query_engine.pipeline.context_budget_ledger import ledger_for_blocks
+    from code_query_engine.pipeline.token_counter import ApproxTokenCounter
+
+    # chars/4 rounds every block down separately, so the summed estimate undercounts the joined text.
+    counter = ApproxTokenCounter()
+    ledger = ledger_for_blocks(counter.count_tokens, ["abcdefg"] * 20, verify=True)
+    joined = counter.count_tokens("\n\n".join(["abcdefg"] * 20))
+    assert ledger.total < joined
+    assert ledger.checked_total(1000) == ledger.total
+    assert ledger.checked_total(joined) == joined
+
+    monkeypatch.setenv("RAG_BUDGET_LEDGER_VERIFY", "1")
+    monkeypatch.setattr(
+        "code_query_engine.pipeline.actions.manage_context_budget.classify_text",
+        lambda _t: type("R", (), {"kind": CodeKind.SQL})(),
+    )
+    step = _step({"on_ok": "ok", "on_over": "over"})
+    outcomes = set()
+    for max_tokens in range(220, 250):
+        rt = _rt(max_context_tokens=max_tokens)
+        rt.token_counter = counter
+        state = _state(
+            node_texts=[{"node_id": f"n{i}", "text": f"select {i}"} for i in range(12)],
+            context_blocks=["abcdefg"] * 10,
+        )
+        outcome = ManageContextBudgetAction().execute(step, state, rt)
+        outcomes.add(outcome)
+        if outcome == "ok":
+            assert counter.count_tokens("\n\n".join(b.strip() for b in state.context_blocks)) <= max_tokens
+    assert outcomes == {"ok", "over"}
+
+
+def test_precomputed_code_kind_skips_classification(monkeypatch: pytest.MonkeyPatch):
+    def _fail(_t):
+        raise AssertionError("classify_text must not be called when code_kind is precomputed")
+
+    monkeypatch.setattr("code_query_engine.pipeline.actions.manage_context_budget.classify_text", _fail)
+
+    rt = _rt(max_context_tokens=300)
+    state = _state(node_texts=[{"node_id": "n1", "text": "select 1", "code_kind": "sql"}])
+    step = _step({"on_ok": "ok", "on_over": "over"})
+
+    assert ManageContextBudgetAction().execute(step, state, rt) == "ok"
+    assert "language: sql" in state.context_blocks[0]
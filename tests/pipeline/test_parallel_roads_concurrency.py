@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from code_query_engine.pipeline.action_registry import build_default_action_registry
+from code_query_engine.pipeline.actions.base_action import PipelineActionBase
+from code_query_engine.pipeline.cancellation import PipelineCancelled, get_pipeline_cancel_registry
+from code_query_engine.pipeline.definitions import StepDef, parse_pipeline_doc
+from code_query_engine.pipeline.engine import PipelineEngine, PipelineRuntime
+from code_query_engine.pipeline.providers.fakes import FakeRetrievalBackend
+from code_query_engine.pipeline.state import PipelineState
+
+LATENCY_S = 0.15
+
+
+class _History:
+    def add_iteration(self, followup, faiss_results):
+        return None
+
+
+class _DoneAction(PipelineActionBase):
+    @property
+    def action_id(self) -> str:
+        return "done"
+
+    def log_in(self, step: StepDef, state: PipelineState, runtime: PipelineRuntime) -> Dict[str, Any]:
+        return {}
+
+    def log_out(self, step, state, runtime, *, next_step_id: Optional[str], error) -> Dict[str, Any]:
+        return {}
+
+    def do_execute(self, step: StepDef, state: PipelineState, runtime: PipelineRuntime) -> Optional[str]:
+        state.done_consumed = [dict(m.get("payload") or {}) for m in state.inbox_last_consumed]
+        return None
+
+
+class _NoteAction(_DoneAction):
+    """Inside the fork segment: reports which prioritization mode fetch used, for the done step."""
+
+    @property
+    def action_id(self) -> str:
+        return "note"
+
+    def do_execute(self, step: StepDef, state: PipelineState, runtime: PipelineRuntime) -> Optional[str]:
+        mode = (state.graph_debug or {}).get("prioritization_mode_source")
+        state.enqueue_message(
+            target_step_id="done",
+            topic="fork_note",
+            payload={"snapshot_id": state.snapshot_id, "mode": mode},
+        )
+        return None
+
+
+def _pipeline(max_concurrency: int, *, note_step: bool = False):
+    segment_end = "note" if note_step else "merge"
+    note = [{"id": "note", "action": "note", "next": "merge"}] if note_step else []
+    return parse_pipeline_doc(
+        {
+            "YAMLpipeline": {
+                "name": "pr_concurrency",
+                "settings": {
+                    "entry_step_id": "parallel_roads",
+                    "repository": "repo",
+                    "max_context_tokens": 4000,
+                    "parallel_roads_max_concurrency": max_concurrency,
+                },
+                "steps": [
+                    {"id": "parallel_roads", "action": "parallel_roads_action", "next": "fork"},
+                    {
+                        "id": "fork",
+                        "action": "fork_action",
+                        "search_action": "search",
+                        "snapshots": {"a": "${snapshot_id}", "b": "${snapshot_id_b}", "c": "snap-c"},
+                        "next": "search",
+                    },
+                    {"id": "search", "action": "search_nodes", "search_type": "semantic", "top_k": 5, "next": "fetch"},
+                    {"id": "fetch", "action": "fetch_node_texts", "next": segment_end},
+                    *note,
+                    {
+                        "id": "merge",
+                        "action": "merge_action",
+                        "snapshots": {"a": "A {}", "b": "B {}", "c": "C {}"},
+                        "on_done": "done",
+                        "next": "done",
+                    },
+                    {"id": "done", "action": "done", "end": True},
+                ],
+            }
+        }
+    )
+
+
+def _run(
+    max_concurrency: int,
+    *,
+    run_id: Optional[str] = None,
+    backend: Optional[FakeRetrievalBackend] = None,
+    inbox: Optional[List[Dict[str, Any]]] = None,
+    note_step: bool = False,
+):
+    backend = backend or FakeRetrievalBackend(
+        hits_by_snapshot={"snap-a": ["A1"], "snap-b": ["B1", "B2"], "snap-c": ["C1"]},
+        texts_by_id={"A1": "class A {}", "B1": "class B1 {}", "B2": "class B2 {}", "C1": "class C {}"},
+        latency_s=LATENCY_S,
+    )
+    registry = build_default_action_registry()
+    registry.register("done", _DoneAction())
+    registry.register("note", _NoteAction())
+    pipeline = _pipeline(max_concurrency, note_step=note_step)
+    runtime = PipelineRuntime(
+        pipeline_settings=pipeline.settings,
+        model=None,
+        searcher=None,
+        markdown_translator=None,
+        translator_pl_en=None,
+        history_manager=_History(),
+        retrieval_backend=backend,
+        token_counter=SimpleNamespace(count_tokens=lambda s: len(str(s).split())),
+    )
+    state = PipelineState(
+        user_query="compare",
+        session_id="s",
+        consultant="shannon",
+        snapshot_id="snap-a",
+        snapshot_id_b="snap-b",
+    )
+    state.last_model_response = "where is class defined"
+    state.context_blocks = ["BASE"]
+    if run_id:
+        state.pipeline_run_id = run_id
+    state.inbox = list(inbox or [])
+
+    t0 = time.perf_counter()
+    PipelineEngine(registry=registry).run(pipeline, state, runtime)
+    return state, time.perf_counter() - t0, backend
+
+
+def test_concurrent_forks_match_sequential_merge_and_are_faster() -> None:
+    seq_state, seq_s, seq_backend = _run(1)
+    par_state, par_s, par_backend = _run(3)
+
+    # Same merged context, in plan order (a, b, c), regardless of which fork finished first.
+    assert par_state.context_blocks == seq_state.context_blocks
+    labels = [b for b in par_state.context_blocks if not b.startswith("--- NODE")]
+    assert labels == ["BASE", "A a", "B b", "C c"]
+    assert "class B2 {}" in par_state.context_blocks[5]
+
+    # Each fork searched its own snapshot; the parent state is restored afterwards.
+    assert sorted(r.snapshot_id for r in par_backend.search_calls) == ["snap-a", "snap-b", "snap-c"]
+    assert par_state.snapshot_id == "snap-a"
+    assert par_state.snapshot_id_b == "snap-b"
+    assert par_state.node_texts == []
+    assert par_state.step_trace.count("search") == 3
+    # One fork_action + one merge_action instead of one per snapshot.
+    assert par_state.steps_used == seq_state.steps_used - 4
+
+    # 3 forks x (search + fetch) latency: sequential ~6x, concurrent ~2x.
+    assert seq_s >= 6 * LATENCY_S
+    assert par_s < seq_s * 0.6
+
+
+def test_max_concurrency_bounds_parallel_forks() -> None:
+    _, two_s, _ = _run(2)
+    # Two waves of forks (2 + 1), each doing search + fetch.
+    assert two_s >= 4 * LATENCY_S
+
+
+def test_cancellation_stops_concurrent_forks() -> None:
+    run_id = "run-cancel-forks"
+    backend = FakeRetrievalBackend(hits_by_snapshot={"snap-a": ["A1"]}, latency_s=LATENCY_S)
+    original_search = backend.search
+
+    def _search_then_cancel(req):
+        get_pipeline_cancel_registry().request_cancel(run_id, reason="user")
+        return original_search(req)
+
+    backend.search = _search_then_cancel  # type: ignore[method-assign]
+
+    with pytest.raises(PipelineCancelled):
+        _run(3, run_id=run_id, backend=backend)
+
+    # Forks stop at the next step boundary: nobody reaches fetch after the cancel.
+    assert len(backend.search_calls) <= 3
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 3])
+def test_fork_inbox_directive_is_consumed_and_fork_messages_survive(monkeypatch, max_concurrency: int) -> None:
+    monkeypatch.setenv("RAG_PIPELINE_INBOX_FAIL_FAST", "1")
+    directive = {"target_step_id": "fetch", "topic": "config", "payload": {"prioritization_mode": "graph_first"}}
+    state, _, _ = _run(max_concurrency, inbox=[directive], note_step=True)
+
+    # Nothing left over at run end (fail-fast would have raised).
+    assert state.inbox == []
+    # Every fork's message (enqueued after fetch consumed the directive) reached the done step, in plan order.
+    assert [m["snapshot_id"] for m in state.done_consumed] == ["snap-a", "snap-b", "snap-c"]
+    modes = [m["mode"] for m in state.done_consumed]
+    if max_concurrency == 1:
+        # Sequential: the first fork consumes the directive.
+        assert modes == ["inbox", "yaml", "yaml"]
+    else:
+        # Concurrent: every fork starts from the parent inbox.
+        assert modes == ["inbox"] * 3
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from code_query_engine.pipeline import cancellation
+from code_query_engine.pipeline.cancellation import (
+    PipelineCancelled,
+    RedisPipelineCancelRegistry,
+    make_cancel_check,
+)
+from code_query_engine.work_callback.mock_redis import InMemoryMockBrokerRedis
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cancel_on_one_worker_is_seen_by_another() -> None:
+    shared = InMemoryMockBrokerRedis()
+    clock = _Clock()
+    api_worker = RedisPipelineCancelRegistry(shared, clock=clock)
+    pipeline_worker = RedisPipelineCancelRegistry(shared, poll_interval_s=0.5, clock=clock)
+
+    assert pipeline_worker.is_cancelled("run-1") is False
+    api_worker.request_cancel("run-1", reason="client_cancel")
+
+    # Polls are rate-limited per run: the next Redis read happens after the interval.
+    assert pipeline_worker.is_cancelled("run-1") is False
+    assert pipeline_worker.poll_count() == 1
+    clock.now = 0.6
+    assert pipeline_worker.is_cancelled("run-1") is True
+    assert pipeline_worker.get_reason("run-1") == "client_cancel"
+
+    # Once seen, the answer is local: no more Redis reads.
+    for _ in range(100):
+        assert pipeline_worker.is_cancelled("run-1") is True
+    assert pipeline_worker.poll_count() == 2
+
+    pipeline_worker.clear("run-1")
+    clock.now = 2.0
+    assert api_worker.is_cancelled("run-1") is True  # local copy of the worker that requested it
+    assert RedisPipelineCancelRegistry(shared).is_cancelled("run-1") is False
+
+
+def test_cancel_check_raises_for_run_cancelled_elsewhere(monkeypatch: pytest.MonkeyPatch) -> None:
+    shared = InMemoryMockBrokerRedis()
+    monkeypatch.setattr(cancellation, "_REGISTRY", RedisPipelineCancelRegistry(shared, poll_interval_s=0.0))
+    state = SimpleNamespace(pipeline_run_id="run-2", pipeline_trace_events=[])
+    check = make_cancel_check(state)
+    check()
+
+    RedisPipelineCancelRegistry(shared).request_cancel("run-2")
+    with pytest.raises(PipelineCancelled) as exc:
+        check()
+    assert exc.value.reason == "cancelled"
+    assert state.pipeline_trace_events[-1]["event_type"] == "CANCELLED"
+
+
+def test_cancel_key_expires_with_ttl() -> None:
+    shared = InMemoryMockBrokerRedis()
+    RedisPipelineCancelRegistry(shared, ttl_sec=60).request_cancel("run-3")
+    assert shared._string_deadlines["pcancel:run-3"] > 0
+    assert RedisPipelineCancelRegistry(shared).is_cancelled("run-3") is True
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import List
+
+import pytest
+
+from code_query_engine.pipeline.providers.query_embedding_service import QueryEmbeddingService
+
+
+class _FakeEncoder:
+    def __init__(self, *, delay_s: float = 0.0) -> None:
+        self.delay_s = delay_s
+        self.batches: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = False) -> List[List[float]]:
+        assert normalize_embeddings is True
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return [[float(len(t)), float(sum(map(ord, t)) % 97)] for t in texts]
+
+
+def test_cache_hits_on_normalized_query() -> None:
+    enc = _FakeEncoder()
+    svc = QueryEmbeddingService(model_name="e5", load_model=lambda: enc, batch_window_ms=0)
+
+    a = svc.encode("find   the  Order\nservice ")
+    b = svc.encode("find the Order service")
+    assert a == b
+    assert len(enc.batches) == 1
+    assert enc.batches[0] == ["find the Order service"]
+
+    stats = svc.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["batches"] == 1
+
+
+def test_cache_key_includes_model_name() -> None:
+    svc_a = QueryEmbeddingService(model_name="a", load_model=_FakeEncoder, batch_window_ms=0)
+    svc_b = QueryEmbeddingService(model_name="b", load_model=_FakeEncoder, batch_window_ms=0)
+    assert svc_a.make_key("q") != svc_b.make_key("q")
+
+
+def test_concurrent_misses_are_coalesced_into_one_encode_call() -> None:
+    enc = _FakeEncoder()
+    svc = QueryEmbeddingService(model_name="e5", load_model=lambda: enc, batch_window_ms=200, max_batch_size=8)
+    barrier = threading.Barrier(8)
+    results: dict = {}
+
+    def worker(i: int) -> None:
+        barrier.wait()
+        results[i] = svc.encode(f"query {i % 6}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 8
+    assert results[0] == results[6]
+    encoded = [t for b in enc.batches for t in b]
+    assert sorted(encoded) == sorted({f"query {i}" for i in range(6)})
+    assert len(enc.batches) == 1
+
+    stats = svc.stats()
+    assert stats["max_batch_size"] == 6
+    assert stats["batch_size_histogram"] == {"6": 1}
+
+
+def test_encode_error_propagates_to_every_waiter_and_is_not_cached() -> None:
+    class _Boom:
+        def encode(self, texts, normalize_embeddings=False):
+            raise RuntimeError("model down")
+
+    svc = QueryEmbeddingService(model_name="e5", load_model=_Boom, batch_window_ms=0)
+    with pytest.raises(RuntimeError, match="model down"):
+        svc.encode("q")
+    assert svc.stats()["entries"] == 0
+    assert svc.stats()["encode_errors"] == 1
+
+
+def test_leader_returns_under_continuous_arrivals_and_hands_over() -> None:
+    enc = _FakeEncoder(delay_s=0.02)
+    svc = QueryEmbeddingService(model_name="e5", load_model=lambda: enc, batch_window_ms=0, max_batch_size=1)
+    leading = threading.Event()
+    encode = enc.encode
+
+    def encode_and_signal(texts, normalize_embeddings=False):
+        leading.set()
+        return encode(texts, normalize_embeddings=normalize_embeddings)
+
+    enc.encode = encode_and_signal  # type: ignore[method-assign]
+    stop = threading.Event()
+    results: dict = {}
+    callers: List[threading.Thread] = []
+
+    def feed() -> None:
+        leading.wait(5)
+        give_up = time.perf_counter() + 1.0  # bounded, so a leader that never returns fails instead of hanging
+        i = 0
+        while not stop.is_set() and time.perf_counter() < give_up:
+            t = threading.Thread(target=lambda i=i: results.__setitem__(i, svc.encode(f"follower {i}")))
+            t.start()
+            callers.append(t)
+            i += 1
+            time.sleep(0.005)
+
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    t0 = time.perf_counter()
+    own = svc.encode("leader query")
+    leader_s = time.perf_counter() - t0
+    time.sleep(0.3)
+    stop.set()
+    feeder.join()
+    for t in callers:
+        t.join(10)
+
+    assert own == [12.0, float(sum(map(ord, "leader query")) % 97)]
+    assert enc.batches[0] == ["leader query"]
+    # Arrivals outpace the encoder (one text per 20 ms batch); the leader still returns after
+    # its own batch and the followers take over.
+    assert leader_s < 0.2
+    assert len(results) == len(callers)
+    assert not any(t.is_alive() for t in callers)
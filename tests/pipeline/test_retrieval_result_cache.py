@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from code_query_engine.pipeline.providers.retrieval_backend_contract import SearchHit
+from code_query_engine.pipeline.providers.retrieval_result_cache import (
+    RetrievalResultCache,
+    retrieval_request_signature,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _key(**overrides) -> bytes:
+    args = dict(
+        snapshot_id="snap",
+        repository="Repo",
+        search_type="bm25",
+        query="order service",
+        top_k=5,
+        retrieval_filters={"acl_tags_any": ["dev"]},
+    )
+    args.update(overrides)
+    return retrieval_request_signature(**args)
+
+
+def test_signature_separates_security_contexts() -> None:
+    assert _key() == _key(retrieval_filters={"acl_tags_any": ["dev"]})
+    assert _key() != _key(retrieval_filters={"acl_tags_any": ["ops"]})
+    assert _key() != _key(retrieval_filters={"acl_tags_any": ["dev"], "user_level": 3})
+    assert _key() != _key(security_context={"kind": "clearance_level"})
+    assert _key() != _key(snapshot_id="other")
+
+
+def test_ttl_and_lru_bounds() -> None:
+    clock = _Clock()
+    cache = RetrievalResultCache(generation_fn=lambda _s: "g1", max_entries=2, ttl_seconds=10, clock=clock)
+    hits = [SearchHit(id="A", score=0.0, rank=1)]
+
+    cache.put(b"k1", snapshot_id="snap", hits=hits)
+    assert cache.get(b"k1", snapshot_id="snap") == hits
+
+    clock.now += 11
+    assert cache.get(b"k1", snapshot_id="snap") is None
+    assert cache.stats()["expirations"] == 1
+
+    for k in (b"a", b"b", b"c"):
+        cache.put(k, snapshot_id="snap", hits=hits)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.get(b"a", snapshot_id="snap") is None
+    # The evicted key left the per-snapshot index too.
+    assert cache.invalidate_snapshot("snap") == 2
+
+
+def test_generation_change_invalidates_snapshot_entries() -> None:
+    clock = _Clock()
+    generations: Dict[str, Optional[str]] = {"s1": "import-1", "s2": "import-9"}
+    cache = RetrievalResultCache(
+        generation_fn=lambda sid: generations[sid],
+        ttl_seconds=600,
+        generation_check_seconds=5,
+        clock=clock,
+    )
+    hits = [SearchHit(id="A", score=0.0, rank=1)]
+    cache.put(b"k1", snapshot_id="s1", hits=hits)
+    cache.put(b"k2", snapshot_id="s2", hits=hits)
+
+    # Purge (ImportRun rows deleted) is noticed after the generation check interval.
+    generations["s1"] = "-"
+    assert cache.get(b"k1", snapshot_id="s1") == hits
+    clock.now += 6
+    assert cache.get(b"k1", snapshot_id="s1") is None
+    assert cache.get(b"k2", snapshot_id="s2") == hits
+
+    # Unknown generation (ImportRun unreadable) bypasses the cache.
+    generations["s2"] = None
+    clock.now += 6
+    assert cache.get(b"k2", snapshot_id="s2") is None
+    cache.put(b"k3", snapshot_id="s2", hits=hits)
+    assert cache.stats()["bypassed"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_explicit_snapshot_invalidation() -> None:
+    cache = RetrievalResultCache(generation_fn=lambda _s: "g")
+    cache.put(b"k1", snapshot_id="s1", hits=[])
+    cache.put(b"k2", snapshot_id="s2", hits=[])
+    assert cache.invalidate_snapshot("s1") == 1
+    assert cache.get(b"k1", snapshot_id="s1") is None
+    assert cache.get(b"k2", snapshot_id="s2") == []
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import List
+
+from code_query_engine.pipeline.token_counter import (
+    CachingTokenCounter,
+    LlamaCppTokenCounter,
+    TokenCountCache,
+    token_counter_model_id,
+)
+
+
+class _FakeLlama:
+    def __init__(self, model_path: str, *, bytes_per_token: int = 1) -> None:
+        self.model_path = model_path
+        self.bytes_per_token = bytes_per_token
+        self.calls = 0
+
+    def tokenize(self, text: bytes, add_bos: bool = False) -> List[int]:
+        self.calls += 1
+        return [0] * (len(text) // self.bytes_per_token)
+
+
+def test_caching_token_counter_counts_each_text_once() -> None:
+    llama = _FakeLlama("models/a.gguf")
+    counter = CachingTokenCounter(inner=LlamaCppTokenCounter(llama=llama), cache=TokenCountCache(max_entries=10))
+
+    assert counter.count_tokens("hello world") == 11
+    assert counter.count("hello world") == 11
+    assert counter.count_tokens("other") == 5
+    assert llama.calls == 2
+
+    stats = counter.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+    assert stats["approx_bytes"] > 0
+    assert stats["model_id"] == "llama:models/a.gguf"
+
+
+def test_shared_cache_is_keyed_by_model_identity() -> None:
+    cache = TokenCountCache(max_entries=10)
+    a = CachingTokenCounter(inner=LlamaCppTokenCounter(llama=_FakeLlama("a.gguf", bytes_per_token=1)), cache=cache)
+    b = CachingTokenCounter(inner=LlamaCppTokenCounter(llama=_FakeLlama("b.gguf", bytes_per_token=2)), cache=cache)
+
+    assert a.count_tokens("abcdef") == 6
+    assert b.count_tokens("abcdef") == 3
+    assert cache.stats()["entries"] == 2
+
+
+def test_cache_is_bounded_lru() -> None:
+    llama = _FakeLlama("m.gguf")
+    cache = TokenCountCache(max_entries=2)
+    counter = CachingTokenCounter(inner=LlamaCppTokenCounter(llama=llama), cache=cache)
+
+    counter.count_tokens("a")
+    counter.count_tokens("bb")
+    counter.count_tokens("a")  # refresh "a"
+    counter.count_tokens("ccc")  # evicts "bb"
+    assert cache.stats()["evictions"] == 1
+
+    calls = llama.calls
+    counter.count_tokens("a")
+    assert llama.calls == calls
+    counter.count_tokens("bb")
+    assert llama.calls == calls + 1
+
+    cache.set_max_entries(0)
+    assert cache.stats()["entries"] == 0
+    counter.count_tokens("a")
+    assert cache.stats()["entries"] == 0
+
+
+def test_model_id_falls_back_to_object_identity() -> None:
+    class _NoPath:
+        def tokenize(self, text: bytes, add_bos: bool = False) -> List[int]:
+            return []
+
+    llama = _NoPath()
+    assert token_counter_model_id(LlamaCppTokenCounter(llama=llama)) == f"llama:_NoPath:{id(llama)}"
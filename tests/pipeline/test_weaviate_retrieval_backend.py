@@ -302,3 +302,45 @@ def test_weaviate_fetch_nodes_maps_security_fields(monkeypatch) -> None:
     assert "acl_allow" in props
     assert "classification_labels" in props
     assert "doc_level" in props
+
+
+def test_weaviate_result_cache_is_scoped_to_acl_context(monkeypatch) -> None:
+    _install_bm25_factory(monkeypatch)
+    query = _FakeQuery()
+    query.bm25_objects = [SimpleNamespace(properties={"canonical_id": "X"})]
+    query.fetch_objects_objects = [
+        SimpleNamespace(properties={"import_id": "i1", "status": "ok", "started_utc": "t0", "finished_utc": "t1"})
+    ]
+    collection = _FakeCollection(query)
+    client = _FakeClient(collection)
+    backend = WeaviateRetrievalBackend(
+        client=client,
+        query_embed_model="models/embedding/e5-base-v2",
+        security_config={"security_enabled": True, "acl_enabled": True},
+        result_cache_max_entries=16,
+    )
+    monkeypatch.setattr(backend, "_build_where_filter", lambda **_kwargs: None)
+
+    def req(acl: List[str]) -> SearchRequest:
+        return SearchRequest(
+            search_type="bm25",
+            query="alpha beta",
+            top_k=3,
+            retrieval_filters={"acl_tags_any": acl},
+            repository="Repo",
+            snapshot_id="snap",
+        )
+
+    assert backend.search(req(["dev"])).hits[0].id == "X"
+    assert backend.search(req(["dev"])).hits[0].id == "X"
+    assert len(query.bm25_calls) == 1
+
+    backend.search(req(["ops"]))
+    assert len(query.bm25_calls) == 2
+
+    stats = backend.result_cache_stats()
+    assert stats is not None and stats["hits"] == 1
+
+    assert backend.invalidate_result_cache("snap") == 2
+    backend.search(req(["dev"]))
+    assert len(query.bm25_calls) == 3
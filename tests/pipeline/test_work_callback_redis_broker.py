@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import time
+from queue import Empty, Queue
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+
+from code_query_engine.work_callback.broker import WorkCallbackBroker
+from code_query_engine.work_callback.mock_redis import InMemoryMockBrokerRedis
+from code_query_engine.work_callback.redis_broker import RedisWorkCallbackBroker
+
+
+def _step_event(run_id: str, step_id: str) -> Dict[str, Any]:
+    return {
+        "run_id": run_id,
+        "step": {"id": step_id, "action": "fetch_node_texts"},
+        "action": {"action_id": "fetch_node_texts"},
+        "in": {},
+        "out": {},
+    }
+
+
+def _next(q: Queue, timeout: float = 2.0) -> Dict[str, Any]:
+    return q.get(timeout=timeout)
+
+
+def _assert_empty(q: Queue) -> None:
+    with pytest.raises(Empty):
+        q.get(timeout=0.1)
+
+
+@pytest.fixture()
+def workers() -> Iterator[Tuple[RedisWorkCallbackBroker, RedisWorkCallbackBroker]]:
+    shared = InMemoryMockBrokerRedis()
+    a = RedisWorkCallbackBroker(shared, poll_timeout_s=0.05)
+    b = RedisWorkCallbackBroker(shared, poll_timeout_s=0.05)
+    try:
+        yield a, b
+    finally:
+        a.shutdown()
+        b.shutdown()
+
+
+def test_stream_on_another_worker_gets_replay_live_events_and_done(workers) -> None:
+    runner, streamer = workers
+    run_id = "run-redis-1"
+    runner.ensure_run(run_id)
+    runner.emit(run_id, _step_event(run_id, "s1"))
+
+    q, snapshot, closed, _ = streamer.open_stream(run_id)
+    assert [e["step_id"] for e in snapshot] == ["s1"]
+    assert snapshot[0]["event_seq"] == 1
+    assert closed is False
+
+    runner.emit(run_id, _step_event(run_id, "s2"))
+    live = _next(q)
+    assert (live["step_id"], live["event_seq"]) == ("s2", 2)
+
+    runner.close(run_id, reason="cancelled")
+    assert _next(q) == {"type": "done", "reason": "cancelled"}
+    streamer.remove_stream(run_id, q)
+
+    # A client connecting after the run finished gets the replay and the closed state.
+    _, snapshot, closed, reason = streamer.open_stream(run_id)
+    assert [e["event_seq"] for e in snapshot] == [1, 2]
+    assert (closed, reason) == (True, "cancelled")
+
+
+def test_reconnect_resumes_after_last_event_seq(workers) -> None:
+    runner, streamer = workers
+    run_id = "run-redis-resume"
+    for i in range(4):
+        runner.emit(run_id, _step_event(run_id, f"s{i}"))
+
+    _, snapshot, _, _ = streamer.open_stream(run_id, after_seq=2)
+    assert [e["event_seq"] for e in snapshot] == [3, 4]
+
+    local = WorkCallbackBroker()
+    for i in range(4):
+        local.emit(run_id, _step_event(run_id, f"s{i}"))
+    _, snapshot, _, _ = local.open_stream(run_id, after_seq=3)
+    assert [e["step_id"] for e in snapshot] == ["s3"]
+
+
+def test_answer_stream_crosses_workers(workers) -> None:
+    runner, streamer = workers
+    run_id = "run-redis-answer"
+    q, _, _, _ = streamer.open_stream(run_id)
+
+    runner.begin_answer(run_id, step_id="answer")
+    for piece in ("The ", "class ", "is Foo."):
+        runner.emit_answer_delta(run_id, step_id="answer", text=piece)
+
+    deltas: List[Dict[str, Any]] = [_next(q) for _ in range(3)]
+    assert [d["type"] for d in deltas] == ["answer_delta"] * 3
+    assert [d["offset"] for d in deltas] == [0, 4, 10]
+
+    # A late subscriber on a third worker starts from the stored draft.
+    late = RedisWorkCallbackBroker(runner._redis, poll_timeout_s=0.05)
+    try:
+        late_q, snapshot, _, _ = late.open_stream(run_id)
+        assert snapshot[-1]["type"] == "answer"
+        assert snapshot[-1]["text"] == "The class is Foo."
+
+        runner.emit_answer(run_id, step_id="answer", text="The class is Foo.")
+        final = _next(late_q)
+        assert (final["type"], final["final"]) == ("answer", True)
+        _assert_empty(late_q)
+    finally:
+        late.shutdown()
+
+
+def test_stream_only_worker_expires_runs_and_policies() -> None:
+    shared = InMemoryMockBrokerRedis()
+    now = [1000.0]
+    runner = RedisWorkCallbackBroker(shared, poll_timeout_s=0.05)
+    streamer = RedisWorkCallbackBroker(shared, poll_timeout_s=0.05, run_ttl_sec=60, clock=lambda: now[0])
+    try:
+        # Policy lookups for runs this worker does not track are not cached.
+        streamer.get_run_policy_dict("run-elsewhere")
+        assert "run-elsewhere" not in streamer._policies
+
+        q, _, _, _ = streamer.open_stream("run-1")
+        streamer.get_run_policy_dict("run-1")
+        assert "run-1" in streamer._policies
+        runner.close("run-1")
+        assert _next(q) == {"type": "done", "reason": "done"}
+        streamer.remove_stream("run-1", q)
+
+        now[0] += 61
+        streamer.open_stream("run-2")
+        assert set(streamer._runs) == {"run-2"}
+        assert "run-1" not in streamer._policies
+    finally:
+        runner.shutdown()
+        streamer.shutdown()
+
+
+def test_missed_delta_reloads_the_draft_without_holding_the_lock(workers) -> None:
+    runner, streamer = workers
+    run_id = "run-redis-resync"
+    q, _, _, _ = streamer.open_stream(run_id)
+    runner.begin_answer(run_id, step_id="answer")
+    deadline = time.monotonic() + 2.0
+    while streamer._runs[run_id].answer is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The draft in Redis moved on; this worker missed the deltas.
+    runner._redis.set(runner._key(run_id, "answer"), "Hello world")
+
+    lock_held: List[bool] = []
+    hgetall = streamer._redis.hgetall
+
+    def _checked_hgetall(key):
+        lock_held.append(streamer._lock.locked())
+        return hgetall(key)
+
+    streamer._redis.hgetall = _checked_hgetall  # type: ignore[method-assign]
+    try:
+        # A delta past the local draft (the ones before it were missed).
+        streamer._handle_message(
+            {"run_id": run_id, "kind": "delta", "payload": {"step_id": "answer", "seq": 3, "offset": 6, "text": "world"}}
+        )
+    finally:
+        streamer._redis.hgetall = hgetall  # type: ignore[method-assign]
+
+    assert lock_held == [False]
+    resynced = _next(q)
+    assert (resynced["type"], resynced["text"]) == ("answer", "Hello world")
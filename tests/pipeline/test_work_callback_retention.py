@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from queue import Empty
+from typing import Any, Dict, List
+
+from code_query_engine.work_callback.broker import WorkCallbackBroker
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _event(run_id: str, step_id: str) -> Dict[str, Any]:
+    return {"run_id": run_id, "step": {"id": step_id, "action": "noop"}, "in": {}, "out": {}}
+
+
+def _drain(q) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    while True:
+        try:
+            out.append(q.get_nowait())
+        except Empty:
+            return out
+
+
+def test_ring_buffer_keeps_latest_events() -> None:
+    broker = WorkCallbackBroker(max_events_per_run=3)
+    for i in range(5):
+        broker.emit("r", _event("r", f"s{i}"))
+    _, snapshot, _, _ = broker.open_stream("r")
+    assert [e["step_id"] for e in snapshot] == ["s2", "s3", "s4"]
+    assert broker.retention_stats()["evicted_events"] == 2
+
+
+def test_closed_and_idle_runs_expire_without_scanning_on_every_emit() -> None:
+    clock = _Clock()
+    broker = WorkCallbackBroker(run_ttl_sec=10, idle_run_ttl_sec=100, clock=clock)
+    broker.emit("closed", _event("closed", "s"))
+    broker.close("closed")
+    broker.emit("idle", _event("idle", "s"))
+    broker.open_stream("watched")
+
+    clock.now += 11
+    broker.emit("other", _event("other", "s"))
+    stats = broker.retention_stats()
+    assert stats["expired_runs"] == 1
+    assert stats["runs"] == 3
+
+    # The idle run expires; the open run with a connected subscriber is kept.
+    clock.now += 200
+    broker.emit("other", _event("other", "s"))
+    stats = broker.retention_stats()
+    assert stats["expired_runs"] == 2
+    assert (stats["runs"], stats["subscribers"]) == (2, 1)
+    _, snapshot, _, _ = broker.open_stream("idle")
+    assert snapshot == []
+
+
+def test_full_queue_drops_oldest_and_counts() -> None:
+    broker = WorkCallbackBroker(subscriber_queue_max=2)
+    q, _, _, _ = broker.open_stream("r")
+    for i in range(4):
+        broker.emit("r", _event("r", f"s{i}"))
+    assert [e["step_id"] for e in _drain(q)] == ["s2", "s3"]
+    assert broker.retention_stats()["dropped_events"] == 2
+
+
+def test_drop_newest_still_delivers_done() -> None:
+    broker = WorkCallbackBroker(subscriber_queue_max=2, drop_policy="drop_newest")
+    q, _, _, _ = broker.open_stream("r")
+    for i in range(4):
+        broker.emit("r", _event("r", f"s{i}"))
+    broker.close("r")
+    events = _drain(q)
+    assert [e.get("step_id") for e in events] == ["s1", None]
+    assert events[-1] == {"type": "done", "reason": "done"}
+    assert broker.retention_stats()["dropped_events"] == 3
+
+
+def test_full_queue_never_evicts_critical_events() -> None:
+    for policy in ("drop_oldest", "drop_newest"):
+        broker = WorkCallbackBroker(subscriber_queue_max=3, drop_policy=policy)
+        broker.configure_run("r")
+        q, _, _, _ = broker.open_stream("r")
+        broker.emit("r", _event("r", "s0"))
+        broker.emit_answer("r", step_id="call", text="full answer")
+        for i in range(1, 6):
+            broker.emit("r", _event("r", f"s{i}"))
+        broker.close("r")
+        broker.emit_answer("r", step_id="call", text="late answer")
+
+        events = _drain(q)
+        types = [e.get("type") for e in events if e.get("type") in ("answer", "done")]
+        assert types == ["answer", "done", "answer"], policy
+        assert events[0]["text"] == "full answer" and events[-1]["text"] == "late answer"
+        # Only critical events are left queued: the bound is exceeded instead of dropping one.
+        assert len(events) == 3
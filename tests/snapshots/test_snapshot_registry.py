@@ -1,3 +1,4 @@
+from server.snapshots import snapshot_registry
 from server.snapshots.snapshot_registry import SnapshotRegistry
 
 
@@ -15,8 +16,10 @@ class _FakeQuery:
     def __init__(self, handler):
         self._handler = handler
 
-    def fetch_objects(self, filters=None, limit=None, return_properties=None):
-        return self._handler(filters, limit, return_properties)
+    def fetch_objects(self, filters=None, limit=None, return_properties=None, sort=None):
+        if sort is None:
+            return self._handler(filters, limit, return_properties)
+        return self._handler(filters, limit, return_properties, sort=sort)
 
 
 class _FakeCollection:
@@ -80,7 +83,70 @@ def test_snapshot_registry_fallbacks_to_import_labels(monkeypatch):
 
     reg = SnapshotRegistry(client)
 
-    monkeypatch.setattr(SnapshotRegistry, "_resolve_snapshot_label", lambda self, repo, sid: "Nice" if sid == "s1" else sid)
+    monkeypatch.setattr(SnapshotRegistry, "_fetch_import_labels", lambda self, repo, sids: {"s1": "Nice"})
 
     labels = reg.list_snapshots(snapshot_set_id="set1", repository="nop")
     assert [(x.id, x.label) for x in labels] == [("s1", "Nice"), ("s2", "s2")]
+
+
+def test_snapshot_registry_batches_latest_import_runs_and_caches_misses_briefly(monkeypatch):
+    monkeypatch.setattr(snapshot_registry, "_IMPORT_LABEL_PAGE_SIZE", 5)
+    calls = {"sets": 0, "imports": []}
+    runs = {
+        # Many older runs of s1 fill the first page; s2 is resolved by a follow-up query.
+        "s1": [{"snapshot_id": "s1", "tag": f"old{i}", "started_utc": f"2024-01-{i:02d}"} for i in range(1, 29)]
+        + [{"snapshot_id": "s1", "tag": "v1", "started_utc": "2025-01-01"}],
+        "s2": [{"snapshot_id": "s2", "friendly_name": "Release 2", "started_utc": "2023-06-01"}],
+    }
+
+    def snapshot_set_handler(*_):
+        calls["sets"] += 1
+        return _FakeQueryResult([
+            _FakeObj({
+                "snapshot_set_id": "set1",
+                "repo": "nop",
+                "allowed_snapshot_ids": ["s1", "s2", "s3"],
+                "allowed_refs": [],
+            })
+        ])
+
+    def import_handler(filters, limit, _props, sort=None):
+        sids = list(filters.filters[1].value)
+        calls["imports"].append(sids)
+        assert sort is not None
+        rows = sorted(
+            (r for sid in sids for r in runs.get(sid, [])), key=lambda r: r["started_utc"], reverse=True
+        )[:limit]
+        return _FakeQueryResult([_FakeObj(r) for r in rows])
+
+    client = _FakeClient({"SnapshotSet": snapshot_set_handler, "ImportRun": import_handler})
+    now = [1000.0]
+    snapshot_registry.snapshot_registry_cache(client)._clock = lambda: now[0]
+    reg = SnapshotRegistry(client)
+
+    expected = [("s1", "v1"), ("s2", "Release 2"), ("s3", "s3")]
+    assert [(x.id, x.label) for x in reg.list_snapshots(snapshot_set_id="set1", repository="nop")] == expected
+    assert calls == {"sets": 1, "imports": [["s1", "s2", "s3"], ["s2", "s3"]]}
+
+    # A second registry on the same client (e.g. search_nodes) shares the cache, including the s3 miss.
+    other = SnapshotRegistry(client)
+    assert [(x.id, x.label) for x in other.list_snapshots(snapshot_set_id="set1", repository="nop")] == expected
+    assert other.resolve_snapshot_label(repository="nop", snapshot_id="s2") == "Release 2"
+    assert calls["sets"] == 1 and len(calls["imports"]) == 2
+    assert reg.cache_stats()["hits"] >= 5
+
+    # s3 gets imported: its label shows up once the short negative TTL expired.
+    runs["s3"] = [{"snapshot_id": "s3", "tag": "v3", "started_utc": "2025-02-01"}]
+    assert reg.resolve_snapshot_label(repository="nop", snapshot_id="s3") == "s3"
+    now[0] += 6
+    assert reg.resolve_snapshot_label(repository="nop", snapshot_id="s3") == "v3"
+    assert reg.resolve_snapshot_label(repository="nop", snapshot_id="s3") == "v3"
+    assert calls["imports"][2:] == [["s3"]]
+
+    reg.invalidate_cache(snapshot_set_id="set1")
+    reg.list_snapshots(snapshot_set_id="set1", repository="nop")
+    assert calls["sets"] == 2 and len(calls["imports"]) == 3
+
+    reg.invalidate_cache(snapshot_id="s1")
+    reg.list_snapshots(snapshot_set_id="set1", repository="nop")
+    assert calls["sets"] == 3 and calls["imports"][3:] == [["s1"]]
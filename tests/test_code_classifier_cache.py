@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import pytest
+
+import classifiers.code_classifier as cc
+from classifiers.code_classifier import ClassificationCache, CodeKind, precomputed_code_kind
+
+
+_SQL = "SELECT c.Id, c.Name FROM dbo.Customer c WHERE c.Deleted = 0 ORDER BY c.Name"
+
+
+def test_classification_cache_memoizes_by_text_digest(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[str] = []
+    real = cc.classify_text
+
+    def _counting(text: str):
+        calls.append(text)
+        return real(text)
+
+    monkeypatch.setattr(cc, "classify_text", _counting)
+    cache = ClassificationCache(max_entries=8)
+
+    r1 = cache.classify(_SQL)
+    r2 = cache.classify(_SQL)
+
+    assert r1 is r2
+    assert r1.kind == real(_SQL).kind
+    assert calls == [_SQL]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_classification_cache_is_bounded() -> None:
+    cache = ClassificationCache(max_entries=2)
+    cache.classify("a")
+    cache.classify("b")
+    cache.classify("a")
+    cache.classify("c")
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+
+    cache.classify("b")
+    assert cache.stats()["misses"] == 4
+
+
+def test_precomputed_code_kind_parsing() -> None:
+    assert precomputed_code_kind("sql") == CodeKind.SQL
+    assert precomputed_code_kind(" DOTNET_WITH_SQL ") == CodeKind.DOTNET_WITH_SQL
+    assert precomputed_code_kind("") is None
+    assert precomputed_code_kind(None) is None
+    assert precomputed_code_kind("cobol") is None
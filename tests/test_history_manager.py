@@ -0,0 +1,122 @@
+import json
+from typing import Optional
+
+import pytest
+
+from history.history_backend import HistoryBackend
+from history.history_manager import HistoryManager
+from history.mock_redis import InMemoryMockRedis
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _CountingRedis(InMemoryMockRedis):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.reads = 0
+
+    def get(self, key: str) -> Optional[str]:
+        self.reads += 1
+        return super().get(key)
+
+    def lrange(self, key: str, start: int, end: int) -> list[str]:
+        self.reads += 1
+        return super().lrange(key, start, end)
+
+
+class _BlobOnlyBackend(HistoryBackend):
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self.data.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.data[key] = value
+
+    def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+def test_writes_append_events_without_reading_the_session() -> None:
+    backend = _CountingRedis()
+    hm = HistoryManager(backend, session_id="s1", user_id="u1")
+    hm.start_user_query("What is Foo?", pl="Co to Foo?")
+    hm.set_final_answer("Foo is a class.")
+    hm.start_user_query("And Bar?")
+
+    assert backend.reads == 0
+    assert backend.get("s1") is None
+    assert backend.llen("s1:events") == 3
+    assert backend.hgetall("s1:session")["user_id"] == "u1"
+
+    history = HistoryManager(backend, session_id="s1").get_history()
+    assert [h["user_query"]["en"] for h in history] == ["What is Foo?", "And Bar?"]
+    assert history[0]["final_answer"] == {"en": "Foo is a class.", "pl": "Foo is a class."}
+    assert history[1]["final_answer"] is None
+
+
+def test_reads_are_lazy_and_incremental() -> None:
+    backend = _CountingRedis()
+    writer = HistoryManager(backend, session_id="s2")
+    reader = HistoryManager(backend, session_id="s2")
+    writer.start_user_query("q1")
+    writer.set_final_answer("a1")
+
+    assert reader.get_context_blocks() == ["User asked: q1", "Final answer: a1"]
+    writer.start_user_query("q2")
+    backend.reads = 0
+    assert [h["user_query"]["en"] for h in reader.get_history()] == ["q1", "q2"]
+    assert backend.reads == 1  # one LRANGE of the new tail only
+    assert reader._events_read == 3
+
+
+def test_legacy_blob_is_migrated_on_first_read() -> None:
+    backend = InMemoryMockRedis()
+    legacy = [
+        {"timestamp": 1.0, "user_query": {"pl": None, "en": "old q"}, "final_answer": {"en": "old a", "pl": "old a"}},
+        {"timestamp": 2.0, "user_query": {"pl": None, "en": "open q"}, "final_answer": None},
+    ]
+    backend.set("s3", json.dumps(legacy))
+    backend.set("s3:meta", json.dumps({"user_id": "legacy-user"}))
+
+    # A write before the migration lands behind the legacy entries.
+    HistoryManager(backend, session_id="s3").start_user_query("new q")
+
+    hm = HistoryManager(backend, session_id="s3")
+    history = hm.get_history()
+    assert [h["user_query"]["en"] for h in history] == ["old q", "open q", "new q"]
+    assert history[0]["timestamp"] == 1.0
+    assert backend.get("s3") is None
+    assert hm.get_user_id() == "legacy-user"
+
+    assert HistoryManager(backend, session_id="s3").get_history() == history
+
+
+def test_session_keys_expire_with_ttl() -> None:
+    clock = _Clock()
+    backend = InMemoryMockRedis(clock=clock)
+    hm = HistoryManager(backend, session_id="s4", ttl=60, user_id="u")
+    hm.start_user_query("q")
+    assert backend.ttl("s4:events") == 60
+    assert backend.ttl("s4:session") == 60
+
+    clock.now += 61
+    assert HistoryManager(backend, session_id="s4").get_history() == []
+    with pytest.raises(RuntimeError):
+        HistoryManager(backend, session_id="s4").set_final_answer("late")
+
+
+def test_plain_key_value_backends_keep_the_blob_format() -> None:
+    backend = _BlobOnlyBackend()
+    hm = HistoryManager(backend, session_id="s5", user_id="u")
+    hm.start_user_query("q")
+    hm.set_final_answer("a")
+    assert json.loads(backend.data["s5"])[0]["final_answer"]["en"] == "a"
+    assert hm.get_context_blocks() == ["User asked: q", "Final answer: a"]
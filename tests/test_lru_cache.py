@@ -0,0 +1,34 @@
+from common.lru_cache import BoundedLRU
+
+
+def test_bounded_lru_entries_recency_and_stats() -> None:
+    lru: BoundedLRU[str, int] = BoundedLRU(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "a" becomes most recent
+    lru.put("c", 3)  # evicts "b"
+    assert lru.get("b") is None
+    assert lru.keys() == ["a", "c"]
+    assert lru.stats() == {"entries": 2, "hits": 1, "misses": 1, "evictions": 1, "hit_rate": 0.5}
+
+    lru.set_max_entries(0)
+    lru.put("d", 4)
+    assert len(lru) == 0
+
+
+def test_bounded_lru_weight_keep_newest_and_evict_callback() -> None:
+    evicted = []
+    lru: BoundedLRU[str, str] = BoundedLRU(
+        max_weight=10, weigh=len, keep_newest=True, on_evict=lambda k, v: evicted.append(k)
+    )
+    lru.put("a", "xxxx")
+    lru.put("b", "xxxx")
+    lru.put("c", "xxxxxxxxxxxx")  # alone over budget: kept, everything older goes
+    assert lru.keys() == ["c"] and lru.weight == 12
+    assert evicted == ["a", "b"]
+
+    assert lru.pop("c") == "xxxxxxxxxxxx" and lru.weight == 0
+    lru.put("d", "x")
+    lru.put("e", "xx")
+    assert [k for k, _ in lru.remove_where(lambda k, v: len(v) > 1)] == ["e"]
+    assert evicted == ["a", "b"]  # explicit removals do not call on_evict
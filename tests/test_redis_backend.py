@@ -0,0 +1,84 @@
+import pytest
+
+from history.history_backend import HistoryConflictError, namespace_ttl, parse_namespace_ttls
+from history.mock_redis import InMemoryMockRedis
+from history.redis_backend import RedisBackend
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_namespace_ttls_parse_and_longest_prefix_wins() -> None:
+    ttls = parse_namespace_ttls(" conv_hist:=86400, conv_hist:tmp:=60 ,")
+    assert ttls == {"conv_hist:": 86400, "conv_hist:tmp:": 60}
+    assert namespace_ttl(ttls, "conv_hist:tmp:s1") == 60
+    assert namespace_ttl(ttls, "conv_hist:s1") == 86400
+    assert namespace_ttl(ttls, "other") is None
+    with pytest.raises(ValueError):
+        parse_namespace_ttls("conv_hist:86400")
+
+
+def test_mock_batched_ops_and_namespace_ttl() -> None:
+    clock = _Clock()
+    backend = InMemoryMockRedis(clock=clock, namespace_ttls={"conv_hist:": 100})
+    backend.set_many({"conv_hist:a": "1", "plain": "2"})
+    backend.set("conv_hist:b", "3", ttl=10)
+
+    assert backend.mget(["conv_hist:a", "missing", "plain", "conv_hist:b"]) == ["1", None, "2", "3"]
+    assert backend.ttl("conv_hist:a") == 100
+    assert backend.ttl("plain") == -1
+    assert backend.ttl("conv_hist:b") == 10
+
+    clock.now += 50
+    backend.delete_many(["plain", "missing"])
+    assert backend.mget(["conv_hist:a", "plain", "conv_hist:b"]) == ["1", None, None]
+
+    stats = backend.stats()
+    assert stats["ops"]["mget"]["calls"] == 2
+    assert stats["ops"]["set_many"]["errors"] == 0
+    assert sum(stats["ops"]["set"]["histogram"].values()) == stats["ops"]["set"]["calls"] == 1
+
+
+def test_mock_update_retries_and_gives_up_like_watch() -> None:
+    backend = InMemoryMockRedis(watch_retries=3)
+    backend.set("k", "0")
+    assert backend.update("k", lambda v: str(int(v) + 1), ttl=30) == "1"
+    assert backend.ttl("k") == 30
+    assert backend.update("k", lambda v: None) == "1"
+
+    def _always_interrupted(value):
+        backend.rpush("k:side", "x")  # unrelated key: no conflict
+        backend.set("k", "other")
+        return "mine"
+
+    with pytest.raises(HistoryConflictError):
+        backend.update("k", _always_interrupted)
+    counters = backend.stats()["counters"]
+    assert counters == {"update_conflicts": 3, "update_gave_up": 1}
+    assert backend.get("k") == "other"
+
+
+def test_redis_backend_pool_is_configured_from_env() -> None:
+    backend = RedisBackend.from_env(
+        {
+            "APP_REDIS_URL": "redis://cache:6380/2",
+            "APP_REDIS_MAX_CONNECTIONS": "8",
+            "APP_REDIS_POOL_TIMEOUT_S": "0.5",
+            "APP_REDIS_SOCKET_TIMEOUT_S": "1.5",
+            "APP_REDIS_NAMESPACE_TTLS": "conv_hist:=600",
+        }
+    )
+    pool = backend.client.connection_pool
+    kwargs = pool.connection_kwargs
+    assert pool.max_connections == 8
+    assert pool.timeout == 0.5
+    assert (kwargs["host"], kwargs["port"], kwargs["db"]) == ("cache", 6380, 2)
+    assert kwargs["socket_timeout"] == 1.5
+    assert backend._ttl_for("conv_hist:s1", None) == 600
+    assert backend._ttl_for("conv_hist:s1", 5) == 5
+    assert backend.stats()["max_connections"] == 8
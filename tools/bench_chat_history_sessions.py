@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+bench_chat_history_sessions.py
+
+Benchmark of SqlChatHistoryStore.list_sessions (the chat sidebar) on SQLite.
+
+Creates `--sessions` sessions spread over `--users` users, then times, for one user:
+- the first page, and every page while walking the whole list with next_cursor;
+- a title search for a common and a rare term.
+The same calls run against a baseline that loads all sessions of the user and filters/pages
+in Python (list_sessions before keyset pagination), so the difference is visible.
+
+Usage:
+    python tools/bench_chat_history_sessions.py --sessions 100000 --users 10 --limit 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server.chat_history.sql_store import SqlChatHistoryStore, create_sqlite_schema  # noqa: E402
+
+_WORDS = ["invoice", "category", "discount", "shipping", "customer", "plugin", "tax", "checkout", "product", "order"]
+
+
+class _LoadAllStore(SqlChatHistoryStore):
+    """Baseline: every session of the user is read, then filtered and paged in Python."""
+
+    def list_sessions(self, *, tenant_id: str, user_id: str, limit: int, cursor: Optional[str], q: Optional[str]) -> dict:
+        from sqlalchemy import text  # type: ignore
+
+        with self._engine().connect() as conn:
+            rows = conn.execute(
+                text(
+                    """
+                    SELECT s.id AS session_id, s.tenant_id AS tenant_id, s.user_id AS user_id, s.title AS title,
+                           s.consultant_id AS consultant_id, s.message_count AS message_count,
+                           s.created_at AS created_at, s.updated_at AS updated_at, s.deleted_at AS deleted_at,
+                           0 AS important
+                    FROM chat_sessions s
+                    WHERE s.tenant_id = :tenant_id AND s.user_id = :user_id AND s.deleted_at IS NULL
+                    ORDER BY s.updated_at DESC, s.id DESC
+                    """
+                ),
+                {"tenant_id": tenant_id, "user_id": user_id},
+            ).mappings().all()
+        items = [self._session_payload(row) for row in rows]
+        qn = str(q or "").strip().lower()
+        if qn:
+            items = [item for item in items if qn in item["title"].lower()]
+        start = 0
+        if cursor:
+            start = next((i + 1 for i, item in enumerate(items) if str(item["updatedAt"]) == cursor), 0)
+        page = items[start : start + limit]
+        return {"items": page, "next_cursor": str(page[-1]["updatedAt"]) if len(page) == limit else None}
+
+
+def _populate(store: SqlChatHistoryStore, *, sessions: int, users: int, seed: int) -> None:
+    from sqlalchemy import text  # type: ignore
+
+    rnd = random.Random(seed)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows: List[Dict[str, Any]] = []
+    for i in range(sessions):
+        words = rnd.sample(_WORDS, 3)
+        if i % 5000 == 0:
+            words.append("zebra")  # rare term
+        created = base + timedelta(seconds=rnd.randint(0, 365 * 86400), microseconds=rnd.randint(0, 999_999))
+        rows.append(
+            {
+                "id": f"s{i:07d}",
+                "tenant_id": "t1",
+                "user_id": f"u{i % users}",
+                "title": " ".join(words).capitalize(),
+                "consultant_id": "",
+                "message_count": 2,
+                "created_at": created,
+                "updated_at": created,
+            }
+        )
+    with store._engine().begin() as conn:
+        conn.execute(text("INSERT INTO chat_tenants (id, name, created_at) VALUES ('t1', 't1', :now)"), {"now": base})
+        conn.execute(
+            text(
+                """
+                INSERT INTO chat_sessions (id, tenant_id, user_id, title, consultant_id, message_count, created_at, updated_at)
+                VALUES (:id, :tenant_id, :user_id, :title, :consultant_id, :message_count, :created_at, :updated_at)
+                """
+            ),
+            rows,
+        )
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def _walk(store: SqlChatHistoryStore, *, user_id: str, limit: int, q: Optional[str]) -> Dict[str, float]:
+    cursor, pages, items, worst = None, 0, 0, 0.0
+    t_all = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        page = store.list_sessions(tenant_id="t1", user_id=user_id, limit=limit, cursor=cursor, q=q)
+        worst = max(worst, time.perf_counter() - t0)
+        pages += 1
+        items += len(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    total = time.perf_counter() - t_all
+    return {"pages": pages, "items": items, "avg_page_ms": total * 1000.0 / pages, "worst_page_ms": worst * 1000.0}
+
+
+def _bench(store: SqlChatHistoryStore, *, user_id: str, limit: int, repeat: int) -> Dict[str, Any]:
+    def _first(q: Optional[str] = None) -> Callable[[], Any]:
+        return lambda: store.list_sessions(tenant_id="t1", user_id=user_id, limit=limit, cursor=None, q=q)
+
+    return {
+        "first_page_ms": _timed(_first(), repeat),
+        "search_common_ms": _timed(_first("invoice"), repeat),
+        "search_rare_ms": _timed(_first("zebra"), repeat),
+        "walk": _walk(store, user_id=user_id, limit=limit, q=None),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=100_000)
+    ap.add_argument("--users", type=int, default=10)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--skip-baseline", action="store_true", help="Do not run the load-all baseline.")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'history.db'}"
+        store = SqlChatHistoryStore(database_type="sqlite", connection_url=url)
+        create_sqlite_schema(store._engine())
+        t0 = time.perf_counter()
+        _populate(store, sessions=args.sessions, users=args.users, seed=args.seed)
+        print(f"populated {args.sessions} sessions / {args.users} users in {time.perf_counter() - t0:.1f}s")
+
+        results = {"keyset": _bench(store, user_id="u0", limit=args.limit, repeat=args.repeat)}
+        if not args.skip_baseline:
+            baseline = _LoadAllStore(database_type="sqlite", connection_url=url)
+            results["load_all"] = _bench(baseline, user_id="u0", limit=args.limit, repeat=args.repeat)
+
+    for name, r in results.items():
+        walk = r["walk"]
+        print(
+            f"{name:>8}: first page {r['first_page_ms']:.2f} ms | search common {r['search_common_ms']:.2f} ms"
+            f" | search rare {r['search_rare_ms']:.2f} ms | walk {walk['pages']} pages / {walk['items']} items,"
+            f" avg {walk['avg_page_ms']:.2f} ms, worst {walk['worst_page_ms']:.2f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
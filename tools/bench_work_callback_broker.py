@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+bench_work_callback_broker.py
+
+Micro-benchmark of WorkCallbackBroker.emit throughput with many concurrent runs.
+
+Each of `--threads` producer threads emits step events round-robin over its share of `--runs`
+runs (one subscriber queue per run, drained by a consumer thread). The same workload is run
+against the current broker and against a baseline that re-scans every run on each emit
+(the pre-retention cleanup), so the cost of O(runs) cleanup per event is visible.
+
+Usage:
+    python tools/bench_work_callback_broker.py --runs 1000 --events-per-run 50 --threads 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Empty
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from code_query_engine.work_callback.broker import WorkCallbackBroker  # noqa: E402
+
+
+class _ScanPerEmitBroker(WorkCallbackBroker):
+    """Baseline: full scan of all runs after every event (the cleanup before the expiry heap)."""
+
+    def _cleanup_locked(self, now: float) -> None:
+        stale = [rid for rid, run in self._runs.items() if run.closed and (now - run.last_emit_ts) > self._run_ttl]
+        for rid in stale:
+            self._runs.pop(rid, None)
+
+
+def _event(run_id: str, i: int) -> Dict[str, Any]:
+    return {
+        "run_id": run_id,
+        "step": {"id": f"step_{i % 7}", "action": "fetch_node_texts"},
+        "action": {"action_id": "fetch_node_texts"},
+        "in": {},
+        "out": {},
+    }
+
+
+def _bench(broker: WorkCallbackBroker, *, runs: int, events_per_run: int, threads: int) -> Dict[str, float]:
+    run_ids = [f"bench-run-{i}" for i in range(runs)]
+    queues = []
+    for rid in run_ids:
+        broker.ensure_run(rid)
+        q, _, _, _ = broker.open_stream(rid)
+        queues.append(q)
+
+    stop = threading.Event()
+    consumed = [0]
+
+    def _consume() -> None:
+        while not stop.is_set():
+            idle = True
+            for q in queues:
+                try:
+                    while True:
+                        q.get_nowait()
+                        consumed[0] += 1
+                        idle = False
+                except Empty:
+                    pass
+            if idle:
+                time.sleep(0.001)
+
+    def _produce(chunk: List[str]) -> None:
+        for i in range(events_per_run):
+            for rid in chunk:
+                broker.emit(rid, _event(rid, i))
+
+    chunks = [run_ids[i::threads] for i in range(threads)]
+    consumer = threading.Thread(target=_consume, daemon=True)
+    consumer.start()
+    producers = [threading.Thread(target=_produce, args=(chunk,)) for chunk in chunks]
+    t0 = time.perf_counter()
+    for t in producers:
+        t.start()
+    for t in producers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    consumer.join()
+
+    total = runs * events_per_run
+    return {"events": total, "seconds": elapsed, "events_per_s": total / elapsed if elapsed else 0.0}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=1000)
+    ap.add_argument("--events-per-run", type=int, default=50)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--closed-runs", type=int, default=5000, help="closed (not yet expired) runs kept in the broker")
+    args = ap.parse_args()
+
+    for name, cls in (("scan_per_emit", _ScanPerEmitBroker), ("expiry_heap", WorkCallbackBroker)):
+        broker = cls()
+        for i in range(args.closed_runs):
+            broker.close(f"closed-{i}")
+        res = _bench(broker, runs=args.runs, events_per_run=args.events_per_run, threads=args.threads)
+        print(f"{name:>14}: {res['events']} events in {res['seconds']:.2f}s -> {res['events_per_s']:,.0f} events/s")
+        print(f"{'':>14}  {broker.retention_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Graph index CLI for LocalAI-RAG.
+
+A graph index is the on-disk, memory-mappable adjacency of one repo snapshot
+(code_query_engine/pipeline/providers/graph_index_file.py). The query server maps it
+instead of streaming every RagEdge object from Weaviate on first use.
+
+Indexes are written by the importer and lazily by the server; this tool builds,
+verifies and prewarms them explicitly, e.g. before a release goes live.
+
+Examples:
+  # Build indexes for every snapshot of a SnapshotSet
+  python -m tools.weaviate.graph_index --env build --snapshot-set nopCommerce_4-60_4-90
+
+  # Verify checksums/version of one snapshot
+  python -m tools.weaviate.graph_index verify --repo nopCommerce --snapshot-id dcfb...
+
+  # Load indexes into the OS page cache (builds missing ones)
+  python -m tools.weaviate.graph_index --env prewarm --snapshot-set nopCommerce_4-60_4-90
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from code_query_engine.pipeline.providers.graph_index_file import (  # noqa: E402
+    GraphIndexError,
+    default_graph_index_dir,
+    graph_index_path,
+    open_graph_index,
+)
+from vector_db.weaviate_client import create_client, get_settings, load_dotenv  # noqa: E402
+
+LOG = logging.getLogger("graph_index")
+
+
+def _connect(args: argparse.Namespace) -> Any:
+    overrides = {
+        "host": (args.weaviate_host or "").strip(),
+        "http_port": int(args.weaviate_http_port or 0),
+        "grpc_port": int(args.weaviate_grpc_port or 0),
+        "api_key": (args.weaviate_api_key or "").strip(),
+    }
+    return create_client(get_settings(overrides={k: v for k, v in overrides.items() if v}))
+
+
+def _resolve_targets(args: argparse.Namespace, client: Optional[Any]) -> List[Tuple[str, str]]:
+    set_id = (args.snapshot_set or "").strip()
+    if set_id:
+        if client is None:
+            raise SystemExit("--snapshot-set requires a Weaviate connection.")
+        from tools.weaviate.snapshot_sets import fetch_snapshot_set
+
+        rec = fetch_snapshot_set(client, snapshot_set_id=set_id)
+        if not rec:
+            raise SystemExit(f"SnapshotSet not found: {set_id}")
+        repo = str(rec.get("repo") or "").strip()
+        ids = list(rec.get("allowed_snapshot_ids") or []) + list(rec.get("allowed_head_shas") or [])
+        seen: List[str] = []
+        for sid in ids:
+            s = str(sid or "").strip()
+            if s and s not in seen:
+                seen.append(s)
+        return [(repo, s) for s in seen]
+
+    repo = (args.repo or "").strip()
+    snapshot_id = (args.snapshot_id or "").strip()
+    if not repo or not snapshot_id:
+        raise SystemExit("Provide --snapshot-set or both --repo and --snapshot-id.")
+    return [(repo, snapshot_id)]
+
+
+def _needs_client(args: argparse.Namespace) -> bool:
+    return bool((args.snapshot_set or "").strip()) or args.cmd in ("build", "prewarm")
+
+
+def _build_one(client: Any, root: Path, repo: str, snapshot_id: str) -> Dict[str, Any]:
+    from code_query_engine.pipeline.providers.weaviate_graph_provider import WeaviateGraphProvider
+
+    provider = WeaviateGraphProvider(client=client, classification_labels_universe=[], security_config={})
+    t0 = time.time()
+    path = provider.build_graph_index(repo=repo, snapshot_id=snapshot_id, root=str(root))
+    idx = open_graph_index(path)
+    return {
+        "path": str(path),
+        "nodes": idx.node_count,
+        "edges": idx.edge_count,
+        "bytes": path.stat().st_size,
+        "build_ms": int((time.time() - t0) * 1000),
+    }
+
+
+def _verify_one(root: Path, repo: str, snapshot_id: str) -> Dict[str, Any]:
+    path = graph_index_path(root, repo=repo, snapshot_id=snapshot_id)
+    if not path.exists():
+        return {"path": str(path), "ok": False, "error": "missing"}
+    try:
+        idx = open_graph_index(path, verify=True)
+    except GraphIndexError as ex:
+        return {"path": str(path), "ok": False, "error": str(ex)}
+    if idx.meta.get("repo") != repo or idx.meta.get("snapshot_id") != snapshot_id:
+        return {"path": str(path), "ok": False, "error": f"belongs to {idx.meta.get('repo')}/{idx.meta.get('snapshot_id')}"}
+    return {"path": str(path), "ok": True, "nodes": idx.node_count, "edges": idx.edge_count, "meta": idx.meta}
+
+
+def _cmd_build(args: argparse.Namespace, client: Any, root: Path) -> int:
+    rc = 0
+    for repo, snapshot_id in _resolve_targets(args, client):
+        path = graph_index_path(root, repo=repo, snapshot_id=snapshot_id)
+        if path.exists() and not args.force and _verify_one(root, repo, snapshot_id).get("ok"):
+            print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, "path": str(path), "skipped": "exists"}))
+            continue
+        try:
+            out = _build_one(client, root, repo, snapshot_id)
+        except Exception as ex:
+            LOG.exception("Build failed for %s/%s", repo, snapshot_id)
+            print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, "error": str(ex)}))
+            rc = 2
+            continue
+        print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, **out}))
+    return rc
+
+
+def _cmd_verify(args: argparse.Namespace, client: Optional[Any], root: Path) -> int:
+    rc = 0
+    for repo, snapshot_id in _resolve_targets(args, client):
+        out = _verify_one(root, repo, snapshot_id)
+        if not out.get("ok"):
+            rc = 2
+        print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, **out}, ensure_ascii=False))
+    return rc
+
+
+def _cmd_prewarm(args: argparse.Namespace, client: Any, root: Path) -> int:
+    rc = 0
+    for repo, snapshot_id in _resolve_targets(args, client):
+        status = _verify_one(root, repo, snapshot_id)
+        if not status.get("ok"):
+            if args.no_build:
+                print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, **status}))
+                rc = 2
+                continue
+            try:
+                _build_one(client, root, repo, snapshot_id)
+            except Exception as ex:
+                LOG.exception("Build failed for %s/%s", repo, snapshot_id)
+                print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, "error": str(ex)}))
+                rc = 2
+                continue
+        idx = open_graph_index(graph_index_path(root, repo=repo, snapshot_id=snapshot_id), verify=False)
+        pages = idx.prewarm()
+        print(json.dumps({"repo": repo, "snapshot_id": snapshot_id, "path": str(idx.path), "pages": pages}))
+    return rc
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Build, verify and prewarm snapshot graph indexes.")
+    p.add_argument("--weaviate-host", default="", help="Optional. Default from config/env.")
+    p.add_argument("--weaviate-http-port", type=int, default=0, help="Optional. Default from config/env.")
+    p.add_argument("--weaviate-grpc-port", type=int, default=0, help="Optional. Default from config/env.")
+    p.add_argument("--weaviate-api-key", default="", help="Optional. Overrides env/config.")
+    p.add_argument("--env", action="store_true", help="Load .env from project root (does not override existing env vars).")
+    p.add_argument(
+        "--index-dir",
+        default="",
+        help="Graph index directory (default: RAG_GRAPH_INDEX_DIR, else config graph_index_dir, else <project>/graph_index).",
+    )
+    p.add_argument("--verbose", "-v", action="count", default=0)
+
+    sub = p.add_subparsers(dest="cmd", required=True)
+    for name, help_text in (
+        ("build", "Build (or rebuild with --force) indexes from RagEdge"),
+        ("verify", "Check version, checksum and snapshot identity"),
+        ("prewarm", "Verify and load indexes into the page cache (builds missing ones)"),
+    ):
+        sp = sub.add_parser(name, help=help_text)
+        sp.add_argument("--snapshot-set", default="", help="SnapshotSet id: process all its snapshots")
+        sp.add_argument("--repo", default="", help="Repo (with --snapshot-id)")
+        sp.add_argument("--snapshot-id", default="", help="Single snapshot id (with --repo)")
+        if name == "build":
+            sp.add_argument("--force", action="store_true", help="Rebuild even if a valid index exists")
+        if name == "prewarm":
+            sp.add_argument("--no-build", action="store_true", help="Do not build missing/invalid indexes")
+    return p
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose >= 2 else (logging.INFO if args.verbose else logging.WARNING),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    if args.env:
+        load_dotenv(PROJECT_ROOT / ".env", override=False)
+
+    root = Path(args.index_dir.strip()) if args.index_dir.strip() else default_graph_index_dir()
+    if root is None:
+        LOG.error("graph index: disabled (graph_index_dir is empty in the runtime config); pass --index-dir.")
+        return 2
+    client = _connect(args) if _needs_client(args) else None
+    try:
+        if args.cmd == "build":
+            return _cmd_build(args, client, root)
+        if args.cmd == "verify":
+            return _cmd_verify(args, client, root)
+        return _cmd_prewarm(args, client, root)
+    finally:
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
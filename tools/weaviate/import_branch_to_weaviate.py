@@ -43,6 +43,13 @@ import weaviate.classes as wvc
 from vector_db.weaviate_client import create_client, get_settings, load_dotenv
 from weaviate.util import generate_uuid5
 
+from classifiers.code_classifier import CODE_KIND_PROPERTY, classify_text
+from code_query_engine.pipeline.providers.graph_adjacency import CompactAdjacencyBuilder
+from code_query_engine.pipeline.providers.graph_index_file import (
+    default_graph_index_dir,
+    graph_index_path,
+    write_graph_index,
+)
 from tools.weaviate.snapshot_id import compute_snapshot_id, extract_folder_fingerprint
 
 try:
@@ -238,6 +245,9 @@ def ensure_schema(client: "weaviate.WeaviateClient") -> None:
                 wvc.config.Property(name="sql_schema", data_type=wvc.config.DataType.TEXT),
                 wvc.config.Property(name="sql_name", data_type=wvc.config.DataType.TEXT),
 
+                # Optional precomputed classifier output (CodeKind.value); lets the query path skip classification.
+                wvc.config.Property(name=CODE_KIND_PROPERTY, data_type=wvc.config.DataType.TEXT),
+
                 # Variant A: ACL on nodes (optional)
                 *(
                     [wvc.config.Property(name="acl_allow", data_type=wvc.config.DataType.TEXT_ARRAY)]
@@ -262,6 +272,16 @@ def ensure_schema(client: "weaviate.WeaviateClient") -> None:
             ],
         )
         LOG.info("Created collection: %s", COL_NODE)
+    else:
+        coll = client.collections.get(COL_NODE)
+        try:
+            cfg = coll.config.get()
+            existing_props = {str(getattr(p, "name", "") or "").strip() for p in (cfg.properties or [])}
+        except Exception:
+            existing_props = set()
+        if CODE_KIND_PROPERTY not in existing_props:
+            coll.config.add_property(wvc.config.Property(name=CODE_KIND_PROPERTY, data_type=wvc.config.DataType.TEXT))
+            LOG.info("Added RagNode property: %s", CODE_KIND_PROPERTY)
 
     # Edges: from/to + type
     if COL_EDGE not in existing:
@@ -785,6 +805,7 @@ def insert_nodes(
     nodes: Iterable[Dict[str, Any]],
     embed_batch: int,
     weaviate_batch: int,
+    precompute_code_kind: bool = True,
 ) -> ImportCounts:
     coll = client.collections.use(COL_NODE).with_tenant(meta.snapshot_id)
 
@@ -809,6 +830,8 @@ def insert_nodes(
             p["branch"] = meta.branch
             p["snapshot_id"] = meta.snapshot_id
             p["head_sha"] = meta.head_sha
+            if precompute_code_kind and not p.get(CODE_KIND_PROPERTY):
+                p[CODE_KIND_PROPERTY] = classify_text(str(p.get("text") or "")).kind.value
 
             obj_uuid = generate_uuid5(p["canonical_id"])
             objs.append(wvc.data.DataObject(uuid=obj_uuid, properties=p, vector=vec))
@@ -852,7 +875,12 @@ def insert_edges(
     import_id: str,
     edges: Iterable[Tuple[str, str, str]],
     weaviate_batch: int,
+    collected: Optional[List[Tuple[str, str, str, str]]] = None,
 ) -> ImportCounts:
+    """
+    Inserts unique edges. If `collected` is given, appends (edge_uuid, from, type, to) for every
+    inserted edge so the caller can write the snapshot's graph index without re-reading Weaviate.
+    """
     coll = client.collections.use(COL_EDGE).with_tenant(meta.snapshot_id)
 
     counts = ImportCounts()
@@ -892,6 +920,8 @@ def insert_edges(
         }
         edge_uuid = generate_uuid5(f"{meta.repo}::{meta.snapshot_id}::{edge_key}")
         buf.append(wvc.data.DataObject(uuid=edge_uuid, properties=props, vector=[0.0]))
+        if collected is not None:
+            collected.append((str(edge_uuid), from_cid, edge_type, to_cid))
 
         if len(buf) >= weaviate_batch:
             flush()
@@ -900,6 +930,28 @@ def insert_edges(
     return counts
 
 
+def write_snapshot_graph_index(
+    root: str,
+    *,
+    meta: RepoMeta,
+    import_id: str,
+    edges: List[Tuple[str, str, str, str]],
+) -> Path:
+    """
+    Writes the on-disk graph index read by WeaviateGraphProvider.
+
+    Edges are ordered by object UUID, which is the order the Weaviate iterator returns them,
+    so dependency expansion is identical whether the server maps this file or scans RagEdge.
+    """
+    builder = CompactAdjacencyBuilder()
+    for _uuid, from_cid, edge_type, to_cid in sorted(edges, key=lambda e: e[0]):
+        builder.add(from_cid, (edge_type or "edge").strip() or "edge", to_cid)
+    path = graph_index_path(root, repo=meta.repo, snapshot_id=meta.snapshot_id)
+    return write_graph_index(
+        path, builder.build(), repo=meta.repo, snapshot_id=meta.snapshot_id, import_id=import_id, source="import"
+    )
+
+
 # ------------------------------
 # Main import
 # ------------------------------
@@ -918,6 +970,8 @@ def run_import(
     ref_type: str,
     ref_name: str,
     tag: str,
+    precompute_code_kind: bool = True,
+    graph_index_dir: Optional[str] = None,
 ) -> None:
     started = utc_now_iso()
     bundle, meta = open_bundle(bundle_path)
@@ -951,6 +1005,7 @@ def run_import(
             nodes=iter_cs_nodes(bundle, meta),
             embed_batch=embed_batch,
             weaviate_batch=weaviate_batch,
+            precompute_code_kind=precompute_code_kind,
         )
         LOG.info(
             "Imported C# nodes: raw=%d unique=%d dupes=%d",
@@ -966,12 +1021,15 @@ def run_import(
             nodes=iter_sql_nodes(bundle, meta),
             embed_batch=embed_batch,
             weaviate_batch=weaviate_batch,
+            precompute_code_kind=precompute_code_kind,
         )
         LOG.info(
             "Imported SQL nodes: raw=%d unique=%d dupes=%d",
             sql_nodes.raw, sql_nodes.unique, sql_nodes.dupes
         )
 
+        index_edges: Optional[List[Tuple[str, str, str, str]]] = [] if graph_index_dir else None
+
         LOG.info("Importing edges: C# dependencies ...")
         cs_edges = insert_edges(
             client,
@@ -979,6 +1037,7 @@ def run_import(
             import_id=import_id,
             edges=iter_cs_edges(bundle, meta),
             weaviate_batch=weaviate_batch,
+            collected=index_edges,
         )
         LOG.info(
             "Imported C# edges: raw=%d unique=%d dupes=%d",
@@ -992,12 +1051,23 @@ def run_import(
             import_id=import_id,
             edges=iter_sql_edges(bundle, meta),
             weaviate_batch=weaviate_batch,
+            collected=index_edges,
         )
         LOG.info(
             "Imported SQL edges: raw=%d unique=%d dupes=%d",
             sql_edges.raw, sql_edges.unique, sql_edges.dupes
         )
 
+        if graph_index_dir and index_edges is not None:
+            # Optional optimization: the query server rebuilds the index lazily if this fails.
+            try:
+                path = write_snapshot_graph_index(
+                    graph_index_dir, meta=meta, import_id=import_id, edges=index_edges
+                )
+                LOG.info("Wrote graph index: %s (edges=%d)", path, len(index_edges))
+            except Exception:
+                LOG.exception("Failed to write graph index for snapshot_id=%s", meta.snapshot_id)
+
         finished = utc_now_iso()
         stats = {
             "nodes_cs": cs_nodes.as_dict(),
@@ -1061,6 +1131,14 @@ def run_import(
         client.close()
 
 
+def _graph_index_dir_arg(value: str) -> Optional[str]:
+    # An explicit --graph-index-dir wins; otherwise the resolver shared with the server (None = disabled in config).
+    if (value or "").strip():
+        return value.strip()
+    root = default_graph_index_dir()
+    return str(root) if root is not None else None
+
+
 def build_arg_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Import LocalAI-RAG branch bundle into Weaviate (BYOV).")
     p.add_argument("--bundle", required=True, help="Path to branch folder OR .zip")
@@ -1076,6 +1154,17 @@ def build_arg_parser() -> argparse.ArgumentParser:
     p.add_argument("--ref-type", default="branch", help="branch|tag|detached")
     p.add_argument("--ref-name", default="", help="e.g. develop or v4.90.0")
     p.add_argument("--tag", default="", help="Tag name if applicable")
+    p.add_argument(
+        "--no-precompute-code-kind",
+        action="store_true",
+        help="Do not store classifier output (code_kind) on RagNode; the query path will classify texts at runtime.",
+    )
+    p.add_argument(
+        "--graph-index-dir",
+        default="",
+        help="Where to write the snapshot graph index (default: RAG_GRAPH_INDEX_DIR, else config graph_index_dir, else <project>/graph_index).",
+    )
+    p.add_argument("--no-graph-index", action="store_true", help="Do not write the on-disk graph index.")
     p.add_argument("--log-level", default="INFO")
     return p
 
@@ -1106,6 +1195,8 @@ def main() -> int:
         ref_type=args.ref_type,
         ref_name=args.ref_name,
         tag=args.tag,
+        precompute_code_kind=not args.no_precompute_code_kind,
+        graph_index_dir=None if args.no_graph_index else _graph_index_dir_arg(args.graph_index_dir),
     )
     return 0
 
@@ -75,6 +75,7 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from vector_db.weaviate_client import create_client, get_settings, load_dotenv  # noqa: E402
+from code_query_engine.pipeline.providers.graph_index_file import default_graph_index_dir, graph_index_path  # noqa: E402
 
 LOG = logging.getLogger("snapshot_sets")
 
@@ -572,9 +573,22 @@ def _purge_snapshot_data(
     result["nodes"] = _delete_many(node_coll, node_filter)
     result["edges"] = _delete_many(edge_coll, edge_filter)
     result["import_runs"] = _delete_many(import_coll, import_filter)
+    result["graph_index_removed"] = _remove_graph_index(repo=repo, snapshot_id=snapshot_id)
     return result
 
 
+def _remove_graph_index(*, repo: str, snapshot_id: str) -> bool:
+    root = default_graph_index_dir()
+    if root is None:
+        return False
+    path = graph_index_path(root, repo=repo, snapshot_id=snapshot_id)
+    try:
+        path.unlink()
+        return True
+    except FileNotFoundError:
+        return False
+
+
 def _update_snapshot_sets_remove_snapshot(
     client: "weaviate.WeaviateClient",
     *,
@@ -626,6 +640,49 @@ def _update_snapshot_sets_remove_snapshot(
     return touched
 
 
+def _notify_server_cache_invalidation(
+    server_url: str,
+    *,
+    snapshot_id: str = "",
+    snapshot_set_id: str = "",
+    token: str = "",
+) -> Optional[bool]:
+    """
+    Best-effort: drop a running query server's cached data for a changed snapshot / SnapshotSet
+    (retrieval results, SnapshotSet records and labels) via DELETE /pipeline/cache.
+
+    Without --notify-server the server still converges on its own: SnapshotSet records expire
+    after their TTL, and retrieval results are keyed on the snapshot's ImportRun rows. With
+    several server workers only the one handling the request is cleared; the rest converge the same way.
+    """
+    base = (server_url or "").strip().rstrip("/")
+    if not base:
+        return None
+    from urllib.parse import urlencode
+    from urllib.request import Request, urlopen
+
+    params = {k: v for k, v in (("snapshot_id", snapshot_id), ("snapshot_set_id", snapshot_set_id)) if v}
+    if not params:
+        return None
+    req = Request(f"{base}/pipeline/cache?{urlencode(params)}", method="DELETE")
+    if token.strip():
+        req.add_header("Authorization", f"Bearer {token.strip()}")
+    try:
+        with urlopen(req, timeout=5) as resp:
+            return 200 <= int(resp.status) < 300
+    except Exception as ex:
+        LOG.warning("Query server cache invalidation failed (%s): %s", base, ex)
+        return False
+
+
+def _notify_server(args: argparse.Namespace, **kwargs: str) -> Optional[bool]:
+    return _notify_server_cache_invalidation(
+        str(getattr(args, "notify_server", "") or ""),
+        token=os.getenv("APP_OPERATOR_TOKEN", ""),
+        **kwargs,
+    )
+
+
 def _suggest_snapshot_set_id(repo: str, labels: List[str]) -> str:
     repo_part = _sanitize_id_part(repo) or "repo"
     label_parts = [_sanitize_id_part(x) for x in labels if _sanitize_id_part(x)]
@@ -729,6 +786,7 @@ def _cmd_add(args: argparse.Namespace) -> int:
         )
 
         upsert_snapshot_set(client, rec)
+        _notify_server(args, snapshot_set_id=snapshot_set_id)
         print("OK")
         print(json.dumps(rec.as_props(), ensure_ascii=False, indent=2))
         return 0
@@ -743,6 +801,8 @@ def _cmd_delete(args: argparse.Namespace) -> int:
     try:
         ensure_schema(client)
         ok = delete_snapshot_set(client, snapshot_set_id=args.id.strip(), repo=args.repo)
+        if ok:
+            _notify_server(args, snapshot_set_id=args.id.strip())
         print("DELETED" if ok else "NOT FOUND")
         return 0 if ok else 2
     finally:
@@ -849,6 +909,7 @@ def _cmd_snapshots(args: argparse.Namespace) -> int:
         )
 
         upsert_snapshot_set(client, rec)
+        _notify_server(args, snapshot_set_id=snapshot_set_id)
         print("\nOK (SnapshotSet created/updated)")
         print(json.dumps(rec.as_props(), ensure_ascii=False, indent=2))
         return 0
@@ -946,6 +1007,8 @@ def _cmd_purge_snapshot(args: argparse.Namespace) -> int:
             # Do not roll back data deletion; instruct user to re-run update step.
             return 3
 
+        cache_notified = _notify_server(args, snapshot_id=snapshot_id)
+
         print("\nOK (snapshot purged)")
         deleted_sets = [s for s in touched_sets if "(deleted)" in s]
         if deleted_sets:
@@ -954,7 +1017,15 @@ def _cmd_purge_snapshot(args: argparse.Namespace) -> int:
                 print(f"- {s}")
         print(
             json.dumps(
-                _jsonify({"repo": repo, "snapshot_id": snapshot_id, "purge": purge_result, "snapshot_sets_updated": touched_sets}),
+                _jsonify(
+                    {
+                        "repo": repo,
+                        "snapshot_id": snapshot_id,
+                        "purge": purge_result,
+                        "snapshot_sets_updated": touched_sets,
+                        "server_cache_invalidated": cache_notified,
+                    }
+                ),
                 ensure_ascii=False,
                 indent=2,
             )
@@ -979,6 +1050,12 @@ def build_arg_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Load .env from project root before reading config/env (does not override existing env vars).",
     )
+    p.add_argument(
+        "--notify-server",
+        default="",
+        help="Optional query server base URL. After add/delete/purge, drop the server's cached SnapshotSets, "
+        "labels and retrieval results (operator token from APP_OPERATOR_TOKEN env).",
+    )
     p.add_argument(
         "--verbose",
         action="count",